@@ -1,9 +1,8 @@
 import os
+import sys
 import json
-import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service as ChromeService
@@ -12,11 +11,18 @@ from selenium.webdriver.chrome.options import Options as ChromeOptions
 from config import Config
 from ai_client import UniversalAIClient
 
+# Общие модули агента лежат в корне репозитория
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from page_snapshot import take_page_snapshot
+from page_cache import get_shared_page_cache
+from page_transition import wait_for_stable_page
+
 class AILocatorFinder:
     def __init__(self):
         self.config = Config()
         self.ai_client = UniversalAIClient()
         self.driver = None
+        self.page_cache = get_shared_page_cache()
         self.debug_mode = True
         
     def setup_driver(self):
@@ -34,7 +40,8 @@ class AILocatorFinder:
             
             service = ChromeService(ChromeDriverManager().install())
             self.driver = webdriver.Chrome(service=service, options=options)
-            self.driver.implicitly_wait(10)
+            # Без неявного ожидания: отсутствующие h1/h2/h3 не должны стоить по 10 секунд
+            self.driver.implicitly_wait(0)
             
             print("✅ Браузер настроен для анализа")
             return True
@@ -113,12 +120,9 @@ class AILocatorFinder:
         
         try:
             self.driver.get(url)
-            time.sleep(3)
             
-            # Ждем загрузки
-            WebDriverWait(self.driver, 15).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
-            )
+            # Ждем загрузки и стабилизации страницы (DOM и сеть), без фиксированной паузы
+            wait_for_stable_page(self.driver, timeout=15)
             
             page_info = {
                 'url': url,
@@ -306,41 +310,41 @@ class AILocatorFinder:
             "[data-testid]"
         ]
         
-        for selector in selectors:
-            try:
-                found_elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                for element in found_elements[:20]:  # Ограничиваем количество
-                    if element.is_displayed():
-                        element_info = self._extract_element_info(element)
-                        if element_info:
-                            elements.append(element_info)
-            except:
-                continue
+        try:
+            # Все селекторы обрабатываются одним вызовом execute_script;
+            # уже снятая страница с тем же отпечатком DOM берётся из кэша
+            snapshot = self.page_cache.snapshot(
+                self.driver, lambda driver: take_page_snapshot(driver, selectors, limit_per_selector=20),
+                variant="ai_test_generator"
+            )
+        except Exception:
+            return elements
+        
+        for record in snapshot:
+            element_info = self._extract_element_info(record)
+            if element_info:
+                elements.append(element_info)
         
         return elements
 
-    def _extract_element_info(self, element):
-        """Извлекает информацию об элементе"""
-        try:
-            info = {
-                'tag': element.tag_name,
-                'text': element.text.strip() if element.text else "",
-                'attributes': {}
-            }
-            
-            attributes = ['id', 'name', 'type', 'placeholder', 'class', 'value', 'href', 'aria-label', 'data-testid', 'for']
-            for attr in attributes:
-                value = element.get_attribute(attr)
-                if value and value.strip():
-                    info['attributes'][attr] = value.strip()
-            
-            if not info['text'] and not info['attributes']:
-                return None
-                
-            return info
-            
-        except:
+    def _extract_element_info(self, record):
+        """Извлекает информацию об элементе из записи снимка страницы"""
+        info = {
+            'tag': record['tag'],
+            'text': record['text'],
+            'attributes': {}
+        }
+        
+        attributes = ['id', 'name', 'type', 'placeholder', 'class', 'value', 'href', 'aria-label', 'data-testid', 'for']
+        for attr in attributes:
+            value = record['attributes'].get(attr)
+            if value and value.strip():
+                info['attributes'][attr] = value.strip()
+        
+        if not info['text'] and not info['attributes']:
             return None
+            
+        return info
 
     def _get_forms_info(self):
         """Получает информацию о формах"""
@@ -1,12 +1,17 @@
 import os
+import sys
 import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
+from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 
+# Общие модули агента лежат в корне репозитория
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from element_probe import ElementProbe
+
 class AdvancedAutoTestGenerator:
     def __init__(self):
         self.driver = None
@@ -14,6 +19,7 @@ class AdvancedAutoTestGenerator:
         self.locators_map = {}
         self.current_page = 1
         self.execution_log = []
+        self.probe = None
         
     def setup_driver(self):
         """Настройка Chrome драйвера"""
@@ -27,7 +33,9 @@ class AdvancedAutoTestGenerator:
             service=Service(ChromeDriverManager().install()),
             options=options
         )
-        self.driver.implicitly_wait(10)
+        # Без неявного ожидания: 11 стратегий поиска на кнопку не должны ждать по 10 секунд
+        self.driver.implicitly_wait(0)
+        self.probe = ElementProbe(self.driver, action_timeout=10)
         self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         print("✅ Драйвер успешно настроен")
 
@@ -115,14 +123,8 @@ class AdvancedAutoTestGenerator:
         strategies = self._get_locator_strategies(element_type, element_name)
         
         for strategy in strategies:
-            try:
-                elements = self.driver.find_elements(By.XPATH, strategy)
-                if elements:
-                    visible_elements = [el for el in elements if el.is_displayed()]
-                    if visible_elements:
-                        return strategy
-            except Exception:
-                continue
+            if self.probe.find_visible(By.XPATH, strategy):
+                return strategy
         
         # Fallback: поиск по частичному совпадению текста
         if element_type in ['button', 'text']:
@@ -131,12 +133,8 @@ class AdvancedAutoTestGenerator:
                 f"//*[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{element_name.lower()}')]"
             ]
             for strategy in fallback_strategies:
-                try:
-                    elements = self.driver.find_elements(By.XPATH, strategy)
-                    if elements and any(el.is_displayed() for el in elements):
-                        return strategy
-                except Exception:
-                    continue
+                if self.probe.find_visible(By.XPATH, strategy):
+                    return strategy
         
         return None
 
@@ -191,8 +189,9 @@ class AdvancedAutoTestGenerator:
     def execute_scenario_and_collect_locators(self, analyzed_steps, start_url):
         """Последовательное выполнение сценария и сбор локаторов"""
         print(f"🚀 Начинаем выполнение сценария с URL: {start_url}")
+        self.probe.reset_stats()
         self.driver.get(start_url)
-        time.sleep(3)
+        self._wait_for_page_load()
         
         page_locators = {}
         current_page_steps = []
@@ -245,23 +244,32 @@ class AdvancedAutoTestGenerator:
                 }
         
         self.locators_map = page_locators
+        wait_stats = self.probe.stats()
+        print(f"⏱️  Время ожиданий за сценарий: {wait_stats['total_seconds']} с {wait_stats['by_label']}")
         return page_locators
 
     def _perform_element_action(self, locator_info):
         """Выполнение действия с элементом"""
         try:
             if locator_info['type'] == 'button':
-                element = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, locator_info['locator']))
+                element = self.probe.wait_until(
+                    EC.element_to_be_clickable((By.XPATH, locator_info['locator'])), label="action"
                 )
+                if element is None:
+                    print(f"❌ Элемент недоступен для клика: {locator_info['element']}")
+                    return False
+                self.probe.mark_page()
                 element.click()
                 print(f"✅ Выполнен клик: {locator_info['element']}")
                 return True
                 
             elif locator_info['type'] == 'input':
-                element = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, locator_info['locator']))
+                element = self.probe.wait_until(
+                    EC.presence_of_element_located((By.XPATH, locator_info['locator'])), label="action"
                 )
+                if element is None:
+                    print(f"❌ Элемент не найден: {locator_info['element']}")
+                    return False
                 element.clear()
                 test_data = locator_info['test_data'] or f"test_{locator_info['element']}"
                 element.send_keys(test_data)
@@ -269,9 +277,12 @@ class AdvancedAutoTestGenerator:
                 return True
                 
             elif locator_info['type'] == 'dropdown':
-                element = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, locator_info['locator']))
+                element = self.probe.wait_until(
+                    EC.presence_of_element_located((By.XPATH, locator_info['locator'])), label="action"
                 )
+                if element is None:
+                    print(f"❌ Элемент не найден: {locator_info['element']}")
+                    return False
                 select = Select(element)
                 if len(select.options) > 1:
                     select.select_by_index(1)
@@ -279,9 +290,12 @@ class AdvancedAutoTestGenerator:
                 return True
                 
             elif locator_info['type'] == 'text':
-                element = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, locator_info['locator']))
+                element = self.probe.wait_until(
+                    EC.presence_of_element_located((By.XPATH, locator_info['locator'])), label="action"
                 )
+                if element is None:
+                    print(f"❌ Элемент не найден: {locator_info['element']}")
+                    return False
                 if element.is_displayed():
                     print(f"✅ Проверен текст: {locator_info['element']}")
                     return True
@@ -298,16 +312,10 @@ class AdvancedAutoTestGenerator:
             return False
 
     def _wait_for_page_load(self, timeout=10):
-        """Ожидание загрузки страницы"""
-        try:
-            WebDriverWait(self.driver, timeout).until(
-                lambda driver: driver.execute_script("return document.readyState") == "complete"
-            )
-            time.sleep(2)  # Дополнительная пауза для стабилизации
-            return True
-        except Exception as e:
-            print(f"⚠️  Страница загружена, но превышено время ожидания: {e}")
-            return True
+        """Ожидание загрузки страницы: до стабилизации DOM и сети, без фиксированной паузы"""
+        if not self.probe.wait_for_stable_page(timeout)["stable"]:
+            print(f"⚠️  Страница загружена, но превышено время ожидания: {timeout} с")
+        return True
 
     def generate_complete_test_code(self, test_name):
         """Генерация полного Python кода авто-теста"""
@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import re
 from selenium import webdriver
@@ -6,12 +7,14 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 from selenium.webdriver.chrome.service import Service as ChromeService
 
-from llama_cpp import Llama
+# Общие модули агента лежат в корне репозитория
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_server import create_llm
 
 class LocalAILocatorFinder:
     def __init__(self, gguf_model_path):
         self.gguf_model_path = gguf_model_path
-        self.llm = Llama(model_path=gguf_model_path, n_ctx=4096)
+        self.llm = create_llm(gguf_model_path, n_ctx=4096)
         self.driver = None
 
     def setup_driver(self):
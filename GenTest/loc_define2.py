@@ -1,25 +1,131 @@
 import os
+import sys
 import json
-import re
 import time
 import logging
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException
 
-from llama_cpp import Llama
+# Общие модули агента лежат в корне репозитория
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from page_snapshot import take_page_snapshot, to_element_info
+from page_cache import get_shared_page_cache
+from element_probe import ElementProbe
+from locator_verifier import normalize_locator_type
+from scenario_walker import ActionTargetResolver
+from element_filter import select_relevant_elements, elements_json
+from browser_pool import get_shared_pool
+from json_grammar import json_completion_kwargs, parse_json_output
+from model_server import create_llm
+
+# JSON-схемы ответов модели: генерация ограничивается грамматикой и
+# останавливается на закрывающей скобке
+SCENARIO_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "initial_url": {"type": "string"},
+        "actions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "action": {"enum": ["navigate", "type", "click", "wait"]},
+                    "target": {"type": "string"},
+                    "value": {"type": "string"},
+                    "description": {"type": "string"}
+                },
+                "required": ["action", "target", "description"]
+            }
+        },
+        "required_elements": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "description": {"type": "string"},
+                    "page": {"type": "string"}
+                },
+                "required": ["name", "description", "page"]
+            }
+        }
+    },
+    "required": ["initial_url", "actions", "required_elements"]
+}
+
+ELEMENT_LOCATOR_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "locator_type": {"enum": ["id", "name", "xpath", "css", "class", "text"]},
+        "locator_value": {"type": "string"}
+    },
+    "required": ["locator_type", "locator_value"]
+}
+
+# Поля элемента в собранных данных и в промпте модели
+ELEMENT_FIELDS = (
+    "tag", "text", "id", "name", "class", "type", "placeholder", "value",
+    "href", "src", "alt", "aria_label", "data_test"
+)
+
+# Служебные поля собранных элементов, не нужные модели
+PROMPT_EXCLUDED_FIELDS = ("url", "collected_at", "source_page")
+
+# Нормализованный тип локатора (locator_verifier) -> стратегия Selenium
+SELENIUM_BY = {
+    "id": By.ID,
+    "name": By.NAME,
+    "css": By.CSS_SELECTOR,
+    "xpath": By.XPATH,
+    "class_name": By.CLASS_NAME,
+    "tag_name": By.TAG_NAME,
+    "link_text": By.LINK_TEXT,
+    "partial_link_text": By.PARTIAL_LINK_TEXT,
+}
+
+LOCATORS_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "required_element": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "description": {"type": "string"},
+                    "page": {"type": "string"}
+                },
+                "required": ["name", "description", "page"]
+            },
+            "locator": {
+                "type": "object",
+                "properties": {
+                    "type": {"enum": ["By.ID", "By.CSS_SELECTOR", "By.NAME", "By.XPATH", "By.CLASS_NAME", "By.LINK_TEXT"]},
+                    "value": {"type": "string"},
+                    "reasoning": {"type": "string"},
+                    "page_url": {"type": "string"},
+                    "page_name": {"type": "string"}
+                },
+                "required": ["type", "value", "reasoning", "page_url", "page_name"]
+            }
+        },
+        "required": ["required_element", "locator"]
+    }
+}
 
 class LocalAILocatorFinder:
     def __init__(self, gguf_model_path):
         self.gguf_model_path = gguf_model_path
-        self.llm = Llama(model_path=gguf_model_path, n_ctx=4096)
+        self.llm = create_llm(gguf_model_path, n_ctx=4096)
         self.driver = None
+        self.probe = None
+        self.page_cache = get_shared_page_cache()
         self.all_page_elements = {}
+        # Снимок страницы после последнего действия: по нему ищутся цели следующих действий
+        self.last_snapshot = None
+        self.target_resolver = ActionTargetResolver(llm_fallback=self._llm_locator)
         self.current_page = 0
         self.action_history = []
         
@@ -39,36 +145,26 @@ class LocalAILocatorFinder:
         self.logger = logging.getLogger(__name__)
 
     def setup_driver(self):
-        """Настройка веб-драйвера"""
-        options = ChromeOptions()
-        options.add_argument("--headless")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1920,1080")
-        service = ChromeService()
-        self.driver = webdriver.Chrome(service=service, options=options)
-        self.driver.implicitly_wait(10)
+        """Берёт веб-драйвер из общего пула тёплых сессий"""
+        self.driver = get_shared_pool().acquire()
+        # Без неявного ожидания: ждём только явно, через self.probe
+        self.driver.implicitly_wait(0)
+        self.probe = ElementProbe(self.driver, action_timeout=10)
 
     def wait_for_element(self, by, value, timeout=10):
         """Ожидание появления элемента на странице"""
-        try:
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_element_located((by, value))
-            )
-            return element
-        except TimeoutException:
+        element = self.probe.wait_until(
+            EC.presence_of_element_located((by, value)), timeout=timeout, label="element"
+        )
+        if element is None:
             self.logger.warning(f"Элемент {by}={value} не найден за {timeout} секунд")
-            return None
+        return element
 
-    def wait_for_page_load(self, timeout=10):
-        """Ожидание полной загрузки страницы"""
-        try:
-            WebDriverWait(self.driver, timeout).until(
-                lambda driver: driver.execute_script("return document.readyState") == "complete"
-            )
+    def wait_for_page_load(self, timeout=10, start_url=None):
+        """Ожидание загрузки и стабилизации страницы (без фиксированных пауз)"""
+        if self.probe.wait_for_stable_page(timeout, start_url=start_url)["stable"]:
             self.logger.info("Страница полностью загружена")
-        except TimeoutException:
+        else:
             self.logger.warning(f"Страница не загрузилась полностью за {timeout} секунд")
 
     def log_page_transition(self, from_page, to_page, action=None):
@@ -108,25 +204,25 @@ class LocalAILocatorFinder:
         print(prompt)
         print("=== END PROMPT ===")
         
-        output = self.llm(prompt, max_tokens=1024, stop=["\n\n"])
+        output = self.llm(prompt, max_tokens=1024, **json_completion_kwargs(SCENARIO_SCHEMA, stop=["\n\n"], llm=self.llm))
         print("=== MODEL OUTPUT (analyze_scenario) ===")
         rez = self._clean_generated_code(output['choices'][0]['text'])
         print(rez)
         print("=== END MODEL OUTPUT ===")
         
-        match = re.search(r'\{.*\}', rez, re.DOTALL)
-        if match:
-            try:
-                scenario_info = json.loads(match.group(0))
+        try:
+            scenario_info = parse_json_output(rez)
+            if isinstance(scenario_info, dict):
                 return scenario_info
-            except Exception as e:
-                self.logger.error(f"Ошибка парсинга JSON: {e}")
+        except ValueError as e:
+            self.logger.error(f"Ошибка парсинга JSON: {e}")
         
         raise ValueError("Не удалось получить корректный JSON из ответа Llama")
 
-    def collect_page_elements(self, page_name):
+    def collect_page_elements(self, page_name, use_cache=True):
         """
         Собирает информацию о всех видимых элементах на текущей странице.
+        use_cache=False — страница снимается заново (после действий сценария).
         """
         self.wait_for_page_load()
         
@@ -136,40 +232,34 @@ class LocalAILocatorFinder:
         elements_info = []
         tags = ['input', 'button', 'a', 'select', 'textarea', 'div', 'span', 'li', 'img']
         
-        for tag in tags:
-            try:
-                found = self.driver.find_elements(By.TAG_NAME, tag)
-                for el in found:
-                    if not el.is_displayed():
-                        continue
-                    
-                    # Получаем дополнительные атрибуты для лучшей идентификации
-                    attributes = {
-                        "tag": tag,
-                        "text": el.text.strip()[:100],  # Ограничиваем длину текста
-                        "id": el.get_attribute("id"),
-                        "name": el.get_attribute("name"),
-                        "class": el.get_attribute("class"),
-                        "type": el.get_attribute("type"),
-                        "placeholder": el.get_attribute("placeholder"),
-                        "value": el.get_attribute("value"),
-                        "href": el.get_attribute("href"),
-                        "src": el.get_attribute("src"),
-                        "alt": el.get_attribute("alt"),
-                        "aria_label": el.get_attribute("aria-label"),
-                        "data_test": el.get_attribute("data-test"),
-                        "page": page_name,
-                        "url": self.driver.current_url,
-                        "collected_at": datetime.now().isoformat()
-                    }
-                    
-                    # Очищаем None значения
-                    attributes = {k: v for k, v in attributes.items() if v is not None}
-                    elements_info.append(attributes)
-                    
-            except Exception as e:
-                self.logger.warning(f"Ошибка при сборе элементов тега {tag}: {e}")
-                continue
+        try:
+            # Один вызов execute_script вместо запросов к WebDriver на каждый атрибут;
+            # уже снятая страница с тем же отпечатком DOM берётся из кэша
+            if use_cache:
+                snapshot = self.page_cache.snapshot(
+                    self.driver, lambda driver: take_page_snapshot(driver, tags, text_limit=100), variant="loc_define2"
+                )
+            else:
+                snapshot = take_page_snapshot(self.driver, tags, text_limit=100)
+        except Exception as e:
+            self.logger.warning(f"Ошибка при снимке страницы {page_name}: {e}")
+            snapshot = []
+        self.last_snapshot = snapshot
+        
+        current_url = self.driver.current_url
+        collected_at = datetime.now().isoformat()
+        for record in snapshot:
+            # Получаем дополнительные атрибуты для лучшей идентификации
+            attributes = to_element_info(record, ELEMENT_FIELDS)
+            attributes.update({
+                "page": page_name,
+                "url": current_url,
+                "collected_at": collected_at
+            })
+            
+            # Очищаем None значения
+            attributes = {k: v for k, v in attributes.items() if v is not None}
+            elements_info.append(attributes)
                 
         self.all_page_elements[page_name] = elements_info
         self.logger.info(f"Собрано {len(elements_info)} элементов со страницы {page_name}")
@@ -195,10 +285,11 @@ class LocalAILocatorFinder:
                 
             elif action_type == "click":
                 # Ищем элемент для клика по различным стратегиям
-                element = self.find_element_by_description(target)
+                element = self.find_element_by_description(target, description)
                 if element:
+                    start_url = self.probe.mark_page()
                     element.click()
-                    self.wait_for_page_load()
+                    self.wait_for_page_load(start_url=start_url)
                     new_page_name = f"page_after_click_{len(self.all_page_elements)}"
                     self.log_page_transition(page_name, new_page_name, f"Клик: {description}")
                     return new_page_name
@@ -206,7 +297,7 @@ class LocalAILocatorFinder:
                     self.logger.error(f"Не удалось найти элемент для клика: {target}")
                     
             elif action_type == "type":
-                element = self.find_element_by_description(target)
+                element = self.find_element_by_description(target, description)
                 if element:
                     element.clear()
                     element.send_keys(value)
@@ -225,37 +316,51 @@ class LocalAILocatorFinder:
             
         return page_name
 
-    def find_element_by_description(self, description):
+    def find_element_by_description(self, target, description=""):
         """
-        Находит элемент на странице по описанию из сценария.
-        Использует LLM для определения лучшего локатора.
+        Находит элемент на странице по цели действия из сценария.
+        Сначала буквальный локатор и LocatorRanker по снимку после предыдущего
+        действия, LLM — только если локально элемент не найден.
         """
-        current_elements = self.collect_page_elements("temp")
-        
+        if self.last_snapshot is None:
+            self.collect_page_elements("temp")
+        locator = self.target_resolver.resolve(self.driver, target, description, self.last_snapshot)
+        if locator is None:
+            return None
+        if locator["source"] == "llm":
+            return self.find_element_by_locator(locator["type"], locator["value"])
+        by = SELENIUM_BY.get(normalize_locator_type(locator["type"]))
+        # Локатор уже проверен на странице: долго ждать не нужно
+        return self.wait_for_element(by, locator["value"], timeout=2) if by else None
+
+    def _llm_locator(self, target, description, snapshot):
+        """
+        Запасной путь: LLM выбирает локатор по тому же снимку страницы.
+        """
+        current_elements = select_relevant_elements(
+            [{"name": target, "description": description}],
+            [to_element_info(record, ELEMENT_FIELDS) for record in snapshot]
+        )
         prompt = (
             "Ты — эксперт по Selenium. "
             "Найди наиболее подходящий HTML элемент на странице по описанию. "
             "Верни ТОЛЬКО JSON в формате: "
             '{"locator_type": "id|name|xpath|css|class|text", "locator_value": "string"}'
-            f"Описание элемента: {description}\n"
-            f"Доступные элементы на странице (JSON):\n{json.dumps(current_elements[:30], ensure_ascii=False)}\n"
+            f"Описание элемента: {target}\n"
+            f"Доступные элементы на странице (JSON):\n{elements_json(current_elements)}\n"
             "Ответ только в формате JSON:"
         )
         
         try:
-            output = self.llm(prompt, max_tokens=512, stop=["\n\n"])
+            output = self.llm(prompt, max_tokens=512, **json_completion_kwargs(ELEMENT_LOCATOR_SCHEMA, stop=["\n\n"], llm=self.llm))
             cleaned_output = self._clean_generated_code(output['choices'][0]['text'])
             
-            match = re.search(r'\{.*\}', cleaned_output, re.DOTALL)
-            if match:
-                locator_info = json.loads(match.group(0))
-                locator_type = locator_info.get("locator_type", "")
-                locator_value = locator_info.get("locator_value", "")
-                
-                return self.find_element_by_locator(locator_type, locator_value)
+            locator_info = parse_json_output(cleaned_output)
+            if isinstance(locator_info, dict):
+                return {"type": locator_info.get("locator_type", ""), "value": locator_info.get("locator_value", "")}
                 
         except Exception as e:
-            self.logger.error(f"Ошибка при поиске элемента по описанию '{description}': {e}")
+            self.logger.error(f"Ошибка при поиске элемента по описанию '{target}': {e}")
             
         return None
 
@@ -312,10 +417,8 @@ class LocalAILocatorFinder:
             if new_page != current_page:
                 # Если произошел переход на новую страницу, собираем элементы
                 current_page = new_page
-                self.collect_page_elements(current_page)
-                
-            # Небольшая пауза между действиями
-            time.sleep(1)
+                # После действий содержимое страницы могло измениться без смены структуры DOM
+                self.collect_page_elements(current_page, use_cache=False)
         
         self.logger.info("Все действия сценария выполнены")
         return self.all_page_elements
@@ -323,12 +426,16 @@ class LocalAILocatorFinder:
     def generate_locators(self, scenario_elements, all_page_elements):
         """
         Генерирует локаторы для требуемых элементов со ВСЕХ страниц.
+        Модель получает только элементы, похожие на требуемые (element_filter), а не первые 100.
         """
         all_elements_flat = []
         for page_name, elements in all_page_elements.items():
             for element in elements:
                 element["source_page"] = page_name
                 all_elements_flat.append(element)
+        relevant_elements = select_relevant_elements(
+            scenario_elements, all_elements_flat, exclude=PROMPT_EXCLUDED_FIELDS
+        )
 
         prompt = (
             "Ты — эксперт по Selenium. "
@@ -354,21 +461,24 @@ class LocalAILocatorFinder:
             '}\n'
             ']\n'
             f"Список требуемых элементов (JSON):\n{json.dumps(scenario_elements, ensure_ascii=False)}\n"
-            f"Список элементов на ВСЕХ страницах (JSON):\n{json.dumps(all_elements_flat[:100], ensure_ascii=False)}\n"
+            f"Список элементов на ВСЕХ страницах (JSON):\n{elements_json(relevant_elements)}\n"
         )
         
         print("=== MODEL INPUT (generate_locators) ===")
         print(prompt)
         print("=== END MODEL INPUT ===")
 
-        output = self.llm(prompt, max_tokens=4096, stop=["\n\n"])
+        output = self.llm(prompt, max_tokens=4096, **json_completion_kwargs(LOCATORS_SCHEMA, stop=["\n\n"], llm=self.llm))
         
         print("=== MODEL OUTPUT (generate_locators) ===")
         locators = self._clean_generated_code(output['choices'][0]['text'])
         print(locators)
         print("=== END MODEL OUTPUT ===")
         
-        return locators
+        try:
+            return parse_json_output(locators)
+        except ValueError:
+            return locators
 
     def _clean_generated_code(self, code: str) -> str:
         """
@@ -420,6 +530,8 @@ class LocalAILocatorFinder:
             all_page_elements = self.execute_scenario_actions(scenario_info)
             
             # 4. Логируем собранную информацию
+            self.probe.log_stats(scenario_info.get("initial_url", ""))
+            self.target_resolver.log_stats()
             required_elements = scenario_info.get("required_elements", [])
             self.logger.info(f"Найдено страниц: {len(all_page_elements)}")
             self.logger.info(f"Требуемых элементов: {len(required_elements)}")
@@ -443,13 +555,14 @@ class LocalAILocatorFinder:
             self.close()
 
     def close(self):
-        """Закрытие драйвера и завершение работы"""
+        """Возврат драйвера в пул и завершение работы"""
         if self.driver:
             try:
-                self.driver.quit()
-                self.logger.info("Веб-драйвер закрыт")
+                get_shared_pool().release(self.driver)
+                self.logger.info("Веб-драйвер возвращён в пул")
             except Exception as e:
                 self.logger.error(f"Ошибка при закрытии драйвера: {e}")
+            self.driver = None
 
 # Пример использования:
 if __name__ == "__main__":
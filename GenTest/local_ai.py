@@ -1,8 +1,14 @@
+import os
+import sys
 import json
 import re
-from llama_cpp import Llama
 from config import Config
 
+# Общие модули агента лежат в корне репозитория
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from json_grammar import ANY_JSON_OBJECT_SCHEMA, json_completion_kwargs
+from model_server import create_llm
+
 class LocalAIClient:
     def __init__(self):
         self.config = Config()
@@ -14,8 +20,9 @@ class LocalAIClient:
         print("🔄 Загружаю локальную AI модель...")
         
         try:
-            self.model = Llama(
-                model_path=self.config.LOCAL_MODEL_PATH,
+            # При заданном MODEL_SERVER_URL используется резидентная модель сервера
+            self.model = create_llm(
+                self.config.LOCAL_MODEL_PATH,
                 n_ctx=4096,  # Размер контекста
                 n_threads=6,  # Количество потоков
                 n_gpu_layers=0,  # 0 = только CPU, больше 0 = использовать GPU
@@ -26,8 +33,12 @@ class LocalAIClient:
             print(f"❌ Ошибка загрузки модели: {e}")
             raise
     
-    def generate_response(self, prompt, system_message=None, max_tokens=None):
-        """Генерирует ответ с помощью локальной модели"""
+    def generate_response(self, prompt, system_message=None, max_tokens=None, json_schema=ANY_JSON_OBJECT_SCHEMA):
+        """
+        Генерирует ответ с помощью локальной модели.
+        Все вызовы ждут JSON, поэтому по умолчанию генерация ограничена грамматикой
+        JSON-объекта (json_schema=None — свободный текст).
+        """
         
         if not self.model:
             raise Exception("Модель не загружена")
@@ -47,9 +58,9 @@ class LocalAIClient:
                 prompt=prompt_text,
                 max_tokens=max_tokens or self.config.LOCAL_MODEL_MAX_TOKENS,
                 temperature=self.config.LOCAL_MODEL_TEMPERATURE,
-                stop=["</s>", "```", "###", "---"],
                 echo=False,
-                stream=False
+                stream=False,
+                **json_completion_kwargs(json_schema, stop=["</s>", "```", "###", "---"], llm=self.model)
             )
             
             text_response = response['choices'][0]['text'].strip()
@@ -1,7 +1,7 @@
 # multi_page_generator.py - упрощенная версия
 import os
+import sys
 import json
-import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -13,6 +13,10 @@ from selenium.webdriver.chrome.options import Options
 from config import Config
 from ai_client import UniversalAIClient
 
+# Общие модули агента лежат в корне репозитория
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from page_transition import wait_for_stable_page
+
 class MultiPageTestGenerator:
     def __init__(self):
         self.config = Config()
@@ -40,7 +44,7 @@ class MultiPageTestGenerator:
         
         # Открываем стартовую страницу
         self.driver.get(start_url)
-        time.sleep(3)
+        wait_for_stable_page(self.driver, timeout=15)
         
         # Простой анализ сценария
         steps = self.simple_analyze_scenario(scenario_description)
@@ -64,7 +68,9 @@ def {test_name}():
     try:
         # Стартовая страница
         driver.get("{start_url}")
-        time.sleep(3)
+        WebDriverWait(driver, 15).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
         
 '''
         
@@ -73,7 +79,9 @@ def {test_name}():
             test_code += f'''
         # Шаг {i+1}
         print("Шаг {i+1}: {step}")
-        time.sleep(2)
+        WebDriverWait(driver, 15).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
 '''
         
         test_code += '''
@@ -1,10 +1,9 @@
 import os
+import sys
 import json
-import time
 import subprocess
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from webdriver_manager.microsoft import EdgeChromiumDriverManager
@@ -14,11 +13,18 @@ from selenium.webdriver.chrome.options import Options as ChromeOptions
 from config import Config
 from ai_client import UniversalAIClient
 
+# Общие модули агента лежат в корне репозитория
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from element_probe import ElementProbe
+from browser_pool import get_shared_pool
+from locator_verifier import choose_locators, verification_summary
+
 class SimpleAITestGenerator:
     def __init__(self):
         self.config = Config()
         self.ai_client = UniversalAIClient()
         self.driver = None
+        self.probe = None
         self.setup_driver()
     
     def setup_driver(self):
@@ -26,10 +32,9 @@ class SimpleAITestGenerator:
         print("🔧 Настраиваю браузер для Windows...")
         
         try:
-            if self.config.BROWSER == "chrome":
-                self._setup_chrome_windows()
-            else:
-                self._setup_chrome_windows()  # По умолчанию Chrome для Windows
+            # Тёплая сессия из общего пула; новый Chrome создаётся только при его отсутствии
+            pool = get_shared_pool("simple_ai", driver_factory=self._create_chrome_windows)
+            self.driver = pool.acquire()
                 
             print("✅ Браузер настроен успешно!")
             
@@ -37,9 +42,12 @@ class SimpleAITestGenerator:
             print(f"❌ Ошибка настройки браузера: {e}")
             print("🔄 Пробую альтернативный метод...")
             self._setup_driver_fallback()
+        
+        # Поиск без неявного ожидания, явные ожидания — через self.probe
+        self.probe = ElementProbe(self.driver, action_timeout=self.config.ELEMENT_TIMEOUT)
     
-    def _setup_chrome_windows(self):
-        """Настраивает Chrome для Windows"""
+    def _create_chrome_windows(self):
+        """Создает Chrome для Windows"""
         options = ChromeOptions()
         
         if self.config.HEADLESS:
@@ -67,12 +75,13 @@ class SimpleAITestGenerator:
             service_args=['--disable-build-check', '--silent']
         )
         
-        self.driver = webdriver.Chrome(service=service, options=options)
+        driver = webdriver.Chrome(service=service, options=options)
         
         # Скрываем автоматизацию
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
-        self.driver.implicitly_wait(self.config.ELEMENT_TIMEOUT)
+        driver.implicitly_wait(0)
+        return driver
     
     def _setup_driver_fallback(self):
         """Резервный метод настройки браузера для Windows"""
@@ -83,7 +92,7 @@ class SimpleAITestGenerator:
             
             # Пробуем без webdriver-manager
             self.driver = webdriver.Chrome(options=options)
-            self.driver.implicitly_wait(self.config.ELEMENT_TIMEOUT)
+            self.driver.implicitly_wait(0)
             print("✅ Браузер настроен в резервном режиме")
         except Exception as e:
             print(f"❌ Критическая ошибка: Не удалось настроить браузер: {e}")
@@ -126,7 +135,7 @@ class SimpleAITestGenerator:
         
         for tag, description in element_types:
             try:
-                elements = self.driver.find_elements(By.TAG_NAME, tag)
+                elements = self.probe.find_all(By.TAG_NAME, tag)
                 print(f"   Найдено {len(elements)} элементов {tag}")
                 
                 for element in elements[:10]:  # Ограничиваем количество
@@ -251,6 +260,30 @@ class SimpleAITestGenerator:
             print(f"   ❌ Ошибка AI: {e}")
             return {"error": str(e)}
 
+    def verify_locators_map(self, locators_map):
+        """Проверяет локаторы AI на странице и ставит первым уникальный рабочий"""
+        groups = [data['locators'] for data in locators_map.values() if data.get('locators')]
+        if not groups:
+            return locators_map
+        try:
+            chosen = choose_locators(self.driver, groups)
+        except Exception as e:
+            print(f"   ⚠️  Не удалось проверить локаторы: {e}")
+            return locators_map
+        for locators, (best, results) in zip(groups, chosen):
+            for locator, result in zip(locators, results):
+                locator['verification'] = verification_summary(result)
+            if best is None:
+                print(f"   ⚠️  Нет уникального рабочего локатора: {locators[0].get('value')} "
+                      f"(найдено {results[0]['count']})")
+                continue
+            index = results.index(best)
+            if index:
+                # create_test_code берёт первый локатор из списка
+                locators.insert(0, locators.pop(index))
+                print(f"   🔁 Локатор заменён на проверенный: {best['type']} {best['value']}")
+        return locators_map
+
     def generate_simple_test(self, test_scenario, start_url):
         """Генерирует простой тест"""
         
@@ -261,13 +294,11 @@ class SimpleAITestGenerator:
         try:
             # Открываем страницу
             print("🌐 Открываю страницу...")
+            self.probe.reset_stats()
             self.driver.get(start_url)
             
-            # Ждем загрузки
-            WebDriverWait(self.driver, 15).until(
-                lambda driver: driver.execute_script("return document.readyState") == "complete"
-            )
-            time.sleep(2)
+            # Ждем загрузки и стабилизации страницы
+            self.probe.wait_for_stable_page(timeout=15)
             
             # Анализируем страницу
             page_elements = self.analyze_page_simple()
@@ -287,6 +318,12 @@ class SimpleAITestGenerator:
                 else:
                     print(f"   ❌ Не удалось найти локатор: {ai_result.get('error')}")
             
+            # Проверяем все локаторы на открытой странице одним скриптом
+            self.verify_locators_map(locators_map)
+            
+            wait_stats = self.probe.stats()
+            print(f"⏱️  Время ожиданий за сценарий: {wait_stats['total_seconds']} с {wait_stats['by_label']}")
+            
             # Генерируем код теста
             test_code = self.create_test_code(test_scenario, start_url, locators_map)
             return test_code
@@ -565,13 +602,15 @@ if __name__ == "__main__":
         return filepath
 
     def close(self):
-        """Закрывает браузер"""
+        """Возвращает браузер в пул"""
         if self.driver:
             try:
-                self.driver.quit()
-                print("🔚 Браузер закрыт")
+                # Драйвер из резервного режима пул не знает и просто закроет
+                get_shared_pool("simple_ai").release(self.driver)
+                print("🔚 Браузер возвращен в пул")
             except:
                 pass
+            self.driver = None
 
     def _fix_locator_type(self, locator_type):
         """Исправляет тип локатора для Selenium"""
@@ -1,11 +1,15 @@
 import os
+import sys
 import subprocess
 import shutil
 from pathlib import Path
-from llama_cpp import Llama
 import requests
 import json
 
+# Общие модули агента лежат в корне репозитория
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_server import create_llm
+
 class TestProjectCreator:
     def __init__(self, model_path):
         """Инициализация с путем к GGUF модели"""
@@ -17,8 +21,8 @@ class TestProjectCreator:
     def initialize_model(self):
         """Инициализация языковой модели"""
         try:
-            self.llm = Llama(
-                model_path=self.model_path,
+            self.llm = create_llm(
+                self.model_path,
                 n_ctx=4096,
                 n_threads=4,
                 verbose=False
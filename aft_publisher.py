@@ -0,0 +1,310 @@
+"""
+Пакетная публикация сгенерированных тестов в репозиторий AFT.
+
+Раньше каждый тест публиковался отдельно: get_contents + update_file/create_file,
+то есть отдельный коммит (и отдельный запуск CI) на каждый файл. Publisher
+накапливает файлы за цикл сканирования и публикует их через Git Data API
+одним деревом, одним коммитом и одним обновлением ref.
+
+Неизменённые файлы пропускаются без скачивания: sha блоба вычисляется
+локально (как git hash-object) и сравнивается с sha из дерева ветки.
+
+LocalGitPublisher — альтернативный режим с постоянным локальным клоном AFT:
+pom.xml и тесты читаются с диска, изменения коммитятся локально и
+отправляются одним git push. Токен GitHub передаётся каждой команде git
+через переменные окружения (http.extraheader) и не попадает ни в URL
+remote, ни в .git/config, ни в текст ошибок git.
+"""
+
+import base64
+import hashlib
+import logging
+import os
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from github import GithubException, InputGitTreeElement
+
+logger = logging.getLogger(__name__)
+
+# Каталог тестов в репозитории AFT
+AFT_TESTS_DIR = "src/test/java/tests"
+
+
+def git_blob_sha(content):
+    """
+    SHA-1 блоба так, как его считает git: sha1("blob <размер>\\0" + содержимое).
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    header = f"blob {len(content)}\0".encode("utf-8")
+    return hashlib.sha1(header + content).hexdigest()
+
+
+class PublishConflict(Exception):
+    """
+    Ветку AFT сдвинули во время публикации — коммит нужно собрать заново от нового head.
+    """
+
+
+class _BatchPublisher(ABC):
+    """
+    Общая часть издателей: очередь файлов и публикация с повтором при конфликте.
+    Наследники реализуют read_file() и _commit().
+    """
+    def __init__(self, tests_dir=AFT_TESTS_DIR):
+        self.tests_dir = tests_dir
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def test_path(self, java_filename):
+        return f"{self.tests_dir}/{java_filename}"
+
+    def refresh(self):
+        """
+        Подготовка к новому циклу (для локального клона — синхронизация с origin).
+        """
+
+    @abstractmethod
+    def read_file(self, path):
+        """
+        Возвращает (содержимое, sha блоба) файла из ветки AFT.
+        """
+
+    def stage(self, java_filename, java_code):
+        """
+        Добавляет тест в следующий коммит (потокобезопасно).
+        Повторная запись того же файла заменяет предыдущую.
+        """
+        with self._lock:
+            self._pending[self.test_path(java_filename)] = java_code
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def discard(self):
+        """
+        Отбрасывает накопленные файлы.
+        """
+        with self._lock:
+            self._pending = {}
+
+    def flush(self, retries=1):
+        """
+        Публикует накопленные файлы одним коммитом.
+        Возвращает True, если коммит создан или все файлы уже совпадают с веткой.
+        При неудаче файлы остаются в очереди, чтобы вызывающий мог решить, что с ними делать.
+        """
+        with self._lock:
+            pending = dict(self._pending)
+        if not pending:
+            return True
+
+        for attempt in range(retries + 1):
+            try:
+                self._commit(pending)
+                with self._lock:
+                    for path, content in pending.items():
+                        if self._pending.get(path) == content:
+                            del self._pending[path]
+                return True
+            except PublishConflict as e:
+                if attempt < retries:
+                    logger.warning(f"⚠️ AFT branch moved during publish, retrying: {e}")
+                    continue
+                logger.error(f"❌ Error publishing batch to AFT repository: {e}")
+                return False
+            except Exception as e:
+                logger.error(f"❌ Error publishing batch to AFT repository: {e}")
+                return False
+        return False
+
+    def _commit_message(self, changed_paths):
+        return (
+            f"Auto-update tests: {len(changed_paths)} file(s)\n\n"
+            f"Generated from scenario update at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+            + "\n".join(f"- {path}" for path in changed_paths)
+        )
+
+    @abstractmethod
+    def _commit(self, pending):
+        """
+        Публикует файлы pending ({путь: содержимое}) одним коммитом.
+        Возвращает sha коммита или None, если все файлы совпадают с веткой.
+        Сдвиг ветки во время публикации — PublishConflict.
+        """
+
+
+class GitHubBatchPublisher(_BatchPublisher):
+    """
+    Публикация через Git Data API: одно дерево, один коммит, одно обновление ref.
+    """
+    def __init__(self, github_client, repo_name, tests_dir=AFT_TESTS_DIR):
+        super().__init__(tests_dir)
+        self.github_client = github_client
+        self.repo_name = repo_name
+
+    def read_file(self, path):
+        repo = self.github_client.get_repo(self.repo_name)
+        content = repo.get_contents(path)
+        return content.decoded_content.decode("utf-8"), content.sha
+
+    def _commit(self, pending):
+        repo = self.github_client.get_repo(self.repo_name)
+        ref = repo.get_git_ref(f"heads/{repo.default_branch}")
+        head_commit = repo.get_git_commit(ref.object.sha)
+        tree = repo.get_git_tree(head_commit.tree.sha, recursive=True)
+
+        existing = {}
+        if not tree.raw_data.get("truncated"):
+            existing = {element.path: element.sha for element in tree.tree if element.type == "blob"}
+        else:
+            logger.warning("⚠️ AFT tree response is truncated, publishing without skip check")
+
+        elements = []
+        changed_paths = []
+        for path, content in sorted(pending.items()):
+            if existing.get(path) == git_blob_sha(content):
+                logger.info(f"ℹ️ File {path} unchanged, skipping update")
+                continue
+            logger.info(f"{'🔄 Updating' if path in existing else '🆕 Creating'} file: {path}")
+            elements.append(InputGitTreeElement(path, "100644", "blob", content=content))
+            changed_paths.append(path)
+
+        if not elements:
+            logger.info("ℹ️ All generated tests match the AFT repository, nothing to commit")
+            return None
+
+        commit_message = self._commit_message(changed_paths)
+        new_tree = repo.create_git_tree(elements, base_tree=tree)
+        commit = repo.create_git_commit(commit_message, new_tree, [head_commit])
+        try:
+            ref.edit(commit.sha)
+        except GithubException as e:
+            # 422 — обновление ref не fast-forward: ветку сдвинули параллельно
+            if getattr(e, 'status', None) == 422:
+                raise PublishConflict(str(e))
+            raise
+        logger.info(f"✅ Published {len(elements)} test(s) to {self.repo_name} in commit {commit.sha[:7]}")
+        logger.info(f"📝 Commit: {commit_message.splitlines()[0]}")
+        return commit.sha
+
+
+class LocalGitPublisher(_BatchPublisher):
+    """
+    Публикация через постоянный локальный клон AFT (как launch_test/test_start.py).
+    Чтение — обычное чтение файлов, запись — локальный коммит и один git push.
+    """
+    def __init__(self, repo_url, workdir, branch=None, tests_dir=AFT_TESTS_DIR,
+                 author_name="AFT Agent", author_email="aft-agent@localhost", token=None):
+        super().__init__(tests_dir)
+        self.repo_url = repo_url
+        self.workdir = workdir
+        self.branch = branch
+        self.author_name = author_name
+        self.author_email = author_email
+        self.token = token
+        self._git_lock = threading.RLock()
+
+    def _git_env(self):
+        """
+        Окружение команды git: токен как заголовок Authorization только на время команды
+        (GIT_CONFIG_* не видны в списке процессов, в отличие от аргументов -c).
+        """
+        env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+        if self.token:
+            credentials = base64.b64encode(f"x-access-token:{self.token}".encode("utf-8")).decode("ascii")
+            env.update({
+                "GIT_CONFIG_COUNT": "1",
+                "GIT_CONFIG_KEY_0": "http.extraheader",
+                "GIT_CONFIG_VALUE_0": f"Authorization: Basic {credentials}",
+            })
+        return env
+
+    def _git(self, *args, check=True):
+        result = subprocess.run(
+            ["git", "-c", f"user.name={self.author_name}", "-c", f"user.email={self.author_email}", *args],
+            cwd=self.workdir,
+            env=self._git_env(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        if check and result.returncode != 0:
+            raise RuntimeError(f"git {args[0]} failed: {result.stderr.strip()}")
+        return result
+
+    def _ensure_clone(self):
+        if os.path.isdir(os.path.join(self.workdir, ".git")):
+            # Клоны прежних версий хранили токен в URL remote
+            origin = self._git("remote", "get-url", "origin", check=False).stdout.strip()
+            if "@" in origin.split("://", 1)[-1].split("/", 1)[0]:
+                logger.info("🔐 Removing credentials from the AFT clone remote URL")
+                self._git("remote", "set-url", "origin", self.repo_url)
+            return
+        logger.info(f"📥 Cloning AFT repository into {self.workdir}")
+        parent = os.path.dirname(os.path.abspath(self.workdir))
+        os.makedirs(parent, exist_ok=True)
+        result = subprocess.run(
+            ["git", "clone", self.repo_url, os.path.abspath(self.workdir)],
+            env=self._git_env(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"git clone failed: {result.stderr.strip()}")
+
+    def _current_branch(self):
+        if not self.branch:
+            self.branch = self._git("rev-parse", "--abbrev-ref", "HEAD").stdout.strip()
+        return self.branch
+
+    def refresh(self):
+        """
+        Клонирует репозиторий при первом вызове, затем приводит клон к состоянию origin.
+        """
+        with self._git_lock:
+            self._ensure_clone()
+            branch = self._current_branch()
+            self._git("fetch", "origin", branch)
+            self._git("checkout", "-q", branch)
+            self._git("reset", "-q", "--hard", f"origin/{branch}")
+
+    def read_file(self, path):
+        with self._git_lock:
+            self._ensure_clone()
+            with open(os.path.join(self.workdir, path), "rb") as f:
+                data = f.read()
+        return data.decode("utf-8"), git_blob_sha(data)
+
+    def _commit(self, pending):
+        with self._git_lock:
+            self.refresh()
+            for path, content in pending.items():
+                full_path = os.path.join(self.workdir, path)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                # newline="" — без перевода строк, чтобы sha блоба совпадал с содержимым
+                with open(full_path, "w", encoding="utf-8", newline="") as f:
+                    f.write(content)
+            self._git("add", "--", *sorted(pending))
+            changed_paths = self._git("diff", "--cached", "--name-only").stdout.split()
+            if not changed_paths:
+                logger.info("ℹ️ All generated tests match the AFT repository, nothing to commit")
+                return None
+
+            commit_message = self._commit_message(changed_paths)
+            self._git("commit", "-q", "-m", commit_message)
+            commit_sha = self._git("rev-parse", "HEAD").stdout.strip()
+            push = self._git("push", "origin", f"HEAD:{self.branch}", check=False)
+            if push.returncode != 0:
+                # Отклонённый push (non-fast-forward) — пересобираем коммит от нового origin
+                if "rejected" in push.stderr or "fetch first" in push.stderr:
+                    raise PublishConflict(push.stderr.strip())
+                raise RuntimeError(f"git push failed: {push.stderr.strip()}")
+            logger.info(f"✅ Published {len(changed_paths)} test(s) from {self.workdir} in commit {commit_sha[:7]}")
+            logger.info(f"📝 Commit: {commit_message.splitlines()[0]}")
+            return commit_sha
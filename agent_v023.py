@@ -13,14 +13,30 @@ from datetime import datetime
 import logging
 from github import Github, GithubException
 from jenkins import Jenkins
-from llama_cpp import Llama
 import xml.etree.ElementTree as ET
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
 import re  # Исправлено: импорт re в начале файла
 import argparse
+import requests
+from page_snapshot import take_page_snapshot, to_element_info
+from element_probe import ElementProbe
+from browser_pool import get_shared_pool, close_shared_pools
+from scenario_pipeline import ScenarioPipeline
+from webhook_trigger import WebhookTrigger
+from aft_publisher import GitHubBatchPublisher, LocalGitPublisher
+from generation_cache import GenerationCache, model_identity
+from prompt_prefix_cache import PrefixStateCache
+from json_grammar import json_completion_kwargs, parse_json_output
+from model_server import create_llm
+from stream_guard import JavaStreamGuard
+from java_templates import render_fallback_test
+from speculative_decoding import SPECULATIVE_MODES, load_speculative_llm
+from locator_ranker import LocatorRanker
+from locator_verifier import choose_locators, verification_summary, verify_locators
+from page_cache import get_shared_page_cache, page_fingerprint
+from locator_index import LocatorIndex
+from static_collector import StaticPageCollector
+from cdp_collector import PAGE_COLLECTORS, capture_accessibility_snapshot
+from element_filter import select_relevant_elements, elements_json
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Test Automation Agent')
@@ -28,6 +44,12 @@ def parse_arguments():
     parser.add_argument('--scenario-repo', type=str, required=True, help='Scenario repository')
     parser.add_argument('--aft-repo', type=str, required=True, help='AFT repository') 
     parser.add_argument('--interval', type=int, default=300, help='Scan interval in seconds')
+    parser.add_argument('--browser-workers', type=int, default=2, help='Parallel browser workers in the pipeline')
+    parser.add_argument('--webhook-port', type=int, default=0, help='Port for GitHub push webhooks (0 - polling only)')
+    parser.add_argument('--aft-workdir', type=str, default=None, help='Local clone of the AFT repository (publish via git push)')
+    parser.add_argument('--speculative', type=str, default='off', choices=SPECULATIVE_MODES, help='Speculative decoding: off, lookup (prompt/template n-grams) or draft (small GGUF model)')
+    parser.add_argument('--draft-model', type=str, default=None, help='Draft GGUF model for --speculative draft')
+    parser.add_argument('--page-collector', type=str, default='cdp', choices=PAGE_COLLECTORS, help='Page elements: cdp (accessibility tree via DevTools, falls back to script) or script')
     return parser.parse_args()
 
 
@@ -38,127 +60,287 @@ logger = logging.getLogger(__name__)
 # Имя файла для хранения статуса обработанных файлов сценариев (SHA)
 SCENARIO_STATUS_FILE = "scenario_file_status.json"
 
+# Имя файла для хранения последнего обработанного коммита и ETag ветки сценариев
+SCENARIO_SCAN_STATE_FILE = "scenario_scan_state.json"
+
+GITHUB_API_URL = "https://api.github.com"
+
+# Записи индекса локаторов перепроверяются на страницах не реже этого интервала (секунды)
+LOCATOR_REVERIFY_INTERVAL = 6 * 3600
+
+# Теги снимка страницы (в браузере и в статическом HTML).
+# label нужен LocatorRanker: подпись <label for> относится к полю ввода
+PAGE_SNAPSHOT_TAGS = ['input', 'button', 'a', 'select', 'textarea', 'div', 'span', 'label']
+
+# Поля элемента страницы в промпте генерации локаторов (снимок CDP добавляет роль и доступное имя)
+ELEMENT_INFO_FIELDS = ("tag", "text", "id", "name")
+AX_ELEMENT_INFO_FIELDS = ELEMENT_INFO_FIELDS + ("ax_role", "accessible_name")
+
+# Версия шаблонов промптов: увеличить при изменении промптов, чтобы не брать устаревшие тесты из кэша генерации
+PROMPT_TEMPLATE_VERSION = "2"
+
+# Неизменные префиксы промптов: их KV-состояние кэшируется (PrefixStateCache),
+# модель вычисляет только часть промпта, зависящую от сценария
+ANALYZE_PROMPT_PREFIX = (
+    "Ты — помощник по автоматизации тестирования. "
+    "На вход тебе дается тестовый сценарий. "
+    "Определи url страницы входа и какие требуются элементы для создания авто-теста "
+    "(например: поле ввода логина, поле ввода пароля, кнопка войти и т.д.). "
+    "Верни ТОЛЬКО JSON без дополнительного текста в формате: "
+    '{"url": "string", "required_elements": [{"name": "string", "description": "string"}]}.\n\n'
+    "Тестовый сценарий:\n"
+)
+
+LOCATORS_PROMPT_PREFIX = (
+    "Ты — эксперт по Selenium. "
+    "Тебе дан список требуемых элементов для автотеста из сценария и список html элементов, найденных на странице (оба в виде JSON). "
+    "Для каждого требуемого элемента из сценария найди наиболее подходящий элемент на html странице и сформируй лучший Selenium локатор для него (приоритет отдавай ID если на странице он уникален). "
+    "Верни ТОЛЬКО JSON без дополнительного текста, в формате: \n"
+    '[\n'
+    '{\n'
+    '    "required_element": {\n'
+    '    "name": "...",\n'
+    '    "description": "..."\n'
+    '    },\n'
+    '    "locator": {\n'
+    '    "type": "By.ID|By.cssSelector|By.name|By.xpath|",\n'
+    '    "value": "...",\n'
+    '    "reasoning": "..."\n'
+    '    }\n'
+    '}\n'
+    ']\n'
+)
+
+# JSON-схемы структурированных ответов модели (генерация ограничивается грамматикой)
+SCENARIO_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "url": {"type": "string"},
+        "required_elements": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "description": {"type": "string"}
+                },
+                "required": ["name", "description"]
+            }
+        }
+    },
+    "required": ["url", "required_elements"]
+}
+
+LOCATORS_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "required_element": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "description": {"type": "string"}
+                },
+                "required": ["name", "description"]
+            },
+            "locator": {
+                "type": "object",
+                "properties": {
+                    "type": {"enum": ["By.ID", "By.cssSelector", "By.name", "By.xpath"]},
+                    "value": {"type": "string"},
+                    "reasoning": {"type": "string"}
+                },
+                "required": ["type", "value", "reasoning"]
+            }
+        },
+        "required": ["required_element", "locator"]
+    }
+}
+
+JAVA_PROMPT_PREFIX = (
+    "[INST] <<SYS>>\n"
+    "Ты - эксперт по автоматизации тестирования на Java + Selenium.\n"
+    "Сгенерируй полнофункциональный Java тест на основе описания сценария.\n"
+    "Верни только Java код без дополнительных объяснений.\n"
+    "<</SYS>>\n\n"
+)
+
+
+def _element_key(required_element):
+    """
+    Ключ требуемого элемента для сопоставления с ответом модели: имя без регистра и лишних пробелов.
+    """
+    return " ".join(str(required_element.get("name", "")).lower().split())
+
+
 class GGUFModelClient:
     """
     Класс-обертка для работы с языковой моделью GGUF (через llama.cpp)
     и для поиска локаторов на веб-странице.
     """
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, speculative: str = "off", draft_model_path: str = None,
+                 page_collector: str = "cdp"):
         self.model_path = model_path  # Путь к файлу модели
         self.llm = None               # Экземпляр модели
+        self.speculative = speculative            # Режим спекулятивного декодирования
+        self.draft_model_path = draft_model_path  # Черновая GGUF-модель для режима draft
+        self.draft_model = None
+        self.java_llm = None          # Отдельный экземпляр с черновиком только для Java-генерации
+        self.page_collector = page_collector      # Сборщик элементов страницы: cdp или script
         self.driver = None            # Selenium WebDriver
+        self.page_snapshot = []       # Полный снимок последней собранной страницы
+        self.probe = None             # Поиск элементов без неявного ожидания
+        self.scenario_info = None     # Результат анализа последнего сценария (url, required_elements)
+        self.prefix_cache = None      # KV-состояния фиксированных префиксов промптов
+        self.locator_ranker = LocatorRanker()  # Локальный выбор локаторов без LLM
+        self.page_cache = get_shared_page_cache()  # Снимки страниц между сценариями
+        self.locator_index = LocatorIndex()        # Проверенные локаторы между запусками
+        # Серверные страницы разбираются по HTTP, без запуска браузера
+        self.static_collector = StaticPageCollector(ranker=self.locator_ranker, selectors=PAGE_SNAPSHOT_TAGS)
 
     #  ***********************Поиск локаторов********************************
     def setup_driver(self):
         """
-        Инициализация headless Chrome WebDriver для сбора элементов страницы.
+        Берёт тёплую сессию headless Chrome из общего пула браузеров
+        вместо запуска нового Chrome на каждый сценарий.
         """
-        options = ChromeOptions()
-        options.add_argument("--headless")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1920,1080")
-        service = ChromeService()
-        self.driver = webdriver.Chrome(service=service, options=options)
-        self.driver.implicitly_wait(10)  # Явное ожидание элементов
+        self.driver = get_shared_pool().acquire()
+        # Неявное ожидание отключено: иначе каждый поиск отсутствующего элемента
+        # стоит 10 секунд. Ждём только явно, через self.probe.wait_until
+        self.driver.implicitly_wait(0)
+        self.probe = ElementProbe(self.driver, action_timeout=10)
 
     def analyze_scenario(self, test_scenario):
         """
         Анализирует текст сценария, извлекает url и список требуемых элементов.
         Использует LLM для парсинга сценария.
         """
-        prompt = (
-            "Ты — помощник по автоматизации тестирования. "
-            "На вход тебе дается тестовый сценарий. "
-            "Определи url страницы входа и какие требуются элементы для создания авто-теста "
-            "(например: поле ввода логина, поле ввода пароля, кнопка войти и т.д.). "
-            "Верни ТОЛЬКО JSON без дополнительного текста в формате: "
-            '{"url": "string", "required_elements": [{"name": "string", "description": "string"}]}.\n\n'
-            f"Тестовый сценарий:\n{test_scenario}\n"
+        suffix = (
+            f"{test_scenario}\n"
             "Ответ только в формате JSON:"
         )
+        prompt = ANALYZE_PROMPT_PREFIX + suffix
         # Для отладки: выводим промпт в консоль
         print("=== PROMPT TO MODEL (analyze_scenario) ===")
         print(prompt)
         print("=== END PROMPT ===")
-        output = self.llm(prompt, max_tokens=512, stop=["\n\n"])
+        # Грамматика по JSON-схеме: ответ всегда валидный JSON и заканчивается на закрывающей скобке
+        output = self._complete(
+            "analyze", ANALYZE_PROMPT_PREFIX, suffix, max_tokens=512,
+            **json_completion_kwargs(SCENARIO_ANALYSIS_SCHEMA, stop=["\n\n"], llm=self.llm)
+        )
         # Для отладки: выводим результат работы модели в консоль
         print("=== MODEL OUTPUT (analyze_scenario) ===")
         rez = self._clean_generated_code(output['choices'][0]['text'])
         print(rez)
         print("=== END MODEL OUTPUT ===")
-        # Пытаемся найти JSON в ответе модели
-        match = re.search(r'\{.*\}', output['choices'][0]['text'], re.DOTALL)
-        if match:
-            try:
-                scenario_info = json.loads(match.group(0))
-                return scenario_info
-            except Exception:
-                pass
-        # Если не удалось получить корректный JSON — выбрасываем ошибку
-        raise ValueError("Не удалось получить корректный JSON из ответа Llama")
+        scenario_info = parse_json_output(output['choices'][0]['text'])
+        if not isinstance(scenario_info, dict):
+            raise ValueError("Не удалось получить корректный JSON из ответа Llama")
+        return scenario_info
 
     def collect_page_elements(self, url):
         """
         Собирает информацию о всех видимых элементах на странице.
         Возвращает список словарей с основной информацией.
         """
-        self.driver.get(url)
-        elements_info = []
-        # Список тегов, которые нас интересуют для поиска элементов
-        tags = ['input', 'button', 'a', 'select', 'textarea', 'div', 'span']
-        for tag in tags:
-            try:
-                found = self.driver.find_elements(By.TAG_NAME, tag)
-                for el in found:
-                    if not el.is_displayed():
-                        continue  # Пропускаем невидимые элементы
-                    info = {
-                        "tag": tag,
-                        "text": el.text.strip(),
-                        "id": el.get_attribute("id"),
-                        "name": el.get_attribute("name"),
-                        # "class": el.get_attribute("class"),
-                        # "type": el.get_attribute("type"),
-                        # "placeholder": el.get_attribute("placeholder"),
-                        #"value": el.get_attribute("value"),
-                        # "aria_label": el.get_attribute("aria-label"),
-                        # "data_test": el.get_attribute("data-test"),
-                        # "outer_html": el.get_attribute("outerHTML")[:500]
-                    }
-                    elements_info.append(info)
-            except Exception:
-                continue  # Игнорируем ошибки для отдельных тегов
+        elements_info, self.page_snapshot = self.snapshot_page(self.driver, self.probe, url)
         return elements_info
 
-    def generate_locators(self, scenario_elements, page_elements):
+    def snapshot_page(self, driver, probe, url):
+        """
+        Открывает url в переданном драйвере и снимает элементы страницы.
+        Не использует состояние клиента, поэтому подходит для параллельных
+        браузерных воркеров. Возвращает (элементы для промпта, полный снимок).
+        """
+        driver.get(url)
+        probe.wait_for_ready_state()
+        try:
+            # Повторная страница (общая страница входа) — только проверка отпечатка DOM
+            snapshot = self.page_cache.snapshot(driver, self._collect_snapshot, variant=self._snapshot_variant())
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to take page snapshot: {e}")
+            snapshot = []
+        elements_info = [
+            to_element_info(record, AX_ELEMENT_INFO_FIELDS if "ax_role" in record else ELEMENT_INFO_FIELDS)
+            for record in snapshot
+        ]
+        return elements_info, snapshot
+
+    def _snapshot_variant(self):
+        return "agent" if self.page_collector == "script" else f"agent_{self.page_collector}"
+
+    def _collect_snapshot(self, driver):
+        """
+        Элементы текущей страницы: дерево доступности через CDP (две команды),
+        а если CDP недоступен или ничего не нашёл — все теги одним вызовом execute_script
+        вместо отдельных запросов is_displayed/text/get_attribute на каждый элемент.
+        """
+        if self.page_collector == "cdp":
+            try:
+                snapshot = capture_accessibility_snapshot(driver)
+                if snapshot:
+                    return snapshot
+                logger.warning("⚠️ CDP snapshot is empty, falling back to snapshot script")
+            except Exception as e:
+                logger.warning(f"⚠️ CDP snapshot failed, falling back to snapshot script: {e}")
+        return take_page_snapshot(driver, PAGE_SNAPSHOT_TAGS)
+
+    def generate_locators(self, scenario_elements, page_elements, page_snapshot=None):
+        """
+        Генерирует локаторы для требуемых элементов.
+        Сначала локально (LocatorRanker по снимку страницы), LLM получает только
+        элементы, для которых уверенность ниже порога.
+        Возвращает список элементов с локаторами, а если грамматики недоступны
+        и JSON не разобрался — текст ответа.
+        """
+        resolved, unresolved, guesses = self.locator_ranker.resolve(scenario_elements, page_snapshot or [])
+        if not unresolved:
+            return [resolved[index] for index in range(len(scenario_elements))]
+        llm_locators = self.generate_locators_llm([scenario_elements[index] for index in unresolved], page_elements)
+        if not isinstance(llm_locators, list):
+            if not resolved:
+                return llm_locators
+            logger.warning("⚠️ LLM locators are not valid JSON, using low-confidence ranker candidates")
+            resolved.update((index, guesses[index]) for index in unresolved if index in guesses)
+            return [resolved[index] for index in sorted(resolved)]
+        # Ответ модели сопоставляется по имени элемента: модель может пропустить или переставить элементы
+        by_name = {}
+        for entry in llm_locators:
+            if isinstance(entry, dict) and isinstance(entry.get("required_element"), dict):
+                by_name.setdefault(_element_key(entry["required_element"]), entry)
+        for index in unresolved:
+            entry = by_name.get(_element_key(scenario_elements[index]))
+            if entry is not None:
+                resolved[index] = entry
+            elif index in guesses:
+                logger.warning(
+                    f"⚠️ LLM returned no locator for '{scenario_elements[index].get('name', '')}', "
+                    f"using low-confidence ranker candidate"
+                )
+                resolved[index] = guesses[index]
+            else:
+                logger.warning(f"⚠️ No locator for '{scenario_elements[index].get('name', '')}'")
+        return [resolved[index] for index in sorted(resolved)]
+
+    def generate_locators_llm(self, scenario_elements, page_elements):
         """
         Генерирует локаторы для требуемых элементов, используя LLM.
-        Возвращает список элементов с локаторами.
+        В промпт попадают только элементы страницы, похожие на требуемые (element_filter).
+        Возвращает список элементов с локаторами (разобранный JSON),
+        а если грамматики недоступны и JSON не разобрался — текст ответа.
         """
-        prompt = (
-            "Ты — эксперт по Selenium. "
-            "Тебе дан список требуемых элементов для автотеста из сценария и список html элементов, найденных на странице (оба в виде JSON). "
-            "Для каждого требуемого элемента из сценария найди наиболее подходящий элемент на html странице и сформируй лучший Selenium локатор для него (приоритет отдавай ID если на странице он уникален). "
-            "Верни ТОЛЬКО JSON без дополнительного текста, в формате: \n"
-            '[\n'
-            '{\n'
-            '    "required_element": {\n'
-            '    "name": "...",\n'
-            '    "description": "..."\n'
-            '    },\n'
-            '    "locator": {\n'
-            '    "type": "By.ID|By.cssSelector|By.name|By.xpath|",\n'
-            '    "value": "...",\n'
-            '    "reasoning": "..."\n'
-            '    }\n'
-            '}\n'
-            ']\n'
+        relevant_elements = select_relevant_elements(scenario_elements, page_elements, ranker=self.locator_ranker)
+        suffix = (
             f"Список требуемых элементов (JSON):\n{json.dumps(scenario_elements, ensure_ascii=False)}\n"
-            f"Список элементов на странице (JSON):\n{json.dumps(page_elements[:20], ensure_ascii=False)}\n"
+            f"Список элементов на странице (JSON):\n{elements_json(relevant_elements)}\n"
+        )
+        prompt = LOCATORS_PROMPT_PREFIX + suffix
+        output = self._complete(
+            "locators", LOCATORS_PROMPT_PREFIX, suffix, max_tokens=2048,
+            **json_completion_kwargs(LOCATORS_SCHEMA, stop=["\n\n"], llm=self.llm)
         )
-        output = self.llm(prompt, max_tokens=2048, stop=["\n\n"])
         # Для отладки: выводим входные и выходные данные модели
         print("=== MODEL INPUT (generate_locators) ===")
         print(prompt)
@@ -168,41 +350,176 @@ class GGUFModelClient:
         locators = self._clean_generated_code(output['choices'][0]['text'])
         print(locators)
         print("=== END MODEL OUTPUT ===")
-        # Возвращаем результат (можно добавить парсинг JSON при необходимости)
+        try:
+            return parse_json_output(output['choices'][0]['text'])
+        except ValueError:
+            return locators
+
+    def verify_locators(self, driver, locators, page_snapshot=None, url=None):
+        """
+        Проверяет локаторы на открытой странице одним скриптом (locator_verifier).
+        Для каждого элемента берёт первый уникальный рабочий кандидат: исходный
+        локатор, затем запасные от LocatorRanker. К элементу добавляется поле verification.
+        Если передан url сценария, результаты сохраняются в индекс локаторов.
+        Ответ модели, не разобранный в JSON, возвращается без изменений.
+        """
+        if not isinstance(locators, list) or not locators:
+            return locators
+        entries = [entry for entry in locators if isinstance(entry, dict) and isinstance(entry.get("locator"), dict)]
+        groups = []
+        for entry in entries:
+            group = [{"type": entry["locator"].get("type"), "value": entry["locator"].get("value")}]
+            for candidate in self.locator_ranker.candidates(entry.get("required_element", {}), page_snapshot or []):
+                if candidate not in group:
+                    group.append(candidate)
+            groups.append(group)
+        for entry, (best, results) in zip(entries, choose_locators(driver, groups)):
+            name = entry.get("required_element", {}).get("name", "")
+            if best is None:
+                logger.warning(f"⚠️ No unique working locator for '{name}': {verification_summary(results[0])}")
+                entry["verification"] = dict(verification_summary(results[0]), ok=False)
+                continue
+            if results[0] is not best:
+                logger.info(
+                    f"🔁 Locator for '{name}' replaced: {results[0]['type']} {results[0]['value']} "
+                    f"-> {best['type']} {best['value']}"
+                )
+                entry["locator"] = dict(
+                    entry["locator"], type=best["type"], value=best["value"],
+                    reasoning=f"{entry['locator'].get('reasoning', '')} (verified replacement: original matched "
+                              f"{results[0]['count']} elements)".strip()
+                )
+            entry["verification"] = dict(verification_summary(best), ok=True)
+        if any(not entry["verification"]["ok"] for entry in entries):
+            # Снимок мог устареть — следующий сценарий снимет страницу заново
+            self.page_cache.invalidate(driver.current_url, variant=self._snapshot_variant())
+        if url:
+            try:
+                self.locator_index.record(url, locators, fingerprint=page_fingerprint(driver))
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to update locator index: {e}")
         return locators
 
-    def find_locators(self, test_scenario):
+    def reload_and_verify_locators(self, driver, probe, url, locators, page_snapshot=None):
         """
-        Основной метод поиска локаторов:
-        1. Анализирует сценарий (LLM)
-        2. Собирает элементы страницы (Selenium)
-        3. Генерирует локаторы (LLM)
+        Открывает url в переданном драйвере и проверяет локаторы (стадия verify конвейера).
+        """
+        driver.get(url)
+        probe.wait_for_ready_state()
+        return self.verify_locators(driver, locators, page_snapshot, url=url)
+
+    def indexed_locators(self, url, required_elements):
+        """
+        Надёжные локаторы всех требуемых элементов из индекса или None.
+        """
+        try:
+            return self.locator_index.lookup(url, required_elements)
+        except Exception as e:
+            logger.warning(f"⚠️ Locator index lookup failed: {e}")
+            return None
+
+    def static_locators(self, url, required_elements):
+        """
+        Локаторы по статическому HTML страницы, без браузера: (элементы для промпта,
+        снимок, локаторы) или None, если страница строится JS или в HTML есть не все элементы.
+        """
+        try:
+            found = self.static_collector.locate(url, required_elements)
+        except Exception as e:
+            logger.warning(f"⚠️ Static page collection failed for {url}: {e}")
+            return None
+        if found is None:
+            return None
+        snapshot, locators = found
+        elements_info = [to_element_info(record, ELEMENT_INFO_FIELDS) for record in snapshot]
+        return elements_info, snapshot, locators
+
+    def reverify_locator_index(self, interval_seconds):
+        """
+        Пакетная перепроверка записей индекса, не проверявшихся дольше interval_seconds:
+        одна загрузка страницы и один скрипт на все локаторы страницы.
+        """
+        due = self.locator_index.due_for_verification(interval_seconds)
+        if not due:
+            return
+        logger.info(f"📇 Re-verifying locator index: {sum(len(e) for e in due.values())} locators on {len(due)} pages")
+        with get_shared_pool().session() as driver:
+            probe = ElementProbe(driver, action_timeout=10)
+            for url, entries in due.items():
+                try:
+                    driver.get(url)
+                    probe.wait_for_ready_state()
+                    results = verify_locators(
+                        driver, [{"type": e["locator_type"], "value": e["locator_value"]} for e in entries]
+                    )
+                    self.locator_index.update_verification(url, entries, results, fingerprint=page_fingerprint(driver))
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed to re-verify locators for {url}: {e}")
+        self.locator_index.log_stats()
+
+    def resolve_scenario_target(self, test_scenario):
+        """
+        Анализирует сценарий (LLM) и возвращает (url, required_elements).
+        Выбрасывает ValueError, если url или элементы определить не удалось.
         """
-        # 1. Анализируем сценарий
         scenario_info = self.analyze_scenario(test_scenario)
         url = scenario_info.get("url")
         print(f"Определен URL для Selenium: {url}")
         required_elements = scenario_info.get("required_elements", [])
         if not url or not required_elements:
             raise ValueError("Не удалось определить url или элементы из сценария")
+        return url, required_elements
+
+    def find_locators(self, test_scenario):
+        """
+        Основной метод поиска локаторов:
+        1. Анализирует сценарий (LLM)
+        2. Собирает элементы страницы (Selenium)
+        3. Генерирует локаторы (LocatorRanker, LLM — только для неуверенных)
+        4. Проверяет локаторы на странице (одним скриптом)
+        """
+        # 1. Анализируем сценарий
+        url, required_elements = self.resolve_scenario_target(test_scenario)
+        self.scenario_info = {"url": url, "required_elements": required_elements}
+
+        # Страница уже встречалась — локаторы берутся из индекса без браузера и LLM
+        indexed = self.indexed_locators(url, required_elements)
+        if indexed:
+            return indexed
+
+        # Серверная страница: все элементы есть в исходном HTML — Chrome не нужен
+        static = self.static_locators(url, required_elements)
+        if static:
+            _, self.page_snapshot, locators = static
+            return locators
 
         # 2. Собираем элементы страницы
         self.setup_driver()
         page_elements = self.collect_page_elements(url)
+        self.probe.log_stats(url)
 
         # 3. Генерируем локаторы для требуемых элементов
-        elements_with_locators = self.generate_locators(required_elements, page_elements)
+        elements_with_locators = self.generate_locators(required_elements, page_elements, self.page_snapshot)
+
+        # 4. Проверяем локаторы, пока страница открыта
+        try:
+            elements_with_locators = self.verify_locators(
+                self.driver, elements_with_locators, self.page_snapshot, url=url
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Locator verification failed: {e}")
         return elements_with_locators
 
     def close(self):
         """
-        Корректно завершает работу WebDriver, если он был запущен.
+        Возвращает WebDriver в пул (сессия очищается и остаётся тёплой).
         """
         if self.driver:
             try:
-                self.driver.quit()
+                get_shared_pool().release(self.driver)
             except Exception:
                 pass
+            self.driver = None
     # *******************************************************************
 
     def log_full_prompt(self, prompt: str):
@@ -221,8 +538,7 @@ class GGUFModelClient:
             return False
         try:
             logger.info("🤖 Loading GGUF model...")
-            self.llm = Llama(
-                model_path=self.model_path,
+            llama_kwargs = dict(
                 n_threads=os.cpu_count(),
                 n_ctx=8192,
                 n_batch=512,
@@ -233,7 +549,22 @@ class GGUFModelClient:
                 echo=False,
                 stop=["</s>"]
             )
+            # При заданном MODEL_SERVER_URL модель уже загружена в model_server.py
+            self.llm = create_llm(self.model_path, **llama_kwargs)
             logger.info("✅ GGUF model successfully loaded!")
+            if getattr(self.llm, "is_remote", False):
+                # Спекулятивное декодирование резидентной модели настраивается на сервере
+                if self.speculative != "off":
+                    logger.info("ℹ️ Speculative decoding is configured by the model server")
+            else:
+                # Черновик только у экземпляра для Java: анализ и локаторы идут через общую модель без него
+                self.java_llm = load_speculative_llm(
+                    self.model_path, self.speculative, self.draft_model_path, **llama_kwargs
+                )
+                self.draft_model = getattr(self.java_llm, "draft_model", None)
+            if not getattr(self.llm, "is_remote", False):
+                # У резидентной модели свой кэш префиксов на стороне сервера
+                self.prefix_cache = PrefixStateCache(self.llm, self.model_path)
             return True
         except Exception as e:
             logger.error(f"❌ Failed to load model: {e}")
@@ -241,35 +572,90 @@ class GGUFModelClient:
 
     def generate_text(self, prompt: str, max_tokens: int = 8000, temperature: float = 0.7) -> str:
         """
-        Генерирует текст с помощью загруженной модели.
+        Генерирует Java-код с помощью загруженной модели в потоковом режиме.
+        Генерация останавливается, как только тело класса закрыто, и прерывается,
+        если вывод явно испорчен (тогда возвращается пустая строка).
         Возвращает очищенный результат.
         """
         if not self.llm:
             logger.error("Model not loaded")
             return ""
         try:
-            full_prompt = (
-                "[INST] <<SYS>>\n"
-                "Ты - эксперт по автоматизации тестирования на Java + Selenium.\n"
-                "Сгенерируй полнофункциональный Java тест на основе описания сценария.\n"
-                "Верни только Java код без дополнительных объяснений.\n"
-                "<</SYS>>\n\n"
+            suffix = (
                 f"{prompt}\n\n"
                 "Верни только Java код. [/INST]"
             )
+            full_prompt = JAVA_PROMPT_PREFIX + suffix
             # Логируем только в generate_text, не дублируем в generate_java_test_code
             self.log_full_prompt(full_prompt)
-            output = self.llm(
-                full_prompt,
+            stream = self._complete(
+                "java",
+                JAVA_PROMPT_PREFIX,
+                suffix,
                 max_tokens=max_tokens,
-                temperature=temperature
+                temperature=temperature,
+                stream=True,
+                speculative=True
             )
-            result_text = output["choices"][0]["text"].strip()
+            guard = self._consume_java_stream(stream, max_tokens)
+            if self.draft_model is not None:
+                self.draft_model.log_stats()
+            if guard.verdict == "derailed":
+                logger.warning(f"🛑 Generation aborted after {guard.tokens} tokens: {guard.reason}")
+                return ""
+            result_text = guard.result().strip()
             return self._clean_generated_code(result_text)
         except Exception as e:
             logger.error(f"Text generation error: {e}")
             return ""
 
+    def _consume_java_stream(self, stream, max_tokens, progress_every=200):
+        """
+        Читает поток токенов через JavaStreamGuard и закрывает его, как только
+        guard вынес решение. Прогресс пишется в лог (его показывает server.py).
+        """
+        guard = JavaStreamGuard()
+        started = time.perf_counter()
+        try:
+            for chunk in stream:
+                verdict = guard.feed(chunk["choices"][0]["text"])
+                if guard.tokens % progress_every == 0:
+                    elapsed = max(time.perf_counter() - started, 1e-6)
+                    logger.info(f"✍️ Generating Java code: {guard.tokens} tokens, {guard.tokens / elapsed:.1f} tok/s")
+                if verdict:
+                    break
+        finally:
+            # Закрытие генератора останавливает llama.cpp — оставшиеся токены не считаются
+            stream.close()
+        elapsed = time.perf_counter() - started
+        if guard.verdict == "complete":
+            logger.info(
+                f"✂️ Class body closed after {guard.tokens} tokens in {elapsed:.1f} s "
+                f"(limit {max_tokens}), trailing output skipped"
+            )
+        elif guard.verdict is None:
+            logger.info(f"✍️ Generation finished: {guard.tokens} tokens in {elapsed:.1f} s")
+        return guard
+
+    def _complete(self, prefix_name, prefix, suffix, speculative=False, **kwargs):
+        """
+        Вызов модели для промпта prefix + suffix.
+        Перед вызовом восстанавливается кэшированное KV-состояние префикса
+        (для модели на сервере префикс передаётся серверу вместе с запросом).
+        speculative=True — вызов через экземпляр с черновиком, если он загружен.
+        """
+        if getattr(self.llm, "is_remote", False):
+            return self.llm(prefix + suffix, cache_prefix=prefix, speculative=speculative, **kwargs)
+        if speculative and self.java_llm is not None:
+            # Экземпляр видит только Java-промпты: префикс остаётся в его KV-кэше без save_state
+            return self.java_llm(prefix + suffix, **kwargs)
+        if self.prefix_cache is not None:
+            try:
+                self.prefix_cache.prepare(prefix_name, prefix)
+            except Exception as e:
+                logger.warning(f"⚠️ Prompt prefix cache unavailable: {e}")
+        return self.llm(prefix + suffix, **kwargs)
+
     def _clean_generated_code(self, code: str) -> str:
         """
         Очищает сгенерированный код от управляющих токенов и артефактов.
@@ -293,7 +679,8 @@ class TestAutomationAgent:
     def __init__(self, github_token: str, jenkins_url: str,
                  jenkins_username: str, jenkins_token: str,
                  model_path: str, github_username: str,
-                 scenario_repo: str, aft_repo: str):
+                 scenario_repo: str, aft_repo: str, aft_workdir: str = None,
+                 speculative: str = "off", draft_model_path: str = None, page_collector: str = "cdp"):
         # Сохраняем параметры подключения
         self.github_token = github_token
         self.github_username = github_username
@@ -305,7 +692,9 @@ class TestAutomationAgent:
         self.aft_repo_name = aft_repo
 
         # Инициализация клиента модели
-        self.model_client = GGUFModelClient(model_path)
+        self.model_client = GGUFModelClient(
+            model_path, speculative=speculative, draft_model_path=draft_model_path, page_collector=page_collector
+        )
 
         # Инициализация клиента GitHub
         try:
@@ -317,6 +706,19 @@ class TestAutomationAgent:
             logger.error(f"❌ GitHub connection failed: {e}")
             raise
 
+        # Тесты за цикл сканирования публикуются в AFT одним коммитом:
+        # через Git Data API или через локальный клон (git push)
+        if aft_workdir:
+            # Токен передаётся командам git через окружение, URL remote без учётных данных
+            self.aft_publisher = LocalGitPublisher(
+                f"https://github.com/{aft_repo}.git",
+                aft_workdir,
+                token=github_token
+            )
+            logger.info(f"📁 AFT working copy: {aft_workdir}")
+        else:
+            self.aft_publisher = GitHubBatchPublisher(self.github_client, aft_repo)
+
         # Инициализация клиента Jenkins (если доступен)
         self.jenkins_client = None
         try:
@@ -341,12 +743,20 @@ class TestAutomationAgent:
         # Словарь для отслеживания изменений файлов (filename -> sha)
         self.file_tracking = {}
 
+        # Кэш готовых тестов по содержимому сценария (повторная генерация не нужна)
+        self.generation_cache = GenerationCache()
+
         # Кэш для pom.xml требований (ускоряет работу)
         self._pom_requirements_cache = None
         self._pom_requirements_cache_sha = None
 
+        # Последний обработанный head-коммит ветки сценариев и ETag запроса к ней
+        self.scan_state = {}
+        self._pending_scan_state = None
+
         # Загрузка статуса файлов из локального файла
         self._load_file_tracking_status()
+        self._load_scan_state()
 
         # Загрузка языковой модели
         if not self.model_client.load_model():
@@ -378,6 +788,76 @@ class TestAutomationAgent:
         except Exception as e:
             logger.warning(f"⚠️ Failed to save scenario file status: {e}")
 
+    def _load_scan_state(self):
+        """
+        Загружает последний обработанный head-коммит и ETag из локального файла.
+        """
+        self.scan_state = {}
+        if os.path.exists(SCENARIO_SCAN_STATE_FILE):
+            try:
+                with open(SCENARIO_SCAN_STATE_FILE, "r", encoding="utf-8") as f:
+                    self.scan_state = json.load(f)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to load scan state: {e}")
+
+    def _commit_scan_state(self, success):
+        """
+        Запоминает head-коммит последнего скана, если все файлы обработаны успешно.
+        При ошибках head не сдвигается и ETag сбрасывается, чтобы следующий скан
+        повторил необработанные файлы, а не получил 304.
+        """
+        if self._pending_scan_state is None:
+            return
+        if success:
+            self.scan_state.update(self._pending_scan_state)
+        else:
+            self.scan_state["ref_etag"] = None
+        self._pending_scan_state = None
+        try:
+            with open(SCENARIO_SCAN_STATE_FILE, "w", encoding="utf-8") as f:
+                json.dump(self.scan_state, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to save scan state: {e}")
+
+    def _fetch_branch_head(self, branch, etag=None):
+        """
+        Условный запрос (If-None-Match) к ref ветки сценариев.
+        Возвращает (sha, etag) или (None, etag) при ответе 304 Not Modified.
+        Ответы 304 не расходуют лимит запросов GitHub.
+        """
+        url = f"{GITHUB_API_URL}/repos/{self.scenario_repo_name}/git/ref/heads/{branch}"
+        headers = {
+            "Authorization": f"token {self.github_token}",
+            "Accept": "application/vnd.github+json",
+        }
+        if etag:
+            headers["If-None-Match"] = etag
+        response = requests.get(url, headers=headers, timeout=30)
+        if response.status_code == 304:
+            return None, etag
+        response.raise_for_status()
+        return response.json()["object"]["sha"], response.headers.get("ETag")
+
+    def _list_changed_txt_blobs(self, repo, base_sha, head_sha):
+        """
+        Возвращает {путь: blob sha} .txt файлов, изменённых между двумя коммитами
+        (compare API). None — если сравнение невозможно и нужен полный скан.
+        """
+        try:
+            comparison = repo.compare(base_sha, head_sha)
+            files = comparison.files
+        except GithubException as e:
+            logger.warning(f"⚠️ Compare {base_sha[:7]}...{head_sha[:7]} failed, doing full scan: {e}")
+            return None
+        # compare API отдаёт не более 300 файлов — при большем числе нужен полный скан
+        if len(files) >= 300:
+            return None
+        return {
+            changed.filename: changed.sha
+            for changed in files
+            if changed.filename.endswith('.txt') and changed.status != "removed"
+        }
+
     def _is_file_changed(self, filename, current_sha):
         """
         Проверяет, изменился ли файл (по SHA).
@@ -394,20 +874,37 @@ class TestAutomationAgent:
 
     def _list_all_txt_files(self, repo, path=""):
         """
-        Рекурсивно возвращает список всех .txt файлов в репозитории.
+        Рекурсивно возвращает {путь: sha} всех .txt файлов, обходя директории.
+        Используется как запасной вариант, если git tree ответ усечён.
         """
-        txt_files = []
+        txt_files = {}
         try:
             contents = repo.get_contents(path)
             for content in contents:
                 if content.type == "file" and content.name.endswith('.txt'):
-                    txt_files.append(content.path)
+                    # Листинг директории уже содержит sha — отдельный запрос на файл не нужен
+                    txt_files[content.path] = content.sha
                 elif content.type == "dir":
-                    txt_files.extend(self._list_all_txt_files(repo, content.path))
+                    txt_files.update(self._list_all_txt_files(repo, content.path))
         except GithubException as e:
             logger.error(f"❌ Error listing directory {path}: {e}")
         return txt_files
 
+    def _list_txt_blobs(self, repo, ref=None):
+        """
+        Возвращает {путь: blob sha} всех .txt файлов одним запросом
+        к git trees API (recursive). Количество запросов не зависит от числа файлов.
+        """
+        tree = repo.get_git_tree(ref or repo.default_branch, recursive=True)
+        if tree.raw_data.get("truncated"):
+            logger.warning("⚠️ Git tree response is truncated, falling back to directory walk")
+            return self._list_all_txt_files(repo)
+        return {
+            element.path: element.sha
+            for element in tree.tree
+            if element.type == "blob" and element.path.endswith('.txt')
+        }
+
     def _scan_dir(self, repo, path=""):
         """
         ОСТАВЛЕНО ДЛЯ СОВМЕСТИМОСТИ, но не используется.
@@ -422,18 +919,41 @@ class TestAutomationAgent:
         """
         try:
             logger.info(f"🔍 Scanning repository: {self.scenario_repo_name}")
-            repo = self.github_client.get_repo(self.scenario_repo_name)
-            all_txt_files = self._list_all_txt_files(repo)
+            last_head_sha = self.scan_state.get("head_sha")
+            branch = self.scan_state.get("branch")
+            head_sha = None
+            repo = None
+            if not branch:
+                repo = self.github_client.get_repo(self.scenario_repo_name)
+                branch = repo.default_branch
+            try:
+                head_sha, etag = self._fetch_branch_head(branch, self.scan_state.get("ref_etag"))
+                if head_sha is None or head_sha == last_head_sha:
+                    # Ветка не изменилась — полный скан не нужен
+                    logger.info(f"ℹ️ Branch {branch} unchanged since {(last_head_sha or '')[:7]}, skipping scan")
+                    self.scan_state["ref_etag"] = etag
+                    return []
+                self._pending_scan_state = {"head_sha": head_sha, "ref_etag": etag, "branch": branch}
+            except Exception as e:
+                logger.warning(f"⚠️ Conditional head request failed, doing full scan: {e}")
+
+            if repo is None:
+                repo = self.github_client.get_repo(self.scenario_repo_name)
+            all_txt_files = None
+            if last_head_sha and head_sha:
+                # Только пути, изменённые с последнего обработанного коммита
+                all_txt_files = self._list_changed_txt_blobs(repo, last_head_sha, head_sha)
+            if all_txt_files is None:
+                # Всё дерево с sha файлов — одним запросом, без get_contents на каждый файл
+                all_txt_files = self._list_txt_blobs(repo, head_sha)
+                removed_files = [path for path in self.file_tracking if path not in all_txt_files]
+                if removed_files:
+                    logger.info(f"🗑️ Tracked files no longer in repository: {removed_files}")
             changed_files = []
-            for file_path in all_txt_files:
-                try:
-                    content = repo.get_contents(file_path)
-                    sha = content.sha
-                    # Проверяем, был ли файл изменен или новый
-                    if self._is_file_changed(file_path, sha):
-                        changed_files.append((file_path, sha))
-                except GithubException as e:
-                    logger.error(f"❌ Error getting file info for {file_path}: {e}")
+            for file_path, sha in sorted(all_txt_files.items()):
+                # Проверяем, был ли файл изменен или новый
+                if self._is_file_changed(file_path, sha):
+                    changed_files.append((file_path, sha))
             logger.info(f"📊 Found {len(changed_files)} changed/new files: {[f[0] for f in changed_files]}")
             return changed_files
         except GithubException as e:
@@ -480,9 +1000,7 @@ class TestAutomationAgent:
         Кэширует результат до изменения pom.xml.
         """
         try:
-            aft_repo = self.github_client.get_repo(self.aft_repo_name)
-            pom_content = aft_repo.get_contents("pom.xml")
-            pom_sha = pom_content.sha
+            pom_xml, pom_sha = self.aft_publisher.read_file("pom.xml")
             # Используем кэш, если pom.xml не изменился
             if (
                 self._pom_requirements_cache is not None
@@ -490,7 +1008,6 @@ class TestAutomationAgent:
             ):
                 return self._pom_requirements_cache
 
-            pom_xml = pom_content.decoded_content.decode("utf-8")
             requirements = []
 
             try:
@@ -596,20 +1113,82 @@ class TestAutomationAgent:
                 "- Используй паттерн Page Object Model (POM)."
             ]
 
+    def _test_name(self, filename):
+        """
+        Имя теста из имени файла сценария.
+        """
+        return os.path.splitext(os.path.basename(filename))[0].replace(' ', '_').replace('-', '_')
+
     def generate_java_test_code(self, scenario_content, filename):
         """
         Генерирует Java-код автотеста с помощью GGUF модели.
         Если модель недоступна или код невалиден — использует fallback.
         """
-        test_name = os.path.splitext(os.path.basename(filename))[0].replace(' ', '_').replace('-', '_')
+        test_name = self._test_name(filename)
+        cached = self.lookup_generated_test(scenario_content, filename)
+        if cached:
+            return cached
         logger.info(f"🤖 Generating Java test code for: {test_name}")
+        scenario = scenario_content
+        try:
+            test_locators = self.model_client.find_locators(scenario)
+        finally:
+            self.model_client.close()
+        return self.generate_java_from_locators(
+            scenario_content, filename, test_locators, analysis=self.model_client.scenario_info
+        )
+
+    def _generation_cache_key(self, scenario_content):
+        return GenerationCache.make_key(
+            scenario_content,
+            self._get_pom_requirements(),
+            model_identity(self.model_client.model_path),
+            PROMPT_TEMPLATE_VERSION
+        )
+
+    def lookup_generated_test(self, scenario_content, filename):
+        """
+        Ищет готовый тест для сценария в кэше генерации.
+        Возвращает (java_code, java_filename) или None.
+        """
+        entry = self.generation_cache.get(self._generation_cache_key(scenario_content))
+        if entry is None:
+            return None
+        test_name = self._test_name(filename)
+        java_code = entry["java_code"]
+        cached_name = entry.get("test_name")
+        if cached_name and cached_name != test_name:
+            # Тот же сценарий в другом файле — переименовываем класс теста
+            java_code = re.sub(rf"\b{re.escape(cached_name)}Test\b", f"{test_name}Test", java_code)
+        logger.info(f"🗃️ Generation cache hit for {filename}, skipping LLM and browser")
+        return java_code, f"{test_name}Test.java"
 
+    def store_generated_test(self, scenario_content, filename, analysis, locators, java_code):
+        """
+        Сохраняет анализ, локаторы и Java-код сценария в кэш генерации.
+        """
+        self.generation_cache.put(self._generation_cache_key(scenario_content), {
+            "test_name": self._test_name(filename),
+            "analysis": analysis,
+            "locators": locators,
+            "java_code": java_code,
+            "created_at": datetime.now().isoformat(),
+        })
+
+    def generate_java_from_locators(self, scenario_content, filename, test_locators, analysis=None):
+        """
+        Генерирует Java-код по уже найденным локаторам (последний LLM-шаг).
+        Валидный код модели сохраняется в кэш генерации вместе с анализом и локаторами.
+        Возвращает (java_code, java_filename).
+        """
+        test_name = self._test_name(filename)
         # Получаем требования из pom.xml
         requirements_list = self._get_pom_requirements()
         requirements_str = "\n".join(requirements_list)
-        scenario = scenario_content
-        test_locators = self.model_client.find_locators(scenario)
-        self.model_client.close()
+        if isinstance(test_locators, str):
+            locators_str = test_locators
+        else:
+            locators_str = json.dumps(test_locators, ensure_ascii=False, indent=2)
         prompt = (
             f"Описание сценария:\n{scenario_content}\n"
             f"Требования:\n"
@@ -618,13 +1197,13 @@ class TestAutomationAgent:
             f"- Не использовать WebDriverManager\n"
             f"- Используй BeforeEach и AfterEach\n"
             f"{requirements_str}\n"
-            f" - Используй следующие локаторы:\n {test_locators}"
+            f" - Используй следующие локаторы:\n {locators_str}"
         )
         # Не дублируем логирование полного промпта здесь, только в generate_text
         java_code = self.model_client.generate_text(prompt)
-        
         if java_code and self.validate_java_code(java_code):
             logger.info(f"✅ Generated valid code for {test_name}Test")
+            self.store_generated_test(scenario_content, filename, analysis, test_locators, java_code)
         else:
             logger.warning("⚠️ Model unavailable or generated invalid code, using fallback")
             java_code = self._generate_fallback_test(test_name, scenario_content)
@@ -635,44 +1214,7 @@ class TestAutomationAgent:
         Резервная генерация теста, если модель недоступна или сгенерировала невалидный код.
         """
         logger.info(f"🔄 Generating fallback test for: {test_name}")
-        return f"""package tests;
-
-import org.openqa.selenium.WebDriver;
-import org.openqa.selenium.chrome.ChromeDriver;
-import org.openqa.selenium.support.ui.WebDriverWait;
-import org.junit.jupiter.api.AfterEach;
-import org.junit.jupiter.api.BeforeEach;
-import org.junit.jupiter.api.Test;
-import java.time.Duration;
-
-public class {test_name}Test {{
-    private WebDriver driver;
-    private WebDriverWait wait;
-
-    @BeforeEach
-    public void setUp() {{
-        System.setProperty("webdriver.chrome.driver", "/path/to/chromedriver");
-        driver = new ChromeDriver();
-        wait = new WebDriverWait(driver, Duration.ofSeconds(10));
-        driver.manage().window().maximize();
-    }}
-
-    @Test
-    public void test{test_name}() {{
-        // Автоматически сгенерированный тест
-        // Сценарий: {scenario_content}
-
-        // TODO: Реализовать шаги сценария
-    }}
-
-    @AfterEach
-    public void tearDown() {{
-        if (driver != null) {{
-            driver.quit();
-        }}
-    }}
-}}
-"""
+        return render_fallback_test(test_name, scenario_content)
 
     def validate_java_code(self, java_code):
         """
@@ -687,89 +1229,137 @@ public class {test_name}Test {{
         ]
         return all(pattern in java_code for pattern in required_patterns)
 
+    def stage_aft_test(self, java_code, java_filename):
+        """
+        Проверяет сгенерированный Java-код и добавляет его в следующий
+        пакетный коммит репозитория AFT (см. aft_publisher.flush()).
+        """
+        if not self.validate_java_code(java_code):
+            logger.warning(f"⚠️ Generated code failed validation: {java_filename}")
+            return False
+        self.aft_publisher.stage(java_filename, java_code)
+        logger.info(f"📦 Staged for AFT repository: {java_filename}")
+        return True
+
     def push_to_aft_repository(self, java_code, java_filename):
         """
-        Загружает сгенерированный Java-код в репозиторий AFT.
-        Обновляет файл, если он изменился, или создает новый.
+        Загружает один сгенерированный тест в репозиторий AFT сразу.
+        Неизменённый файл пропускается по локально вычисленному sha блоба.
         """
-        try:
-            if not self.validate_java_code(java_code):
-                logger.warning(f"⚠️ Generated code failed validation: {java_filename}")
-                return False
-            logger.info(f"📤 Pushing to AFT repository: {java_filename}")
-            aft_repo = self.github_client.get_repo(self.aft_repo_name)
-            file_path = f"src/test/java/tests/{java_filename}"
-            commit_message = (
-                f"Auto-update test: {java_filename}\n\n"
-                f"Generated from scenario update at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            )
-            try:
-                existing_file = aft_repo.get_contents(file_path)
-                # Если файл не изменился — пропускаем коммит
-                if existing_file.decoded_content.decode('utf-8') == java_code:
-                    logger.info(f"ℹ️ File {file_path} unchanged, skipping update")
-                    return True
-                aft_repo.update_file(file_path, commit_message, java_code, existing_file.sha)
-                logger.info(f"✅ Updated file: {file_path}")
-                logger.info(f"📝 Commit: {commit_message}")
-            except GithubException as e:
-                # Если файл не существует — создаем новый
-                if getattr(e, 'status', None) == 404:
-                    aft_repo.create_file(file_path, commit_message, java_code)
-                    logger.info(f"✅ Created new file: {file_path}")
-                    logger.info(f"📝 Commit: {commit_message}")
-                else:
-                    logger.error(f"❌ Error updating/creating file: {e}")
-                    return False
-            return True
-        except GithubException as e:
-            logger.error(f"❌ Error pushing to AFT repository: {e}")
-            if getattr(e, 'status', None) == 404:
-                logger.error(f"Repository {self.aft_repo_name} not found!")
-                logger.error("Please check:")
-                logger.error("1. Repository exists")
-                logger.error("2. You have access to it")
-                logger.error("3. Format is 'username/repository-name'")
+        if not self.stage_aft_test(java_code, java_filename):
             return False
+        logger.info(f"📤 Pushing to AFT repository: {java_filename}")
+        return self.aft_publisher.flush()
 
-    def run(self, scan_interval=300):
+    def _resolve_pushed_files(self, paths):
+        """
+        Превращает пути из push-вебхука в список (путь, sha) изменённых файлов.
+        Sha всех путей берутся одним запросом к дереву ветки.
+        """
+        repo = self.github_client.get_repo(self.scenario_repo_name)
+        blobs = self._list_txt_blobs(repo)
+        changed_files = []
+        for file_path in sorted(paths):
+            sha = blobs.get(file_path)
+            if sha is None:
+                # Файл уже удалён более поздним коммитом
+                logger.info(f"ℹ️ Pushed file no longer in repository: {file_path}")
+            elif self._is_file_changed(file_path, sha):
+                changed_files.append((file_path, sha))
+        logger.info(f"📊 Webhook: {len(changed_files)} changed/new files: {[f[0] for f in changed_files]}")
+        return changed_files
+
+    def _process_changed_files(self, pipeline, changed_files):
+        """
+        Обрабатывает пачку (путь, sha) конвейером, публикует все тесты
+        одним коммитом и обновляет статус файлов.
+        Возвращает True, если все файлы обработаны успешно.
+        """
+        logger.info(f"🔄 Processing {len(changed_files)} changed files: {[f[0] for f in changed_files]}")
+        try:
+            self.aft_publisher.refresh()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to refresh AFT working copy: {e}")
+        results = pipeline.run_batch(changed_files)
+        if any(results.values()) and not self.aft_publisher.flush():
+            # Коммит не создан — сценарии будут обработаны повторно в следующем цикле
+            self.aft_publisher.discard()
+            results = {filename: False for filename in results}
+        for filename, sha in changed_files:
+            if results.get(filename):
+                self.processed_files.add(filename)
+                # Обновляем статус файла (sha)
+                self.file_tracking[filename] = sha
+        # После обработки всех файлов сохраняем статус
+        self._save_file_tracking_status()
+        self.generation_cache.log_stats()
+        self.model_client.page_cache.log_stats()
+        self.model_client.locator_index.log_stats()
+        return all(results.get(f) for f, _ in changed_files)
+
+    def run(self, scan_interval=300, browser_workers=2, webhook=None):
         """
         Основной цикл работы агента:
         - Периодически сканирует репозиторий сценариев на изменения
-        - Обрабатывает новые/измененные сценарии
+          или, если передан webhook (WebhookTrigger), ждёт push-событий
+          и сканирует только по истечении scan_interval без событий
+        - Обрабатывает новые/измененные сценарии конвейером (ScenarioPipeline)
         - Загружает сгенерированные тесты в целевой репозиторий
         """
         logger.info("🚀 Starting Test Automation Agent v0.2")
         logger.info(f"📂 Monitoring: {self.scenario_repo_name}")
         logger.info(f"📂 Target: {self.aft_repo_name}")
         logger.info(f"⏰ Scan interval: {scan_interval} seconds")
+        if webhook is not None:
+            logger.info(f"🪝 Webhook mode: port {webhook.port}, polling every {scan_interval} seconds as fallback")
+        # При батчинге на сервере модели LLM-запросы сценариев отправляются параллельно
+        llm_workers = getattr(self.model_client.llm, "parallel", 1)
+        pipeline = ScenarioPipeline(self, browser_workers=browser_workers, llm_workers=llm_workers)
+
         try:
             while True:
                 try:
-                    changed_files = self.scan_scenario_repository()
+                    if webhook is not None:
+                        pushed_paths = webhook.wait_for_paths(timeout=scan_interval)
+                        if pushed_paths is None:
+                            # Событий не было — обычный скан на случай потерянных доставок
+                            changed_files = self.scan_scenario_repository()
+                        else:
+                            changed_files = self._resolve_pushed_files(pushed_paths)
+                    else:
+                        changed_files = self.scan_scenario_repository()
+
                     if changed_files:
-                        logger.info(f"🔄 Processing {len(changed_files)} changed files: {[f[0] for f in changed_files]}")
-                        for filename, sha in changed_files:
-                            logger.info(f"📝 Processing file: {filename}")
-                            success = self.process_scenario(filename)
-                            if success:
-                                self.processed_files.add(filename)
-                                # Обновляем статус файла (sha)
-                                self.file_tracking[filename] = sha
-                                logger.info(f"✅ Successfully processed: {filename}")
-                            else:
-                                logger.error(f"❌ Failed to process: {filename}")
-                        # После обработки всех файлов сохраняем статус
-                        self._save_file_tracking_status()
+                        self._commit_scan_state(self._process_changed_files(pipeline, changed_files))
                     else:
                         logger.info("ℹ️ No changes detected")
-                    logger.info(f"⏳ Waiting {scan_interval} seconds until next scan...")
-                    time.sleep(scan_interval)
+                        self._commit_scan_state(True)
+
+                    self._reverify_locator_index()
+
+                    if webhook is None:
+                        logger.info(f"⏳ Waiting {scan_interval} seconds until next scan...")
+                        time.sleep(scan_interval)
+
                 except Exception as e:
                     logger.error(f"❌ Error in main loop: {e}")
-                    time.sleep(scan_interval)
+                    time.sleep(scan_interval if webhook is None else 5)
+
         except KeyboardInterrupt:
             logger.info("🛑 Agent stopped by user")
+        finally:
+            if webhook is not None:
+                webhook.stop()
+            close_shared_pools()
+
+    def _reverify_locator_index(self):
+        """
+        Перепроверка индекса локаторов по расписанию (не чаще LOCATOR_REVERIFY_INTERVAL).
+        """
+        try:
+            self.model_client.reverify_locator_index(LOCATOR_REVERIFY_INTERVAL)
+        except Exception as e:
+            logger.warning(f"⚠️ Locator index re-verification failed: {e}")
 
     def process_scenario(self, filename):
         """
@@ -840,9 +1430,22 @@ if __name__ == "__main__":
             model_path=MODEL_PATH,
             github_username=GITHUB_USERNAME,
             scenario_repo=SCENARIO_REPO,
-            aft_repo=AFT_REPO
+            aft_repo=AFT_REPO,
+            aft_workdir=os.getenv('AFT_WORKDIR'),
+            speculative=os.getenv('SPECULATIVE', 'off'),
+            draft_model_path=os.getenv('DRAFT_MODEL'),
+            page_collector=os.getenv('PAGE_COLLECTOR', 'cdp')
         )
-        agent.run(scan_interval=300)
+        webhook = None
+        if os.getenv('WEBHOOK_PORT'):
+            # Push-вебхук GitHub: секрет должен совпадать с настройкой вебхука репозитория
+            webhook = WebhookTrigger(
+                secret=os.getenv('GITHUB_WEBHOOK_SECRET'),
+                repo_full_name=SCENARIO_REPO,
+                port=int(os.getenv('WEBHOOK_PORT'))
+            )
+            webhook.start()
+        agent.run(scan_interval=300, browser_workers=int(os.getenv('BROWSER_WORKERS', '2')), webhook=webhook)
     except Exception as e:
         logger.error(f"❌ Failed to initialize agent: {e}")
         logger.error("Please check your configuration:")
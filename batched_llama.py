@@ -0,0 +1,513 @@
+"""
+Непрерывный батчинг запросов к llama.cpp.
+
+Llama из llama_cpp обслуживает одну последовательность: параллельные
+запросы (анализ сценария одного файла, локаторы другого, запросы GenTest)
+выстраиваются в очередь, и на CPU пропускная способность не растёт с
+числом сценариев. BatchedLlama держит несколько последовательностей в
+одном контексте llama.cpp (n_seq_max = n_parallel) и на каждом шаге
+декодирует их общим батчем:
+
+- генерирующие последовательности добавляют по одному токену;
+- оставшееся место батча занимает prefill промптов новых запросов —
+  новый запрос подключается, не дожидаясь окончания остальных;
+- закончившаяся последовательность сразу освобождает слот.
+
+Свободный слот выбирается по самому длинному общему префиксу с прошлым
+промптом этого слота: KV-кэш общего префикса (инструкции шаблона)
+не пересчитывается.
+
+Для каждого запроса считаются задержки (ожидание в очереди, первый токен,
+полное время), для движка — суммарная скорость генерации tok/s.
+"""
+
+import inspect
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+try:
+    import llama_cpp
+    from llama_cpp import _internals as llama_internals
+    from llama_cpp._logger import set_verbose
+except ImportError:  # Клиентам без llama_cpp модуль нужен только ради импорта
+    llama_cpp = None
+    llama_internals = None
+    set_verbose = None
+
+from json_grammar import json_grammar
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLING = {
+    "max_tokens": 256,
+    "temperature": 0.8,
+    "top_k": 40,
+    "top_p": 0.95,
+    "min_p": 0.05,
+    "repeat_penalty": 1.1,
+    "frequency_penalty": 0.0,
+    "presence_penalty": 0.0,
+    "seed": None,
+    "stop": None,
+}
+
+
+class BatchRequest:
+    """
+    Запрос на генерацию: параметры, накопленный текст и задержки.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, prompt, params, json_schema=None, on_chunk=None, on_done=None):
+        self.id = next(self._ids)
+        self.prompt = prompt
+        self.params = params
+        self.json_schema = json_schema
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.stop = [s for s in (params.get("stop") or []) if s]
+        self.tokens = []
+        self.output = b""
+        self.completion_tokens = 0
+        self.emitted = 0
+        self.finish_reason = None
+        self.response = None
+        self.error = None
+        self.cancelled = False
+        self.done = threading.Event()
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.first_token_at = None
+        self.finished_at = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def wait(self, timeout=None):
+        """
+        Ждёт завершения и возвращает ответ в формате llama_cpp.
+        """
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"Batched request #{self.id} timed out")
+        if self.error:
+            raise RuntimeError(self.error)
+        return self.response
+
+    def text(self):
+        return self.output.decode("utf-8", errors="ignore")
+
+    def timings(self):
+        end = self.finished_at or time.perf_counter()
+        started = self.started_at or end
+        generation = end - (self.first_token_at or started)
+        return {
+            "queue_wait_seconds": round(started - self.submitted_at, 3),
+            "first_token_seconds": round((self.first_token_at or end) - self.submitted_at, 3),
+            "latency_seconds": round(end - self.submitted_at, 3),
+            "tokens_per_second": round(self.completion_tokens / generation, 2) if generation > 0 else 0.0,
+        }
+
+
+class _Slot:
+    """
+    Последовательность контекста (seq_id) и запрос, который она сейчас обслуживает.
+    """
+    def __init__(self, seq_id):
+        self.seq_id = seq_id
+        self.request = None
+        self.sampler = None
+        self.cached = []    # Токены, уже лежащие в KV-кэше последовательности
+        self.pending = []   # Токены, которые нужно подать в следующих батчах
+        self.logits_index = None
+
+
+class BatchedLlama:
+    """
+    Одна модель, n_parallel последовательностей в общем контексте и цикл непрерывного батчинга.
+    Вызов llm(prompt, ...) совместим с Llama для обычных и потоковых запросов.
+    """
+    def __init__(self, model_path, n_ctx=8192, n_parallel=4, n_batch=512, n_threads=None,
+                 n_gpu_layers=0, verbose=False, stats_interval=60.0):
+        if llama_cpp is None:
+            raise ImportError("llama_cpp is not installed")
+        self.model_path = model_path
+        self.parallel = max(1, n_parallel)
+        self.n_ctx_per_seq = n_ctx
+        self.n_batch = n_batch
+        self.stats_interval = stats_interval
+        # Как и Llama: без verbose логи llama.cpp ниже ERROR не печатаются
+        set_verbose(verbose)
+
+        model_params = llama_cpp.llama_model_default_params()
+        model_params.n_gpu_layers = n_gpu_layers
+        self._model = llama_internals.LlamaModel(path_model=model_path, params=model_params, verbose=verbose)
+
+        ctx_params = llama_cpp.llama_context_default_params()
+        # У каждой последовательности свои n_ctx токенов
+        ctx_params.n_ctx = n_ctx * self.parallel
+        ctx_params.n_batch = n_batch
+        ctx_params.n_ubatch = n_batch
+        ctx_params.n_seq_max = self.parallel
+        if n_threads:
+            ctx_params.n_threads = n_threads
+            ctx_params.n_threads_batch = n_threads
+        self._ctx = llama_internals.LlamaContext(model=self._model, params=ctx_params, verbose=verbose)
+        self._batch = llama_internals.LlamaBatch(n_tokens=n_batch, embd=0, n_seq_max=self.parallel, verbose=verbose)
+        self._n_vocab = self._model.n_vocab()
+        # Ранние 0.3.x принимают в add_penalties словарь и служебные токены, поздние — только коэффициенты
+        self._legacy_penalties = "n_vocab" in inspect.signature(llama_internals.LlamaSampler.add_penalties).parameters
+
+        self._slots = [_Slot(seq_id) for seq_id in range(self.parallel)]
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = {
+            "requests": 0, "completed": 0, "errors": 0, "cancelled": 0,
+            "prompt_tokens": 0, "reused_prompt_tokens": 0, "generated_tokens": 0,
+            "decode_steps": 0, "busy_seconds": 0.0, "max_active": 0,
+        }
+        self._stats_lock = threading.Lock()
+        self._last_stats_log = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, name="batched-llama", daemon=True)
+        self._thread.start()
+        logger.info(f"🧵 Batched llama.cpp context: {self.parallel} sequences x {n_ctx} tokens, batch {n_batch}")
+
+    # ------------------------------------------------------------------
+    # Клиентский интерфейс
+    # ------------------------------------------------------------------
+    def __call__(self, prompt, stream=False, json_schema=None, **kwargs):
+        if not stream:
+            return self.submit(prompt, json_schema=json_schema, **kwargs).wait()
+        chunks = queue.Queue()
+        request = self.submit(
+            prompt, json_schema=json_schema,
+            on_chunk=chunks.put, on_done=lambda _: chunks.put(None), **kwargs
+        )
+        return self._iter_chunks(request, chunks)
+
+    def _iter_chunks(self, request, chunks):
+        # Закрытие генератора отменяет запрос и освобождает слот
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+            if request.error:
+                raise RuntimeError(request.error)
+        finally:
+            request.cancel()
+
+    def submit(self, prompt, json_schema=None, on_chunk=None, on_done=None, **kwargs):
+        """
+        Ставит запрос в очередь и сразу возвращает BatchRequest.
+        on_chunk(chunk) вызывается для каждого фрагмента текста, on_done(request) — по завершении.
+        """
+        params = dict(DEFAULT_SAMPLING)
+        params.update({key: value for key, value in kwargs.items() if key in DEFAULT_SAMPLING})
+        request = BatchRequest(prompt, params, json_schema, on_chunk, on_done)
+        request.tokens = self._model.tokenize(prompt.encode("utf-8"), add_bos=True, special=True)
+        if len(request.tokens) >= self.n_ctx_per_seq:
+            self._complete(request, error=f"prompt is {len(request.tokens)} tokens, context is {self.n_ctx_per_seq}")
+            return request
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BatchedLlama is closed")
+            self._queue.append(request)
+            self._count("requests")
+            self._cond.notify()
+        return request
+
+    def stats(self):
+        """
+        Суммарная статистика движка: запросы, токены, скорость генерации.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        busy = stats["busy_seconds"]
+        stats["busy_seconds"] = round(busy, 2)
+        stats["tokens_per_second"] = round(stats["generated_tokens"] / busy, 2) if busy > 0 else 0.0
+        with self._cond:
+            stats["active"] = sum(1 for slot in self._slots if slot.request is not None)
+            stats["queued"] = len(self._queue)
+        return stats
+
+    def log_stats(self):
+        stats = self.stats()
+        logger.info(
+            f"📈 Batched decode: {stats['active']} active, {stats['queued']} queued, "
+            f"{stats['completed']} completed, {stats['generated_tokens']} tokens generated, "
+            f"{stats['tokens_per_second']} tok/s aggregate (max {stats['max_active']} concurrent, "
+            f"{stats['reused_prompt_tokens']} prompt tokens reused)"
+        )
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+
+    # ------------------------------------------------------------------
+    # Цикл батчинга
+    # ------------------------------------------------------------------
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._queue and not self._has_active():
+                    self._cond.wait()
+                if self._closed:
+                    break
+            started = time.perf_counter()
+            try:
+                with self._cond:
+                    self._admit()
+                if self._fill_batch():
+                    self._ctx.decode(self._batch)
+                    self._sample()
+            except Exception as e:
+                logger.error(f"❌ Batched decode failed: {e}")
+                for slot in self._slots:
+                    if slot.request is not None:
+                        self._release(slot, error=str(e))
+            with self._stats_lock:
+                self._stats["busy_seconds"] += time.perf_counter() - started
+                self._stats["decode_steps"] += 1
+            if time.perf_counter() - self._last_stats_log >= self.stats_interval:
+                self._last_stats_log = time.perf_counter()
+                self.log_stats()
+
+        for slot in self._slots:
+            if slot.request is not None:
+                self._release(slot, error="BatchedLlama closed")
+        while self._queue:
+            self._complete(self._queue.popleft(), error="BatchedLlama closed")
+
+    def _has_active(self):
+        return any(slot.request is not None for slot in self._slots)
+
+    def _admit(self):
+        """
+        Подключает запросы из очереди к свободным слотам (вызывается под self._cond).
+        """
+        while self._queue:
+            free = [slot for slot in self._slots if slot.request is None]
+            if not free:
+                break
+            request = self._queue.popleft()
+            if request.cancelled:
+                self._count("cancelled")
+                self._complete(request, finish_reason="cancelled")
+                continue
+            slot = max(free, key=lambda s: _common_prefix(s.cached, request.tokens))
+            try:
+                self._start(slot, request)
+            except Exception as e:
+                # Ошибка одного запроса не останавливает цикл и не задевает остальные
+                logger.error(f"❌ Failed to start batched request #{request.id}: {e}")
+                if slot.request is request:
+                    self._release(slot, error=str(e))
+                else:
+                    self._complete(request, error=str(e))
+        with self._stats_lock:
+            active = sum(1 for slot in self._slots if slot.request is not None)
+            self._stats["max_active"] = max(self._stats["max_active"], active)
+
+    def _start(self, slot, request):
+        # Последний токен промпта подаётся всегда: нужны его логиты
+        keep = min(_common_prefix(slot.cached, request.tokens), len(request.tokens) - 1)
+        # Обёртка LlamaContext.kv_cache_seq_rm ничего не возвращает: результат не проверяется
+        self._ctx.kv_cache_seq_rm(slot.seq_id, keep, -1)
+        slot.cached = request.tokens[:keep]
+        slot.pending = request.tokens[keep:]
+        slot.request = request
+        slot.sampler = self._make_sampler(request)
+        request.started_at = time.perf_counter()
+        max_tokens = request.params["max_tokens"]
+        room = self.n_ctx_per_seq - len(request.tokens)
+        request.params["max_tokens"] = room if not max_tokens or max_tokens <= 0 else min(max_tokens, room)
+        with self._stats_lock:
+            self._stats["prompt_tokens"] += len(request.tokens)
+            self._stats["reused_prompt_tokens"] += keep
+
+    def _make_sampler(self, request):
+        params = request.params
+        sampler = llama_internals.LlamaSampler()
+        penalties = {
+            "penalty_last_n": 64,
+            "penalty_repeat": params["repeat_penalty"],
+            "penalty_freq": params["frequency_penalty"],
+            "penalty_present": params["presence_penalty"],
+        }
+        if self._legacy_penalties:
+            penalties.update(
+                n_vocab=self._n_vocab,
+                special_eos_id=self._model.token_eos(),
+                linefeed_id=self._model.token_nl(),
+                penalize_nl=False,
+                ignore_eos=False,
+            )
+        sampler.add_penalties(**penalties)
+        grammar = json_grammar(request.json_schema) if request.json_schema else None
+        if grammar is not None:
+            sampler.add_grammar(self._model, grammar)
+            # Генерацию завершает грамматика
+            request.stop = []
+        if params["temperature"] <= 0:
+            sampler.add_greedy()
+        else:
+            sampler.add_top_k(params["top_k"])
+            sampler.add_top_p(params["top_p"], 1)
+            sampler.add_min_p(params["min_p"], 1)
+            sampler.add_temp(params["temperature"])
+            seed = params["seed"]
+            sampler.add_dist(seed if seed is not None else llama_cpp.LLAMA_DEFAULT_SEED)
+        return sampler
+
+    def _fill_batch(self):
+        """
+        Собирает батч: сначала по одному токену генерирующих последовательностей,
+        затем prefill промптов в пределах n_batch. Возвращает False, если батч пуст.
+        """
+        batch = self._batch.batch
+        self._batch.reset()
+        for slot in self._slots:
+            slot.logits_index = None
+            if slot.request is not None and slot.request.cancelled:
+                self._count("cancelled")
+                self._release(slot, finish_reason="cancelled")
+
+        decoding = [s for s in self._slots if s.request is not None and len(s.pending) == 1 and s.request.completion_tokens]
+        prefilling = [s for s in self._slots if s.request is not None and s not in decoding]
+        for slot in decoding + prefilling:
+            room = self.n_batch - batch.n_tokens
+            if room <= 0:
+                break
+            chunk = slot.pending[:room]
+            for offset, token in enumerate(chunk):
+                j = batch.n_tokens
+                batch.token[j] = token
+                batch.pos[j] = len(slot.cached) + offset
+                batch.seq_id[j][0] = slot.seq_id
+                batch.n_seq_id[j] = 1
+                batch.logits[j] = False
+                batch.n_tokens += 1
+            slot.cached = slot.cached + chunk
+            slot.pending = slot.pending[len(chunk):]
+            if not slot.pending:
+                batch.logits[batch.n_tokens - 1] = True
+                slot.logits_index = batch.n_tokens - 1
+        return batch.n_tokens > 0
+
+    def _sample(self):
+        now = time.perf_counter()
+        generated = 0
+        for slot in self._slots:
+            if slot.logits_index is None:
+                continue
+            request = slot.request
+            token = slot.sampler.sample(self._ctx, slot.logits_index)
+            generated += 1
+            if request.first_token_at is None:
+                request.first_token_at = now
+            if llama_cpp.llama_vocab_is_eog(self._model.vocab, token):
+                self._release(slot, finish_reason="stop")
+                continue
+            request.completion_tokens += 1
+            request.output += self._model.detokenize([token])
+            slot.pending = [token]
+            text = request.text()
+            stop_at = _find_stop(text, request.stop)
+            if stop_at is not None:
+                request.output = text[:stop_at].encode("utf-8")
+                self._release(slot, finish_reason="stop")
+            elif request.completion_tokens >= request.params["max_tokens"]:
+                self._release(slot, finish_reason="length")
+            else:
+                self._emit(request, text, final=False)
+        with self._stats_lock:
+            self._stats["generated_tokens"] += generated
+
+    def _emit(self, request, text, final):
+        """
+        Передаёт новый текст потоковому клиенту. Пока запрос не завершён,
+        хвост длиной в стоп-последовательность придерживается.
+        """
+        if request.on_chunk is None:
+            return
+        hold = 0 if final else max((len(s) - 1 for s in request.stop), default=0)
+        # Незавершённый UTF-8 символ в конце ещё не декодирован — errors="ignore" его отбросил
+        end = max(request.emitted, len(text) - hold)
+        if end > request.emitted:
+            request.on_chunk({"choices": [{"text": text[request.emitted:end], "index": 0, "finish_reason": None}]})
+            request.emitted = end
+
+    def _release(self, slot, finish_reason=None, error=None):
+        request = slot.request
+        slot.request = None
+        slot.pending = []
+        if slot.sampler is not None:
+            slot.sampler.close()
+            slot.sampler = None
+        if error:
+            # Состояние последовательности неизвестно — очищаем её целиком
+            self._ctx.kv_cache_seq_rm(slot.seq_id, -1, -1)
+            slot.cached = []
+        self._complete(request, finish_reason=finish_reason, error=error)
+
+    def _complete(self, request, finish_reason=None, error=None):
+        request.finished_at = time.perf_counter()
+        request.finish_reason = finish_reason
+        request.error = error
+        if error:
+            self._count("errors")
+        elif finish_reason != "cancelled":
+            self._count("completed")
+            text = request.text()
+            self._emit(request, text, final=True)
+            timings = request.timings()
+            request.response = {
+                "id": f"cmpl-batched-{request.id}",
+                "object": "text_completion",
+                "created": int(time.time()),
+                "model": self.model_path,
+                "choices": [{"text": text, "index": 0, "logprobs": None, "finish_reason": finish_reason}],
+                "usage": {
+                    "prompt_tokens": len(request.tokens),
+                    "completion_tokens": request.completion_tokens,
+                    "total_tokens": len(request.tokens) + request.completion_tokens,
+                },
+                "timings": timings,
+            }
+            logger.info(
+                f"⏱️ Request #{request.id}: {len(request.tokens)} prompt + {request.completion_tokens} tokens, "
+                f"queue {timings['queue_wait_seconds']} s, first token {timings['first_token_seconds']} s, "
+                f"total {timings['latency_seconds']} s ({timings['tokens_per_second']} tok/s)"
+            )
+        request.done.set()
+        if request.on_done is not None:
+            try:
+                request.on_done(request)
+            except Exception as e:
+                logger.warning(f"⚠️ on_done callback failed for request #{request.id}: {e}")
+
+    def _count(self, key):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+
+def _common_prefix(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def _find_stop(text, stops):
+    positions = [text.find(stop) for stop in stops if stop in text]
+    return min(positions) if positions else None
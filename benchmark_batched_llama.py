@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк непрерывного батчинга: одни и те же параллельные запросы
+(анализ сценариев) выполняются с n_parallel=1 и с n_parallel=N.
+Печатает задержки каждого запроса и суммарную скорость tok/s.
+
+Запуск: python benchmark_batched_llama.py --model models/model.gguf --requests 8 --parallel 4
+"""
+
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from batched_llama import BatchedLlama
+
+SCENARIOS = [
+    "Открыть https://example.com/login, ввести логин и пароль, нажать кнопку Войти",
+    "Открыть https://example.com/cart, добавить товар в корзину и перейти к оформлению",
+    "Открыть https://example.com/search, ввести запрос в поле поиска и нажать Найти",
+    "Открыть https://example.com/profile, изменить имя пользователя и сохранить",
+]
+
+PROMPT_PREFIX = (
+    "Проанализируй сценарий теста и верни JSON с полями url и required_elements.\n"
+    "Сценарий:\n"
+)
+
+
+def run(model_path, n_requests, n_parallel, max_tokens, n_ctx):
+    llm = BatchedLlama(model_path, n_ctx=n_ctx, n_parallel=n_parallel, verbose=False, stats_interval=3600)
+    prompts = [PROMPT_PREFIX + SCENARIOS[i % len(SCENARIOS)] for i in range(n_requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_requests) as executor:
+        responses = list(executor.map(
+            lambda prompt: llm(prompt, max_tokens=max_tokens, temperature=0.0),
+            prompts
+        ))
+    wall = time.perf_counter() - started
+    stats = llm.stats()
+    llm.close()
+    return responses, wall, stats
+
+
+def report(title, responses, wall, stats):
+    print(f"\n📊 {title}")
+    for i, response in enumerate(responses):
+        timings = response["timings"]
+        print(
+            f"   #{i + 1}: {response['usage']['completion_tokens']} tokens, "
+            f"очередь {timings['queue_wait_seconds']} s, первый токен {timings['first_token_seconds']} s, "
+            f"всего {timings['latency_seconds']} s"
+        )
+    generated = sum(response["usage"]["completion_tokens"] for response in responses)
+    print(f"   Итого: {generated} tokens за {wall:.1f} s — {generated / wall:.1f} tok/s "
+          f"(движок: {stats['tokens_per_second']} tok/s, до {stats['max_active']} одновременно)")
+    return generated / wall if wall > 0 else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Continuous batching benchmark')
+    parser.add_argument('--model', type=str, required=True, help='Path to GGUF model')
+    parser.add_argument('--requests', type=int, default=8, help='Concurrent requests')
+    parser.add_argument('--parallel', type=int, default=4, help='Sequences per batch')
+    parser.add_argument('--max-tokens', type=int, default=128, help='Tokens per request')
+    parser.add_argument('--n-ctx', type=int, default=2048, help='Context size per sequence')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    print("🚀 Бенчмарк непрерывного батчинга")
+    print("=" * 50)
+    sequential = report("Последовательно (n_parallel=1)", *run(args.model, args.requests, 1, args.max_tokens, args.n_ctx))
+    batched = report(f"Батчинг (n_parallel={args.parallel})", *run(args.model, args.requests, args.parallel, args.max_tokens, args.n_ctx))
+    print("\n" + "=" * 50)
+    print(f"📈 Ускорение: {batched / sequential:.2f}x" if sequential else "📈 Ускорение: н/д")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
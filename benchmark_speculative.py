@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк спекулятивного декодирования генерации Java-тестов.
+
+Для каждого шаблона сценария один и тот же Java-промпт агента генерируется
+без черновика, с prompt/template lookup и (если указан --draft-model)
+с черновой GGUF-моделью. Печатает время, tok/s, ускорение относительно
+обычного декодирования и долю принятых токенов черновика по источникам.
+
+Запуск: python benchmark_speculative.py --model models/model.gguf [--draft-model models/draft.gguf]
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+
+from llama_cpp import Llama
+
+from agent_v024_interface import JAVA_PROMPT_PREFIX
+from speculative_decoding import create_draft_model, attach_references, speculative_llama_kwargs
+
+SCENARIO_TEMPLATES = {
+    "login": {
+        "scenario": "Открыть https://example.com/login, ввести логин и пароль, нажать кнопку Войти, проверить приветствие",
+        "locators": [
+            {"required_element": "поле логина", "locator": {"by": "id", "value": "username"}},
+            {"required_element": "поле пароля", "locator": {"by": "id", "value": "password"}},
+            {"required_element": "кнопка Войти", "locator": {"by": "css", "value": "button[type='submit']"}},
+        ],
+    },
+    "search": {
+        "scenario": "Открыть https://example.com, ввести запрос в поле поиска, нажать Найти, проверить список результатов",
+        "locators": [
+            {"required_element": "поле поиска", "locator": {"by": "name", "value": "q"}},
+            {"required_element": "кнопка Найти", "locator": {"by": "xpath", "value": "//button[text()='Найти']"}},
+        ],
+    },
+    "cart": {
+        "scenario": "Открыть https://example.com/catalog, добавить первый товар в корзину, перейти в корзину, проверить количество",
+        "locators": [
+            {"required_element": "кнопка В корзину", "locator": {"by": "css", "value": ".product:first-child .add-to-cart"}},
+            {"required_element": "ссылка Корзина", "locator": {"by": "id", "value": "cart-link"}},
+            {"required_element": "счётчик товаров", "locator": {"by": "css", "value": ".cart-count"}},
+        ],
+    },
+}
+
+
+def build_prompt(name, template):
+    """Java-промпт в том же виде, что собирает агент"""
+    test_name = name.capitalize()
+    prompt = (
+        f"Описание сценария:\n{template['scenario']}\n"
+        f"Требования:\n"
+        f"- Имя класса: {test_name}Test\n"
+        f"- Используй java.time.Duration для ожиданий\n"
+        f"- Не использовать WebDriverManager\n"
+        f"- Используй BeforeEach и AfterEach\n"
+        f" - Используй следующие локаторы:\n {json.dumps(template['locators'], ensure_ascii=False, indent=2)}"
+    )
+    return JAVA_PROMPT_PREFIX + f"{prompt}\n\nВерни только Java код. [/INST]"
+
+
+def run_mode(args, mode):
+    draft_model = create_draft_model(mode, args.draft_model, num_pred_tokens=args.num_pred_tokens, n_ctx=args.n_ctx)
+    llm = Llama(model_path=args.model, n_ctx=args.n_ctx, n_threads=args.threads, verbose=False,
+                **speculative_llama_kwargs(draft_model))
+    if draft_model is not None:
+        attach_references(draft_model, llm)
+    results = {}
+    for name, template in SCENARIO_TEMPLATES.items():
+        if draft_model is not None:
+            draft_model.reset_stats()
+        started = time.perf_counter()
+        output = llm(build_prompt(name, template), max_tokens=args.max_tokens, temperature=0.0)
+        elapsed = time.perf_counter() - started
+        tokens = output["usage"]["completion_tokens"]
+        results[name] = {
+            "seconds": elapsed,
+            "tokens": tokens,
+            "tokens_per_second": tokens / elapsed if elapsed > 0 else 0.0,
+            "drafts": draft_model.stats() if draft_model is not None else {},
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Speculative decoding benchmark')
+    parser.add_argument('--model', type=str, required=True, help='Path to GGUF model')
+    parser.add_argument('--draft-model', type=str, default=None, help='Draft GGUF model (same vocabulary)')
+    parser.add_argument('--max-tokens', type=int, default=512, help='Tokens per test')
+    parser.add_argument('--num-pred-tokens', type=int, default=10, help='Tokens per draft')
+    parser.add_argument('--n-ctx', type=int, default=4096, help='Context size')
+    parser.add_argument('--threads', type=int, default=None, help='CPU threads')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    print("🚀 Бенчмарк спекулятивного декодирования")
+    print("=" * 50)
+    modes = ["off", "lookup"] + (["draft"] if args.draft_model else [])
+    results = {mode: run_mode(args, mode) for mode in modes}
+
+    for name in SCENARIO_TEMPLATES:
+        baseline = results["off"][name]["seconds"]
+        print(f"\n📊 Шаблон {name}")
+        for mode in modes:
+            values = results[mode][name]
+            speedup = baseline / values["seconds"] if values["seconds"] > 0 else 0.0
+            print(
+                f"   {mode:<7} {values['tokens']:>5} tokens, {values['seconds']:6.2f} s, "
+                f"{values['tokens_per_second']:7.1f} tok/s, ускорение {speedup:.2f}x"
+            )
+            for source, drafts in values["drafts"].items():
+                print(
+                    f"           черновик {source}: принято {drafts['accepted']}/{drafts['proposed']} "
+                    f"({drafts['acceptance_rate']:.0%}), раундов {drafts['rounds']}"
+                )
+
+    print("\n" + "=" * 50)
+    for mode in modes[1:]:
+        total = sum(results[mode][name]["seconds"] for name in SCENARIO_TEMPLATES)
+        baseline = sum(results["off"][name]["seconds"] for name in SCENARIO_TEMPLATES)
+        print(f"📈 {mode}: суммарное ускорение {baseline / total:.2f}x" if total else f"📈 {mode}: н/д")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,287 @@
+"""
+Пул переиспользуемых WebDriver-сессий.
+
+Запуск headless Chrome занимает секунды, а агент раньше поднимал и закрывал
+браузер на каждый сценарий. Пул держит «тёплые» сессии: при возврате
+сессия очищается (cookies, localStorage/sessionStorage, лишние окна),
+при выдаче проверяется её работоспособность, а после N использований или
+превышения порога памяти браузер перезапускается.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+from selenium.webdriver.chrome.service import Service as ChromeService
+
+try:
+    import psutil  # Необязательно: нужен только для порога по памяти
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+def create_headless_chrome():
+    """
+    Создаёт headless Chrome с теми же опциями, что и setup_driver агента.
+    """
+    options = ChromeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    service = ChromeService()
+    driver = webdriver.Chrome(service=service, options=options)
+    driver.implicitly_wait(0)
+    return driver
+
+
+class PooledSession:
+    """
+    Сессия браузера в пуле и её счётчики.
+    """
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+
+
+class WebDriverPool:
+    """
+    Потокобезопасный пул WebDriver-сессий.
+    """
+    def __init__(self, driver_factory=None, max_size=2, max_uses=25, max_memory_mb=1500):
+        self.driver_factory = driver_factory or create_headless_chrome
+        self.max_size = max_size            # Максимум одновременно живых браузеров
+        self.max_uses = max_uses            # Перезапуск после N использований
+        self.max_memory_mb = max_memory_mb  # Перезапуск при превышении памяти (нужен psutil)
+        self._idle = []
+        self._busy = {}
+        self._lock = threading.Condition()
+        self.stats = {"created": 0, "reused": 0, "recycled": 0, "failed_health_checks": 0}
+
+    # ------------------------------------------------------------------
+    def acquire(self, timeout=None):
+        """
+        Выдаёт готовый к работе драйвер (из пула или новый).
+        Блокируется, если все max_size браузеров заняты.
+        """
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            with self._lock:
+                while not self._idle and len(self._busy) >= self.max_size:
+                    remaining = deadline - time.time() if deadline else None
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("No free browser session in pool")
+                    self._lock.wait(remaining)
+                session = self._idle.pop() if self._idle else None
+                # Резервируем место до проверки или создания браузера, чтобы не превысить max_size
+                placeholder = session.driver if session else object()
+                self._busy[id(placeholder)] = session
+            if session is None:
+                break
+            # Проверка идёт без блокировки: зависший браузер не задерживает другие воркеры
+            if self._is_healthy(session):
+                with self._lock:
+                    session.uses += 1
+                    self.stats["reused"] += 1
+                return session.driver
+            self._quit(session)
+            with self._lock:
+                self._busy.pop(id(placeholder), None)
+                self.stats["failed_health_checks"] += 1
+                self._lock.notify()
+
+        try:
+            driver = self.driver_factory()
+        except Exception:
+            with self._lock:
+                self._busy.pop(id(placeholder), None)
+                self._lock.notify()
+            raise
+
+        session = PooledSession(driver)
+        session.uses = 1
+        with self._lock:
+            self._busy.pop(id(placeholder), None)
+            self._busy[id(driver)] = session
+            self.stats["created"] += 1
+        logger.info(f"🌐 Started new browser session (pool size {len(self._busy) + len(self._idle)})")
+        return driver
+
+    def release(self, driver, broken=False):
+        """
+        Возвращает драйвер в пул. Сломанные и «уставшие» сессии закрываются.
+        """
+        if driver is None:
+            return
+        with self._lock:
+            session = self._busy.get(id(driver))
+        if session is None:
+            # Драйвер создан не пулом — просто закрываем
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            return
+
+        # Сессия остаётся занятой, пока её очищают, чтобы не превысить max_size
+        keep = not broken and self._reset(session) and not self._should_recycle(session)
+        if not keep:
+            self._quit(session)
+        with self._lock:
+            if not keep:
+                self.stats["recycled"] += 1
+            self._busy.pop(id(driver), None)
+            if keep:
+                self._idle.append(session)
+            self._lock.notify()
+
+    @contextmanager
+    def session(self, timeout=None):
+        """
+        Контекстный менеджер: with pool.session() as driver: ...
+        """
+        driver = self.acquire(timeout)
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = not self._is_alive(driver)
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def close_all(self):
+        """
+        Закрывает все браузеры пула.
+        """
+        with self._lock:
+            sessions = self._idle + [s for s in self._busy.values() if s is not None]
+            self._idle = []
+            self._busy = {}
+        for session in sessions:
+            self._quit(session)
+
+    # ------------------------------------------------------------------
+    def _is_alive(self, driver):
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _is_healthy(self, session):
+        """
+        Проверка сессии перед выдачей: браузер отвечает и есть открытое окно.
+        """
+        try:
+            return bool(session.driver.window_handles) and self._is_alive(session.driver)
+        except Exception:
+            return False
+
+    def _reset(self, session):
+        """
+        Очищает состояние сессии между сценариями. Возвращает False, если сессия сломана.
+        """
+        driver = session.driver
+        try:
+            # Закрываем лишние вкладки, оставляем первую
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+
+            origin = driver.execute_script("return window.location.origin")
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except Exception:
+                pass
+            if isinstance(origin, str) and origin.startswith("http"):
+                try:
+                    driver.execute_cdp_cmd("Storage.clearDataForOrigin", {
+                        "origin": origin,
+                        "storageTypes": "local_storage,session_storage,indexeddb,cache_storage,service_workers"
+                    })
+                except Exception:
+                    pass
+            driver.delete_all_cookies()
+            try:
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            except Exception:
+                pass
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to reset browser session: {e}")
+            return False
+
+    def _memory_mb(self, session):
+        """
+        Суммарная память процесса chromedriver и его дочерних процессов (Chrome).
+        """
+        if psutil is None:
+            return None
+        try:
+            process = psutil.Process(session.driver.service.process.pid)
+            total = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    continue
+            return total / (1024 * 1024)
+        except Exception:
+            return None
+
+    def _should_recycle(self, session):
+        if self.max_uses and session.uses >= self.max_uses:
+            logger.info(f"♻️ Recycling browser session after {session.uses} uses")
+            return True
+        memory_mb = self._memory_mb(session)
+        if memory_mb is not None and self.max_memory_mb and memory_mb > self.max_memory_mb:
+            logger.info(f"♻️ Recycling browser session: {memory_mb:.0f} MB > {self.max_memory_mb} MB")
+            return True
+        return False
+
+    def _quit(self, session):
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
+
+
+_shared_pools = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_pool(key="default", **kwargs):
+    """
+    Возвращает общий для процесса пул. Параметры учитываются только при первом вызове.
+    """
+    with _shared_lock:
+        pool = _shared_pools.get(key)
+        if pool is None:
+            pool = WebDriverPool(**kwargs)
+            _shared_pools[key] = pool
+        return pool
+
+
+def close_shared_pools():
+    """
+    Закрывает все общие пулы (вызывается при завершении процесса).
+    """
+    with _shared_lock:
+        pools = list(_shared_pools.values())
+        _shared_pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+
+atexit.register(close_shared_pools)
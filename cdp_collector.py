@@ -0,0 +1,201 @@
+"""
+Снимок интерактивных элементов страницы через Chrome DevTools Protocol.
+
+Скрипт снимка (page_snapshot) обходит страницу по тегам и отдаёт для
+промпта id, name и текст элемента. Здесь вместо этого выполняются две
+команды CDP через driver.execute_cdp_cmd:
+
+- Accessibility.getFullAXTree — роль и доступное имя каждого узла
+  (имя уже учитывает <label for>, aria-label, aria-labelledby, placeholder);
+- DOMSnapshot.captureSnapshot — дерево DOM с атрибутами и раскладкой
+  (координаты, признак кликабельности).
+
+Узлы объединяются по backendNodeId. В результат попадают видимые узлы с
+интерактивной ролью или кликабельные, а также заголовки, сообщения и
+элементы с id/data-test и текстом — в формате take_page_snapshot
+(tag, text, visible, attributes, rect, css, xpath) с дополнительными
+полями ax_role и accessible_name. CSS и XPath строятся по дереву
+DOMSnapshot теми же правилами, что и в скрипте снимка
+(static_collector.UniqueLocators).
+
+Работает в Chrome/Chromium, в том числе в headless-сессиях пула
+браузеров. Элементы внутри shadow DOM и фреймов не собираются.
+"""
+
+import logging
+import time
+from urllib.parse import urljoin
+
+from page_snapshot import SNAPSHOT_ATTRIBUTES
+from static_collector import DomNode, UniqueLocators, inner_text
+
+logger = logging.getLogger(__name__)
+
+# Сборщики элементов страницы для агента: cdp (с откатом на скрипт) или только скрипт снимка
+PAGE_COLLECTORS = ("cdp", "script")
+
+# Роли дерева доступности, элементы с которыми попадают в снимок всегда
+INTERACTIVE_ROLES = {
+    "button", "link", "textbox", "searchbox", "checkbox", "radio", "combobox", "listbox", "option",
+    "menuitem", "menuitemcheckbox", "menuitemradio", "tab", "switch", "slider", "spinbutton"
+}
+# Роли с текстом, который проверяют сценарии ("сообщение об ошибке", "заголовок страницы")
+TEXT_ROLES = {"heading", "alert", "status", "dialog", "img"}
+# Атрибуты, по которым на элемент с текстом можно сослаться из теста
+TEXT_ANCHOR_ATTRIBUTES = ("id", "data-test", "data-testid")
+
+ELEMENT_NODE = 1
+TEXT_NODE = 3
+DOCUMENT_NODE = 9
+
+
+def capture_accessibility_snapshot(driver):
+    """
+    Снимок страницы двумя командами CDP.
+    Возвращает список записей формата take_page_snapshot с полями ax_role и accessible_name.
+    """
+    started = time.perf_counter()
+    ax_tree = driver.execute_cdp_cmd("Accessibility.getFullAXTree", {})
+    dom_snapshot = driver.execute_cdp_cmd("DOMSnapshot.captureSnapshot", {"computedStyles": []})
+    records = build_accessibility_records(ax_tree.get("nodes", []), dom_snapshot)
+    logger.info(
+        f"♿ CDP snapshot: {len(records)} elements in {(time.perf_counter() - started) * 1000:.0f} ms (2 calls)"
+    )
+    return records
+
+
+def build_accessibility_records(ax_nodes, dom_snapshot):
+    """
+    Объединяет узлы дерева доступности и DOMSnapshot основного документа в записи снимка (порядок документа).
+    """
+    documents = dom_snapshot.get("documents") or []
+    if not documents:
+        return []
+    strings = dom_snapshot.get("strings", [])
+    document = documents[0]
+    tree = _DomTree(document, strings)
+    base_url = _string(strings, document.get("baseURL", -1)) or _string(strings, document.get("documentURL", -1))
+
+    ax_by_backend_id = {}
+    for ax_node in ax_nodes:
+        backend_id = ax_node.get("backendDOMNodeId")
+        if backend_id is not None and not ax_node.get("ignored"):
+            ax_by_backend_id[backend_id] = ax_node
+
+    locators = UniqueLocators(tree.elements)
+    texts = {}
+    records = []
+    for node in tree.elements:
+        index = tree.index_of[id(node)]
+        ax_node = ax_by_backend_id.get(tree.backend_ids[index])
+        bounds = tree.bounds.get(index)
+        if ax_node is None or not bounds or (bounds[2] <= 0 and bounds[3] <= 0):
+            continue
+        role = _ax_value(ax_node.get("role"))
+        name = " ".join(_ax_value(ax_node.get("name")).split())
+        text = inner_text(node, texts)
+        if not _collected(node, role, name or text, index in tree.clickable):
+            continue
+        attributes = {}
+        for attribute in SNAPSHOT_ATTRIBUTES:
+            if attribute in node.attrs:
+                value = node.attrs[attribute]
+                # Как Selenium get_attribute: href и src — абсолютные URL
+                attributes[attribute] = urljoin(base_url, value) if attribute in ("href", "src") else value
+        if index in tree.input_values:
+            # Текущее значение поля, а не исходный атрибут value
+            attributes["value"] = tree.input_values[index]
+        x, y, width, height = bounds
+        records.append({
+            "selector": role,
+            "tag": node.tag,
+            "text": text,
+            "visible": True,
+            "attributes": attributes,
+            "rect": {"x": round(x), "y": round(y), "width": round(width), "height": round(height)},
+            "css": locators.css(node),
+            "xpath": locators.xpath(node),
+            "ax_role": role,
+            "accessible_name": name,
+        })
+    return records
+
+
+def _collected(node, role, label, clickable):
+    if role in INTERACTIVE_ROLES or clickable:
+        return True
+    if not label:
+        return False
+    return role in TEXT_ROLES or any(node.attrs.get(name) for name in TEXT_ANCHOR_ATTRIBUTES)
+
+
+def _ax_value(value):
+    if isinstance(value, dict):
+        value = value.get("value")
+    return value if isinstance(value, str) else ""
+
+
+def _string(strings, index):
+    return strings[index] if isinstance(index, int) and 0 <= index < len(strings) else ""
+
+
+def _rare(data):
+    """
+    RareStringData / RareBooleanData DOMSnapshot: индексы узлов (и значения).
+    """
+    data = data or {}
+    return data.get("index", []), data.get("value")
+
+
+class _DomTree:
+    """
+    Дерево элементов основного документа из NodeTreeSnapshot: DomNode в порядке документа,
+    backendNodeId, координаты раскладки, кликабельность и текущие значения полей.
+    """
+    def __init__(self, document, strings):
+        nodes = document.get("nodes", {})
+        parents = nodes.get("parentIndex", [])
+        node_types = nodes.get("nodeType", [])
+        node_names = nodes.get("nodeName", [])
+        node_values = nodes.get("nodeValue", [])
+        attributes = nodes.get("attributes", [])
+        self.backend_ids = nodes.get("backendNodeId", [])
+        pseudo = set(_rare(nodes.get("pseudoType"))[0])
+
+        self.elements = []
+        self.index_of = {}
+        built = {}
+        for index, parent in enumerate(parents):
+            node_type = node_types[index] if index < len(node_types) else 0
+            if node_type == DOCUMENT_NODE and parent == -1:
+                built[index] = DomNode("#document", {}, None)
+                continue
+            owner = built.get(parent)
+            if owner is None:
+                # Shadow root, фрейм или узел внутри них — CSS/XPath документа до них не дотягиваются
+                continue
+            if node_type == TEXT_NODE:
+                owner.texts.append(_string(strings, node_values[index] if index < len(node_values) else -1))
+                continue
+            name = _string(strings, node_names[index] if index < len(node_names) else -1)
+            if node_type != ELEMENT_NODE or index in pseudo or name.startswith("::"):
+                continue
+            pairs = attributes[index] if index < len(attributes) else []
+            attrs = {
+                _string(strings, pairs[position]): _string(strings, pairs[position + 1])
+                for position in range(0, len(pairs) - 1, 2)
+            }
+            node = DomNode(name.lower(), attrs, owner)
+            owner.children.append(node)
+            owner.texts.append(node)
+            built[index] = node
+            self.index_of[id(node)] = index
+            self.elements.append(node)
+
+        layout = document.get("layout", {})
+        self.bounds = dict(zip(layout.get("nodeIndex", []), layout.get("bounds", [])))
+        self.clickable = set(_rare(nodes.get("isClickable"))[0])
+        input_indexes, input_values = _rare(nodes.get("inputValue"))
+        self.input_values = {
+            index: _string(strings, value) for index, value in zip(input_indexes, input_values or [])
+        }
@@ -0,0 +1,99 @@
+"""
+Отбор элементов страницы для промпта генерации локаторов.
+
+Раньше в промпт шли первые элементы страницы в порядке DOM
+(page_elements[:20] в агенте, all_elements_flat[:100] в loc_define2):
+нужное поле часто отрезалось, а пустые div/span оставались. Здесь каждый
+элемент оценивается LocatorRanker для каждого требуемого элемента
+(сходство текста и атрибутов с названием и описанием, совместимость роли,
+уникальность атрибутов), и в промпт попадает объединение лучших top_k
+кандидатов каждого требуемого элемента — в исходном порядке страницы.
+
+Пустые поля удаляются, длинный текст обрезается, пустые и повторяющиеся
+элементы пропускаются, JSON сериализуется без пробелов.
+"""
+
+import json
+import logging
+
+from locator_ranker import LocatorRanker
+
+logger = logging.getLogger(__name__)
+
+# Кандидатов на каждый требуемый элемент
+DEFAULT_TOP_K = 5
+# Длина текста элемента в промпте
+TEXT_LIMIT = 80
+# Поля элемента, которые берутся из записи снимка, а не из атрибутов (см. to_element_info)
+RECORD_FIELDS = ("tag", "text", "css", "xpath", "visible", "rect", "ax_role", "accessible_name")
+
+
+def compact_element(element, exclude=(), text_limit=TEXT_LIMIT):
+    """
+    Элемент без пустых полей и полей из exclude, текст обрезан до text_limit символов.
+    """
+    compact = {}
+    for field, value in element.items():
+        if field in exclude or value is None or value == "" or value == [] or value == {}:
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.split())
+            if text_limit and len(value) > text_limit:
+                value = value[:text_limit - 1] + "…"
+        compact[field] = value
+    return compact
+
+
+def select_relevant_elements(required_elements, elements, top_k=DEFAULT_TOP_K, ranker=None, exclude=()):
+    """
+    Элементы страницы (плоские словари to_element_info), относящиеся к требуемым элементам:
+    объединение top_k лучших по оценке LocatorRanker для каждого, в порядке страницы.
+    Если ни один элемент не получил оценки, возвращаются первые непустые элементы.
+    """
+    ranker = ranker or LocatorRanker()
+    candidates = []
+    seen = set()
+    for element in elements:
+        compact = compact_element(element, exclude)
+        if not any(field != "tag" for field in compact):
+            continue
+        key = json.dumps(compact, ensure_ascii=False, sort_keys=True)
+        if key in seen:
+            continue
+        seen.add(key)
+        candidates.append((compact, _as_record(element)))
+
+    records = [record for _, record in candidates]
+    selected = set()
+    for required in required_elements:
+        for _, record in ranker.rank(required, records, limit=top_k):
+            selected.add(id(record))
+    if selected:
+        result = [compact for compact, record in candidates if id(record) in selected]
+    else:
+        result = [compact for compact, _ in candidates[:top_k * max(1, len(required_elements))]]
+    logger.info(
+        f"🧹 Element pre-filter: {len(result)}/{len(elements)} page elements kept "
+        f"for {len(required_elements)} required elements"
+    )
+    return result
+
+
+def elements_json(elements):
+    """
+    Компактный JSON элементов для промпта.
+    """
+    return json.dumps(elements, ensure_ascii=False, separators=(",", ":"))
+
+
+def _as_record(element):
+    """
+    Плоский элемент в формате записи снимка для LocatorRanker (aria_label -> attributes["aria-label"]).
+    """
+    record = {"attributes": {}}
+    for field, value in element.items():
+        if field in RECORD_FIELDS:
+            record[field] = value
+        elif value is not None:
+            record["attributes"][field.replace("_", "-")] = value
+    return record
@@ -0,0 +1,163 @@
+"""
+Поиск элементов без неявного ожидания.
+
+При implicitly_wait(10) каждый find_elements для отсутствующего на странице
+тега или неподходящей XPath-стратегии блокируется на все 10 секунд.
+ElementProbe выполняет поиск с нулевым неявным ожиданием, а ждёт только
+явно (WebDriverWait с условием) там, где действию действительно нужен элемент.
+Всё время, проведённое в поиске и ожиданиях, накапливается в счётчиках,
+которые сбрасываются на каждый сценарий.
+"""
+
+import time
+import logging
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+import page_transition
+
+logger = logging.getLogger(__name__)
+
+
+class ElementProbe:
+    """
+    Обёртка над WebDriver для быстрого поиска элементов и учёта времени ожиданий.
+    """
+    def __init__(self, driver, action_timeout=10):
+        self.driver = driver
+        self.action_timeout = action_timeout  # Таймаут явных ожиданий по умолчанию
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Сбрасывает счётчики времени (вызывается в начале каждого сценария).
+        """
+        self.wait_seconds = {}
+        self.wait_counts = {}
+        self.timeouts = 0
+
+    def _record(self, label, started):
+        elapsed = time.perf_counter() - started
+        self.wait_seconds[label] = self.wait_seconds.get(label, 0.0) + elapsed
+        self.wait_counts[label] = self.wait_counts.get(label, 0) + 1
+        return elapsed
+
+    @contextmanager
+    def no_implicit_wait(self):
+        """
+        Временно отключает неявное ожидание и восстанавливает прежнее значение.
+        """
+        try:
+            previous = self.driver.timeouts.implicit_wait
+        except Exception:
+            previous = 0
+        if previous:
+            self.driver.implicitly_wait(0)
+        try:
+            yield
+        finally:
+            if previous:
+                self.driver.implicitly_wait(previous)
+
+    def find_all(self, by, value):
+        """
+        Возвращает все найденные элементы без ожидания (пустой список, если их нет).
+        """
+        started = time.perf_counter()
+        try:
+            with self.no_implicit_wait():
+                return self.driver.find_elements(by, value)
+        except Exception:
+            return []
+        finally:
+            self._record("probe", started)
+
+    def find_visible(self, by, value):
+        """
+        Возвращает видимые элементы без ожидания.
+        """
+        visible = []
+        for element in self.find_all(by, value):
+            try:
+                if element.is_displayed():
+                    visible.append(element)
+            except Exception:
+                continue
+        return visible
+
+    def wait_until(self, condition, timeout=None, label="wait"):
+        """
+        Явное ожидание условия. Возвращает результат условия или None по таймауту.
+        """
+        started = time.perf_counter()
+        try:
+            with self.no_implicit_wait():
+                return WebDriverWait(self.driver, timeout or self.action_timeout).until(condition)
+        except TimeoutException:
+            self.timeouts += 1
+            return None
+        finally:
+            self._record(label, started)
+
+    def wait_for_ready_state(self, timeout=None):
+        """
+        Ожидает document.readyState == 'complete'.
+        """
+        return self.wait_until(
+            lambda driver: driver.execute_script("return document.readyState") == "complete",
+            timeout=timeout,
+            label="page_load"
+        )
+
+    def mark_page(self):
+        """
+        Отмечает страницу перед действием, которое может её сменить (см. page_transition).
+        Возвращает текущий URL для wait_for_stable_page.
+        """
+        return page_transition.mark_page(self.driver)
+
+    def wait_for_stable_page(self, timeout=None, start_url=None):
+        """
+        Ожидает стабильную страницу: загрузка завершена, нет запросов в полёте,
+        DOM не меняется. Заменяет фиксированные паузы после загрузки и переходов.
+        """
+        started = time.perf_counter()
+        try:
+            result = page_transition.wait_for_stable_page(
+                self.driver, timeout=timeout or self.action_timeout, start_url=start_url
+            )
+        finally:
+            self._record("page_stable", started)
+        if not result["stable"]:
+            self.timeouts += 1
+        return result
+
+    def total_wait(self):
+        """
+        Суммарное время (в секундах), проведённое в поиске и ожиданиях.
+        """
+        return sum(self.wait_seconds.values())
+
+    def stats(self):
+        """
+        Словарь со статистикой для логов и отчётов.
+        """
+        return {
+            "total_seconds": round(self.total_wait(), 3),
+            "by_label": {label: round(seconds, 3) for label, seconds in self.wait_seconds.items()},
+            "calls": dict(self.wait_counts),
+            "timeouts": self.timeouts,
+        }
+
+    def log_stats(self, scenario_name=""):
+        """
+        Пишет статистику ожиданий в лог.
+        """
+        stats = self.stats()
+        logger.info(
+            f"⏱️ Wait time{' for ' + scenario_name if scenario_name else ''}: "
+            f"{stats['total_seconds']} s {stats['by_label']} (timeouts: {stats['timeouts']})"
+        )
+        return stats
@@ -0,0 +1,168 @@
+"""
+Кэш результатов генерации, адресуемый содержимым сценария.
+
+Если файл сценария «тронут», но по сути не изменился (пробелы,
+переформатирование, revert), или два сценария совпадают, полный прогон
+LLM + Selenium не нужен. Ключ кэша — хэш нормализованного текста
+сценария, требований из pom.xml, идентичности файла модели и версии
+шаблонов промптов. В записи хранятся анализ сценария (JSON), локаторы
+и итоговый Java-код.
+
+Каждая запись — отдельный JSON-файл; время последнего обращения
+хранится в mtime файла, по нему вытесняются самые старые записи при
+превышении лимита по количеству или суммарному размеру.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "generation_cache"
+
+
+def normalize_scenario(text):
+    """
+    Нормализует текст сценария: переводы строк, пробелы по краям и внутри строк, пустые строки.
+    """
+    lines = []
+    for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        line = re.sub(r"\s+", " ", line).strip()
+        if line:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def model_identity(model_path):
+    """
+    Идентичность файла модели без чтения гигабайтов: имя, размер и время изменения.
+    """
+    try:
+        stat = os.stat(model_path)
+        return f"{os.path.basename(model_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+    except OSError:
+        return f"{os.path.basename(model_path or '')}:missing"
+
+
+class GenerationCache:
+    """
+    Дисковый LRU-кэш результатов генерации с ограничением по числу записей и размеру.
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=500, max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(scenario_text, pom_requirements, model_id, template_version):
+        """
+        Ключ записи: sha256 от всех входов, влияющих на результат генерации.
+        """
+        payload = json.dumps({
+            "scenario": normalize_scenario(scenario_text),
+            "pom": list(pom_requirements or []),
+            "model": model_id,
+            "template": template_version,
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """
+        Возвращает запись или None. Обращение обновляет позицию записи в LRU.
+        """
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                os.utime(path, None)
+                self.hits += 1
+                return entry
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            except Exception as e:
+                logger.warning(f"⚠️ Broken generation cache entry {key[:12]}: {e}")
+                self.misses += 1
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                return None
+
+    def put(self, key, entry):
+        """
+        Сохраняет запись (analysis, locators, java_code, ...) и вытесняет старые при переполнении.
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with self._lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to write generation cache entry: {e}")
+                return
+            self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (
+            (self.max_entries and len(entries) > self.max_entries)
+            or (self.max_bytes and total_bytes > self.max_bytes)
+        ):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+                total_bytes -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        """
+        Статистика кэша: попадания, промахи, число записей и размер на диске.
+        """
+        with self._lock:
+            entries = self._entries()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+            }
+
+    def log_stats(self):
+        stats = self.stats()
+        logger.info(
+            f"🗃️ Generation cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"(hit rate {stats['hit_rate']:.0%}), {stats['entries']} entries, {stats['bytes'] / 1024:.0f} KB"
+        )
+        return stats
@@ -0,0 +1,55 @@
+"""
+Шаблоны Java-тестов.
+
+FALLBACK_TEST_TEMPLATE — резервный тест агента (если модель недоступна или
+сгенерировала невалидный код). Тот же текст служит справочным корпусом для
+черновиков спекулятивного декодирования (speculative_decoding): импорты,
+@BeforeEach и настройка WebDriverWait в ответах модели почти дословно
+совпадают с шаблоном.
+"""
+
+FALLBACK_TEST_TEMPLATE = """package tests;
+
+import org.openqa.selenium.WebDriver;
+import org.openqa.selenium.chrome.ChromeDriver;
+import org.openqa.selenium.support.ui.WebDriverWait;
+import org.junit.jupiter.api.AfterEach;
+import org.junit.jupiter.api.BeforeEach;
+import org.junit.jupiter.api.Test;
+import java.time.Duration;
+
+public class {test_name}Test {{
+    private WebDriver driver;
+    private WebDriverWait wait;
+
+    @BeforeEach
+    public void setUp() {{
+        System.setProperty("webdriver.chrome.driver", "/path/to/chromedriver");
+        driver = new ChromeDriver();
+        wait = new WebDriverWait(driver, Duration.ofSeconds(10));
+        driver.manage().window().maximize();
+    }}
+
+    @Test
+    public void test{test_name}() {{
+        // Автоматически сгенерированный тест
+        // Сценарий: {scenario_content}
+
+        // TODO: Реализовать шаги сценария
+    }}
+
+    @AfterEach
+    public void tearDown() {{
+        if (driver != null) {{
+            driver.quit();
+        }}
+    }}
+}}
+"""
+
+
+def render_fallback_test(test_name, scenario_content):
+    """
+    Резервный тест для класса {test_name}Test.
+    """
+    return FALLBACK_TEST_TEMPLATE.format(test_name=test_name, scenario_content=scenario_content)
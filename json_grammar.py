@@ -0,0 +1,85 @@
+"""
+Генерация JSON с ограничением по грамматике (llama.cpp GBNF).
+
+Раньше структурированные ответы модели (анализ сценария, локаторы)
+генерировались свободным текстом, из которого регуляркой вырезался
+{...}; при битом JSON сценарий падал с ValueError, а лишние токены
+тратили секунды. С грамматикой, построенной из JSON-схемы, модель
+может выдать только валидный по схеме JSON, и генерация заканчивается
+сразу после закрывающей скобки.
+
+Используется агентом (agent_v023 / agent_v024_interface),
+GenTest/loc_define2.LocalAILocatorFinder и GenTest/local_ai.LocalAIClient.
+"""
+
+import json
+import logging
+import re
+import threading
+
+try:
+    from llama_cpp import LlamaGrammar
+except ImportError:  # Старая сборка llama_cpp без грамматик — остаётся свободный текст
+    LlamaGrammar = None
+
+logger = logging.getLogger(__name__)
+
+# Любой JSON-объект — для вызовов без собственной схемы
+ANY_JSON_OBJECT_SCHEMA = {"type": "object"}
+
+_grammars = {}
+_grammars_lock = threading.Lock()
+
+
+def json_grammar(schema):
+    """
+    Возвращает (кэшированную) грамматику для JSON-схемы или None, если грамматики недоступны.
+    """
+    if LlamaGrammar is None or schema is None:
+        return None
+    key = json.dumps(schema, sort_keys=True, ensure_ascii=False)
+    with _grammars_lock:
+        if key not in _grammars:
+            try:
+                _grammars[key] = LlamaGrammar.from_json_schema(key, verbose=False)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to build JSON grammar, falling back to free text: {e}")
+                _grammars[key] = None
+        return _grammars[key]
+
+
+def json_completion_kwargs(schema, stop=None, llm=None):
+    """
+    Параметры вызова llm(...) для JSON-ответа: grammar, а без неё — прежние стоп-последовательности.
+    С грамматикой stop не передаётся: генерацию завершает сама грамматика.
+    Для модели на сервере (model_server.RemoteLlama) передаётся сама схема —
+    грамматику строит сервер, а stop он отбрасывает, если грамматика построена.
+    """
+    if getattr(llm, "is_remote", False):
+        kwargs = {"json_schema": schema} if schema is not None else {}
+        if stop:
+            kwargs["stop"] = stop
+        return kwargs
+    grammar = json_grammar(schema)
+    if grammar is not None:
+        return {"grammar": grammar}
+    return {"stop": stop} if stop else {}
+
+
+def parse_json_output(text):
+    """
+    Разбирает ответ модели. При генерации с грамматикой это уже чистый JSON;
+    для свободного текста остаётся прежний поиск первого {...} / [...].
+    """
+    text = (text or "").strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    match = re.search(r'(\{.*\}|\[.*\])', text, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except ValueError:
+            pass
+    raise ValueError("Не удалось получить корректный JSON из ответа Llama")
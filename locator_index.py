@@ -0,0 +1,214 @@
+"""
+Постоянный индекс проверенных локаторов (SQLite).
+
+Раньше найденный локатор использовался один раз — в промпте генерации
+Java — и терялся. Здесь каждый локатор, прошедший проверку на странице
+(locator_verifier), сохраняется по URL страницы и смысловому ключу
+требуемого элемента ("Поле ввода логина" и "поле логина" дают один ключ),
+вместе с отпечатком DOM, временем последней встречи и счётчиками
+успешных и неудачных проверок.
+
+Агент обращается к индексу сразу после анализа сценария: если для всех
+требуемых элементов страницы есть надёжные записи, браузер и LLM для
+поиска локаторов не нужны. Записи периодически перепроверяются пачкой:
+одна загрузка страницы и один скрипт проверки на все её локаторы.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from locator_ranker import tokenize
+from page_cache import normalize_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = "locator_index.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS locators (
+    url TEXT NOT NULL,
+    element_key TEXT NOT NULL,
+    element_name TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    locator_type TEXT NOT NULL,
+    locator_value TEXT NOT NULL,
+    fingerprint TEXT,
+    successes INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    last_ok INTEGER NOT NULL DEFAULT 1,
+    last_seen REAL NOT NULL,
+    last_verified REAL NOT NULL,
+    PRIMARY KEY (url, element_key)
+)
+"""
+
+
+def element_key(required_element):
+    """
+    Смысловой ключ требуемого элемента: основы слов названия без служебных слов, по алфавиту.
+    """
+    name = required_element.get("name", "") if isinstance(required_element, dict) else str(required_element)
+    return " ".join(sorted(set(tokenize(name))))
+
+
+class LocatorIndex:
+    """
+    Индекс локаторов по (URL, смысловой ключ элемента) с долей успешных проверок.
+    """
+    def __init__(self, path=DEFAULT_INDEX_PATH, min_success_rate=0.8, max_age_seconds=7 * 24 * 3600):
+        self.path = path
+        self.min_success_rate = min_success_rate
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(SCHEMA)
+
+    def lookup(self, url, required_elements):
+        """
+        Локаторы всех требуемых элементов страницы в формате LOCATORS_SCHEMA или None,
+        если хотя бы для одного нет надёжной записи (последняя проверка успешна,
+        доля успешных не ниже порога, запись не старше max_age_seconds).
+        """
+        if not required_elements:
+            return None
+        url = normalize_url(url)
+        now = time.time()
+        result = []
+        with self._lock:
+            for required in required_elements:
+                key = element_key(required)
+                row = self._conn.execute(
+                    "SELECT * FROM locators WHERE url = ? AND element_key = ?", (url, key)
+                ).fetchone() if key else None
+                if row is None or not self._reliable(row, now):
+                    self.misses += 1
+                    return None
+                result.append(self._as_locator(required, row))
+            self.hits += 1
+        logger.info(f"📇 Locator index hit for {url}: {len(result)} elements, browser and LLM skipped")
+        return result
+
+    def record(self, url, locators, fingerprint=None):
+        """
+        Сохраняет результаты проверки локаторов страницы (поле verification, см. locator_verifier).
+        Новый локатор для элемента заменяет старый и начинает счётчики заново.
+        """
+        if not isinstance(locators, list):
+            return 0
+        url = normalize_url(url)
+        now = time.time()
+        recorded = 0
+        with self._lock, self._conn:
+            for entry in locators:
+                if not isinstance(entry, dict) or not isinstance(entry.get("verification"), dict):
+                    continue
+                if entry["verification"].get("source"):
+                    # Не проверено в браузере: взято из индекса или из статического HTML
+                    continue
+                required = entry.get("required_element") or {}
+                key = element_key(required)
+                locator = entry.get("locator") or {}
+                if not key or not locator.get("type") or not locator.get("value"):
+                    continue
+                ok = bool(entry["verification"].get("ok"))
+                row = self._conn.execute(
+                    "SELECT locator_type, locator_value FROM locators WHERE url = ? AND element_key = ?", (url, key)
+                ).fetchone()
+                if row is not None and (row["locator_type"], row["locator_value"]) == (locator["type"], locator["value"]):
+                    self._conn.execute(
+                        "UPDATE locators SET successes = successes + ?, failures = failures + ?, last_ok = ?, "
+                        "fingerprint = COALESCE(?, fingerprint), last_seen = ?, last_verified = ? "
+                        "WHERE url = ? AND element_key = ?",
+                        (int(ok), int(not ok), int(ok), fingerprint, now, now, url, key)
+                    )
+                elif ok:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO locators (url, element_key, element_name, description, locator_type, "
+                        "locator_value, fingerprint, successes, failures, last_ok, last_seen, last_verified) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, 1, 0, 1, ?, ?)",
+                        (url, key, required.get("name", ""), required.get("description", ""),
+                         locator["type"], locator["value"], fingerprint, now, now)
+                    )
+                else:
+                    continue
+                recorded += 1
+        return recorded
+
+    def due_for_verification(self, interval_seconds):
+        """
+        Записи, не проверявшиеся дольше interval_seconds, сгруппированные по URL.
+        """
+        threshold = time.time() - interval_seconds
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM locators WHERE last_verified < ? ORDER BY url", (threshold,)
+            ).fetchall()
+        due = {}
+        for row in rows:
+            due.setdefault(row["url"], []).append(dict(row))
+        return due
+
+    def update_verification(self, url, entries, results, fingerprint=None):
+        """
+        Итог пакетной перепроверки записей страницы (результаты verify_locators в том же порядке).
+        """
+        url = normalize_url(url)
+        now = time.time()
+        with self._lock, self._conn:
+            for entry, result in zip(entries, results):
+                ok = bool(result["unique"] and result["visible"])
+                self._conn.execute(
+                    "UPDATE locators SET successes = successes + ?, failures = failures + ?, last_ok = ?, "
+                    "fingerprint = COALESCE(?, fingerprint), last_seen = MAX(last_seen, ?), last_verified = ? "
+                    "WHERE url = ? AND element_key = ?",
+                    (int(ok), int(not ok), int(ok), fingerprint, now if ok else 0, now, url, entry["element_key"])
+                )
+
+    def stats(self):
+        with self._lock:
+            total, reliable = self._conn.execute(
+                "SELECT COUNT(*), SUM(last_ok) FROM locators"
+            ).fetchone()
+            return {"hits": self.hits, "misses": self.misses, "entries": total, "working": reliable or 0}
+
+    def log_stats(self):
+        stats = self.stats()
+        logger.info(
+            f"📇 Locator index: {stats['hits']} page hits, {stats['misses']} misses, "
+            f"{stats['working']}/{stats['entries']} working locators"
+        )
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _reliable(self, row, now):
+        checks = row["successes"] + row["failures"]
+        rate = row["successes"] / checks if checks else 0.0
+        return bool(row["last_ok"]) and rate >= self.min_success_rate and now - row["last_seen"] <= self.max_age_seconds
+
+    @staticmethod
+    def _as_locator(required, row):
+        checks = row["successes"] + row["failures"]
+        return {
+            "required_element": {
+                "name": required.get("name", row["element_name"]) if isinstance(required, dict) else row["element_name"],
+                "description": required.get("description", row["description"]) if isinstance(required, dict) else row["description"],
+            },
+            "locator": {
+                "type": row["locator_type"],
+                "value": row["locator_value"],
+                "reasoning": f"locator index: {row['successes']}/{checks} successful checks",
+            },
+            "verification": {"ok": True, "source": "index"},
+        }
@@ -0,0 +1,416 @@
+"""
+Детерминированный выбор локаторов без LLM.
+
+Для каждого требуемого элемента сценария (name, description) ранжирует
+элементы снимка страницы (page_snapshot.take_page_snapshot):
+
+- сходство текста, подписи (label), placeholder, id, name, aria-label,
+  title и т.д. с названием элемента — на русском и английском (словарь
+  понятий: "логин" ~ login/username, "войти" ~ signin/submit, ...);
+- совместимость тега/роли ("кнопка" — button, "поле" — input/textarea, ...);
+- уникальность атрибута для локатора на странице.
+
+Лучший кандидат возвращается в формате ответа LLM (LOCATORS_SCHEMA агента)
+с оценкой уверенности confidence от 0 до 1. Если уверенность ниже порога,
+элемент отдаётся LLM.
+"""
+
+import difflib
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Ниже этой уверенности локатор выбирает LLM
+DEFAULT_CONFIDENCE_THRESHOLD = 0.6
+
+# Понятия и их написания (основы русских слов и английские слова)
+CONCEPTS = {
+    "login": ["логин", "login", "username", "user", "usernam", "пользовател", "учетн", "учётн", "account"],
+    "password": ["парол", "password", "pass", "pwd", "passwd"],
+    "signin": ["войт", "вход", "signin", "sign", "login", "submit", "enter", "авторизац", "auth"],
+    "logout": ["выйт", "выход", "logout", "signout", "exit"],
+    "register": ["регистрац", "зарегистрир", "register", "signup", "registration", "join"],
+    "search": ["поиск", "найт", "искат", "search", "find", "query", "q"],
+    "email": ["email", "mail", "почт", "e-mail", "емейл", "имейл"],
+    "phone": ["телефон", "phone", "tel", "mobile", "номер"],
+    "name": ["имя", "name", "first", "firstname"],
+    "surname": ["фамил", "surname", "last", "lastname"],
+    "cart": ["корзин", "cart", "basket", "bag"],
+    "add": ["добав", "add"],
+    "checkout": ["оформ", "checkout", "order", "заказ"],
+    "continue": ["продолж", "continue", "next", "далее", "дальш"],
+    "back": ["назад", "back", "return", "вернут"],
+    "submit": ["отправ", "submit", "send", "подтверд", "confirm", "ок", "ok"],
+    "save": ["сохран", "save", "apply", "применит"],
+    "cancel": ["отмен", "cancel"],
+    "close": ["закрыт", "close", "dismiss"],
+    "delete": ["удал", "delete", "remove"],
+    "edit": ["редакт", "измен", "edit", "change"],
+    "menu": ["меню", "menu", "nav", "navigation", "burger", "hamburger"],
+    "product": ["товар", "продукт", "product", "item", "inventory"],
+    "price": ["цен", "стоимост", "price", "cost"],
+    "quantity": ["количеств", "quantity", "qty", "count", "счетчик", "счётчик", "badge"],
+    "address": ["адрес", "address", "street", "улиц"],
+    "city": ["город", "city"],
+    "zip": ["индекс", "zip", "postal", "postcode"],
+    "date": ["дат", "date", "день", "day"],
+    "message": ["сообщен", "message", "msg", "текст", "text", "уведомлен", "notification", "alert"],
+    "error": ["ошибк", "error", "invalid", "неверн"],
+    "title": ["заголов", "title", "heading", "header"],
+    "comment": ["коммент", "comment", "отзыв", "review", "feedback"],
+    "filter": ["фильтр", "filter", "сортир", "sort"],
+    "profile": ["профил", "profile", "кабинет", "account"],
+    "remember": ["запомн", "remember"],
+    "forgot": ["забыл", "forgot", "восстанов", "reset", "recover"],
+    "agree": ["соглас", "agree", "accept", "terms", "услов"],
+}
+
+# Основы слов, задающих ожидаемую роль элемента (сравниваются целиком, в сходство текста не входят)
+ROLE_WORDS = {
+    "button": ["кнопк", "button", "btn"],
+    "textbox": ["пол", "field", "input", "ввод", "textbox", "textarea", "строк"],
+    "link": ["ссылк", "link"],
+    "checkbox": ["чекбокс", "флажок", "галочк", "checkbox"],
+    "radio": ["радиокнопк", "переключател", "radio"],
+    "select": ["выпадающ", "список", "select", "dropdown", "combobox"],
+    "text": ["надпис", "label"],
+}
+
+# Служебные слова описаний
+STOP_WORDS = {
+    "для", "на", "в", "во", "и", "или", "с", "со", "по", "к", "от", "из", "о", "об", "что", "который",
+    "которая", "которое", "странице", "страниц", "элемент", "элемента", "the", "a", "an", "to", "for",
+    "of", "on", "in", "and", "or", "with", "element", "page", "нажат", "нажатия", "ввода", "click",
+}
+
+RU_ENDINGS = sorted([
+    "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ой", "ей", "ая", "яя", "ое", "ее", "ые",
+    "ие", "ый", "ий", "ом", "ем", "ах", "ях", "ов", "ев", "ию", "ия", "ть", "а", "я", "о", "е", "ы",
+    "и", "у", "ю", "ь", "й",
+], key=len, reverse=True)
+
+INTERACTIVE_TAGS = {"input", "button", "a", "select", "textarea"}
+# Роли дерева доступности (снимок cdp_collector) и соответствующие роли ранжирования
+AX_ROLES = {
+    "button": "button", "menuitem": "button", "tab": "button", "link": "link",
+    "textbox": "textbox", "searchbox": "textbox", "spinbutton": "textbox",
+    "checkbox": "checkbox", "switch": "checkbox", "radio": "radio", "combobox": "select", "listbox": "select",
+}
+TEXTBOX_INPUT_TYPES = {"", "text", "email", "password", "search", "tel", "number", "url", "date"}
+
+# Поля записи снимка и их вес в сходстве текста
+FIELD_WEIGHTS = {
+    "label": 1.0,
+    "aria-label": 1.0,
+    "placeholder": 0.95,
+    "text": 0.95,
+    "id": 0.9,
+    "name": 0.9,
+    "data-test": 0.9,
+    "data-testid": 0.9,
+    "title": 0.85,
+    "alt": 0.8,
+    "value": 0.75,
+    "type": 0.6,
+    "class": 0.5,
+    "href": 0.4,
+}
+
+
+def _stem(word):
+    if re.search("[а-яё]", word):
+        word = word.replace("ё", "е")
+        for ending in RU_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= 3:
+                return word[:-len(ending)]
+    return word
+
+
+def tokenize(value):
+    """
+    Разбивает строку на нормализованные слова: camelCase, snake_case,
+    kebab-case и обычный текст; русские слова приводятся к основе.
+    """
+    if not value:
+        return []
+    value = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(value))
+    words = re.findall(r"[a-zа-яё0-9]+", value.lower())
+    return [_stem(word) for word in words if word not in STOP_WORDS]
+
+
+def _matches(word, variant):
+    if word == variant:
+        return True
+    # Основы русских слов и сокращения: "пользовател" ~ "пользователя", "usernam" ~ "username"
+    if len(variant) >= 3 and len(word) >= 3 and (word.startswith(variant) or variant.startswith(word)):
+        return True
+    return False
+
+
+def _concepts(words):
+    found = set()
+    for word in words:
+        for concept, variants in CONCEPTS.items():
+            if any(_matches(word, variant) for variant in variants):
+                found.add(concept)
+    return found
+
+
+def _expected_roles(words):
+    roles = set()
+    rest = []
+    for word in words:
+        matched = [role for role, variants in ROLE_WORDS.items() if word in variants]
+        if matched:
+            roles.update(matched)
+        else:
+            rest.append(word)
+    return roles, rest
+
+
+def element_role(record):
+    """
+    Роль элемента снимка: button, textbox, link, checkbox, radio, select или text.
+    Роль из дерева доступности (ax_role) точнее тега и атрибута role.
+    """
+    if record.get("ax_role") in AX_ROLES:
+        return AX_ROLES[record["ax_role"]]
+    attributes = record.get("attributes", {})
+    explicit = (attributes.get("role") or "").lower()
+    if explicit in ("button", "link", "checkbox", "radio", "textbox", "combobox", "searchbox"):
+        return {"combobox": "select", "searchbox": "textbox"}.get(explicit, explicit)
+    tag = record.get("tag")
+    if tag == "input":
+        input_type = (attributes.get("type") or "").lower()
+        if input_type in ("submit", "button", "reset", "image"):
+            return "button"
+        if input_type in ("checkbox", "radio"):
+            return input_type
+        return "textbox" if input_type in TEXTBOX_INPUT_TYPES else "text"
+    return {"button": "button", "a": "link", "textarea": "textbox", "select": "select"}.get(tag, "text")
+
+
+class _Query:
+    """
+    Разобранный требуемый элемент: слова названия и описания, ожидаемые роли.
+    """
+    def __init__(self, required_element):
+        name = required_element.get("name", "") if isinstance(required_element, dict) else str(required_element)
+        description = required_element.get("description", "") if isinstance(required_element, dict) else ""
+        name_roles, name_words = _expected_roles(tokenize(name))
+        description_roles, description_words = _expected_roles(tokenize(description))
+        # Роль из названия важнее роли из описания ("поле логина" — textbox, даже если в описании есть "кнопка")
+        self.roles = name_roles or description_roles
+        self.variants = [(words, weight) for words, weight in ((name_words, 1.0), (description_words, 0.8)) if words]
+
+
+class LocatorRanker:
+    """
+    Ранжирует элементы страницы для требуемых элементов сценария и выбирает
+    лучший локатор с оценкой уверенности.
+    """
+    def __init__(self, threshold=DEFAULT_CONFIDENCE_THRESHOLD):
+        self.threshold = threshold
+
+    def rank(self, required_element, snapshot, limit=None):
+        """
+        Кандидаты для требуемого элемента по убыванию оценки: список (оценка, запись снимка).
+        """
+        query = _Query(required_element)
+        counts = _attribute_counts(snapshot)
+        labels = _label_texts(snapshot)
+        scored = []
+        for record in snapshot:
+            if record.get("tag") == "label":
+                continue
+            score = self._score(query, record, counts, labels)
+            if score > 0:
+                scored.append((round(score, 4), record))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:limit] if limit else scored
+
+    def best_locator(self, required_element, snapshot):
+        """
+        Лучший локатор в формате LOCATORS_SCHEMA плюс поле confidence.
+        Возвращает None, если подходящих кандидатов нет.
+        """
+        ranked = self.rank(required_element, snapshot, limit=2)
+        if not ranked:
+            return None
+        best_score, record = ranked[0]
+        second_score = ranked[1][0] if len(ranked) > 1 else 0.0
+        # Близкие по оценке кандидаты — неоднозначность, уверенность ниже
+        margin = min(1.0, (best_score - second_score) / 0.2)
+        confidence = round(best_score * (0.6 + 0.4 * margin), 3)
+        locator_type, value, reason = _choose_locator(record, _attribute_counts(snapshot))
+        return {
+            "required_element": _required_dict(required_element),
+            "locator": {
+                "type": locator_type,
+                "value": value,
+                "reasoning": f"{reason}; {record.get('tag')} \"{_short(_record_label(record))}\", score {best_score}",
+            },
+            "confidence": confidence,
+        }
+
+    def candidates(self, required_element, snapshot, limit=3):
+        """
+        Запасные локаторы для проверки в браузере: для лучших записей снимка —
+        атрибутный локатор, CSS и XPath, без повторов.
+        """
+        counts = _attribute_counts(snapshot)
+        result = []
+        for _, record in self.rank(required_element, snapshot, limit=limit):
+            locator_type, value, _ = _choose_locator(record, counts)
+            for option in ((locator_type, value), ("By.cssSelector", record.get("css")), ("By.xpath", record.get("xpath"))):
+                candidate = {"type": option[0], "value": option[1]}
+                if option[1] and candidate not in result:
+                    result.append(candidate)
+        return result
+
+    def resolve(self, required_elements, snapshot):
+        """
+        Делит требуемые элементы на выбранные локально (уверенность не ниже порога)
+        и оставленные для LLM. Возвращает (локаторы по индексам, индексы для LLM, все лучшие кандидаты).
+        """
+        resolved = {}
+        unresolved = []
+        guesses = {}
+        for index, required in enumerate(required_elements):
+            candidate = self.best_locator(required, snapshot) if snapshot else None
+            if candidate is not None:
+                guesses[index] = candidate
+            if candidate is not None and candidate["confidence"] >= self.threshold:
+                resolved[index] = candidate
+            else:
+                unresolved.append(index)
+        logger.info(
+            f"🎯 Locator ranker: {len(resolved)}/{len(required_elements)} elements resolved locally "
+            f"(threshold {self.threshold})"
+        )
+        return resolved, unresolved, guesses
+
+    def _score(self, query, record, counts, labels):
+        fields = _record_fields(record, labels)
+        similarity = 0.0
+        for words, query_weight in query.variants:
+            for field, value in fields.items():
+                field_similarity = _similarity(words, tokenize(value))
+                similarity = max(similarity, field_similarity * FIELD_WEIGHTS.get(field, 0.5) * query_weight)
+        # Поле пароля узнаётся по type=password, даже без подписи
+        if query.variants and record.get("attributes", {}).get("type") == "password" and \
+                "password" in _concepts(query.variants[0][0]):
+            similarity = max(similarity, 0.95)
+        if similarity <= 0:
+            return 0.0
+        role = element_role(record)
+        if query.roles:
+            role_score = 1.0 if role in query.roles else 0.0
+        else:
+            role_score = 1.0 if record.get("tag") in INTERACTIVE_TAGS or role != "text" else 0.5
+        uniqueness = 1.0 if _stable_attribute(record, counts) else 0.5
+        return 0.7 * similarity + 0.2 * role_score + 0.1 * uniqueness
+
+
+def _similarity(query_words, field_words):
+    """
+    Доля слов запроса, найденных в поле (словами или понятиями), с поправкой
+    на длину поля: длинный текст контейнера совпадает слабее, чем точная подпись.
+    """
+    if not query_words or not field_words:
+        return 0.0
+    field_concepts = _concepts(field_words)
+    matched = 0.0
+    for word in query_words:
+        if any(_matches(word, other) for other in field_words):
+            matched += 1.0
+        elif _concepts([word]) & field_concepts:
+            matched += 0.9
+        elif max(difflib.SequenceMatcher(None, word, other).ratio() for other in field_words) >= 0.8:
+            matched += 0.7
+    if not matched:
+        return 0.0
+    coverage = matched / len(query_words)
+    precision = min(1.0, matched / len(field_words))
+    return 0.75 * coverage + 0.25 * precision
+
+
+def _record_fields(record, labels):
+    attributes = record.get("attributes", {})
+    fields = {field: attributes.get(field) for field in FIELD_WEIGHTS if attributes.get(field)}
+    if record.get("text"):
+        fields["text"] = record["text"][:200]
+    element_id = attributes.get("id")
+    if element_id and element_id in labels:
+        fields["label"] = labels[element_id]
+    elif record.get("accessible_name"):
+        # Доступное имя уже учитывает <label>, aria-labelledby и placeholder
+        fields["label"] = record["accessible_name"]
+    return fields
+
+
+def _label_texts(snapshot):
+    """
+    Тексты <label for="..."> по id связанного элемента (если теги label есть в снимке).
+    """
+    labels = {}
+    for record in snapshot:
+        target = record.get("attributes", {}).get("for")
+        if record.get("tag") == "label" and target and record.get("text"):
+            labels[target] = record["text"]
+    return labels
+
+
+def _attribute_counts(snapshot):
+    counts = {}
+    for record in snapshot:
+        attributes = record.get("attributes", {})
+        for field in ("id", "name", "data-test", "data-testid"):
+            if attributes.get(field):
+                key = (field, attributes[field])
+                counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def _stable_attribute(record, counts):
+    attributes = record.get("attributes", {})
+    for field in ("id", "data-test", "data-testid", "name"):
+        value = attributes.get(field)
+        if value and counts.get((field, value)) == 1:
+            return field, value
+    return None
+
+
+def _choose_locator(record, counts):
+    """
+    Локатор по приоритету: уникальный id, data-test, name, затем CSS и XPath из снимка.
+    """
+    stable = _stable_attribute(record, counts)
+    if stable is not None:
+        field, value = stable
+        if field == "id":
+            return "By.ID", value, "unique id"
+        if field == "name":
+            return "By.name", value, "unique name"
+        return "By.cssSelector", f"[{field}=\"{value}\"]", f"unique {field}"
+    if record.get("css"):
+        return "By.cssSelector", record["css"], "unique CSS path"
+    return "By.xpath", record.get("xpath", ""), "XPath"
+
+
+def _record_label(record):
+    attributes = record.get("attributes", {})
+    return record.get("text") or record.get("accessible_name") or attributes.get("aria-label") or attributes.get("placeholder") or \
+        attributes.get("id") or attributes.get("name") or ""
+
+
+def _required_dict(required_element):
+    if isinstance(required_element, dict):
+        return {"name": required_element.get("name", ""), "description": required_element.get("description", "")}
+    return {"name": str(required_element), "description": ""}
+
+
+def _short(text, limit=40):
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit] + "..."
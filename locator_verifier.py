@@ -0,0 +1,198 @@
+"""
+Проверка локаторов на странице одним вызовом execute_script.
+
+Локаторы от LLM или LocatorRanker раньше не проверялись: сломанный локатор
+обнаруживался только красной сборкой в Jenkins. Здесь все кандидаты для
+страницы отправляются в браузер одним скриптом, который для каждого
+возвращает число совпадений, видимость и доступность первого элемента
+(не disabled, не перекрыт другим элементом). Для каждого требуемого
+элемента выбирается первый уникальный рабочий кандидат.
+
+Типы локаторов принимаются в любом написании, которое встречается в проекте:
+By.ID / ID / id, By.cssSelector / CSS / css selector, By.name, By.xpath,
+By.className, By.tagName, By.linkText, By.partialLinkText.
+"""
+
+import json
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Нормализованное имя типа локатора (без "By.", регистра и разделителей) -> тип для скрипта
+LOCATOR_TYPES = {
+    "id": "id",
+    "css": "css",
+    "cssselector": "css",
+    "selector": "css",
+    "name": "name",
+    "xpath": "xpath",
+    "class": "class_name",
+    "classname": "class_name",
+    "tag": "tag_name",
+    "tagname": "tag_name",
+    "linktext": "link_text",
+    "partiallinktext": "partial_link_text",
+}
+
+VERIFY_SCRIPT = r"""
+var candidates = arguments[0];
+
+function quoteCss(value) {
+    return '"' + String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"') + '"';
+}
+
+function byText(value, partial) {
+    var links = document.getElementsByTagName('a');
+    var found = [];
+    for (var i = 0; i < links.length; i++) {
+        var text = (links[i].innerText || links[i].textContent || '').trim();
+        if (partial ? text.indexOf(value) !== -1 : text === value) found.push(links[i]);
+    }
+    return found;
+}
+
+function find(by, value) {
+    switch (by) {
+        case 'id': return document.querySelectorAll('[id=' + quoteCss(value) + ']');
+        case 'name': return document.querySelectorAll('[name=' + quoteCss(value) + ']');
+        case 'css': return document.querySelectorAll(value);
+        case 'class_name': return document.getElementsByClassName(value);
+        case 'tag_name': return document.getElementsByTagName(value);
+        case 'link_text': return byText(value, false);
+        case 'partial_link_text': return byText(value, true);
+        case 'xpath':
+            var snapshot = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var nodes = [];
+            for (var i = 0; i < snapshot.snapshotLength; i++) {
+                if (snapshot.snapshotItem(i).nodeType === 1) nodes.push(snapshot.snapshotItem(i));
+            }
+            return nodes;
+    }
+    throw new Error('unsupported locator type: ' + by);
+}
+
+function isVisible(el) {
+    if (el.tagName === 'INPUT' && (el.type || '').toLowerCase() === 'hidden') return false;
+    if (!el.getClientRects().length) return false;
+    var node = el;
+    while (node && node.nodeType === 1) {
+        var style = window.getComputedStyle(node);
+        if (style.display === 'none' || style.opacity === '0') return false;
+        node = node.parentElement;
+    }
+    var own = window.getComputedStyle(el);
+    if (own.visibility === 'hidden' || own.visibility === 'collapse') return false;
+    var rect = el.getBoundingClientRect();
+    return rect.width > 0 || rect.height > 0;
+}
+
+function isInteractable(el) {
+    if (el.disabled || el.getAttribute('aria-disabled') === 'true') return false;
+    if (window.getComputedStyle(el).pointerEvents === 'none') return false;
+    var rect = el.getBoundingClientRect();
+    var x = rect.left + rect.width / 2, y = rect.top + rect.height / 2;
+    // Вне окна перекрытие не проверить — Selenium сам прокрутит к элементу
+    if (x < 0 || y < 0 || x >= window.innerWidth || y >= window.innerHeight) return true;
+    var top = document.elementFromPoint(x, y);
+    if (!top) return true;
+    // Подпись <label> поля тоже передаёт клик в поле
+    return top === el || el.contains(top) || top.contains(el) || (top.control && top.control === el);
+}
+
+var result = [];
+for (var c = 0; c < candidates.length; c++) {
+    var item = {count: 0, visible: false, interactable: false, error: null};
+    try {
+        var found = find(candidates[c].by, candidates[c].value);
+        item.count = found.length;
+        if (found.length) {
+            var el = found[0];
+            item.visible = isVisible(el);
+            item.interactable = item.visible && isInteractable(el);
+            item.tag = el.tagName.toLowerCase();
+        }
+    } catch (e) {
+        item.error = String(e.message || e);
+    }
+    result.push(item);
+}
+return JSON.stringify(result);
+"""
+
+
+def normalize_locator_type(locator_type):
+    """
+    Тип локатора для скрипта проверки (id, css, name, xpath, ...) или None.
+    """
+    key = re.sub(r"[^a-z]", "", str(locator_type or "").lower().replace("by.", ""))
+    return LOCATOR_TYPES.get(key)
+
+
+def verify_locators(driver, candidates):
+    """
+    Проверяет список локаторов {"type": ..., "value": ...} на текущей странице
+    одним вызовом execute_script. Возвращает для каждого словарь:
+    type, value, count, unique, visible, interactable, error.
+    """
+    results = [None] * len(candidates)
+    queries = []
+    for index, candidate in enumerate(candidates):
+        by = normalize_locator_type(candidate.get("type"))
+        value = candidate.get("value")
+        if by is None or not value:
+            results[index] = _result(candidate, {"error": f"unsupported locator: {candidate.get('type')}"})
+        else:
+            queries.append((index, {"by": by, "value": str(value)}))
+    if queries:
+        started = time.perf_counter()
+        raw = driver.execute_script(VERIFY_SCRIPT, [query for _, query in queries])
+        checked = json.loads(raw) if raw else []
+        logger.info(f"🔎 Verified {len(queries)} locators in {(time.perf_counter() - started) * 1000:.0f} ms")
+        for (index, _), item in zip(queries, checked):
+            results[index] = _result(candidates[index], item)
+    return results
+
+
+def choose_locators(driver, candidate_groups):
+    """
+    Для каждой группы кандидатов (кандидаты одного требуемого элемента по
+    приоритету) выбирает первый уникальный видимый и доступный локатор,
+    а если такого нет — первый уникальный видимый. Все группы проверяются
+    одним скриптом. Возвращает список (выбранный результат или None, все результаты группы).
+    """
+    flat = [candidate for group in candidate_groups for candidate in group]
+    results = verify_locators(driver, flat) if flat else []
+    chosen = []
+    offset = 0
+    for group in candidate_groups:
+        group_results = results[offset:offset + len(group)]
+        offset += len(group)
+        best = next((r for r in group_results if r["unique"] and r["interactable"]), None)
+        if best is None:
+            best = next((r for r in group_results if r["unique"] and r["visible"]), None)
+        chosen.append((best, group_results))
+    working = sum(1 for best, _ in chosen if best is not None)
+    logger.info(f"🔎 Locator verification: {working}/{len(candidate_groups)} elements have a unique working locator")
+    return chosen
+
+
+def _result(candidate, item):
+    count = item.get("count", 0)
+    return {
+        "type": candidate.get("type"),
+        "value": candidate.get("value"),
+        "count": count,
+        "unique": count == 1 and not item.get("error"),
+        "visible": bool(item.get("visible")),
+        "interactable": bool(item.get("interactable")),
+        "error": item.get("error"),
+    }
+
+
+def verification_summary(result):
+    """
+    Краткий итог проверки для записи рядом с локатором.
+    """
+    return {key: result[key] for key in ("count", "visible", "interactable", "error") if result.get(key) is not None}
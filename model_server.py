@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Локальный сервер инференса: одна резидентная llama.cpp модель на хост.
+
+Раньше каждая точка входа (агент, GenTest/local_ai, GenTest/loc_define*,
+Model/model_generate_2) создавала свой Llama(...), а server.py при каждом
+Start перезапускал агента и заново загружал многогигабайтную модель.
+Сервер загружает модель один раз и обслуживает всех клиентов по HTTP:
+
+    GET  /health          — состояние, загруженные модели, длина очередей
+    POST /v1/completions  — {"model_path", "prompt", параметры llm(...),
+                             "stream", "json_schema", "cache_prefix", "speculative"}
+
+По умолчанию в памяти держится одна модель (--max-models): запрос к другому
+файлу .gguf выгружает прежнюю после выполнения её очереди.
+
+Запросы к одной модели ставятся в очередь и выполняются по одному рабочим
+потоком модели, а с --parallel N — непрерывным батчингом (batched_llama):
+до N запросов декодируются общими шагами в одном контексте llama.cpp.
+Ответ совпадает с форматом llama_cpp ({"choices": [...]}),
+при stream=true — NDJSON-поток таких же фрагментов.
+
+Клиенты получают модель через create_llm(): если задан MODEL_SERVER_URL,
+возвращается RemoteLlama с тем же интерфейсом вызова, иначе — обычный Llama.
+
+Запуск: python model_server.py --port 8765 --preload models/model.gguf
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+try:
+    from llama_cpp import Llama
+except ImportError:  # Клиентам RemoteLlama сам llama_cpp не нужен
+    Llama = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_SERVER_URL = "http://127.0.0.1:8765"
+
+# Параметры вызова llm(...), которые клиент может передать серверу
+COMPLETION_PARAMS = (
+    "max_tokens", "temperature", "top_p", "top_k", "min_p", "repeat_penalty",
+    "stop", "echo", "seed", "presence_penalty", "frequency_penalty",
+)
+
+
+# ----------------------------------------------------------------------
+# Клиент
+# ----------------------------------------------------------------------
+class RemoteLlama:
+    """
+    Замена Llama для клиентов: тот же вызов llm(prompt, ...), выполнение на сервере.
+    """
+    is_remote = True
+
+    def __init__(self, base_url, model_path, timeout=3600):
+        self.base_url = base_url.rstrip("/")
+        self.model_path = os.path.abspath(model_path)
+        self.timeout = timeout
+        self._parallel = None
+
+    @property
+    def parallel(self):
+        """
+        Сколько запросов сервер декодирует одновременно (1 — последовательно).
+        """
+        if self._parallel is None:
+            try:
+                self._parallel = int(self.health().get("parallel", 1))
+            except Exception:
+                self._parallel = 1
+        return self._parallel
+
+    def __call__(self, prompt, stream=False, json_schema=None, cache_prefix=None, speculative=False, **kwargs):
+        unsupported = set(kwargs) - set(COMPLETION_PARAMS)
+        if unsupported:
+            logger.debug(f"Model server ignores parameters: {sorted(unsupported)}")
+        payload = {key: value for key, value in kwargs.items() if key in COMPLETION_PARAMS}
+        payload.update({
+            "model_path": self.model_path,
+            "prompt": prompt,
+            "stream": bool(stream),
+            "json_schema": json_schema,
+            "cache_prefix": cache_prefix,
+            "speculative": bool(speculative),
+        })
+        response = requests.post(
+            f"{self.base_url}/v1/completions",
+            json=payload,
+            stream=bool(stream),
+            timeout=(10, self.timeout)
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Model server error {response.status_code}: {response.text[:500]}")
+        if not stream:
+            return response.json()
+        return self._iter_chunks(response)
+
+    def _iter_chunks(self, response):
+        # Закрытие генератора закрывает соединение — сервер прекращает генерацию
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"Model server error: {chunk['error']}")
+                yield chunk
+        finally:
+            response.close()
+
+    def health(self):
+        return requests.get(f"{self.base_url}/health", timeout=5).json()
+
+
+def model_server_available(base_url, timeout=2):
+    """
+    Проверяет, что сервер модели отвечает на /health.
+    """
+    try:
+        return requests.get(f"{base_url.rstrip('/')}/health", timeout=timeout).status_code == 200
+    except requests.RequestException:
+        return False
+
+
+def model_server_health(base_url, timeout=2):
+    """
+    Ответ /health сервера модели или None, если сервер недоступен.
+    """
+    try:
+        response = requests.get(f"{base_url.rstrip('/')}/health", timeout=timeout)
+        return response.json() if response.status_code == 200 else None
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def create_llm(model_path, **llama_kwargs):
+    """
+    Модель для клиента: RemoteLlama, если задан MODEL_SERVER_URL, иначе локальный Llama.
+    Параметры llama_kwargs используются только при локальной загрузке.
+    """
+    server_url = os.getenv("MODEL_SERVER_URL")
+    if server_url:
+        logger.info(f"🔌 Using model server {server_url} for {os.path.basename(model_path)}")
+        return RemoteLlama(server_url, model_path)
+    if Llama is None:
+        raise ImportError("llama_cpp is not installed and MODEL_SERVER_URL is not set")
+    return Llama(model_path=model_path, **llama_kwargs)
+
+
+# ----------------------------------------------------------------------
+# Сервер
+# ----------------------------------------------------------------------
+class _CompletionJob:
+    def __init__(self, prompt, params, stream, json_schema, cache_prefix, speculative=False):
+        self.prompt = prompt
+        self.params = params
+        self.stream = stream
+        self.json_schema = json_schema
+        self.cache_prefix = cache_prefix
+        self.speculative = speculative  # Java-генерация: экземпляр с черновиком, если он есть
+        self.output = queue.Queue()
+        self.cancelled = False
+        self.request = None  # BatchRequest в режиме батчинга
+        self.enqueued_at = time.perf_counter()
+
+    def cancel(self):
+        self.cancelled = True
+        if self.request is not None:
+            self.request.cancel()
+
+
+class ResidentModel:
+    """
+    Загруженная модель и её очередь запросов с единственным рабочим потоком.
+    При n_parallel > 1 рабочий поток только передаёт запросы в BatchedLlama.
+    """
+    def __init__(self, model_path, llama_kwargs, n_parallel=1, speculative=None):
+        self.model_path = model_path
+        self.llama_kwargs = llama_kwargs
+        self.n_parallel = n_parallel
+        self.speculative = speculative or {}
+        self.batched = n_parallel > 1
+        self.llm = None
+        self.speculative_llm = None  # Экземпляр с черновиком только для запросов speculative=true
+        self.prefix_cache = None
+        self.jobs = queue.Queue()
+        self.ready = threading.Event()
+        self.load_error = None
+        self.stats = {"requests": 0, "errors": 0, "cancelled": 0}
+        threading.Thread(target=self._worker, name=f"model-{os.path.basename(model_path)}", daemon=True).start()
+
+    def _load(self):
+        started = time.perf_counter()
+        logger.info(f"🤖 Loading resident model {self.model_path}...")
+        try:
+            if self.batched:
+                # Общий префикс промптов переиспользуют сами слоты батчинга
+                from batched_llama import BatchedLlama
+                if self.speculative.get("mode", "off") != "off":
+                    logger.warning("⚠️ Speculative decoding is not supported with --parallel > 1, disabled")
+                self.llm = BatchedLlama(self.model_path, n_parallel=self.n_parallel, **self.llama_kwargs)
+            else:
+                from speculative_decoding import load_speculative_llm
+                self.llm = Llama(model_path=self.model_path, **self.llama_kwargs)
+                self.speculative_llm = load_speculative_llm(
+                    self.model_path, self.speculative.get("mode"), self.speculative.get("draft_model_path"),
+                    **self.llama_kwargs
+                )
+                from prompt_prefix_cache import PrefixStateCache
+                self.prefix_cache = PrefixStateCache(self.llm, self.model_path)
+            logger.info(f"✅ Model loaded in {time.perf_counter() - started:.1f} s")
+        except Exception as e:
+            self.load_error = str(e)
+            logger.error(f"❌ Failed to load model {self.model_path}: {e}")
+        finally:
+            self.ready.set()
+
+    def _worker(self):
+        self._load()
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            if job.cancelled:
+                continue
+            self._run(job)
+        self._release()
+
+    def unload(self):
+        """
+        Выгружает модель после уже поставленных в очередь запросов.
+        """
+        self.jobs.put(None)
+
+    def _release(self):
+        for llm in (self.llm, self.speculative_llm):
+            close = getattr(llm, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed to close model {self.model_path}: {e}")
+        self.llm = None
+        self.speculative_llm = None
+        self.prefix_cache = None
+        logger.info(f"🧹 Model unloaded: {self.model_path}")
+
+    def _run(self, job):
+        from json_grammar import json_grammar
+        self.stats["requests"] += 1
+        if self.load_error:
+            job.output.put(("error", f"model not loaded: {self.load_error}"))
+            return
+        if self.batched:
+            return self._submit_batched(job)
+        try:
+            params = dict(job.params)
+            grammar = json_grammar(job.json_schema) if job.json_schema else None
+            if grammar is not None:
+                params["grammar"] = grammar
+                params.pop("stop", None)
+            llm = self.speculative_llm if job.speculative and self.speculative_llm is not None else self.llm
+            if llm is self.llm and job.cache_prefix and self.prefix_cache is not None:
+                try:
+                    self.prefix_cache.prepare("remote", job.cache_prefix)
+                except Exception as e:
+                    logger.warning(f"⚠️ Prompt prefix cache unavailable: {e}")
+            if job.stream:
+                stream = llm(job.prompt, stream=True, **params)
+                try:
+                    for chunk in stream:
+                        if job.cancelled:
+                            self.stats["cancelled"] += 1
+                            break
+                        job.output.put(("chunk", chunk))
+                finally:
+                    stream.close()
+                job.output.put(("done", None))
+            else:
+                job.output.put(("result", llm(job.prompt, **params)))
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"❌ Completion failed: {e}")
+            job.output.put(("error", str(e)))
+
+    def _submit_batched(self, job):
+        def on_done(request):
+            if request.error:
+                self.stats["errors"] += 1
+                job.output.put(("error", request.error))
+            elif request.finish_reason == "cancelled":
+                self.stats["cancelled"] += 1
+                job.output.put(("done", None))
+            elif job.stream:
+                job.output.put(("done", None))
+            else:
+                job.output.put(("result", request.response))
+
+        try:
+            job.request = self.llm.submit(
+                job.prompt,
+                json_schema=job.json_schema,
+                on_chunk=(lambda chunk: job.output.put(("chunk", chunk))) if job.stream else None,
+                on_done=on_done,
+                **job.params
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            job.output.put(("error", str(e)))
+            return
+        if job.cancelled:
+            job.request.cancel()
+
+    def health(self):
+        health = {
+            "loaded": self.llm is not None,
+            "error": self.load_error,
+            "queue": self.jobs.qsize(),
+            **self.stats,
+        }
+        if self.batched and self.llm is not None:
+            health["batching"] = self.llm.stats()
+        draft_model = getattr(self.speculative_llm, "draft_model", None)
+        if draft_model is not None and hasattr(draft_model, "stats"):
+            health["speculative"] = draft_model.stats()
+        return health
+
+
+class ModelServer:
+    """
+    HTTP-сервер, раздающий резидентные модели клиентам.
+    """
+    def __init__(self, host="127.0.0.1", port=8765, llama_kwargs=None, n_parallel=1, speculative=None, max_models=1):
+        self.host = host
+        self.port = port
+        self.llama_kwargs = llama_kwargs or {}
+        self.n_parallel = max(1, n_parallel)
+        self.speculative = speculative  # {"mode": off|lookup|draft, "draft_model_path": ...}
+        self.max_models = max(1, max_models)  # Резидентных моделей одновременно
+        self.models = {}
+        self._lock = threading.RLock()
+        self._server = None
+
+    def get_model(self, model_path):
+        """
+        Возвращает резидентную модель, при первом обращении запускает её загрузку.
+        """
+        model_path = os.path.abspath(model_path)
+        with self._lock:
+            model = self.models.get(model_path)
+            if model is None:
+                # Место под новую модель: выгружаем загруженные раньше всех
+                while len(self.models) >= self.max_models:
+                    old_path = next(iter(self.models))
+                    logger.info(f"🧹 Unloading {old_path} to load {model_path}")
+                    self.models.pop(old_path).unload()
+                model = ResidentModel(model_path, self.llama_kwargs, self.n_parallel, self.speculative)
+                self.models[model_path] = model
+            return model
+
+    def health(self):
+        speculative = self.speculative or {}
+        return {
+            "status": "ok",
+            "parallel": self.n_parallel,
+            "speculative": speculative.get("mode") or "off",
+            "draft_model": speculative.get("draft_model_path"),
+            "models": {path: model.health() for path, model in list(self.models.items())},
+        }
+
+    def serve_forever(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/health":
+                    server._send_json(self, 200, server.health())
+                else:
+                    server._send_json(self, 404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path != "/v1/completions":
+                    return server._send_json(self, 404, {"error": "not found"})
+                server._handle_completion(self)
+
+            def log_message(self, format, *args):
+                logger.debug("model server: " + format % args)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        logger.info(f"🧠 Model server listening on http://{self.host}:{self.port}")
+        self._server.serve_forever()
+
+    def shutdown(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    # ------------------------------------------------------------------
+    def _send_json(self, handler, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _handle_completion(self, handler):
+        try:
+            length = int(handler.headers.get("Content-Length", 0))
+            request = json.loads(handler.rfile.read(length).decode("utf-8"))
+            model_path = request["model_path"]
+            prompt = request["prompt"]
+        except (ValueError, KeyError) as e:
+            return self._send_json(handler, 400, {"error": f"bad request: {e}"})
+
+        params = {key: request[key] for key in COMPLETION_PARAMS if request.get(key) is not None}
+        job = _CompletionJob(
+            prompt, params, bool(request.get("stream")),
+            request.get("json_schema"), request.get("cache_prefix"), bool(request.get("speculative"))
+        )
+        with self._lock:
+            # Под блокировкой: модель не выгрузят между выбором и постановкой запроса в очередь
+            self.get_model(model_path).jobs.put(job)
+
+        if not job.stream:
+            kind, value = job.output.get()
+            if kind == "error":
+                return self._send_json(handler, 500, {"error": value})
+            # BatchedLlama сам заполняет задержки запроса
+            value.setdefault("timings", {}).setdefault(
+                "queue_wait_seconds", round(time.perf_counter() - job.enqueued_at, 3)
+            )
+            return self._send_json(handler, 200, value)
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.end_headers()
+        try:
+            while True:
+                kind, value = job.output.get()
+                if kind == "chunk":
+                    handler.wfile.write((json.dumps(value, ensure_ascii=False) + "\n").encode("utf-8"))
+                    handler.wfile.flush()
+                elif kind == "error":
+                    handler.wfile.write((json.dumps({"error": value}) + "\n").encode("utf-8"))
+                    break
+                else:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент закрыл поток (например, guard остановил генерацию)
+            job.cancel()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Resident llama.cpp model server')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Bind address')
+    parser.add_argument('--port', type=int, default=8765, help='Port')
+    parser.add_argument('--preload', type=str, action='append', default=[], help='Model to load at startup (repeatable)')
+    parser.add_argument('--n-ctx', type=int, default=8192, help='Context size (per sequence)')
+    parser.add_argument('--parallel', type=int, default=1, help='Sequences decoded together (continuous batching)')
+    parser.add_argument('--speculative', type=str, default='off', choices=('off', 'lookup', 'draft'), help='Speculative decoding mode')
+    parser.add_argument('--draft-model', type=str, default=None, help='Draft GGUF model for --speculative draft')
+    parser.add_argument('--max-models', type=int, default=1, help='Models kept loaded at once (older ones are unloaded)')
+    parser.add_argument('--n-threads', type=int, default=os.cpu_count(), help='CPU threads')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_arguments()
+    model_server = ModelServer(
+        host=args.host,
+        port=args.port,
+        llama_kwargs={"n_ctx": args.n_ctx, "n_threads": args.n_threads, "n_batch": 512, "verbose": False},
+        n_parallel=args.parallel,
+        speculative={"mode": args.speculative, "draft_model_path": args.draft_model},
+        max_models=args.max_models
+    )
+    for path in args.preload:
+        model_server.get_model(path)
+    try:
+        model_server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("🛑 Model server stopped")
@@ -0,0 +1,218 @@
+"""
+Кэш снимков страниц между сценариями.
+
+Многие сценарии начинаются с одной и той же страницы (вход saucedemo,
+HR_Portal), и каждый раз страница заново снималась полным скриптом
+page_snapshot (видимость, атрибуты, уникальные CSS/XPath для каждого
+элемента). Здесь снимок сохраняется по URL и виду сборщика вместе со
+структурным отпечатком DOM: теги, id, name, type, role, data-test и
+видимость интерактивных элементов, без текста (время, счётчики, баннеры
+не ломают совпадение).
+
+Повторная страница стоит один дешёвый скрипт отпечатка: если отпечаток
+совпал и запись не старше TTL, возвращается сохранённый снимок, иначе
+страница снимается заново и запись заменяется.
+
+Записи хранятся в памяти и в JSON-файлах каталога кэша, поэтому
+используются и отдельными процессами (GenTest/loc_define2,
+GenTest/ai_test_generator).
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urldefrag
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "page_cache"
+
+FINGERPRINT_SCRIPT = r"""
+var nodes = document.querySelectorAll(
+    'input, button, a, select, textarea, form, label, iframe, [role], [onclick], [data-test], [data-testid]'
+);
+var parts = [];
+for (var i = 0; i < nodes.length; i++) {
+    var el = nodes[i];
+    parts.push([
+        el.tagName.toLowerCase(), el.id || '', el.getAttribute('name') || '', el.getAttribute('type') || '',
+        el.getAttribute('role') || '', el.getAttribute('data-test') || el.getAttribute('data-testid') || '',
+        // Видимость: окно, сообщение об ошибке или меню, открытые действием на той же странице
+        el.offsetParent !== null || el.getClientRects().length > 0 ? '1' : '0'
+    ].join('|'));
+}
+return parts.join('\n');
+"""
+
+
+def page_fingerprint(driver):
+    """
+    Структурный отпечаток текущей страницы (sha256 от интерактивных элементов).
+    """
+    structure = driver.execute_script(FINGERPRINT_SCRIPT) or ""
+    return hashlib.sha256(structure.encode("utf-8")).hexdigest()
+
+
+def normalize_url(url):
+    """
+    URL без фрагмента и завершающего слэша.
+    """
+    url = urldefrag(url or "")[0]
+    return url[:-1] if url.endswith("/") and url.count("/") > 3 else url
+
+
+class PageSnapshotCache:
+    """
+    Снимки страниц по (URL, вид сборщика) с проверкой отпечатка DOM и TTL.
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl_seconds=900, max_entries=200):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(url, variant):
+        return hashlib.sha256(f"{normalize_url(url)}\n{variant}".encode("utf-8")).hexdigest()
+
+    def snapshot(self, driver, collect, variant="default"):
+        """
+        Снимок текущей страницы драйвера: из кэша, если отпечаток совпал и
+        запись не устарела, иначе collect(driver) с сохранением в кэш.
+        variant отделяет сборщики с разными селекторами и параметрами.
+        """
+        url = driver.current_url
+        key = self.make_key(url, variant)
+        started = time.perf_counter()
+        fingerprint = page_fingerprint(driver)
+        entry = self._load(key)
+        if entry is not None:
+            age = time.time() - entry["created_at"]
+            if entry["fingerprint"] == fingerprint and age <= self.ttl_seconds:
+                with self._lock:
+                    self.hits += 1
+                logger.info(
+                    f"🗂️ Page cache hit for {url} ({variant}), fingerprint checked in "
+                    f"{(time.perf_counter() - started) * 1000:.0f} ms"
+                )
+                return copy.deepcopy(entry["snapshot"])
+            reason = "fingerprint changed" if entry["fingerprint"] != fingerprint else "expired"
+            logger.info(f"🗂️ Page cache entry for {url} ({variant}) invalidated: {reason}")
+            with self._lock:
+                self.invalidations += 1
+        with self._lock:
+            self.misses += 1
+        snapshot = collect(driver)
+        self._store(key, {
+            "url": normalize_url(url),
+            "variant": variant,
+            "fingerprint": fingerprint,
+            "created_at": time.time(),
+            "snapshot": snapshot,
+        })
+        return copy.deepcopy(snapshot)
+
+    def invalidate(self, url, variant="default"):
+        """
+        Удаляет запись страницы (например, после неудачной проверки локаторов).
+        """
+        key = self.make_key(url, variant)
+        with self._lock:
+            self._entries.pop(key, None)
+            if self.cache_dir:
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
+
+    def log_stats(self):
+        stats = self.stats()
+        logger.info(
+            f"🗂️ Page cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['invalidations']} invalidations, {stats['entries']} entries"
+        )
+        return stats
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None or not self.cache_dir:
+                return entry
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except FileNotFoundError:
+                return None
+            except Exception as e:
+                logger.warning(f"⚠️ Broken page cache entry {key[:12]}: {e}")
+                return None
+            self._entries[key] = entry
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            if len(self._entries) > self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k]["created_at"])
+                self._entries.pop(oldest)
+            if not self.cache_dir:
+                return
+            tmp_path = f"{self._path(key)}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                os.replace(tmp_path, self._path(key))
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to write page cache entry: {e}")
+                return
+            self._evict_files()
+
+    def _evict_files(self):
+        files = [
+            os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".json")
+        ]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=lambda path: os.path.getmtime(path))
+        for path in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_page_cache():
+    """
+    Общий кэш снимков процесса (как get_shared_pool для браузеров).
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = PageSnapshotCache()
+        return _shared_cache
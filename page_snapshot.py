@@ -0,0 +1,218 @@
+"""
+Снимок DOM страницы за один вызов execute_script.
+
+Вместо отдельных WebDriver-запросов is_displayed / .text / get_attribute
+для каждого элемента в браузер внедряется один скрипт, который обходит
+нужные селекторы, вычисляет видимость, текст, атрибуты, координаты и
+уникальные CSS/XPath локаторы и возвращает всё одной JSON-строкой.
+
+Используется агентом (agent_v023 / agent_v024_interface),
+GenTest/loc_define2.LocalAILocatorFinder и GenTest/ai_test_generator.AILocatorFinder.
+"""
+
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Теги, которые агент собирал по умолчанию (порядок сохраняется в результате)
+DEFAULT_TAGS = ['input', 'button', 'a', 'select', 'textarea', 'div', 'span']
+
+# Атрибуты, которые скрипт читает у каждого элемента
+SNAPSHOT_ATTRIBUTES = [
+    'id', 'name', 'class', 'type', 'placeholder', 'value', 'href', 'src', 'alt',
+    'title', 'role', 'aria-label', 'data-test', 'data-testid', 'for', 'action', 'method'
+]
+
+SNAPSHOT_SCRIPT = r"""
+var selectors = arguments[0];
+var opts = arguments[1] || {};
+var attrNames = arguments[2];
+var limit = opts.limit_per_selector || 0;
+var visibleOnly = opts.visible_only !== false;
+var textLimit = opts.text_limit || 0;
+
+function isVisible(el) {
+    if (el.tagName === 'INPUT' && (el.type || '').toLowerCase() === 'hidden') return false;
+    if (!el.getClientRects().length) return false;
+    var node = el;
+    while (node && node.nodeType === 1) {
+        var style = window.getComputedStyle(node);
+        if (style.display === 'none' || style.opacity === '0') return false;
+        node = node.parentElement;
+    }
+    var own = window.getComputedStyle(el);
+    if (own.visibility === 'hidden' || own.visibility === 'collapse') return false;
+    var rect = el.getBoundingClientRect();
+    return rect.width > 0 || rect.height > 0;
+}
+
+function esc(value) {
+    if (window.CSS && CSS.escape) return CSS.escape(value);
+    return String(value).replace(/([^\w-])/g, '\\$1');
+}
+
+function quoteCss(value) {
+    return '"' + String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"') + '"';
+}
+
+function cssCount(sel) {
+    try { return document.querySelectorAll(sel).length; } catch (e) { return 0; }
+}
+
+function xpathLiteral(value) {
+    if (value.indexOf("'") === -1) return "'" + value + "'";
+    if (value.indexOf('"') === -1) return '"' + value + '"';
+    return "concat('" + value.replace(/'/g, "', \"'\", '") + "')";
+}
+
+function xpathCount(xp) {
+    try {
+        return document.evaluate('count(' + xp + ')', document, null, XPathResult.NUMBER_TYPE, null).numberValue;
+    } catch (e) { return 0; }
+}
+
+function readAttr(el, name) {
+    // Как и Selenium get_attribute: для href/src/value берём свойство (абсолютный URL, текущее значение)
+    if ((name === 'href' || name === 'src' || name === 'value') && typeof el[name] === 'string' && el.hasAttribute(name)) {
+        return el[name];
+    }
+    if (name === 'value' && (el.tagName === 'INPUT' || el.tagName === 'TEXTAREA' || el.tagName === 'SELECT')) {
+        return el.value;
+    }
+    return el.getAttribute(name);
+}
+
+function nthOfType(el) {
+    var index = 1, sibling = el.previousElementSibling;
+    while (sibling) {
+        if (sibling.tagName === el.tagName) index++;
+        sibling = sibling.previousElementSibling;
+    }
+    var total = index;
+    sibling = el.nextElementSibling;
+    while (sibling) {
+        if (sibling.tagName === el.tagName) total++;
+        sibling = sibling.nextElementSibling;
+    }
+    return total > 1 ? index : 0;
+}
+
+function uniqueCss(el) {
+    var tag = el.tagName.toLowerCase();
+    if (el.id && cssCount('#' + esc(el.id)) === 1) return '#' + esc(el.id);
+    var keys = ['data-test', 'data-testid', 'name'];
+    for (var i = 0; i < keys.length; i++) {
+        var value = el.getAttribute(keys[i]);
+        if (value) {
+            var sel = tag + '[' + keys[i] + '=' + quoteCss(value) + ']';
+            if (cssCount(sel) === 1) return sel;
+        }
+    }
+    var parts = [];
+    var node = el;
+    while (node && node.nodeType === 1 && node !== document.documentElement) {
+        var nodeTag = node.tagName.toLowerCase();
+        if (node !== el && node.id && cssCount('#' + esc(node.id)) === 1) {
+            parts.unshift('#' + esc(node.id));
+            break;
+        }
+        var nth = nthOfType(node);
+        parts.unshift(nth ? nodeTag + ':nth-of-type(' + nth + ')' : nodeTag);
+        var candidate = parts.join(' > ');
+        if (cssCount(candidate) === 1) return candidate;
+        node = node.parentElement;
+    }
+    return parts.join(' > ');
+}
+
+function uniqueXpath(el) {
+    var tag = el.tagName.toLowerCase();
+    if (el.id) {
+        var byId = '//*[@id=' + xpathLiteral(el.id) + ']';
+        if (xpathCount(byId) === 1) return byId;
+    }
+    var name = el.getAttribute('name');
+    if (name) {
+        var byName = '//' + tag + '[@name=' + xpathLiteral(name) + ']';
+        if (xpathCount(byName) === 1) return byName;
+    }
+    var parts = [];
+    var node = el;
+    while (node && node.nodeType === 1) {
+        var nth = nthOfType(node);
+        parts.unshift(node.tagName.toLowerCase() + (nth ? '[' + nth + ']' : ''));
+        node = node.parentElement;
+    }
+    return '/' + parts.join('/');
+}
+
+var result = [];
+for (var s = 0; s < selectors.length; s++) {
+    var found;
+    try { found = document.querySelectorAll(selectors[s]); } catch (e) { continue; }
+    var count = limit ? Math.min(limit, found.length) : found.length;
+    for (var k = 0; k < count; k++) {
+        var el = found[k];
+        var visible = isVisible(el);
+        if (visibleOnly && !visible) continue;
+        var attributes = {};
+        for (var a = 0; a < attrNames.length; a++) {
+            var attrValue = readAttr(el, attrNames[a]);
+            if (attrValue !== null && attrValue !== undefined) attributes[attrNames[a]] = String(attrValue);
+        }
+        var text = (el.innerText || '').trim();
+        if (textLimit && text.length > textLimit) text = text.substring(0, textLimit);
+        var rect = el.getBoundingClientRect();
+        result.push({
+            selector: selectors[s],
+            tag: el.tagName.toLowerCase(),
+            text: text,
+            visible: visible,
+            attributes: attributes,
+            rect: {x: Math.round(rect.left), y: Math.round(rect.top),
+                   width: Math.round(rect.width), height: Math.round(rect.height)},
+            css: uniqueCss(el),
+            xpath: uniqueXpath(el)
+        });
+    }
+}
+return JSON.stringify(result);
+"""
+
+
+def take_page_snapshot(driver, selectors=None, visible_only=True, limit_per_selector=None, text_limit=None):
+    """
+    Собирает элементы текущей страницы одним вызовом execute_script.
+    Возвращает список словарей: selector, tag, text, visible, attributes, rect, css, xpath.
+    Порядок совпадает с порядком селекторов, внутри селектора — порядок DOM.
+    """
+    selectors = list(selectors or DEFAULT_TAGS)
+    options = {
+        "visible_only": visible_only,
+        "limit_per_selector": limit_per_selector or 0,
+        "text_limit": text_limit or 0,
+    }
+    started = time.perf_counter()
+    raw = driver.execute_script(SNAPSHOT_SCRIPT, selectors, options, SNAPSHOT_ATTRIBUTES)
+    snapshot = json.loads(raw) if raw else []
+    logger.info(f"📸 Page snapshot: {len(snapshot)} elements in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return snapshot
+
+
+def to_element_info(record, fields):
+    """
+    Превращает запись снимка в плоский словарь с нужными полями.
+    Имена атрибутов с дефисом указываются через подчёркивание (aria_label -> aria-label).
+    Поля tag, text, css, xpath, visible, rect (и ax_role, accessible_name снимка cdp_collector)
+    берутся из самой записи.
+    """
+    attributes = record.get("attributes", {})
+    info = {}
+    for field in fields:
+        if field in ("tag", "text", "css", "xpath", "visible", "rect", "ax_role", "accessible_name"):
+            info[field] = record.get(field)
+        else:
+            info[field] = attributes.get(field.replace('_', '-'))
+    return info
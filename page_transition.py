@@ -0,0 +1,138 @@
+"""
+Определение перехода страницы по событиям вместо фиксированных пауз.
+
+GenTest ждал после загрузки и переходов фиксированно: time.sleep(1) между
+действиями loc_define2, sleep(2) после readyState в algoritm_no_ai и
+test_generator, sleep(3) в ai_test_generator и multi_page_generator.
+На быстрой странице это лишние секунды на каждом шаге, на медленной —
+всё равно мало.
+
+Здесь в страницу внедряется один скрипт, который при первом вызове
+ставит MutationObserver на документ, считает незавершённые fetch/XHR,
+следит за новыми записями Resource Timing и событием beforeunload.
+Страница считается стабильной, когда readyState == 'complete', нет
+запросов в полёте, документ не выгружается и DOM не менялся quiet_ms.
+Опрос идёт, пока страница не стабильна или не истёк таймаут.
+
+После навигации в новом документе скрипт ставится заново, поэтому
+ожидание длится не меньше quiet_ms с момента установки. mark_page перед
+действием сбрасывает таймер тишины: ожидание после клика не закончится
+на старой странице до того, как начнётся переход.
+"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUIET_MS = 300
+DEFAULT_POLL_INTERVAL = 0.05
+
+TRANSITION_SCRIPT = r"""
+var quietMs = arguments[0];
+var mark = arguments[1];
+var installedNow = false;
+if (!window.__aftTransition) {
+    installedNow = true;
+    var state = {pending: 0, last: performance.now(), resources: 0, unloading: false};
+    window.__aftTransition = state;
+    var touch = function () { state.last = performance.now(); };
+    var finished = function () { state.pending = Math.max(0, state.pending - 1); touch(); };
+    try {
+        new MutationObserver(touch).observe(document, {
+            childList: true, subtree: true, characterData: true,
+            attributes: true, attributeFilter: ['class', 'hidden', 'disabled', 'aria-busy', 'aria-hidden']
+        });
+    } catch (e) {}
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            state.pending++;
+            touch();
+            return originalFetch.apply(this, arguments).then(
+                function (response) { finished(); return response; },
+                function (error) { finished(); throw error; }
+            );
+        };
+    }
+    if (window.XMLHttpRequest) {
+        var originalSend = XMLHttpRequest.prototype.send;
+        XMLHttpRequest.prototype.send = function () {
+            state.pending++;
+            touch();
+            this.addEventListener('loadend', finished);
+            return originalSend.apply(this, arguments);
+        };
+    }
+    window.addEventListener('beforeunload', function () { state.unloading = true; touch(); });
+}
+var s = window.__aftTransition;
+if (mark) { s.last = performance.now(); }
+// Запросы, начатые до установки скрипта, видны только в Resource Timing
+var resources = performance.getEntriesByType ? performance.getEntriesByType('resource').length : 0;
+if (resources !== s.resources) { s.resources = resources; s.last = performance.now(); }
+var quiet = performance.now() - s.last;
+return {
+    url: location.href,
+    ready_state: document.readyState,
+    pending: s.pending,
+    unloading: s.unloading,
+    quiet_ms: Math.round(quiet),
+    installed_now: installedNow,
+    stable: document.readyState === 'complete' && s.pending === 0 && !s.unloading && quiet >= quietMs
+};
+"""
+
+
+def mark_page(driver):
+    """
+    Ставит наблюдатель на текущий документ и сбрасывает таймер тишины.
+    Вызывается перед действием, которое может сменить страницу. Возвращает текущий URL.
+    """
+    try:
+        state = driver.execute_script(TRANSITION_SCRIPT, DEFAULT_QUIET_MS, True)
+        return state.get("url") if isinstance(state, dict) else driver.current_url
+    except Exception as e:
+        logger.debug(f"mark_page failed: {e}")
+        return None
+
+
+def wait_for_stable_page(driver, timeout=10, quiet_ms=DEFAULT_QUIET_MS, start_url=None,
+                         poll_interval=DEFAULT_POLL_INTERVAL):
+    """
+    Ждёт, пока страница станет стабильной (загружена, без запросов в полёте,
+    DOM не менялся quiet_ms), но не дольше timeout секунд.
+    Возвращает словарь: stable, url, url_changed, elapsed, pending, quiet_ms.
+    """
+    started = time.perf_counter()
+    deadline = started + timeout
+    state = {}
+    while True:
+        try:
+            state = driver.execute_script(TRANSITION_SCRIPT, quiet_ms, False) or {}
+        except Exception as e:
+            # Документ выгружается во время навигации: пробуем снова
+            state = {"stable": False, "error": str(e)}
+        if state.get("stable") or time.perf_counter() >= deadline:
+            break
+        time.sleep(poll_interval)
+    elapsed = time.perf_counter() - started
+    url = state.get("url")
+    result = {
+        "stable": bool(state.get("stable")),
+        "url": url,
+        "url_changed": bool(start_url and url and url != start_url),
+        "elapsed": round(elapsed, 3),
+        "pending": state.get("pending"),
+        "quiet_ms": state.get("quiet_ms"),
+    }
+    if result["stable"]:
+        logger.info(
+            f"🌊 Page stable in {elapsed * 1000:.0f} ms{' after URL change' if result['url_changed'] else ''}: {url}"
+        )
+    else:
+        logger.warning(
+            f"⚠️ Page not stable after {timeout} s (pending requests: {result['pending']}, "
+            f"quiet {result['quiet_ms']} ms): {url}"
+        )
+    return result
@@ -0,0 +1,121 @@
+"""
+Кэш KV-состояния llama.cpp для фиксированных префиксов промптов.
+
+Промпты агента начинаются с длинных неизменных инструкций (системный блок
+[INST] <<SYS>> для Java, инструкции формата JSON для анализа и локаторов),
+и llama.cpp заново вычисляет их при каждом вызове. Сам Llama переиспользует
+KV-кэш только для общего префикса с *предыдущим* промптом, а в конвейере
+шаблоны чередуются (анализ -> локаторы -> Java), поэтому префикс почти
+всегда считается заново.
+
+PrefixStateCache один раз вычисляет префикс каждого шаблона, сохраняет
+состояние (llm.save_state) в памяти и на диске рядом с .gguf и
+восстанавливает его перед вызовом — модель считает только новые токены.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+
+from generation_cache import model_identity
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixStateCache:
+    """
+    Состояния llama.cpp после вычисления префиксов шаблонов: в памяти и на диске.
+    """
+    def __init__(self, llm, model_path, cache_dir=None):
+        self.llm = llm
+        self.model_path = model_path
+        # По умолчанию — каталог рядом с файлом модели: model.gguf -> model.prefix_cache/
+        self.cache_dir = cache_dir or f"{os.path.splitext(model_path)[0]}.prefix_cache"
+        self._states = {}
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self.stats = {"reused": 0, "memory": 0, "disk": 0, "computed": 0}
+
+    def _key(self, prefix):
+        identity = f"{model_identity(self.model_path)}:{self.llm.n_ctx()}:{prefix}"
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:24]
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.state")
+
+    def _prefix_tokens(self, key, prefix):
+        tokens = self._tokens.get(key)
+        if tokens is None:
+            tokens = self.llm.tokenize(prefix.encode("utf-8"), add_bos=True)
+            self._tokens[key] = tokens
+        return tokens
+
+    def _context_has(self, tokens):
+        """
+        Уже ли текущий контекст модели начинается с токенов префикса.
+        """
+        n_tokens = self.llm.n_tokens
+        return n_tokens >= len(tokens) and list(self.llm.input_ids[:len(tokens)]) == list(tokens)
+
+    def prepare(self, name, prefix):
+        """
+        Приводит контекст модели к состоянию «префикс вычислен».
+        Следующий вызов llm(prefix + suffix) вычислит только суффикс.
+        """
+        with self._lock:
+            key = self._key(prefix)
+            tokens = self._prefix_tokens(key, prefix)
+            if self._context_has(tokens):
+                self.stats["reused"] += 1
+                return
+
+            started = time.perf_counter()
+            state = self._states.get(key)
+            source = "memory"
+            if state is None:
+                state = self._load_from_disk(key)
+                source = "disk"
+            if state is not None:
+                self.llm.load_state(state)
+                self._states[key] = state
+                self.stats[source] += 1
+                logger.info(
+                    f"♻️ Prompt prefix '{name}' restored from {source} "
+                    f"({len(tokens)} tokens, {(time.perf_counter() - started) * 1000:.0f} ms)"
+                )
+                return
+
+            self.llm.reset()
+            self.llm.eval(tokens)
+            state = self.llm.save_state()
+            self._states[key] = state
+            self._save_to_disk(key, state)
+            self.stats["computed"] += 1
+            logger.info(
+                f"🧮 Prompt prefix '{name}' evaluated and cached "
+                f"({len(tokens)} tokens, {time.perf_counter() - started:.1f} s)"
+            )
+
+    def _load_from_disk(self, key):
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to load prompt prefix state {path}: {e}")
+            return None
+
+    def _save_to_disk(self, key, state):
+        path = self._disk_path(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(f"{path}.tmp", "wb") as f:
+                pickle.dump(state, f)
+            os.replace(f"{path}.tmp", path)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to save prompt prefix state {path}: {e}")
@@ -0,0 +1,377 @@
+"""
+Конвейер параллельной обработки сценариев.
+
+Сценарий проходит стадии:
+    download (GitHub) -> analyze (LLM) -> collect (Selenium) -> locate (LocatorRanker/LLM)
+    -> verify (Selenium) -> generate (LLM) -> publish
+
+На стадии verify страница открывается повторно и все локаторы проверяются
+одним скриптом: сломанный локатор заменяется рабочим до генерации кода.
+Если все локаторы страницы есть в индексе (locator_index), сценарий после
+analyze сразу переходит к generate. Если все требуемые элементы есть в
+статическом HTML страницы (static_collector), collect, locate и verify
+выполняются без браузера.
+
+Сценарий, найденный в кэше генерации агента, сразу после download
+уходит в publish, минуя LLM и браузер.
+
+Стадия publish только проверяет код и добавляет его в пакет агента:
+сам коммит в AFT делается один раз на всю пачку после run_batch.
+
+Каждая стадия работает в своих потоках и связана с соседними очередями.
+Модель одна, поэтому обе LLM-стадии обслуживает единственный LLM-воркер:
+пока браузеры загружают страницы одних сценариев, модель анализирует или
+генерирует код для других. Если сервер модели декодирует несколько запросов
+общим батчем (model_server --parallel N), LLM-воркеров запускается N. Количество браузерных воркеров настраивается,
+по каждой стадии собираются метрики пропускной способности.
+"""
+
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+
+from element_probe import ElementProbe
+from browser_pool import get_shared_pool
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("download", "analyze", "collect", "locate", "verify", "generate", "publish")
+
+
+class ScenarioJob:
+    """
+    Состояние одного сценария, которое передаётся между стадиями.
+    """
+    def __init__(self, filename, sha):
+        self.filename = filename
+        self.sha = sha
+        self.file_path = None
+        self.content = None
+        self.url = None
+        self.required_elements = []
+        self.page_elements = []
+        self.page_snapshot = []
+        self.locators = None
+        self.java_code = None
+        self.java_filename = None
+
+
+class StageMetrics:
+    """
+    Счётчики одной стадии: обработано, ошибки, суммарное время работы.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok=True):
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += seconds
+            if not ok:
+                self.errors += 1
+
+    def as_dict(self, wall_seconds):
+        per_minute = self.items / wall_seconds * 60 if wall_seconds > 0 else 0.0
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "avg_seconds": round(self.busy_seconds / self.items, 2) if self.items else 0.0,
+            "items_per_minute": round(per_minute, 2),
+        }
+
+
+class _LLMInbox:
+    """
+    Входящая очередь единственного LLM-воркера с двумя видами задач.
+    Анализ берётся первым, только если браузерной стадии есть куда принять
+    результат, иначе модель занимается локаторами и генерацией кода — так она не простаивает.
+    """
+    def __init__(self):
+        self._analyze = deque()
+        self._generate = deque()
+        self._cond = threading.Condition()
+
+    def put(self, kind, job):
+        with self._cond:
+            (self._analyze if kind == "analyze" else self._generate).append(job)
+            self._cond.notify()
+
+    def get(self, can_analyze, timeout=0.2):
+        with self._cond:
+            if not self._analyze and not self._generate:
+                self._cond.wait(timeout)
+            if self._analyze and (can_analyze() or not self._generate):
+                return "analyze", self._analyze.popleft()
+            if self._generate:
+                return "generate", self._generate.popleft()
+            return None, None
+
+
+class ScenarioPipeline:
+    """
+    Конвейер обработки пачки изменённых сценариев для TestAutomationAgent.
+    """
+    def __init__(self, agent, browser_workers=2, io_workers=2, queue_size=None, llm_workers=1):
+        self.agent = agent
+        self.browser_workers = max(1, browser_workers)
+        self.io_workers = max(1, io_workers)
+        self.llm_workers = max(1, llm_workers)
+        # Ограничение очереди к браузерам: не больше, чем они успеют разобрать
+        self.queue_size = queue_size or self.browser_workers
+        self.metrics = {}
+        # Пул браузеров должен вмещать всех браузерных воркеров
+        pool = get_shared_pool()
+        pool.max_size = max(pool.max_size, self.browser_workers)
+
+    # ------------------------------------------------------------------
+    def run_batch(self, changed_files):
+        """
+        Обрабатывает список (filename, sha). Возвращает словарь filename -> bool.
+        """
+        if not changed_files:
+            return {}
+
+        self.metrics = {name: StageMetrics(name) for name in STAGES}
+        self._download_queue = queue.Queue()
+        self._browser_queue = queue.Queue(maxsize=self.queue_size)
+        self._publish_queue = queue.Queue(maxsize=self.queue_size)
+        self._llm_inbox = _LLMInbox()
+        self._results = {}
+        self._results_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._total = len(changed_files)
+
+        for filename, sha in changed_files:
+            self._download_queue.put(ScenarioJob(filename, sha))
+
+        threads = []
+        for i in range(self.io_workers):
+            threads.append(threading.Thread(target=self._download_worker, name=f"download-{i}", daemon=True))
+            threads.append(threading.Thread(target=self._publish_worker, name=f"publish-{i}", daemon=True))
+        for i in range(self.browser_workers):
+            threads.append(threading.Thread(target=self._browser_worker, name=f"browser-{i}", daemon=True))
+        for i in range(self.llm_workers):
+            threads.append(threading.Thread(target=self._llm_worker, name=f"llm-{i}", daemon=True))
+
+        started = time.perf_counter()
+        logger.info(
+            f"🏭 Pipeline started: {self._total} scenarios, "
+            f"{self.browser_workers} browser workers, {self.io_workers} I/O workers, "
+            f"{self.llm_workers} LLM workers"
+        )
+        for thread in threads:
+            thread.start()
+        self._stop.wait()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.log_metrics(time.perf_counter() - started)
+        return dict(self._results)
+
+    def metrics_summary(self, wall_seconds):
+        """
+        Метрики по стадиям в виде словаря.
+        """
+        return {name: metrics.as_dict(wall_seconds) for name, metrics in self.metrics.items()}
+
+    def log_metrics(self, wall_seconds):
+        logger.info(f"📈 Pipeline finished in {wall_seconds:.1f} s")
+        for name, values in self.metrics_summary(wall_seconds).items():
+            logger.info(
+                f"📈 Stage {name}: {values['items']} items, {values['errors']} errors, "
+                f"busy {values['busy_seconds']} s (avg {values['avg_seconds']} s), "
+                f"{values['items_per_minute']} items/min"
+            )
+
+    # ------------------------------------------------------------------
+    def _finish(self, job, success):
+        """
+        Фиксирует результат сценария; после последнего останавливает конвейер.
+        """
+        if job.file_path and os.path.exists(os.path.dirname(job.file_path)):
+            try:
+                shutil.rmtree(os.path.dirname(job.file_path))
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to clean up temp files: {e}")
+        if success:
+            logger.info(f"✅ Scenario {job.filename} processed successfully")
+        else:
+            logger.error(f"❌ Failed to process: {job.filename}")
+        with self._results_lock:
+            self._results[job.filename] = success
+            if len(self._results) >= self._total:
+                self._stop.set()
+
+    def _put(self, target_queue, job):
+        """
+        Кладёт задачу в ограниченную очередь, не зависая после остановки конвейера.
+        """
+        while not self._stop.is_set():
+            try:
+                target_queue.put(job, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source_queue):
+        while not self._stop.is_set():
+            try:
+                return source_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+        return None
+
+    # ------------------------------------------------------------------
+    def _download_worker(self):
+        while not self._stop.is_set():
+            try:
+                job = self._download_queue.get_nowait()
+            except queue.Empty:
+                return
+            started = time.perf_counter()
+            try:
+                job.file_path, job.content = self.agent.download_scenario_file(job.filename)
+                ok = bool(job.content)
+            except Exception as e:
+                logger.error(f"❌ Scenario download failed for {job.filename}: {e}")
+                ok = False
+            self.metrics["download"].record(time.perf_counter() - started, ok)
+            try:
+                cached = self.agent.lookup_generated_test(job.content, job.filename) if ok else None
+            except Exception as e:
+                logger.warning(f"⚠️ Generation cache lookup failed for {job.filename}: {e}")
+                cached = None
+            if cached:
+                job.java_code, job.java_filename = cached
+                self._put(self._publish_queue, job)
+            elif ok:
+                self._llm_inbox.put("analyze", job)
+            else:
+                self._finish(job, False)
+
+    def _llm_worker(self):
+        model_client = self.agent.model_client
+        while not self._stop.is_set():
+            kind, job = self._llm_inbox.get(lambda: not self._browser_queue.full())
+            if job is None:
+                continue
+            started = time.perf_counter()
+            if kind == "analyze":
+                try:
+                    job.url, job.required_elements = model_client.resolve_scenario_target(job.content)
+                    ok = True
+                except Exception as e:
+                    logger.error(f"❌ Scenario analysis failed for {job.filename}: {e}")
+                    ok = False
+                self.metrics["analyze"].record(time.perf_counter() - started, ok)
+                if ok:
+                    # Локаторы страницы уже есть в индексе — браузер и поиск локаторов не нужны
+                    job.locators = model_client.indexed_locators(job.url, job.required_elements)
+                if ok and job.locators:
+                    self._llm_inbox.put("generate", job)
+                elif ok:
+                    self._put(self._browser_queue, job)
+                else:
+                    self._finish(job, False)
+            elif job.locators is None:
+                try:
+                    job.locators = model_client.generate_locators(job.required_elements, job.page_elements, job.page_snapshot)
+                    ok = True
+                except Exception as e:
+                    logger.error(f"❌ Locator generation failed for {job.filename}: {e}")
+                    ok = False
+                self.metrics["locate"].record(time.perf_counter() - started, ok)
+                if ok:
+                    self._put(self._browser_queue, job)
+                else:
+                    self._finish(job, False)
+            else:
+                try:
+                    job.java_code, job.java_filename = self.agent.generate_java_from_locators(
+                        job.content, job.filename, job.locators,
+                        analysis={"url": job.url, "required_elements": job.required_elements}
+                    )
+                    ok = True
+                except Exception as e:
+                    logger.error(f"❌ Code generation failed for {job.filename}: {e}")
+                    ok = False
+                self.metrics["generate"].record(time.perf_counter() - started, ok)
+                if ok:
+                    self._put(self._publish_queue, job)
+                else:
+                    self._finish(job, False)
+
+    def _browser_worker(self):
+        model_client = self.agent.model_client
+        pool = get_shared_pool()
+        while not self._stop.is_set():
+            job = self._get(self._browser_queue)
+            if job is None:
+                return
+            started = time.perf_counter()
+            if job.locators is not None:
+                self._verify(job, model_client, pool, started)
+                continue
+            # Серверная страница разбирается по HTTP: браузер из пула не берётся
+            static = model_client.static_locators(job.url, job.required_elements)
+            if static:
+                job.page_elements, job.page_snapshot, job.locators = static
+                self.metrics["collect"].record(time.perf_counter() - started, True)
+                self._llm_inbox.put("generate", job)
+                continue
+            try:
+                with pool.session() as driver:
+                    probe = ElementProbe(driver, action_timeout=10)
+                    job.page_elements, job.page_snapshot = model_client.snapshot_page(driver, probe, job.url)
+                    probe.log_stats(job.url)
+                ok = True
+            except Exception as e:
+                logger.error(f"❌ Page collection failed for {job.filename}: {e}")
+                ok = False
+            self.metrics["collect"].record(time.perf_counter() - started, ok)
+            if ok:
+                self._llm_inbox.put("generate", job)
+            else:
+                self._finish(job, False)
+
+    def _verify(self, job, model_client, pool, started):
+        """
+        Проверка локаторов на странице. Ошибка проверки не останавливает сценарий:
+        код генерируется по непроверенным локаторам, как раньше.
+        """
+        try:
+            with pool.session() as driver:
+                probe = ElementProbe(driver, action_timeout=10)
+                job.locators = model_client.reload_and_verify_locators(
+                    driver, probe, job.url, job.locators, job.page_snapshot
+                )
+            ok = True
+        except Exception as e:
+            logger.warning(f"⚠️ Locator verification failed for {job.filename}: {e}")
+            ok = False
+        self.metrics["verify"].record(time.perf_counter() - started, ok)
+        self._llm_inbox.put("generate", job)
+
+    def _publish_worker(self):
+        while not self._stop.is_set():
+            job = self._get(self._publish_queue)
+            if job is None:
+                return
+            started = time.perf_counter()
+            try:
+                ok = self.agent.stage_aft_test(job.java_code, job.java_filename)
+            except Exception as e:
+                logger.error(f"❌ Staging for AFT failed for {job.filename}: {e}")
+                ok = False
+            self.metrics["publish"].record(time.perf_counter() - started, ok)
+            self._finish(job, ok)
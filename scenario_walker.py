@@ -0,0 +1,125 @@
+"""
+Поиск целей действий сценария при живом прогоне без LLM на каждое действие.
+
+GenTest/loc_define2 для каждого действия type/click заново снимал всю
+страницу и задавал модели вопрос на 512 токенов — около 100 с на действие.
+ActionTargetResolver ищет цель по порядку, от дешёвого к дорогому:
+
+1. Буквальный локатор из target (analyze_scenario часто пишет "#user-name",
+   "input[name='password']", "//button[@id='login']", "id=login-button" или
+   просто id "login-button") — проверяется одним скриптом locator_verifier.
+2. LocatorRanker по снимку страницы, сделанному после предыдущего действия;
+   кандидаты выше порога уверенности тоже проверяются одним скриптом.
+3. LLM — только если оба шага не дали уникального видимого элемента; модель
+   получает тот же снимок, страница повторно не снимается.
+"""
+
+import logging
+import re
+import time
+
+from locator_ranker import LocatorRanker
+from locator_verifier import choose_locators
+
+logger = logging.getLogger(__name__)
+
+# Префиксы в стиле Selenium IDE: "id=login", "css=#login", "xpath=//a"
+PREFIXED_TARGET = re.compile(r"^(id|name|css|xpath|link)\s*=\s*(.+)$", re.IGNORECASE)
+PREFIX_TYPES = {"id": "By.ID", "name": "By.name", "css": "By.cssSelector", "xpath": "By.xpath", "link": "By.linkText"}
+# CSS: начинается с #, . или [, либо латинский тег с #, ., [, : или комбинатором
+CSS_TARGET = re.compile(r"^([#.\[]\S|[a-z][a-z0-9-]*\s*([#.\[:]\S|>))", re.IGNORECASE)
+# Голый идентификатор: id, name или data-test элемента
+IDENTIFIER_TARGET = re.compile(r"^[A-Za-z_][\w-]*$")
+
+SOURCES = ("literal", "ranker", "llm")
+
+
+def literal_candidates(target):
+    """
+    Локаторы, которые target задаёт буквально, по приоритету. Пустой список,
+    если target — описание на естественном языке.
+    """
+    target = (target or "").strip()
+    if not target:
+        return []
+    prefixed = PREFIXED_TARGET.match(target)
+    if prefixed:
+        return [{"type": PREFIX_TYPES[prefixed.group(1).lower()], "value": prefixed.group(2).strip()}]
+    if target.startswith(("/", "./", "(/")):
+        return [{"type": "By.xpath", "value": target}]
+    if IDENTIFIER_TARGET.match(target):
+        return [
+            {"type": "By.ID", "value": target},
+            {"type": "By.name", "value": target},
+            {"type": "By.cssSelector", "value": f"[data-test=\"{target}\"]"},
+        ]
+    if CSS_TARGET.match(target):
+        return [{"type": "By.cssSelector", "value": target}]
+    return []
+
+
+class ActionTargetResolver:
+    """
+    Находит локатор цели действия: буквальный target, затем LocatorRanker по
+    снимку страницы, затем llm_fallback(target, description, snapshot).
+    """
+    def __init__(self, ranker=None, llm_fallback=None):
+        self.ranker = ranker or LocatorRanker()
+        self.llm_fallback = llm_fallback
+        self.counts = {source: 0 for source in SOURCES}
+        self.failed = 0
+        self.seconds = {source: 0.0 for source in SOURCES}
+
+    def resolve(self, driver, target, description="", snapshot=None):
+        """
+        Локатор {"type", "value", "source"} или None. source — literal, ranker или llm.
+        Локаторы literal и ranker уже проверены на странице (уникальны и видимы).
+        """
+        started = time.perf_counter()
+        literal = literal_candidates(target)
+        if literal:
+            best, _ = choose_locators(driver, [literal])[0]
+            if best is not None:
+                return self._found(best, "literal", target, started)
+
+        if snapshot:
+            required = {"name": target, "description": description}
+            best_guess = self.ranker.best_locator(required, snapshot)
+            if best_guess is not None and best_guess["confidence"] >= self.ranker.threshold:
+                candidates = [{"type": best_guess["locator"]["type"], "value": best_guess["locator"]["value"]}]
+                candidates += [c for c in self.ranker.candidates(required, snapshot) if c not in candidates]
+                best, _ = choose_locators(driver, [candidates])[0]
+                if best is not None:
+                    return self._found(best, "ranker", target, started)
+
+        if self.llm_fallback is not None:
+            started = time.perf_counter()
+            locator = self.llm_fallback(target, description, snapshot or [])
+            if locator and locator.get("value"):
+                return self._found(locator, "llm", target, started)
+
+        self.failed += 1
+        logger.warning(f"⚠️ Action target not resolved: {target}")
+        return None
+
+    def stats(self):
+        return {
+            "counts": dict(self.counts),
+            "failed": self.failed,
+            "seconds": {source: round(value, 2) for source, value in self.seconds.items()},
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        logger.info(
+            f"🚶 Action targets: {stats['counts']['literal']} literal, {stats['counts']['ranker']} ranker, "
+            f"{stats['counts']['llm']} LLM ({stats['seconds']['llm']} s), {stats['failed']} not found"
+        )
+        return stats
+
+    def _found(self, locator, source, target, started):
+        elapsed = time.perf_counter() - started
+        self.counts[source] += 1
+        self.seconds[source] += elapsed
+        logger.info(f"🚶 Target '{target}' -> {locator['type']}={locator['value']} ({source}, {elapsed * 1000:.0f} ms)")
+        return {"type": locator["type"], "value": locator["value"], "source": source}
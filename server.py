@@ -8,12 +8,14 @@ import sys
 import shutil
 import time
 import re
+from model_server import DEFAULT_MODEL_SERVER_URL, model_server_available, model_server_health
 
 app = Flask(__name__)
 CORS(app)
 
 # Глобальные переменные
 agent_process = None
+model_server_process = None  # Резидентный сервер модели, переживает перезапуски агента
 agent_status = "stopped"
 agent_logs = []
 last_log_count = 0
@@ -102,6 +104,77 @@ def upload_model():
         add_agent_log(f"ERROR - ❌ Ошибка загрузки файла: {str(e)}", "error")
         return jsonify({"status": "error", "message": str(e)})
 
+
+def model_server_settings_differ(health, parallel, speculative, draft_model):
+    """Список отличий настроек запущенного сервера модели от запрошенных"""
+    differences = []
+    if int(health.get("parallel", 1)) != parallel:
+        differences.append(f"parallel {health.get('parallel', 1)} -> {parallel}")
+    if health.get("speculative", "off") != speculative:
+        differences.append(f"speculative {health.get('speculative', 'off')} -> {speculative}")
+    elif speculative == "draft" and os.path.abspath(health.get("draft_model") or "") != os.path.abspath(draft_model or ""):
+        differences.append(f"draft model -> {draft_model}")
+    return differences
+
+
+def ensure_model_server(model_path, parallel=1, speculative="off", draft_model=None, timeout=15):
+    """
+    Возвращает URL сервера модели, при необходимости запуская model_server.py.
+    Модель загружается сервером один раз и остаётся в памяти между перезапусками агента;
+    при смене файла модели сервер выгружает прежнюю.
+    parallel > 1 включает непрерывный батчинг параллельных запросов,
+    speculative — спекулятивное декодирование (lookup или draft с draft_model).
+    Запущенный этим сервером процесс с другими настройками перезапускается.
+    При неудаче возвращает None — агент загрузит модель сам.
+    """
+    global model_server_process
+    server_url = os.getenv("MODEL_SERVER_URL", DEFAULT_MODEL_SERVER_URL)
+    health = model_server_health(server_url)
+    if health is not None:
+        differences = model_server_settings_differ(health, parallel, speculative, draft_model)
+        if not differences:
+            add_agent_log(f"INFO - 🧠 Используется запущенный сервер модели {server_url}", "info")
+            return server_url
+        if model_server_process is None or model_server_process.poll() is not None:
+            # Сервер запущен не нами — не останавливаем чужой процесс
+            add_agent_log(
+                f"WARNING - ⚠️ Сервер модели {server_url} запущен с другими настройками "
+                f"({', '.join(differences)}), используется как есть", "warning"
+            )
+            return server_url
+        add_agent_log(f"INFO - 🔁 Перезапуск сервера модели: {', '.join(differences)}", "info")
+        model_server_process.terminate()
+        try:
+            model_server_process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            model_server_process.kill()
+            model_server_process.wait()
+
+    if model_server_process is None or model_server_process.poll() is not None:
+        port = server_url.rsplit(":", 1)[-1].strip("/")
+        log_file = open("model_server.log", "a", encoding="utf-8")
+        server_cmd = [sys.executable, "model_server.py", "--port", port, "--preload", model_path,
+                      "--parallel", str(parallel), "--speculative", speculative]
+        if draft_model:
+            server_cmd += ["--draft-model", draft_model]
+        model_server_process = subprocess.Popen(
+            server_cmd,
+            stdout=log_file,
+            stderr=subprocess.STDOUT
+        )
+        add_agent_log(f"INFO - 🧠 Запуск сервера модели на порту {port} (лог: model_server.log)", "info")
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if model_server_available(server_url):
+            return server_url
+        if model_server_process.poll() is not None:
+            break
+        time.sleep(0.5)
+    add_agent_log("WARNING - ⚠️ Сервер модели недоступен, агент загрузит модель локально", "warning")
+    return None
+
+
 @app.route('/api/start', methods=['POST'])
 def start_agent():
     global agent_process, agent_status, agent_logs, last_log_count
@@ -152,6 +225,19 @@ def start_agent():
             "--aft-repo", config["aft_repo"],
             "--interval", str(config["scan_interval"])
         ]
+        if config.get("webhook_port"):
+            # Событийный режим: агент принимает push-вебхуки GitHub на этом порту
+            cmd += ["--webhook-port", str(config["webhook_port"])]
+        if config.get("aft_workdir"):
+            # Публикация тестов через локальный клон AFT вместо GitHub API
+            cmd += ["--aft-workdir", config["aft_workdir"]]
+        speculative = config.get("speculative", "off")
+        draft_model = get_absolute_model_path(config["draft_model"]) if config.get("draft_model") else None
+        if speculative != "off":
+            # Спекулятивное декодирование Java-тестов: lookup по шаблону или черновая модель
+            cmd += ["--speculative", speculative]
+            if draft_model:
+                cmd += ["--draft-model", draft_model]
         
         add_agent_log(f"INFO - 🔧 Команда запуска: {' '.join(cmd)}", "info")
         
@@ -159,6 +245,16 @@ def start_agent():
         env = os.environ.copy()
         env['PYTHONIOENCODING'] = 'utf-8'
         env['PYTHONUTF8'] = '1'
+        if config.get("use_model_server", False):
+            # Одна резидентная модель на хост вместо загрузки при каждом запуске агента
+            server_url = ensure_model_server(
+                absolute_model_path,
+                parallel=int(config.get("model_parallel", 1)),
+                speculative=speculative,
+                draft_model=draft_model
+            )
+            if server_url:
+                env['MODEL_SERVER_URL'] = server_url
         
         agent_process = subprocess.Popen(
             cmd,
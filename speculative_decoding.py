@@ -0,0 +1,243 @@
+"""
+Спекулятивное декодирование для генерации Java-тестов.
+
+Java-тест, который пишет модель, в основном состоит из предсказуемого
+шаблона: импорты, @BeforeEach, настройка WebDriverWait, tearDown. Черновик
+предлагает следующие токены, основная модель проверяет их одним батчем
+(llama_cpp.Llama с draft_model) и принимает совпавший префикс — за один
+проход модели получается несколько токенов.
+
+Источники черновиков:
+
+- TemplateLookupDecoding — без дополнительной модели: n-граммный поиск
+  продолжения в уже сгенерированном тексте, промпте (локаторы, сценарий)
+  и в резервном шаблоне теста (java_templates.FALLBACK_TEST_TEMPLATE);
+- GGUFDraftModel — маленькая GGUF-модель с тем же словарём, что у основной.
+
+Оба считают долю принятых токенов по источникам (stats()).
+
+Черновик подключается к отдельному экземпляру Llama (load_speculative_llm),
+который вызывается только для Java-генерации. Общая модель для анализа
+сценария и JSON-локаторов остаётся без draft_model и logits_all: иначе
+спекуляция шла бы и на коротких JSON-ответах, а каждое сохранённое
+состояние префикса (prompt_prefix_cache) содержало бы логиты всех токенов.
+"""
+
+import logging
+
+try:
+    import numpy as np
+    from llama_cpp import Llama
+    from llama_cpp.llama_speculative import LlamaDraftModel
+except ImportError:  # Без llama_cpp спекулятивное декодирование недоступно
+    np = None
+    Llama = None
+    LlamaDraftModel = object
+
+from java_templates import FALLBACK_TEST_TEMPLATE
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_MODES = ("off", "lookup", "draft")
+
+
+class _AcceptanceStats:
+    """
+    Учёт предложенных и принятых токенов черновика.
+    Принятые токены черновика предыдущего раунда видны в input_ids следующего вызова.
+    """
+    def _init_stats(self):
+        self._last_draft = None  # (позиция, токены, источник)
+        self._stats = {}
+
+    def _verify_last(self, input_ids):
+        if self._last_draft is None:
+            return
+        start, draft, source = self._last_draft
+        self._last_draft = None
+        # Если контекст сброшен (новый промпт), раунд не учитываем
+        if len(input_ids) <= start:
+            return
+        accepted = 0
+        for offset, token in enumerate(draft):
+            if start + offset >= len(input_ids) or int(input_ids[start + offset]) != int(token):
+                break
+            accepted += 1
+        stats = self._stats.setdefault(source, {"rounds": 0, "proposed": 0, "accepted": 0})
+        stats["rounds"] += 1
+        stats["proposed"] += len(draft)
+        stats["accepted"] += accepted
+
+    def _remember(self, input_ids, draft, source):
+        if len(draft):
+            self._last_draft = (len(input_ids), [int(token) for token in draft], source)
+
+    def stats(self):
+        """
+        Статистика по источникам черновиков: раунды, предложено, принято, доля принятых.
+        """
+        result = {}
+        for source, values in self._stats.items():
+            rate = values["accepted"] / values["proposed"] if values["proposed"] else 0.0
+            result[source] = dict(values, acceptance_rate=round(rate, 3))
+        return result
+
+    def reset_stats(self):
+        self._init_stats()
+
+    def log_stats(self):
+        for source, values in self.stats().items():
+            logger.info(
+                f"🎯 Speculative drafts ({source}): {values['accepted']}/{values['proposed']} tokens accepted "
+                f"({values['acceptance_rate']:.0%}) in {values['rounds']} rounds"
+            )
+
+
+class TemplateLookupDecoding(_AcceptanceStats, LlamaDraftModel):
+    """
+    Prompt lookup: ищет последние n-граммы в тексте запроса и справочных
+    шаблонах и предлагает следующие за найденным местом токены.
+    """
+    def __init__(self, max_ngram_size=3, num_pred_tokens=10, min_ngram_size=2):
+        self.max_ngram_size = max_ngram_size
+        self.min_ngram_size = min_ngram_size
+        self.num_pred_tokens = num_pred_tokens
+        self.references = {}
+        self._init_stats()
+
+    def add_reference(self, name, tokens):
+        """
+        Добавляет справочную последовательность токенов (например, резервный шаблон теста).
+        """
+        self.references[name] = np.asarray(tokens, dtype=np.intc)
+
+    def add_fallback_template(self, llm, test_name="Scenario"):
+        """
+        Токенизирует резервный шаблон теста словарём модели llm.
+        Имя класса в сгенерированном тесте другое, но остальной шаблон совпадает.
+        """
+        text = FALLBACK_TEST_TEMPLATE.format(test_name=test_name, scenario_content="")
+        self.add_reference("fallback_template", llm.tokenize(text.encode("utf-8"), add_bos=False))
+
+    def __call__(self, input_ids, /, **kwargs):
+        self._verify_last(input_ids)
+        draft, source = self._find(input_ids)
+        self._remember(input_ids, draft, source)
+        return draft
+
+    def _find(self, input_ids):
+        corpora = [("prompt", input_ids)] + list(self.references.items())
+        for ngram_size in range(min(self.max_ngram_size, len(input_ids) - 1), self.min_ngram_size - 1, -1):
+            ngram = input_ids[-ngram_size:]
+            for source, corpus in corpora:
+                # В самом запросе последняя n-грамма совпадает сама с собой — её не считаем
+                searchable = corpus[:-1] if source == "prompt" else corpus
+                continuation = _lookup(searchable, corpus, ngram, self.num_pred_tokens)
+                if len(continuation):
+                    return continuation, source
+        return np.array([], dtype=np.intc), None
+
+
+class GGUFDraftModel(_AcceptanceStats, LlamaDraftModel):
+    """
+    Черновик от маленькой GGUF-модели: жадно предсказывает num_pred_tokens токенов.
+    Словарь должен совпадать со словарём основной модели.
+    """
+    def __init__(self, model_path, num_pred_tokens=8, n_ctx=8192, n_threads=None):
+        self.model_path = model_path
+        self.num_pred_tokens = num_pred_tokens
+        self.llm = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+        self._init_stats()
+
+    def __call__(self, input_ids, /, **kwargs):
+        self._verify_last(input_ids)
+        draft = []
+        # Черновик не должен выходить за контекст черновой модели
+        limit = min(self.num_pred_tokens, self.llm.n_ctx() - len(input_ids))
+        if limit <= 0:
+            return np.array([], dtype=np.intc)
+        # Llama.generate сам переиспользует общий с прошлым вызовом префикс контекста
+        generator = self.llm.generate(list(input_ids), top_k=1, temp=0.0, repeat_penalty=1.0)
+        try:
+            for token in generator:
+                if token == self.llm.token_eos() or len(draft) >= limit:
+                    break
+                draft.append(token)
+        finally:
+            generator.close()
+        draft = np.asarray(draft, dtype=np.intc)
+        self._remember(input_ids, draft, "draft_model")
+        return draft
+
+
+def _lookup(searchable, corpus, ngram, num_pred_tokens):
+    """
+    Продолжение после последнего вхождения ngram в searchable (берётся из corpus).
+    """
+    size = len(ngram)
+    if len(searchable) < size:
+        return ()
+    windows = np.lib.stride_tricks.sliding_window_view(searchable, size)
+    matches = np.nonzero(np.all(windows == ngram, axis=1))[0]
+    # Ближайшее к концу вхождение — самое вероятное продолжение
+    for idx in matches[::-1]:
+        start = idx + size
+        end = min(start + num_pred_tokens, len(corpus))
+        if start < end:
+            return corpus[start:end]
+    return ()
+
+
+def create_draft_model(mode, draft_model_path=None, num_pred_tokens=10, n_ctx=8192):
+    """
+    Черновик для Llama(draft_model=...): None для "off", TemplateLookupDecoding для "lookup",
+    GGUFDraftModel для "draft" (нужен draft_model_path).
+    """
+    if mode in (None, "", "off"):
+        return None
+    if Llama is None:
+        logger.warning("⚠️ llama_cpp is not installed, speculative decoding disabled")
+        return None
+    if mode == "lookup":
+        logger.info(f"🎯 Speculative decoding: prompt/template lookup, {num_pred_tokens} tokens per draft")
+        return TemplateLookupDecoding(num_pred_tokens=num_pred_tokens)
+    if mode == "draft":
+        if not draft_model_path:
+            raise ValueError("Speculative mode 'draft' requires a draft model path")
+        logger.info(f"🎯 Speculative decoding: draft model {draft_model_path}")
+        return GGUFDraftModel(draft_model_path, num_pred_tokens=min(num_pred_tokens, 8), n_ctx=n_ctx)
+    raise ValueError(f"Unknown speculative mode: {mode} (expected one of {', '.join(SPECULATIVE_MODES)})")
+
+
+def speculative_llama_kwargs(draft_model):
+    """
+    Параметры Llama для черновика (только для экземпляра из load_speculative_llm). llama_cpp при draft_model сам включает logits_all,
+    но буфер scores выделяет по переданному значению (n_batch строк) — без явного
+    logits_all=True промпт вместе с ответом длиннее n_batch не помещается в буфер.
+    """
+    if draft_model is None:
+        return {}
+    return {"draft_model": draft_model, "logits_all": True}
+
+
+def load_speculative_llm(model_path, mode, draft_model_path=None, **llama_kwargs):
+    """
+    Отдельный экземпляр Llama с черновиком для генерации Java-тестов или None ("off", нет llama_cpp).
+    Веса .gguf отображаются в память (mmap) и общие с основным экземпляром —
+    дополнительно расходуется память на контекст. Экземпляр видит только
+    Java-промпты, поэтому общий системный префикс переиспользуется из его KV-кэша.
+    """
+    draft_model = create_draft_model(mode, draft_model_path, n_ctx=llama_kwargs.get("n_ctx", 8192))
+    if draft_model is None:
+        return None
+    llm = Llama(model_path=model_path, **llama_kwargs, **speculative_llama_kwargs(draft_model))
+    attach_references(draft_model, llm)
+    return llm
+
+
+def attach_references(draft_model, llm):
+    """
+    После загрузки основной модели добавляет черновику справочный шаблон теста.
+    """
+    if isinstance(draft_model, TemplateLookupDecoding):
+        draft_model.add_fallback_template(llm)
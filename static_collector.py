@@ -0,0 +1,431 @@
+"""
+Сбор элементов страницы без браузера для страниц, отрисованных на сервере.
+
+Для многих внутренних страниц форма входа есть уже в исходном HTML, а
+агент всё равно запускал Chrome, чтобы снять поля и кнопки. Здесь
+страница загружается по HTTP и разбирается html.parser в записи того же
+формата, что и page_snapshot.take_page_snapshot: tag, text, visible,
+attributes, css, xpath. CSS и XPath строятся по разобранному дереву по
+тем же правилам, что и в скрипте снимка, и проверяются на уникальность.
+
+Статический результат используется, только если:
+- ответ — HTML с кодом 200 и страница не похожа на отрисованную JS
+  (пустой корневой контейнер SPA, нет интерактивных элементов при наличии скриптов);
+- LocatorRanker уверенно находит в нём все требуемые элементы.
+Иначе вызывающий код снимает страницу в браузере, как раньше.
+
+Поддерживаются только простые селекторы-теги (как в списках тегов агента).
+"""
+
+import logging
+import re
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import requests
+
+from locator_ranker import LocatorRanker
+from page_snapshot import DEFAULT_TAGS, SNAPSHOT_ATTRIBUTES
+
+logger = logging.getLogger(__name__)
+
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"
+}
+# Содержимое не отображается (noscript — в браузере с включённым JS)
+HIDDEN_CONTAINERS = {"head", "script", "style", "template", "noscript", "title"}
+# Открытый <p> закрывается этими тегами, как в браузере
+CLOSES_PARAGRAPH = {
+    "address", "article", "aside", "div", "dl", "fieldset", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hr", "main", "nav", "ol", "p", "pre", "section", "table", "ul"
+}
+# Корневые контейнеры SPA: пустой контейнер значит, что разметку строит JS
+SPA_ROOT_IDS = {"root", "app", "__next", "__nuxt", "svelte", "main-app"}
+INTERACTIVE_TAGS = {"input", "button", "a", "select", "textarea"}
+HIDDEN_STYLE = re.compile(r"(display\s*:\s*none|visibility\s*:\s*hidden)", re.IGNORECASE)
+CSS_IDENTIFIER = re.compile(r"^[A-Za-z_][\w-]*$")
+META_CHARSET = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?([\w-]+)", re.IGNORECASE)
+
+
+class DomNode:
+    """
+    Узел упрощённого DOM-дерева (также строится cdp_collector из DOMSnapshot).
+    """
+    __slots__ = ("tag", "attrs", "parent", "children", "texts")
+
+    def __init__(self, tag, attrs, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []
+        self.texts = []  # Текст и дочерние узлы по порядку, для innerText
+
+
+class _TreeBuilder(HTMLParser):
+    """
+    Строит упрощённое DOM-дерево с поправками браузера: html/body, tbody, незакрытые p/li/option.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = DomNode("#document", {}, None)
+        self.stack = [self.root]
+        self.scripts = 0
+
+    def handle_starttag(self, tag, attrs):
+        self._open(tag, attrs, void=tag in VOID_TAGS)
+
+    def handle_startendtag(self, tag, attrs):
+        self._open(tag, attrs, void=True)
+
+    def handle_endtag(self, tag):
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].tag == tag:
+                del self.stack[index:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].texts.append(data)
+
+    def _open(self, tag, attrs, void):
+        if tag == "p" or tag in CLOSES_PARAGRAPH:
+            self._close_open("p", stop_at={"div", "form", "section", "body"})
+        if tag in ("li", "option"):
+            self._close_open(tag, stop_at={"ul", "ol", "select", "datalist"})
+        if tag == "tr" and self.stack[-1].tag == "table":
+            # Браузер вставляет tbody между table и tr
+            self._push("tbody", {})
+        if tag == "script":
+            self.scripts += 1
+        current = self.stack[-1]
+        node = DomNode(tag, {name: value if value is not None else "" for name, value in attrs}, current)
+        current.children.append(node)
+        current.texts.append(node)
+        if not void:
+            self.stack.append(node)
+
+    def _close_open(self, tag, stop_at):
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].tag == tag:
+                del self.stack[index:]
+                return
+            if self.stack[index].tag in stop_at:
+                return
+
+    def _push(self, tag, attrs):
+        node = DomNode(tag, attrs, self.stack[-1])
+        self.stack[-1].children.append(node)
+        self.stack[-1].texts.append(node)
+        self.stack.append(node)
+
+
+def _normalize_tree(root):
+    """
+    Гарантирует корень html с body, как в DOM браузера (для абсолютных XPath).
+    """
+    html = next((child for child in root.children if child.tag == "html"), None)
+    if html is None:
+        html = DomNode("html", {}, root)
+        html.children, html.texts = root.children, root.texts
+        for child in html.children:
+            child.parent = html
+        root.children, root.texts = [html], [html]
+    if not any(child.tag == "body" for child in html.children):
+        body = DomNode("body", {}, html)
+        keep = [child for child in html.children if child.tag == "head"]
+        body.children = [child for child in html.children if child.tag != "head"]
+        body.texts = [item for item in html.texts if not isinstance(item, DomNode) or item.tag != "head"]
+        for child in body.children:
+            child.parent = body
+        html.children = keep + [body]
+        html.texts = keep + [body]
+    return html
+
+
+def _iter_nodes(node):
+    for child in node.children:
+        yield child
+        yield from _iter_nodes(child)
+
+
+def inner_text(node, cache=None):
+    """
+    Текст узла без скрытых контейнеров, пробелы схлопнуты (как innerText).
+    """
+    if node.tag in HIDDEN_CONTAINERS:
+        return ""
+    if cache is not None and id(node) in cache:
+        return cache[id(node)]
+    parts = []
+    for item in node.texts:
+        parts.append(inner_text(item, cache) if isinstance(item, DomNode) else item)
+    text = " ".join(" ".join(parts).split())
+    if cache is not None:
+        cache[id(node)] = text
+    return text
+
+
+def _hidden(node):
+    while node is not None and node.tag != "#document":
+        attrs = node.attrs
+        if node.tag in HIDDEN_CONTAINERS or "hidden" in attrs or HIDDEN_STYLE.search(attrs.get("style", "")):
+            return True
+        if node.tag == "input" and attrs.get("type", "").lower() == "hidden":
+            return True
+        if node.tag == "dialog" and "open" not in attrs:
+            return True
+        node = node.parent
+    return False
+
+
+def _position(node):
+    """
+    (номер среди соседей того же тега с 1, число таких соседей).
+    """
+    siblings = [child for child in node.parent.children if child.tag == node.tag] if node.parent else [node]
+    return siblings.index(node) + 1, len(siblings)
+
+
+def _nth_of_type(node):
+    """
+    Номер для :nth-of-type / [n] или 0, если соседей того же тега нет (как nthOfType в скрипте снимка).
+    """
+    index, total = _position(node)
+    return index if total > 1 else 0
+
+
+def _xpath_literal(value):
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return "concat('" + value.replace("'", "', \"'\", '") + "')"
+
+
+def _css_quote(value):
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class UniqueLocators:
+    """
+    Уникальные CSS и XPath элементов дерева — те же правила, что в SNAPSHOT_SCRIPT.
+    nodes — все элементы документа в порядке обхода.
+    """
+    def __init__(self, nodes):
+        self.by_tag = {}
+        self.attribute_counts = {}
+        for node in nodes:
+            self.by_tag.setdefault(node.tag, []).append(node)
+            for name in ("id", "name", "data-test", "data-testid"):
+                value = node.attrs.get(name)
+                if value:
+                    self.attribute_counts[(None, name, value)] = self.attribute_counts.get((None, name, value), 0) + 1
+                    key = (node.tag, name, value)
+                    self.attribute_counts[key] = self.attribute_counts.get(key, 0) + 1
+
+    def _unique_id(self, node):
+        element_id = node.attrs.get("id")
+        return bool(element_id) and self.attribute_counts.get((None, "id", element_id)) == 1
+
+    def _id_css(self, element_id):
+        return f"#{element_id}" if CSS_IDENTIFIER.match(element_id) else f"[id={_css_quote(element_id)}]"
+
+    def css(self, node):
+        if self._unique_id(node):
+            return self._id_css(node.attrs["id"])
+        for name in ("data-test", "data-testid", "name"):
+            value = node.attrs.get(name)
+            if value and self.attribute_counts.get((node.tag, name, value)) == 1:
+                return f"{node.tag}[{name}={_css_quote(value)}]"
+        steps = []
+        current = node
+        while current is not None and current.tag not in ("html", "#document"):
+            if current is not node and self._unique_id(current):
+                steps.insert(0, ("#id", current))
+                break
+            steps.insert(0, (current.tag, current))
+            if self._path_count(steps) == 1:
+                break
+            current = current.parent
+        return " > ".join(self._step_css(step) for step in steps)
+
+    def xpath(self, node):
+        if self._unique_id(node):
+            return f"//*[@id={_xpath_literal(node.attrs['id'])}]"
+        name = node.attrs.get("name")
+        if name and self.attribute_counts.get((node.tag, "name", name)) == 1:
+            return f"//{node.tag}[@name={_xpath_literal(name)}]"
+        parts = []
+        current = node
+        while current is not None and current.tag != "#document":
+            nth = _nth_of_type(current)
+            parts.insert(0, f"{current.tag}[{nth}]" if nth else current.tag)
+            current = current.parent
+        return "/" + "/".join(parts)
+
+    def _step_css(self, step):
+        kind, node = step
+        if kind == "#id":
+            return self._id_css(node.attrs["id"])
+        nth = _nth_of_type(node)
+        return f"{node.tag}:nth-of-type({nth})" if nth else node.tag
+
+    def _path_count(self, steps):
+        """
+        Число элементов документа, подходящих под цепочку "a > b:nth-of-type(n) > c".
+        """
+        def matches(candidate, step):
+            kind, node = step
+            if kind == "#id":
+                return candidate.attrs.get("id") == node.attrs["id"]
+            if candidate.tag != node.tag:
+                return False
+            nth = _nth_of_type(node)
+            return not nth or _position(candidate)[0] == nth
+
+        count = 0
+        for candidate in self.by_tag.get(steps[-1][1].tag, []):
+            current, ok = candidate, True
+            for step in reversed(steps):
+                if current is None or not matches(current, step):
+                    ok = False
+                    break
+                current = current.parent
+            count += ok
+        return count
+
+
+def parse_static_snapshot(html, base_url="", selectors=None):
+    """
+    Разбирает HTML в записи формата take_page_snapshot (только видимые элементы,
+    порядок — по селекторам, внутри селектора — порядок документа).
+    Возвращает (записи, признаки страницы для определения JS-отрисовки).
+    """
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    html_node = _normalize_tree(builder.root)
+    nodes = list(_iter_nodes(html_node))
+    nodes.insert(0, html_node)
+    locators = UniqueLocators(nodes)
+    texts = {}
+    records = []
+    for selector in list(selectors or DEFAULT_TAGS):
+        for node in locators.by_tag.get(selector, []):
+            if _hidden(node):
+                continue
+            attributes = {}
+            for name in SNAPSHOT_ATTRIBUTES:
+                if name in node.attrs:
+                    value = node.attrs[name]
+                    # Как Selenium get_attribute: href и src — абсолютные URL
+                    attributes[name] = urljoin(base_url, value) if name in ("href", "src") else value
+            records.append({
+                "selector": selector,
+                "tag": node.tag,
+                "text": inner_text(node, texts),
+                "visible": True,
+                "attributes": attributes,
+                "rect": None,
+                "css": locators.css(node),
+                "xpath": locators.xpath(node),
+            })
+    body = next((child for child in html_node.children if child.tag == "body"), html_node)
+    features = {
+        "scripts": builder.scripts,
+        "interactive": sum(1 for node in nodes if node.tag in INTERACTIVE_TAGS and not _hidden(node)),
+        "text_length": len(inner_text(body, texts)),
+        "empty_spa_root": any(
+            node.attrs.get("id") in SPA_ROOT_IDS and not node.children and not inner_text(node, texts) for node in nodes
+        ),
+    }
+    return records, features
+
+
+def decode_html(response):
+    """
+    Текст HTML-ответа. Без charset в Content-Type requests считает текст
+    ISO-8859-1, поэтому кодировка берётся из <meta charset>, затем UTF-8.
+    """
+    if "charset" in response.headers.get("Content-Type", "").lower():
+        return response.text
+    content = response.content
+    meta = META_CHARSET.search(content[:2048])
+    if meta:
+        try:
+            return content.decode(meta.group(1).decode("ascii"), errors="replace")
+        except LookupError:
+            pass
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content.decode(response.apparent_encoding or "utf-8", errors="replace")
+
+
+def looks_js_rendered(features):
+    """
+    Страница строится скриптами: пустой корневой контейнер SPA или скрипты без интерактивных элементов.
+    """
+    return features["empty_spa_root"] or (features["scripts"] > 0 and features["interactive"] == 0)
+
+
+class StaticPageCollector:
+    """
+    Загрузка страницы по HTTP и поиск требуемых элементов без браузера.
+    """
+    def __init__(self, ranker=None, timeout=5, selectors=None, session=None):
+        self.ranker = ranker or LocatorRanker()
+        self.timeout = timeout
+        self.selectors = selectors
+        self.session = session or requests.Session()
+        self.hits = 0
+        self.fallbacks = 0
+
+    def collect(self, url):
+        """
+        Записи элементов страницы или None, если страница не HTML или строится JS.
+        """
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=self.timeout, headers={"Accept": "text/html"})
+        except requests.RequestException as e:
+            logger.info(f"🌐 Static fetch failed for {url}: {e}")
+            return None
+        content_type = response.headers.get("Content-Type", "")
+        if response.status_code != 200 or "html" not in content_type.lower():
+            logger.info(f"🌐 Static fetch for {url}: HTTP {response.status_code}, {content_type or 'no content type'}")
+            return None
+        records, features = parse_static_snapshot(decode_html(response), response.url, self.selectors)
+        if looks_js_rendered(features):
+            logger.info(f"🌐 {url} looks JS-rendered ({features}), static snapshot skipped")
+            return None
+        logger.info(
+            f"🌐 Static snapshot: {len(records)} elements from {url} in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return records
+
+    def locate(self, url, required_elements):
+        """
+        (записи, локаторы) без браузера, если LocatorRanker уверенно нашёл все
+        требуемые элементы в статическом HTML, иначе None (нужен браузер).
+        Локаторы взяты из разобранного дерева и уникальны в нём: verification.source = "static".
+        """
+        records = self.collect(url)
+        if not records:
+            self.fallbacks += 1
+            return None
+        resolved, unresolved, _ = self.ranker.resolve(required_elements, records)
+        if unresolved:
+            self.fallbacks += 1
+            missing = [required_elements[index].get("name", "") for index in unresolved
+                       if isinstance(required_elements[index], dict)]
+            logger.info(f"🌐 Static HTML of {url} lacks {missing}, falling back to the browser")
+            return None
+        self.hits += 1
+        locators = []
+        for index in range(len(required_elements)):
+            entry = resolved[index]
+            entry["verification"] = {"count": 1, "ok": True, "source": "static"}
+            locators.append(entry)
+        logger.info(f"🌐 All {len(locators)} elements of {url} found in static HTML, browser skipped")
+        return records, locators
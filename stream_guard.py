@@ -0,0 +1,163 @@
+"""
+Контроль потоковой генерации Java-кода.
+
+generate_text раньше ждал до 8000 токенов одним блокирующим вызовом и
+только потом проверял код. JavaStreamGuard получает текст по мере
+генерации и решает, продолжать ли:
+
+- «complete»: тело верхнеуровневого класса сбалансировано, дальше идёт
+  не объявление Java (болтовня, ``` и т.п.) — генерация останавливается,
+  хвост отбрасывается;
+- «derailed»: вывод явно испорчен (одна и та же строка повторяется,
+  нет `class` за первые N токенов) — генерация прерывается, агент
+  использует резервный тест.
+
+Скобки внутри строк, символьных литералов и комментариев не учитываются.
+"""
+
+import re
+
+# После закрытия класса допускается продолжение только новым объявлением Java
+_JAVA_DECLARATION = re.compile(
+    r"^(public|protected|private|final|abstract|static|class|interface|enum|record|@|//|/\*)"
+)
+
+
+class JavaStreamGuard:
+    """
+    Пошаговая проверка потока токенов с Java-кодом.
+    """
+    def __init__(self, max_tokens_without_class=600, max_repeated_lines=4, lookahead_chars=24):
+        self.max_tokens_without_class = max_tokens_without_class
+        self.max_repeated_lines = max_repeated_lines
+        self.lookahead_chars = lookahead_chars
+        self.text = ""
+        self.tokens = 0
+        self.verdict = None      # None, "complete" или "derailed"
+        self.reason = ""
+        self._scanned = 0
+        self._depth = 0
+        self._mode = "code"      # code, string, char, line_comment, block_comment
+        self._escape = False
+        self._class_seen = False
+        self._balanced_at = None # Индекс после закрывающей скобки класса
+        self._line_start = 0
+        self._last_line = None
+        self._repeats = 0
+
+    # ------------------------------------------------------------------
+    def feed(self, chunk):
+        """
+        Добавляет очередной фрагмент. Возвращает verdict (None — продолжать).
+        """
+        if self.verdict:
+            return self.verdict
+        self.tokens += 1
+        self.text += chunk
+        self._scan()
+        if self.verdict:
+            return self.verdict
+
+        if not self._class_seen and self.tokens >= self.max_tokens_without_class:
+            return self._stop("derailed", f"no class declaration within {self.tokens} tokens")
+
+        if self._balanced_at is not None:
+            tail = self.text[self._balanced_at:].lstrip()
+            if tail and (len(tail) >= self.lookahead_chars or "\n" in tail):
+                if _JAVA_DECLARATION.match(tail):
+                    # Следующий верхнеуровневый класс — продолжаем
+                    self._balanced_at = None
+                else:
+                    return self._stop("complete", "class body closed, trailing text dropped")
+        return None
+
+    def result(self):
+        """
+        Итоговый текст: при завершённом классе — без хвоста после закрывающей скобки.
+        """
+        if self._balanced_at is not None:
+            return self.text[:self._balanced_at]
+        return self.text
+
+    # ------------------------------------------------------------------
+    def _stop(self, verdict, reason):
+        self.verdict = verdict
+        self.reason = reason
+        return verdict
+
+    def _scan(self):
+        text = self.text
+        i = self._scanned
+        while i < len(text):
+            ch = text[i]
+            nxt = text[i + 1] if i + 1 < len(text) else ""
+            if self._mode == "code":
+                if ch == '/' and nxt == '/':
+                    self._mode = "line_comment"
+                    i += 1
+                elif ch == '/' and nxt == '*':
+                    self._mode = "block_comment"
+                    i += 1
+                elif ch == '/' and not nxt:
+                    # Ждём следующий символ, чтобы отличить комментарий от деления
+                    break
+                elif ch == '"':
+                    self._mode = "string"
+                elif ch == "'":
+                    self._mode = "char"
+                elif ch == '{':
+                    self._depth += 1
+                    self._balanced_at = None
+                elif ch == '}':
+                    self._depth -= 1
+                    if self._depth <= 0 and self._class_seen:
+                        self._depth = 0
+                        self._balanced_at = i + 1
+                elif ch == 'c' and (i == 0 or not (text[i - 1].isalnum() or text[i - 1] == '_')):
+                    word = text[i:i + 6]
+                    if len(word) < 6 and "class".startswith(word[:5]):
+                        # Слово ещё не догенерировано целиком
+                        break
+                    if word[:5] == "class" and not (word[5].isalnum() or word[5] == '_'):
+                        self._class_seen = True
+            elif self._mode in ("string", "char"):
+                quote = '"' if self._mode == "string" else "'"
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == quote or ch == '\n':
+                    self._mode = "code"
+            elif self._mode == "line_comment":
+                if ch == '\n':
+                    self._mode = "code"
+            elif self._mode == "block_comment":
+                if ch == '*' and nxt == '/':
+                    self._mode = "code"
+                    i += 1
+                elif ch == '*' and not nxt:
+                    break
+            if ch == '\n' and self._check_line(text[self._line_start:i]):
+                return
+            if ch == '\n':
+                self._line_start = i + 1
+            i += 1
+        self._scanned = i
+
+    def _check_line(self, line):
+        """
+        Считает подряд идущие одинаковые строки. Возвращает True, если вывод зациклился.
+        """
+        line = line.strip()
+        # Пустые строки и строки из одних скобок повторяются в нормальном коде
+        if not line or not line.strip("{}();"):
+            return False
+        if line == self._last_line:
+            self._repeats += 1
+        else:
+            self._last_line = line
+            self._repeats = 1
+        if self._repeats >= self.max_repeated_lines:
+            self._stop("derailed", f"line repeated {self._repeats} times: {line[:60]}")
+            return True
+        return False
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки непрерывного батчинга (BatchedLlama).
+Вместо llama.cpp — модули llama_cpp и llama_cpp._internals с теми же
+классами (LlamaModel, LlamaContext, LlamaBatch, LlamaSampler). Словарь —
+символы, а «модель» отвечает на промпт «...Q:<вопрос>|» перевёрнутым
+вопросом, читая его из KV-кэша своей последовательности: неверные позиции
+или неочищенный кэш сразу дают неверный ответ.
+"""
+
+import sys
+from types import SimpleNamespace
+
+import batched_llama
+from batched_llama import BatchedLlama
+
+BOS = 1
+EOS = 2
+NL = ord("\n")
+
+
+class FakeModel:
+    def __init__(self, path_model, params, verbose=False):
+        self.vocab = "vocab"
+
+    def n_vocab(self):
+        return 0x10000
+
+    def token_eos(self):
+        return EOS
+
+    def token_nl(self):
+        return NL
+
+    def tokenize(self, text, add_bos=True, special=False):
+        return ([BOS] if add_bos else []) + [ord(ch) for ch in text.decode("utf-8")]
+
+    def detokenize(self, tokens, special=False):
+        return "".join(chr(token) for token in tokens).encode("utf-8")
+
+
+class FakeContext:
+    """KV-кэш — список токенов каждой последовательности; каждый decode записывается"""
+
+    def __init__(self, model, params, verbose=False):
+        self.kv = {}
+        self.decodes = []
+        self.fail_decode = False
+        self._logits = {}
+
+    def kv_cache_seq_rm(self, seq_id, p0, p1):
+        # Как и обёртка llama_cpp: ничего не возвращает
+        history = self.kv.setdefault(seq_id, [])
+        del history[max(p0, 0):]
+
+    def decode(self, llama_batch):
+        if self.fail_decode:
+            self.fail_decode = False
+            raise RuntimeError("llama_decode returned -1")
+        batch = llama_batch.batch
+        rows = []
+        for j in range(batch.n_tokens):
+            seq_id = batch.seq_id[j][0]
+            history = self.kv.setdefault(seq_id, [])
+            assert batch.pos[j] == len(history), f"position {batch.pos[j]} != {len(history)} in seq {seq_id}"
+            history.append(batch.token[j])
+            rows.append(seq_id)
+            if batch.logits[j]:
+                self._logits[j] = list(history)
+        self.decodes.append(rows)
+
+    def next_token(self, index):
+        text = "".join(chr(token) for token in self._logits[index] if token > EOS)
+        prompt, _, generated = text.partition("|")
+        answer = prompt.rpartition("Q:")[2][::-1]
+        return ord(answer[len(generated)]) if len(generated) < len(answer) else EOS
+
+
+class FakeBatch:
+    def __init__(self, n_tokens, embd, n_seq_max, verbose=False):
+        self.batch = SimpleNamespace(
+            n_tokens=0, token=[0] * n_tokens, pos=[0] * n_tokens,
+            seq_id=[[0] for _ in range(n_tokens)], n_seq_id=[0] * n_tokens, logits=[False] * n_tokens,
+        )
+
+    def reset(self):
+        self.batch.n_tokens = 0
+
+
+class FakeSampler:
+    """Сэмплер с сигнатурой add_penalties из llama-cpp-python 0.3.16"""
+
+    created = []
+    fail_on = None
+
+    def __init__(self):
+        self.steps = []
+        self.closed = False
+        FakeSampler.created.append(self)
+
+    def add_penalties(self, penalty_last_n, penalty_repeat, penalty_freq, penalty_present):
+        self.steps.append(("penalties", penalty_last_n))
+
+    def add_grammar(self, model, grammar):
+        self.steps.append(("grammar",))
+
+    def add_greedy(self):
+        self.steps.append(("greedy",))
+
+    def add_top_k(self, k):
+        if FakeSampler.fail_on == "top_k":
+            raise ValueError("bad top_k")
+        self.steps.append(("top_k", k))
+
+    def add_top_p(self, p, min_keep):
+        self.steps.append(("top_p", p))
+
+    def add_min_p(self, p, min_keep):
+        self.steps.append(("min_p", p))
+
+    def add_temp(self, temp):
+        self.steps.append(("temp", temp))
+
+    def add_dist(self, seed):
+        self.steps.append(("dist", seed))
+
+    def sample(self, ctx, index):
+        return ctx.next_token(index)
+
+    def close(self):
+        self.closed = True
+
+
+class LegacySampler(FakeSampler):
+    """Сэмплер с сигнатурой add_penalties ранних 0.3.x"""
+
+    def add_penalties(self, n_vocab, special_eos_id, linefeed_id, penalty_last_n, penalty_repeat,
+                      penalty_freq, penalty_present, penalize_nl, ignore_eos):
+        self.steps.append(("penalties", penalty_last_n, special_eos_id, linefeed_id))
+
+
+def install_fakes(sampler_class=FakeSampler):
+    batched_llama.llama_cpp = SimpleNamespace(
+        llama_model_default_params=SimpleNamespace,
+        llama_context_default_params=SimpleNamespace,
+        llama_vocab_is_eog=lambda vocab, token: token == EOS,
+        LLAMA_DEFAULT_SEED=0xFFFFFFFF,
+    )
+    batched_llama.llama_internals = SimpleNamespace(
+        LlamaModel=FakeModel, LlamaContext=FakeContext, LlamaBatch=FakeBatch, LlamaSampler=sampler_class,
+    )
+    batched_llama.set_verbose = lambda verbose: None
+    FakeSampler.created = []
+    FakeSampler.fail_on = None
+
+
+def submit_together(llm, prompts, **kwargs):
+    """Ставит запросы в очередь одновременно: цикл батчинга ждёт, пока условие захвачено"""
+    with llm._cond:
+        return [llm.submit(prompt, **kwargs) for prompt in prompts]
+
+
+def answers(requests):
+    return [request.wait(timeout=5)["choices"][0]["text"] for request in requests]
+
+
+def test_admission_and_interleaving():
+    """Два запроса декодируются общими батчами, третий подключается в освободившийся слот"""
+    print("🔧 Тестирование подключения и общего декодирования...")
+    install_fakes()
+    llm = BatchedLlama("model.gguf", n_ctx=256, n_parallel=2, n_batch=64)
+    try:
+        requests = submit_together(llm, ["Q:abcdefghij|", "Q:0123456789|", "Q:xyz|"], temperature=0)
+        result = answers(requests)
+        shared = [rows for rows in llm._ctx.decodes if len(rows) == 2 and len(set(rows)) == 2]
+        stats = llm.stats()
+        print(f"📊 Ответы: {result}, общих шагов декодирования: {len(shared)}, статистика: {stats}")
+        return (
+            result == ["jihgfedcba", "9876543210", "zyx"] and len(shared) >= 5 and
+            stats["max_active"] == 2 and stats["completed"] == 3 and stats["errors"] == 0 and
+            requests[2].started_at >= min(requests[0].finished_at, requests[1].finished_at) and
+            all(sampler.closed for sampler in FakeSampler.created) and
+            ("penalties", 64) in FakeSampler.created[0].steps and ("greedy",) in FakeSampler.created[0].steps
+        )
+    finally:
+        llm.close()
+
+
+def test_prefix_reuse():
+    """Общий префикс с прошлым промптом слота не вычисляется повторно"""
+    print("\n🔧 Тестирование повторного использования префикса...")
+    install_fakes()
+    llm = BatchedLlama("model.gguf", n_ctx=256, n_parallel=2, n_batch=64)
+    instructions = "Переверни строку после Q:. "
+    try:
+        first = answers([llm.submit(instructions + "Q:login|", temperature=0)])
+        prompt_tokens = len(llm._ctx.decodes[0])
+        second_request = llm.submit(instructions + "Q:password|", temperature=0)
+        second = answers([second_request])
+        stats = llm.stats()
+        reused = len(instructions) + 3
+        print(f"📊 Ответы: {first + second}, переиспользовано токенов: {stats['reused_prompt_tokens']}")
+        return (
+            first == ["nigol"] and second == ["drowssap"] and prompt_tokens == len(instructions) + 9 and
+            stats["reused_prompt_tokens"] == reused and
+            llm._ctx.decodes[len(first[0]) + 1] == [0] * (len(second_request.tokens) - reused)
+        )
+    finally:
+        llm.close()
+
+
+def test_errors_do_not_stop_loop():
+    """Ошибка сэмплера или decode проваливает запросы с ошибкой, цикл продолжает работу"""
+    print("\n🔧 Тестирование ошибок...")
+    install_fakes()
+    llm = BatchedLlama("model.gguf", n_ctx=256, n_parallel=2, n_batch=64)
+    try:
+        FakeSampler.fail_on = "top_k"
+        failed = submit_together(llm, ["Q:abc|", "Q:def|"], temperature=0.5)
+        greedy = llm.submit("Q:ghi|", temperature=0)
+        errors = []
+        for request in failed:
+            try:
+                request.wait(timeout=5)
+            except RuntimeError as e:
+                errors.append(str(e))
+        FakeSampler.fail_on = None
+        llm._ctx.fail_decode = True
+        broken = llm.submit("Q:jkl|", temperature=0)
+        try:
+            broken.wait(timeout=5)
+            decode_error = None
+        except RuntimeError as e:
+            decode_error = str(e)
+        after = answers([llm.submit("Q:mno|", temperature=0)])
+        print(f"📊 Ошибки: {errors}, decode: {decode_error}, после ошибок: {answers([greedy]) + after}")
+        return (
+            errors == ["bad top_k", "bad top_k"] and decode_error == "llama_decode returned -1" and
+            answers([greedy]) == ["ihg"] and after == ["onm"] and llm.stats()["errors"] == 3
+        )
+    finally:
+        llm.close()
+
+
+def test_legacy_penalties_signature():
+    """Ранняя сигнатура add_penalties получает словарь и служебные токены"""
+    print("\n🔧 Тестирование сигнатуры add_penalties...")
+    install_fakes(LegacySampler)
+    llm = BatchedLlama("model.gguf", n_ctx=256, n_parallel=1, n_batch=64)
+    try:
+        result = answers([llm.submit("Q:abc|")])
+        steps = FakeSampler.created[0].steps
+        print(f"📊 Ответ: {result}, шаги сэмплера: {steps}")
+        return result == ["cba"] and steps[0] == ("penalties", 64, EOS, NL) and ("top_k", 40) in steps
+    finally:
+        llm.close()
+
+
+def test_close_fails_waiting_requests():
+    """Закрытие движка завершает ожидающие запросы ошибкой, а не оставляет их висеть"""
+    print("\n🔧 Тестирование закрытия...")
+    install_fakes()
+    llm = BatchedLlama("model.gguf", n_ctx=256, n_parallel=1, n_batch=64)
+    with llm._cond:
+        requests = [llm.submit("Q:abc|"), llm.submit("Q:def|")]
+        llm._closed = True
+        llm._cond.notify()
+    llm._thread.join(timeout=5)
+    finished = [request.done.is_set() and request.error == "BatchedLlama closed" for request in requests]
+    print(f"📊 Завершены с ошибкой: {finished}, поток жив: {llm._thread.is_alive()}")
+    return all(finished) and not llm._thread.is_alive()
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование непрерывного батчинга")
+    print("=" * 50)
+
+    saved = (batched_llama.llama_cpp, batched_llama.llama_internals, batched_llama.set_verbose)
+    tests = [
+        ("Подключение и общее декодирование", test_admission_and_interleaving),
+        ("Повторное использование префикса", test_prefix_reuse),
+        ("Ошибки", test_errors_do_not_stop_loop),
+        ("Сигнатура add_penalties", test_legacy_penalties_signature),
+        ("Закрытие", test_close_fails_waiting_requests),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+    batched_llama.llama_cpp, batched_llama.llama_internals, batched_llama.set_verbose = saved
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
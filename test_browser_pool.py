@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки пула WebDriver-сессий (browser_pool).
+Вместо Chrome — фиктивный драйвер, проверку здоровья которого можно
+задержать или провалить.
+"""
+
+import sys
+import threading
+import time
+
+from browser_pool import WebDriverPool
+
+
+class FakeDriver:
+    """Драйвер: execute_script ждёт события hang (если задано) и отвечает, пока alive"""
+
+    def __init__(self):
+        self.alive = True
+        self.hang = None
+        self.quit_calls = 0
+        self.window_handles = ["main"]
+        self.switch_to = self
+
+    def window(self, handle):
+        pass
+
+    def execute_script(self, script, *args):
+        if self.hang is not None:
+            self.hang.wait(5)
+        if not self.alive:
+            raise RuntimeError("browser is gone")
+        return 1
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return {}
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class Factory:
+    def __init__(self):
+        self.drivers = []
+
+    def __call__(self):
+        driver = FakeDriver()
+        self.drivers.append(driver)
+        return driver
+
+
+def test_reuse():
+    """Возвращённая сессия выдаётся повторно без запуска нового браузера"""
+    print("🔧 Тестирование повторного использования...")
+    factory = Factory()
+    pool = WebDriverPool(driver_factory=factory, max_size=2)
+    with pool.session() as first:
+        pass
+    with pool.session() as second:
+        pass
+    print(f"📊 Статистика: {pool.stats}")
+    return first is second and len(factory.drivers) == 1 and pool.stats["created"] == 1 and pool.stats["reused"] == 1
+
+
+def test_unhealthy_replaced():
+    """Сессия, не прошедшая проверку, закрывается, вместо неё запускается новая"""
+    print("\n🔧 Тестирование замены сломанной сессии...")
+    factory = Factory()
+    pool = WebDriverPool(driver_factory=factory, max_size=1)
+    with pool.session() as first:
+        pass
+    first.alive = False
+    with pool.session() as second:
+        pass
+    print(f"📊 Статистика: {pool.stats}")
+    return (
+        second is not first and first.quit_calls == 1 and
+        pool.stats["failed_health_checks"] == 1 and pool.stats["created"] == 2
+    )
+
+
+def test_hung_health_check_does_not_block():
+    """Пока один воркер ждёт зависший браузер, другой получает сессию"""
+    print("\n🔧 Тестирование зависшей проверки здоровья...")
+    factory = Factory()
+    pool = WebDriverPool(driver_factory=factory, max_size=2)
+    with pool.session() as hung:
+        pass
+    hung.hang = threading.Event()
+    hung.alive = False
+    acquired = []
+    worker = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    worker.start()
+    time.sleep(0.2)
+
+    started = time.perf_counter()
+    other = pool.acquire(timeout=2)
+    waited = time.perf_counter() - started
+    hung.hang.set()
+    worker.join(timeout=5)
+    print(f"📊 Ожидание второго воркера: {waited:.2f} с, статистика: {pool.stats}")
+    ok = (
+        waited < 0.5 and other is not hung and len(acquired) == 1 and acquired[0] is not hung and
+        pool.stats["failed_health_checks"] == 1 and pool.stats["created"] == 3
+    )
+    pool.release(other)
+    pool.release(acquired[0])
+    return ok
+
+
+def test_max_size_timeout():
+    """Все max_size сессий заняты — acquire ждёт и завершается по таймауту"""
+    print("\n🔧 Тестирование ограничения размера пула...")
+    pool = WebDriverPool(driver_factory=Factory(), max_size=1)
+    driver = pool.acquire()
+    try:
+        pool.acquire(timeout=0.2)
+        ok = False
+    except TimeoutError:
+        ok = True
+    pool.release(driver)
+    again = pool.acquire(timeout=0.2)
+    print(f"📊 Статистика: {pool.stats}")
+    return ok and again is driver
+
+
+def test_recycled_counted():
+    """Перезапуски после max_uses подсчитываются точно при параллельной работе"""
+    print("\n🔧 Тестирование счётчика перезапусков...")
+    factory = Factory()
+    pool = WebDriverPool(driver_factory=factory, max_size=4, max_uses=1)
+
+    def worker():
+        for _ in range(25):
+            with pool.session():
+                pass
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    print(f"📊 Статистика: {pool.stats}, браузеров: {len(factory.drivers)}")
+    return pool.stats["recycled"] == 100 and pool.stats["created"] == 100 and all(d.quit_calls == 1 for d in factory.drivers)
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование пула WebDriver-сессий")
+    print("=" * 50)
+
+    tests = [
+        ("Повторное использование", test_reuse),
+        ("Замена сломанной сессии", test_unhealthy_replaced),
+        ("Зависшая проверка здоровья", test_hung_health_check_does_not_block),
+        ("Ограничение размера пула", test_max_size_timeout),
+        ("Счётчик перезапусков", test_recycled_counted),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки снимка страницы через CDP (cdp_collector).
+Вместо Chrome — драйвер, который отдаёт ответы Accessibility.getFullAXTree
+и DOMSnapshot.captureSnapshot, собранные из описания страницы.
+"""
+
+import sys
+
+from cdp_collector import capture_accessibility_snapshot
+from locator_ranker import LocatorRanker
+
+# (тег, атрибуты, раскладка [x, y, w, h] или None, роль и имя в дереве доступности или None, дети)
+LOGIN_PAGE = ("HTML", {}, [0, 0, 1280, 800], None, [
+    ("HEAD", {}, None, None, [("TITLE", {}, None, None, ["Swag Labs"])]),
+    ("BODY", {}, [0, 0, 1280, 800], None, [
+        ("FORM", {"id": "login-form"}, [0, 0, 400, 300], None, [
+            ("LABEL", {"for": "user-name"}, [0, 0, 100, 20], ("LabelText", ""), ["Имя пользователя"]),
+            ("INPUT", {"id": "user-name", "type": "text", "data-test": "username"}, [0, 20, 200, 30],
+             ("textbox", "Имя пользователя"), []),
+            ("INPUT", {"type": "password", "placeholder": "Password"}, [0, 60, 200, 30], ("textbox", "Password"), []),
+            ("DIV", {"class": "actions"}, [0, 100, 200, 40], None, [
+                ("INPUT", {"type": "submit", "value": "Login"}, [0, 100, 80, 30], ("button", "Login"), []),
+                ("::before", {}, [0, 100, 1, 1], None, []),
+            ]),
+            ("BUTTON", {"style": "display:none"}, None, None, ["Скрытая кнопка"]),
+        ]),
+        ("H3", {"data-test": "error"}, [0, 320, 400, 30], ("generic", "Epic sadface: Username is required"),
+         ["Epic sadface: Username is required"]),
+        ("DIV", {"class": "footer"}, [0, 700, 1280, 100], ("generic", ""), ["© 2024"]),
+        ("A", {"href": "/about"}, [0, 760, 60, 20], ("link", "About"), ["About"]),
+        ("SPAN", {"class": "logo"}, [0, 780, 60, 20], ("generic", ""), [], True),
+    ]),
+])
+
+LOGIN_ELEMENTS = [
+    {"name": "Поле ввода логина", "description": "имя пользователя"},
+    {"name": "Поле ввода пароля", "description": "пароль"},
+    {"name": "Кнопка Login", "description": "вход в систему"},
+]
+
+
+def build_cdp_responses(page, url="https://www.saucedemo.com/"):
+    """Ответы обеих команд CDP для дерева из описания (форматы Chrome DevTools Protocol)"""
+    strings = []
+    nodes = {"parentIndex": [], "nodeType": [], "nodeName": [], "nodeValue": [], "backendNodeId": [],
+             "attributes": [], "pseudoType": {"index": [], "value": []}, "isClickable": {"index": []}}
+    layout = {"nodeIndex": [], "bounds": []}
+    ax_nodes = [{"nodeId": "1", "ignored": False, "role": {"type": "role", "value": "RootWebArea"},
+                 "name": {"type": "computedString", "value": "Swag Labs"}, "backendDOMNodeId": 1}]
+
+    def string(value):
+        if value not in strings:
+            strings.append(value)
+        return strings.index(value)
+
+    def add(parent, node_type, name, value=-1, attributes=()):
+        index = len(nodes["parentIndex"])
+        nodes["parentIndex"].append(parent)
+        nodes["nodeType"].append(node_type)
+        nodes["nodeName"].append(string(name))
+        nodes["nodeValue"].append(value)
+        nodes["backendNodeId"].append(index + 1)
+        nodes["attributes"].append([string(item) for pair in attributes for item in pair])
+        return index
+
+    def walk(item, parent):
+        if isinstance(item, str):
+            add(parent, 3, "#text", string(item))
+            return
+        tag, attributes, bounds, ax, children = item[:5]
+        index = add(parent, 1, tag, attributes=attributes.items())
+        if tag.startswith("::"):
+            nodes["pseudoType"]["index"].append(index)
+            nodes["pseudoType"]["value"].append(string(tag[2:]))
+        if len(item) > 5 and item[5]:
+            nodes["isClickable"]["index"].append(index)
+        if bounds:
+            layout["nodeIndex"].append(index)
+            layout["bounds"].append(bounds)
+        ax_nodes.append({
+            "nodeId": str(index + 1), "ignored": ax is None, "backendDOMNodeId": index + 1,
+            "role": {"type": "role", "value": ax[0] if ax else "none"},
+            "name": {"type": "computedString", "value": ax[1] if ax else ""},
+        })
+        for child in children:
+            walk(child, index)
+
+    walk(page, add(-1, 9, "#document"))
+    dom = {"documents": [{"documentURL": string(url), "baseURL": string(url), "nodes": nodes, "layout": layout}],
+           "strings": strings}
+    return {"nodes": ax_nodes}, dom
+
+
+class CDPDriver:
+    """Драйвер, который отвечает на две команды CDP и считает вызовы"""
+
+    def __init__(self, page):
+        self.responses = dict(zip(
+            ("Accessibility.getFullAXTree", "DOMSnapshot.captureSnapshot"), build_cdp_responses(page)
+        ))
+        self.commands = []
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        self.commands.append(cmd)
+        return self.responses[cmd]
+
+
+def test_interactive_nodes():
+    """Интерактивные узлы с ролями, доступными именами и раскладкой за две команды"""
+    print("🔧 Тестирование снимка дерева доступности...")
+    driver = CDPDriver(LOGIN_PAGE)
+    records = capture_accessibility_snapshot(driver)
+    by_name = {record["accessible_name"] or record["css"]: record for record in records}
+    print(f"📊 Элементы: {[(r['ax_role'], r['accessible_name'], r['css']) for r in records]}")
+    return (
+        len(driver.commands) == 2 and
+        list(by_name) == ["Имя пользователя", "Password", "Login", "Epic sadface: Username is required", "About", "span"] and
+        [record["ax_role"] for record in records] == ["textbox", "textbox", "button", "generic", "link", "generic"] and
+        by_name["Имя пользователя"]["css"] == "#user-name" and
+        by_name["Password"]["css"] == "input:nth-of-type(2)" and
+        by_name["Password"]["xpath"] == "/html/body/form/input[2]" and
+        by_name["Login"]["rect"] == {"x": 0, "y": 100, "width": 80, "height": 30} and
+        by_name["About"]["attributes"]["href"] == "https://www.saucedemo.com/about" and
+        by_name["Epic sadface: Username is required"]["css"] == 'h3[data-test="error"]' and
+        "Скрытая кнопка" not in [record["text"] for record in records]
+    )
+
+
+def test_ranker_uses_accessibility():
+    """LocatorRanker берёт роль и подпись из дерева доступности"""
+    print("\n🔧 Тестирование выбора локаторов по снимку CDP...")
+    records = capture_accessibility_snapshot(CDPDriver(LOGIN_PAGE))
+    resolved, unresolved, _ = LocatorRanker().resolve(LOGIN_ELEMENTS, records)
+    locators = [resolved[index]["locator"]["value"] for index in sorted(resolved)]
+    print(f"📊 Локаторы: {locators}, не найдены: {unresolved}")
+    return not unresolved and locators == ["user-name", "input:nth-of-type(2)", "div > input"]
+
+
+def test_empty_document():
+    """Пустой ответ DOMSnapshot не ломает сборщик"""
+    print("\n🔧 Тестирование пустого ответа...")
+
+    class EmptyDriver:
+        def execute_cdp_cmd(self, cmd, cmd_args):
+            return {"nodes": []} if cmd.startswith("Accessibility") else {"documents": [], "strings": []}
+
+    records = capture_accessibility_snapshot(EmptyDriver())
+    print(f"📊 Элементы: {records}")
+    return records == []
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование снимка страницы через CDP")
+    print("=" * 50)
+
+    tests = [
+        ("Снимок дерева доступности", test_interactive_nodes),
+        ("Локаторы по снимку CDP", test_ranker_uses_accessibility),
+        ("Пустой ответ", test_empty_document),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки отбора элементов страницы для промпта (element_filter).
+"""
+
+import json
+import sys
+
+from element_filter import compact_element, elements_json, select_relevant_elements
+
+REQUIRED_ELEMENTS = [
+    {"name": "Поле ввода логина", "description": "имя пользователя"},
+    {"name": "Поле ввода пароля", "description": "пароль"},
+    {"name": "Кнопка Войти", "description": "отправка формы входа"},
+]
+
+# Шапка и меню страницы идут в DOM раньше формы входа
+NOISE = (
+    [{"tag": "div", "text": f"Новость дня номер {i}: " + "подробности " * 20, "id": None, "name": None} for i in range(30)] +
+    [{"tag": "span", "text": "", "id": None, "name": None}] * 10 +
+    [{"tag": "a", "text": "Каталог", "id": "catalog", "name": None}] * 3
+)
+FORM = [
+    {"tag": "input", "text": "", "id": "username", "name": "username"},
+    {"tag": "input", "text": "", "id": "password", "name": "password"},
+    {"tag": "button", "text": "Войти", "id": "login-button", "name": None},
+]
+
+
+def test_relevant_elements_kept():
+    """Нужные элементы из конца страницы попадают в промпт, в отличие от первых 20"""
+    print("🔧 Тестирование отбора по требуемым элементам...")
+    page = NOISE + FORM
+    selected = select_relevant_elements(REQUIRED_ELEMENTS, page, top_k=3)
+    ids = [element.get("id") for element in selected]
+    print(f"📊 Отобрано {len(selected)} из {len(page)}: {ids}")
+    head_ids = [element["id"] for element in page[:20]]
+    return (
+        {"username", "password", "login-button"} <= set(ids) and
+        "username" not in head_ids and
+        len(selected) <= 3 * len(REQUIRED_ELEMENTS) and
+        ids.index("username") < ids.index("password") < ids.index("login-button")
+    )
+
+
+def test_empty_and_duplicates_dropped():
+    """Пустые элементы и повторы не попадают в промпт, текст обрезан"""
+    print("\n🔧 Тестирование очистки элементов...")
+    selected = select_relevant_elements([{"name": "Ссылка Каталог", "description": ""}], NOISE, top_k=10)
+    catalog = [element for element in selected if element.get("id") == "catalog"]
+    empty = [element for element in selected if list(element) == ["tag"]]
+    news = compact_element(NOISE[0])
+    print(f"📊 Отобрано: {len(selected)}, ссылок Каталог: {len(catalog)}, пустых: {len(empty)}, новость: {news}")
+    return len(catalog) == 1 and not empty and "name" not in catalog[0] and len(news["text"]) == 80 and list(news) == ["tag", "text"]
+
+
+def test_compact_serialization():
+    """Компактный JSON короче прежнего json.dumps первых 20 элементов"""
+    print("\n🔧 Тестирование компактной сериализации...")
+    page = NOISE + FORM
+    old_prompt = json.dumps(page[:20], ensure_ascii=False)
+    new_prompt = elements_json(select_relevant_elements(REQUIRED_ELEMENTS, page))
+    print(f"📊 Было символов: {len(old_prompt)}, стало: {len(new_prompt)}")
+    return (
+        len(new_prompt) < len(old_prompt) / 4 and
+        compact_element({"tag": "a", "href": "/x", "url": "https://e.com"}, exclude=("url",)) == {"tag": "a", "href": "/x"}
+    )
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование отбора элементов для промпта")
+    print("=" * 50)
+
+    tests = [
+        ("Отбор по требуемым элементам", test_relevant_elements_kept),
+        ("Очистка элементов", test_empty_and_duplicates_dropped),
+        ("Компактная сериализация", test_compact_serialization),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
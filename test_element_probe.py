@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки поиска элементов без неявного ожидания (ElementProbe).
+Вместо браузера — драйвер, который запоминает неявное ожидание в момент
+каждого поиска и каждой проверки условия.
+"""
+
+import sys
+import time
+from types import SimpleNamespace
+
+from element_probe import ElementProbe
+
+
+class FakeElement:
+    def __init__(self, displayed=True, stale=False):
+        self.displayed = displayed
+        self.stale = stale
+
+    def is_displayed(self):
+        if self.stale:
+            raise RuntimeError("stale element reference")
+        return self.displayed
+
+
+class FakeDriver:
+    """Драйвер с неявным ожиданием implicit_wait; отвечает элементами из словаря page"""
+
+    def __init__(self, page, implicit_wait=10):
+        self.page = page
+        self.timeouts = SimpleNamespace(implicit_wait=implicit_wait)
+        self.implicit_history = []
+        self.seen_waits = []
+        self.ready_state = "complete"
+
+    def implicitly_wait(self, seconds):
+        self.implicit_history.append(seconds)
+        self.timeouts.implicit_wait = seconds
+
+    def find_elements(self, by, value):
+        self.seen_waits.append(self.timeouts.implicit_wait)
+        if value not in self.page:
+            raise RuntimeError(f"invalid selector: {value}")
+        return self.page[value]
+
+    def execute_script(self, script):
+        self.seen_waits.append(self.timeouts.implicit_wait)
+        return self.ready_state
+
+
+class NoTimeoutsDriver(FakeDriver):
+    """Драйвер, у которого неявное ожидание прочитать нельзя"""
+
+    @property
+    def timeouts(self):
+        raise RuntimeError("timeouts are not supported")
+
+    @timeouts.setter
+    def timeouts(self, value):
+        pass
+
+    def find_elements(self, by, value):
+        return self.page.get(value, [])
+
+
+def login_page():
+    return {
+        "input": [FakeElement(), FakeElement(displayed=False), FakeElement(stale=True)],
+        "button": [],
+    }
+
+
+def test_find_without_implicit_wait():
+    """Поиск идёт с нулевым неявным ожиданием, прежнее значение восстанавливается"""
+    print("🔧 Тестирование поиска без неявного ожидания...")
+    driver = FakeDriver(login_page())
+    probe = ElementProbe(driver)
+    inputs = probe.find_all("tag name", "input")
+    visible = probe.find_visible("tag name", "input")
+    missing = probe.find_all("tag name", "button")
+    broken = probe.find_all("xpath", "//*[")
+    stats = probe.stats()
+    print(f"📊 Неявное ожидание при поиске: {driver.seen_waits}, история: {driver.implicit_history}, статистика: {stats}")
+    return (
+        len(inputs) == 3 and visible == [inputs[0]] and missing == [] and broken == [] and
+        driver.seen_waits == [0, 0, 0, 0] and driver.timeouts.implicit_wait == 10 and
+        driver.implicit_history == [0, 10] * 4 and stats["calls"] == {"probe": 4} and stats["timeouts"] == 0
+    )
+
+
+def test_zero_or_unknown_implicit_wait():
+    """Нулевое или недоступное неявное ожидание не переключается лишними командами"""
+    print("\n🔧 Тестирование без переключения неявного ожидания...")
+    driver = FakeDriver(login_page(), implicit_wait=0)
+    found = ElementProbe(driver).find_visible("tag name", "input")
+    unknown = NoTimeoutsDriver(login_page())
+    unknown_found = ElementProbe(unknown).find_all("tag name", "input")
+    print(f"📊 История: {driver.implicit_history}, без timeouts: {unknown.implicit_history}")
+    return len(found) == 1 and driver.implicit_history == [] and len(unknown_found) == 3 and unknown.implicit_history == []
+
+
+def test_wait_accounting():
+    """Явные ожидания учитываются по меткам, таймаут возвращает None и считается"""
+    print("\n🔧 Тестирование учёта ожиданий...")
+    driver = FakeDriver(login_page())
+    probe = ElementProbe(driver, action_timeout=5)
+    ready = probe.wait_for_ready_state()
+    driver.ready_state = "loading"
+    started = time.perf_counter()
+    timed_out = probe.wait_for_ready_state(timeout=0.2)
+    elapsed = time.perf_counter() - started
+    found = probe.wait_until(lambda d: d.find_elements("tag name", "input"), label="element")
+    stats = probe.stats()
+    print(f"📊 Статистика: {stats}, время таймаута: {elapsed:.2f} с")
+    return (
+        ready is True and timed_out is None and len(found) == 3 and
+        stats["calls"] == {"page_load": 2, "element": 1} and stats["timeouts"] == 1 and
+        0.2 <= stats["by_label"]["page_load"] <= elapsed + 0.01 and
+        abs(probe.total_wait() - sum(probe.wait_seconds.values())) < 1e-9 and
+        set(driver.seen_waits) == {0} and driver.timeouts.implicit_wait == 10
+    )
+
+
+def test_reset_and_log_stats():
+    """Счётчики сбрасываются на новый сценарий, log_stats возвращает статистику"""
+    print("\n🔧 Тестирование сброса статистики...")
+    driver = FakeDriver(login_page())
+    driver.ready_state = "loading"
+    probe = ElementProbe(driver)
+    probe.wait_for_ready_state(timeout=0.1)
+    probe.find_all("tag name", "input")
+    before = probe.log_stats("login_scenario")
+    probe.reset_stats()
+    after = probe.log_stats()
+    print(f"📊 До сброса: {before}, после: {after}")
+    return (
+        before["timeouts"] == 1 and before["calls"] == {"page_load": 1, "probe": 1} and before["total_seconds"] >= 0.1 and
+        after == {"total_seconds": 0, "by_label": {}, "calls": {}, "timeouts": 0}
+    )
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование поиска элементов без неявного ожидания")
+    print("=" * 50)
+
+    tests = [
+        ("Поиск без неявного ожидания", test_find_without_implicit_wait),
+        ("Без переключения ожидания", test_zero_or_unknown_implicit_wait),
+        ("Учёт ожиданий", test_wait_accounting),
+        ("Сброс статистики", test_reset_and_log_stats),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
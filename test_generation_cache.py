@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки кэша результатов генерации (GenerationCache).
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from generation_cache import GenerationCache, normalize_scenario
+
+SCENARIO = "Открыть страницу https://www.saucedemo.com/\nВвести логин standard_user\nНажать кнопку Login"
+POM = ["junit-jupiter:5.10.0", "selenium-java:4.21.0"]
+
+
+def make_key(scenario=SCENARIO, pom=POM, model="model.gguf:100:1", template="2"):
+    return GenerationCache.make_key(scenario, pom, model, template)
+
+
+def age_entries(cache, keys):
+    """Выставляет время обращения записей по порядку keys: первая — самая старая"""
+    now = time.time()
+    for offset, key in enumerate(keys):
+        stamp = now - 100 + offset
+        os.utime(cache._path(key), (stamp, stamp))
+
+
+def test_key_normalization():
+    """Пробелы, переводы строк и пустые строки не меняют ключ; изменение любого входа меняет"""
+    print("🔧 Тестирование ключа кэша...")
+    reformatted = "\r\n  Открыть страницу   https://www.saucedemo.com/\r\n\r\nВвести логин\tstandard_user  \nНажать кнопку Login\n\n"
+    base = make_key()
+    variants = [
+        make_key(scenario=SCENARIO.replace("standard_user", "locked_out_user")),
+        make_key(pom=POM + ["webdrivermanager:5.8.0"]),
+        make_key(model="model.gguf:100:2"),
+        make_key(template="3"),
+    ]
+    print(f"📊 Нормализованный текст: {normalize_scenario(reformatted)!r}")
+    return make_key(scenario=reformatted) == base and len({base, *variants}) == 5
+
+
+def test_roundtrip_and_broken_entry():
+    """Запись читается обратно, битый файл удаляется и считается промахом"""
+    print("\n🔧 Тестирование чтения и записи...")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = GenerationCache(cache_dir=cache_dir)
+        key = make_key()
+        missing = cache.get(key)
+        cache.put(key, {"java_code": "public class LoginTest {}", "locators": []})
+        entry = cache.get(key)
+        broken = make_key(template="broken")
+        with open(cache._path(broken), "w", encoding="utf-8") as f:
+            f.write("{not json")
+        broken_entry = cache.get(broken)
+        stats = cache.stats()
+        print(f"📊 Статистика: {stats}")
+        return (
+            missing is None and entry == {"java_code": "public class LoginTest {}", "locators": []} and
+            broken_entry is None and not os.path.exists(cache._path(broken)) and
+            stats["hits"] == 1 and stats["misses"] == 2 and stats["entries"] == 1
+        )
+
+
+def test_lru_eviction_by_count():
+    """При превышении max_entries вытесняется запись, к которой дольше всего не обращались"""
+    print("\n🔧 Тестирование вытеснения по количеству...")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = GenerationCache(cache_dir=cache_dir, max_entries=2)
+        first, second, third = (make_key(template=str(i)) for i in range(3))
+        cache.put(first, {"n": 1})
+        cache.put(second, {"n": 2})
+        age_entries(cache, [first, second])
+        cache.get(first)
+        cache.put(third, {"n": 3})
+        kept = [key for key in (first, second, third) if os.path.exists(cache._path(key))]
+        print(f"📊 Осталось записей: {len(kept)}")
+        return kept == [first, third]
+
+
+def test_eviction_by_size():
+    """При превышении max_bytes вытесняются старые записи, новая остаётся"""
+    print("\n🔧 Тестирование вытеснения по размеру...")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = GenerationCache(cache_dir=cache_dir, max_bytes=2500)
+        keys = [make_key(template=str(i)) for i in range(4)]
+        for index, key in enumerate(keys):
+            cache.put(key, {"java_code": "x" * 1000})
+            age_entries(cache, [k for k in keys[:index + 1] if os.path.exists(cache._path(k))])
+        kept = [key for key in keys if os.path.exists(cache._path(key))]
+        stats = cache.stats()
+        print(f"📊 Статистика: {stats}")
+        return kept == keys[2:] and stats["bytes"] <= 2500
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование кэша генерации")
+    print("=" * 50)
+
+    tests = [
+        ("Ключ кэша", test_key_normalization),
+        ("Чтение и запись", test_roundtrip_and_broken_entry),
+        ("Вытеснение по количеству", test_lru_eviction_by_count),
+        ("Вытеснение по размеру", test_eviction_by_size),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки публикации тестов через Git Data API (GitHubBatchPublisher).
+Вместо GitHub — фиктивный репозиторий с тем же интерфейсом, что у PyGithub.
+"""
+
+import hashlib
+import sys
+
+from github import GithubException
+
+from aft_publisher import GitHubBatchPublisher, git_blob_sha
+
+LOGIN_TEST = "public class LoginTest {}\n"
+CART_TEST = "public class CartTest {}\n"
+
+
+class Obj:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class FakeRef:
+    def __init__(self, repo):
+        self.repo = repo
+        self.object = Obj(sha=repo.head)
+
+    def edit(self, sha):
+        self.repo.calls.append("edit_ref")
+        if self.repo.fail_edits:
+            self.repo.fail_edits -= 1
+            status, message = self.repo.edit_error
+            if status == 422:
+                # Ветку сдвинул параллельный коммит
+                self.repo.move_head({"README.md": "AFT\n"})
+            raise GithubException(status, {"message": message}, None)
+        self.repo.head = sha
+
+
+class FakeRepo:
+    """Ветка main: коммиты {sha: (дерево {путь: содержимое}, родитель)}"""
+
+    default_branch = "main"
+
+    def __init__(self, files):
+        self.commits = {}
+        self.head = None
+        self.calls = []
+        self.fail_edits = 0
+        self.edit_error = (422, "Update is not a fast forward")
+        self.move_head(files)
+
+    def move_head(self, files):
+        tree = dict(self.commits[self.head][0]) if self.head else {}
+        tree.update(files)
+        sha = hashlib.sha1(repr((sorted(tree.items()), self.head)).encode("utf-8")).hexdigest()
+        self.commits[sha] = (tree, self.head)
+        self.head = sha
+        return sha
+
+    def get_git_ref(self, ref):
+        self.calls.append("get_ref")
+        return FakeRef(self)
+
+    def get_git_commit(self, sha):
+        return Obj(sha=sha, tree=Obj(sha=sha))
+
+    def get_git_tree(self, sha, recursive=False):
+        self.calls.append("get_tree")
+        files = self.commits[sha][0]
+        elements = [Obj(path=path, sha=git_blob_sha(content), type="blob") for path, content in files.items()]
+        return Obj(sha=sha, tree=elements, raw_data={"truncated": False})
+
+    def create_git_tree(self, elements, base_tree):
+        self.calls.append("create_tree")
+        files = dict(self.commits[base_tree.sha][0])
+        for element in elements:
+            files[element._identity["path"]] = element._identity["content"]
+        return Obj(files=files, base=base_tree.sha)
+
+    def create_git_commit(self, message, tree, parents):
+        self.calls.append("create_commit")
+        sha = hashlib.sha1(repr((sorted(tree.files.items()), parents[0].sha)).encode("utf-8")).hexdigest()
+        self.commits[sha] = (tree.files, parents[0].sha)
+        return Obj(sha=sha, message=message)
+
+    def get_contents(self, path):
+        content = self.commits[self.head][0][path]
+        return Obj(decoded_content=content.encode("utf-8"), sha=git_blob_sha(content))
+
+    def files(self):
+        return self.commits[self.head][0]
+
+
+class FakeGithub:
+    def __init__(self, repo):
+        self.repo = repo
+
+    def get_repo(self, name):
+        return self.repo
+
+
+def make_publisher(files):
+    repo = FakeRepo(files)
+    return GitHubBatchPublisher(FakeGithub(repo), "org/AFT"), repo
+
+
+def test_single_commit():
+    """Изменённые файлы — одно дерево, один коммит, одно обновление ref; совпадающий файл пропущен"""
+    print("🔧 Тестирование пакетного коммита...")
+    publisher, repo = make_publisher({"pom.xml": "<project/>\n", "src/test/java/tests/LoginTest.java": LOGIN_TEST})
+    publisher.stage("LoginTest.java", LOGIN_TEST)
+    publisher.stage("CartTest.java", CART_TEST)
+    ok = publisher.flush()
+    commits = [call for call in repo.calls if call == "create_commit"]
+    print(f"📊 Вызовы: {repo.calls}, файлы: {sorted(repo.files())}")
+    return (
+        ok and repo.calls.count("create_tree") == 1 and len(commits) == 1 and repo.calls.count("edit_ref") == 1 and
+        repo.files()["src/test/java/tests/CartTest.java"] == CART_TEST and publisher.pending_count() == 0
+    )
+
+
+def test_conflict_retried():
+    """422 при обновлении ref — коммит пересобирается от нового head ветки"""
+    print("\n🔧 Тестирование конфликта при обновлении ref...")
+    publisher, repo = make_publisher({"pom.xml": "<project/>\n"})
+    repo.fail_edits = 1
+    publisher.stage("LoginTest.java", LOGIN_TEST)
+    ok = publisher.flush()
+    print(f"📊 Вызовы: {repo.calls}, файлы: {sorted(repo.files())}")
+    return (
+        ok and repo.calls.count("create_commit") == 2 and repo.calls.count("get_ref") == 2 and
+        "README.md" in repo.files() and "src/test/java/tests/LoginTest.java" in repo.files()
+    )
+
+
+def test_unchanged_no_commit():
+    """Если все файлы совпадают с веткой, коммит не создаётся"""
+    print("\n🔧 Тестирование пропуска неизменённых файлов...")
+    publisher, repo = make_publisher({"src/test/java/tests/LoginTest.java": LOGIN_TEST})
+    head = repo.head
+    publisher.stage("LoginTest.java", LOGIN_TEST)
+    ok = publisher.flush()
+    print(f"📊 Вызовы: {repo.calls}")
+    return ok and repo.head == head and "create_commit" not in repo.calls and publisher.pending_count() == 0
+
+
+def test_failure_keeps_pending():
+    """Ошибка API (не 422) — flush возвращает False, файлы остаются в очереди"""
+    print("\n🔧 Тестирование ошибки публикации...")
+    publisher, repo = make_publisher({"pom.xml": "<project/>\n"})
+    repo.fail_edits = 5
+    repo.edit_error = (403, "Resource not accessible by integration")
+    publisher.stage("LoginTest.java", LOGIN_TEST)
+    ok = publisher.flush()
+    print(f"📊 Результат: {ok}, в очереди: {publisher.pending_count()}, вызовы: {repo.calls}")
+    return not ok and publisher.pending_count() == 1 and repo.calls.count("edit_ref") == 1
+
+
+def test_read_file():
+    """Чтение pom.xml: содержимое и sha блоба"""
+    print("\n🔧 Тестирование чтения файла...")
+    publisher, _ = make_publisher({"pom.xml": "<project/>\n"})
+    content, sha = publisher.read_file("pom.xml")
+    print(f"📊 sha: {sha}")
+    return content == "<project/>\n" and sha == git_blob_sha("<project/>\n")
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование GitHubBatchPublisher")
+    print("=" * 50)
+
+    tests = [
+        ("Пакетный коммит", test_single_commit),
+        ("Конфликт ref", test_conflict_retried),
+        ("Пропуск неизменённых", test_unchanged_no_commit),
+        ("Ошибка публикации", test_failure_keeps_pending),
+        ("Чтение файла", test_read_file),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
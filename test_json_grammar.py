@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки JSON-ответов модели (json_grammar).
+Построение грамматики подменяется классом с тем же from_json_schema,
+что у llama_cpp.LlamaGrammar, — так проверяются все три варианта вызова.
+"""
+
+import json
+import sys
+
+import json_grammar
+from json_grammar import json_completion_kwargs, parse_json_output
+
+SCHEMA = {"type": "object", "properties": {"url": {"type": "string"}}, "required": ["url"]}
+STOP = ["\n\n"]
+
+
+class FakeGrammar:
+    """Грамматика, построенная из схемы; счётчик построений общий для класса"""
+
+    built = []
+
+    def __init__(self, schema):
+        self.schema = schema
+
+    @classmethod
+    def from_json_schema(cls, schema, verbose=False):
+        cls.built.append(schema)
+        return cls(schema)
+
+
+class BrokenGrammar:
+    @classmethod
+    def from_json_schema(cls, schema, verbose=False):
+        raise RuntimeError("grammar support is broken")
+
+
+class RemoteLlama:
+    is_remote = True
+
+
+def with_grammar(grammar_class, check):
+    """Выполняет check с подменённым LlamaGrammar и пустым кэшем грамматик"""
+    saved = json_grammar.LlamaGrammar
+    json_grammar.LlamaGrammar = grammar_class
+    json_grammar._grammars.clear()
+    try:
+        return check()
+    finally:
+        json_grammar.LlamaGrammar = saved
+        json_grammar._grammars.clear()
+
+
+def test_parse_json_output():
+    """Чистый JSON, JSON внутри текста и массив разбираются, мусор — ValueError"""
+    print("🔧 Тестирование разбора ответа...")
+    clean = parse_json_output('{"url": "https://www.saucedemo.com/"}')
+    chatter = parse_json_output('Вот результат:\n```json\n{"url": "https://e.com", "n": [1, 2]}\n```\nГотово.')
+    array = parse_json_output('Локаторы: [{"type": "By.ID", "value": "login-button"}]')
+    failures = 0
+    for text in ("", None, "Не могу ответить", '{"url": '):
+        try:
+            parse_json_output(text)
+        except ValueError:
+            failures += 1
+    print(f"📊 Разобрано: {clean}, {chatter}, {array}; ошибок: {failures}/4")
+    return (
+        clean == {"url": "https://www.saucedemo.com/"} and chatter == {"url": "https://e.com", "n": [1, 2]} and
+        array == [{"type": "By.ID", "value": "login-button"}] and failures == 4
+    )
+
+
+def test_remote_kwargs():
+    """Для сервера модели передаётся схема и stop, грамматика локально не строится"""
+    print("\n🔧 Тестирование параметров для сервера модели...")
+    FakeGrammar.built = []
+
+    def check():
+        remote = json_completion_kwargs(SCHEMA, stop=STOP, llm=RemoteLlama())
+        without_schema = json_completion_kwargs(None, llm=RemoteLlama())
+        print(f"📊 Параметры: {remote}, без схемы: {without_schema}")
+        return remote == {"json_schema": SCHEMA, "stop": STOP} and without_schema == {} and not FakeGrammar.built
+
+    return with_grammar(FakeGrammar, check)
+
+
+def test_local_grammar_kwargs():
+    """Локальная модель получает грамматику без stop; грамматика строится один раз на схему"""
+    print("\n🔧 Тестирование параметров с грамматикой...")
+    FakeGrammar.built = []
+
+    def check():
+        first = json_completion_kwargs(SCHEMA, stop=STOP)
+        second = json_completion_kwargs(dict(reversed(list(SCHEMA.items()))), stop=STOP)
+        print(f"📊 Параметры: {first}, построений: {len(FakeGrammar.built)}")
+        return (
+            list(first) == ["grammar"] and first["grammar"] is second["grammar"] and
+            json.loads(first["grammar"].schema) == SCHEMA and len(FakeGrammar.built) == 1
+        )
+
+    return with_grammar(FakeGrammar, check)
+
+
+def test_grammar_unavailable_kwargs():
+    """Без грамматик (старый llama_cpp или ошибка построения) остаются прежние stop"""
+    print("\n🔧 Тестирование параметров без грамматики...")
+    unavailable = with_grammar(None, lambda: (json_completion_kwargs(SCHEMA, stop=STOP), json_completion_kwargs(SCHEMA)))
+    broken = with_grammar(BrokenGrammar, lambda: json_completion_kwargs(SCHEMA, stop=STOP))
+    print(f"📊 Без llama_cpp: {unavailable}, ошибка построения: {broken}")
+    return unavailable == ({"stop": STOP}, {}) and broken == {"stop": STOP}
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование JSON-ответов модели")
+    print("=" * 50)
+
+    tests = [
+        ("Разбор ответа", test_parse_json_output),
+        ("Сервер модели", test_remote_kwargs),
+        ("Локальная грамматика", test_local_grammar_kwargs),
+        ("Без грамматики", test_grammar_unavailable_kwargs),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
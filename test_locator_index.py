@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки индекса локаторов (LocatorIndex, SQLite).
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from locator_index import LocatorIndex, element_key
+
+URL = "https://www.saucedemo.com/"
+
+
+def verified(name, locator_type, value, ok=True):
+    """Элемент с локатором после проверки на странице (формат агента)"""
+    return {
+        "required_element": {"name": name, "description": ""},
+        "locator": {"type": locator_type, "value": value, "reasoning": "unique id"},
+        "verification": {"count": 1, "visible": True, "interactable": True, "ok": ok},
+    }
+
+
+LOGIN_LOCATORS = [
+    verified("Поле ввода логина", "By.ID", "user-name"),
+    verified("Поле ввода пароля", "By.ID", "password"),
+    verified("Кнопка Войти", "By.ID", "login-button"),
+]
+
+
+def test_semantic_keys():
+    """Разные формулировки одного элемента дают один ключ"""
+    print("🔧 Тестирование смысловых ключей...")
+    keys = {element_key({"name": name}) for name in ("Поле ввода логина", "поле логина", "Поле для логина")}
+    print(f"📊 Ключи: {keys}")
+    return len(keys) == 1 and element_key({"name": "Кнопка Войти"}) != keys.pop()
+
+
+def test_lookup_after_record(path):
+    """Проверенные локаторы находятся в следующем запуске без браузера"""
+    print("\n🔧 Тестирование записи и поиска...")
+    index = LocatorIndex(path)
+    index.record(URL + "#login", LOGIN_LOCATORS, fingerprint="abc")
+    index.close()
+    index = LocatorIndex(path)
+    required = [{"name": "поле логина", "description": "логин"}, {"name": "Кнопка войти", "description": ""}]
+    found = index.lookup(URL, required)
+    missing = index.lookup(URL, required + [{"name": "Ссылка на корзину", "description": ""}])
+    print(f"📊 Найдено: {[entry['locator']['value'] for entry in found or []]}, с неизвестным элементом: {missing}")
+    return (
+        found is not None and [entry["locator"]["value"] for entry in found] == ["user-name", "login-button"] and
+        found[0]["required_element"]["name"] == "поле логина" and missing is None
+    )
+
+
+def test_failed_check_and_replacement(path):
+    """Неудачная проверка выключает запись, новый рабочий локатор её заменяет"""
+    print("\n🔧 Тестирование неудачной проверки...")
+    index = LocatorIndex(path)
+    index.record(URL, LOGIN_LOCATORS)
+    required = [{"name": "Кнопка Войти", "description": ""}]
+    index.record(URL, [verified("Кнопка Войти", "By.ID", "login-button", ok=False)])
+    after_failure = index.lookup(URL, required)
+    index.record(URL, [verified("Кнопка Войти", "By.cssSelector", "input[type='submit']")])
+    replaced = index.lookup(URL, required)
+    print(f"📊 После ошибки: {after_failure}, после замены: {replaced and replaced[0]['locator']}")
+    return after_failure is None and replaced[0]["locator"]["value"] == "input[type='submit']"
+
+
+def test_scheduled_reverification(path):
+    """Записи старше интервала выдаются пачкой по страницам и обновляются"""
+    print("\n🔧 Тестирование перепроверки по расписанию...")
+    index = LocatorIndex(path)
+    index.record(URL, LOGIN_LOCATORS)
+    index.record("https://hr.example.com/login", [verified("Поле email", "By.name", "email")])
+    time.sleep(0.05)
+    due = index.due_for_verification(0.01)
+    entries = due.get(URL, [])
+    # Локатор пароля перестал быть уникальным, остальные на месте
+    results = [{"unique": entry["locator_value"] != "password", "visible": True} for entry in entries]
+    index.update_verification(URL, entries, results, fingerprint="def")
+    still_due = index.due_for_verification(0.01)
+    lookup = index.lookup(URL, [{"name": "Поле ввода пароля", "description": ""}])
+    print(f"📊 Страниц к проверке: {len(due)}, после проверки: {list(still_due)}, пароль: {lookup}")
+    return len(due) == 2 and len(entries) == 3 and URL not in still_due and lookup is None
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование индекса локаторов")
+    print("=" * 50)
+
+    tests = [
+        ("Смысловые ключи", lambda path: test_semantic_keys()),
+        ("Запись и поиск", test_lookup_after_record),
+        ("Неудачная проверка", test_failed_check_and_replacement),
+        ("Перепроверка", test_scheduled_reverification),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                if test_func(os.path.join(tmp_dir, "locator_index.sqlite3")):
+                    print(f"✅ {test_name} - ПРОЙДЕН")
+                    passed += 1
+                else:
+                    print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки локального выбора локаторов (LocatorRanker).
+Работает на записанных снимках страниц — без браузера и LLM.
+"""
+
+import sys
+
+from locator_ranker import LocatorRanker, tokenize
+
+
+def record(tag, text="", css=None, xpath=None, **attributes):
+    """Запись в формате page_snapshot.take_page_snapshot"""
+    attributes = {key.replace("_", "-"): value for key, value in attributes.items()}
+    return {
+        "selector": tag, "tag": tag, "text": text, "visible": True, "attributes": attributes,
+        "rect": {"x": 0, "y": 0, "width": 100, "height": 20},
+        "css": css or tag, "xpath": xpath or f"//{tag}",
+    }
+
+
+# Страница входа saucedemo.com (английские атрибуты)
+SAUCEDEMO_LOGIN = [
+    record("input", id="user-name", name="user-name", placeholder="Username", type="text", data_test="username"),
+    record("input", id="password", name="password", placeholder="Password", type="password", data_test="password"),
+    record("input", id="login-button", name="login-button", type="submit", value="Login", data_test="login-button"),
+    record("div", "Swag Labs", css="div.login_logo", **{"class": "login_logo"}),
+    record("div", "Accepted usernames are:\nstandard_user\nlocked_out_user", css="#login_credentials", id="login_credentials"),
+]
+
+# Русская страница: подписи label, кнопки без id, несколько одинаковых кнопок
+RU_SHOP = [
+    record("label", "Электронная почта", **{"for": "f-email"}),
+    record("input", id="f-email", type="email", css="#f-email"),
+    record("label", "Пароль", **{"for": "f-pass"}),
+    record("input", id="f-pass", type="password", css="#f-pass"),
+    record("button", "Войти", css="form > button:nth-of-type(1)", type="submit"),
+    record("a", "Корзина (2)", css="#cart-link", id="cart-link", href="https://example.com/cart"),
+    record("input", name="q", type="search", placeholder="Поиск товаров", css="input[name=\"q\"]"),
+    record("button", "В корзину", css="div.card:nth-of-type(1) > button"),
+    record("button", "В корзину", css="div.card:nth-of-type(2) > button"),
+    record("div", "Популярные товары", css="div.title"),
+]
+
+
+def locator(ranker, name, snapshot, description=""):
+    result = ranker.best_locator({"name": name, "description": description}, snapshot)
+    print(f"   {name}: {result['locator']['type']} {result['locator']['value']} "
+          f"(уверенность {result['confidence']})" if result else f"   {name}: нет кандидатов")
+    return result
+
+
+def test_tokenize():
+    """Разбиение camelCase/kebab-case и основы русских слов"""
+    print("🔧 Тестирование нормализации слов...")
+    cases = {
+        "loginButton": ["login", "button"],
+        "user-name": ["user", "name"],
+        "Поле для ввода пароля": ["пол", "парол"],
+    }
+    ok = True
+    for value, expected in cases.items():
+        words = tokenize(value)
+        print(f"   {value!r} -> {words}")
+        ok = ok and words == expected
+    return ok
+
+
+def test_english_attributes_with_russian_names():
+    """Русские названия элементов находят английские id/placeholder saucedemo"""
+    print("\n🔧 Тестирование saucedemo (RU -> EN)...")
+    ranker = LocatorRanker()
+    username = locator(ranker, "Поле ввода логина", SAUCEDEMO_LOGIN)
+    password = locator(ranker, "Поле ввода пароля", SAUCEDEMO_LOGIN)
+    button = locator(ranker, "Кнопка Войти", SAUCEDEMO_LOGIN, "Кнопка для входа в систему")
+    return (
+        username["locator"] == dict(username["locator"], type="By.ID", value="user-name") and
+        password["locator"]["value"] == "password" and
+        button["locator"]["value"] == "login-button" and
+        min(username["confidence"], password["confidence"], button["confidence"]) >= ranker.threshold
+    )
+
+
+def test_labels_roles_and_css_fallback():
+    """Подписи label, роль кнопки и CSS-локатор для элемента без id"""
+    print("\n🔧 Тестирование русской страницы...")
+    ranker = LocatorRanker()
+    email = locator(ranker, "Поле email", RU_SHOP, "Поле для ввода электронной почты")
+    submit = locator(ranker, "Кнопка Войти", RU_SHOP)
+    search = locator(ranker, "Поле поиска", RU_SHOP)
+    cart = locator(ranker, "Ссылка на корзину", RU_SHOP)
+    return (
+        email["locator"]["value"] == "f-email" and
+        submit["locator"] == dict(submit["locator"], type="By.cssSelector", value="form > button:nth-of-type(1)") and
+        search["locator"] == dict(search["locator"], type="By.name", value="q") and
+        cart["locator"]["value"] == "cart-link" and
+        min(email["confidence"], submit["confidence"], search["confidence"], cart["confidence"]) >= ranker.threshold
+    )
+
+
+def test_ambiguous_and_missing_go_to_llm():
+    """Неоднозначные и отсутствующие элементы остаются для LLM"""
+    print("\n🔧 Тестирование порога уверенности...")
+    ranker = LocatorRanker()
+    required = [
+        {"name": "Кнопка В корзину", "description": "Добавить товар в корзину"},
+        {"name": "Поле ввода даты рождения", "description": ""},
+        {"name": "Кнопка Войти", "description": ""},
+    ]
+    resolved, unresolved, guesses = ranker.resolve(required, RU_SHOP)
+    print(f"📊 Локально: {sorted(resolved)}, для LLM: {unresolved}, кандидаты: {sorted(guesses)}")
+    return sorted(resolved) == [2] and unresolved == [0, 1] and 0 in guesses
+
+
+def test_llm_locators_matched_by_name():
+    """Ответ LLM сопоставляется по имени элемента; пропущенный моделью элемент берётся у ранжировщика"""
+    print("\n🔧 Тестирование сопоставления ответа LLM...")
+    from agent_v024_interface import GGUFModelClient
+
+    required = [
+        {"name": "Кнопка В корзину", "description": "Добавить товар в корзину"},
+        {"name": "Поле ввода даты рождения", "description": ""},
+        {"name": "Кнопка Войти", "description": ""},
+    ]
+    birth = {"required_element": {"name": "поле ввода  даты рождения", "description": ""},
+             "locator": {"type": "By.ID", "value": "birth-date", "reasoning": "id"}}
+    cart = {"required_element": {"name": "Кнопка В корзину", "description": ""},
+            "locator": {"type": "By.cssSelector", "value": "div.card:nth-of-type(1) > button", "reasoning": "css"}}
+
+    class Client:
+        locator_ranker = LocatorRanker()
+
+        def __init__(self, answer):
+            self.answer = answer
+
+        def generate_locators_llm(self, scenario_elements, page_elements):
+            return self.answer
+
+    # Модель переставила элементы, затем пропустила один
+    swapped = GGUFModelClient.generate_locators(Client([birth, cart]), required, [], RU_SHOP)
+    omitted = GGUFModelClient.generate_locators(Client([birth]), required, [], RU_SHOP)
+    names = [entry["required_element"]["name"] for entry in omitted]
+    print(f"📊 Переставлены: {[e['locator']['value'] for e in swapped]}, пропущен: {names}")
+    return (
+        swapped[0] is cart and swapped[1] is birth and swapped[2]["locator"]["value"] == "form > button:nth-of-type(1)" and
+        len(omitted) == 3 and omitted[1] is birth and omitted[0] is not cart and
+        omitted[0]["required_element"]["name"] == "Кнопка В корзину"
+    )
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование LocatorRanker")
+    print("=" * 50)
+
+    tests = [
+        ("Нормализация слов", test_tokenize),
+        ("Saucedemo RU -> EN", test_english_attributes_with_russian_names),
+        ("Подписи, роли, CSS", test_labels_roles_and_css_fallback),
+        ("Порог уверенности", test_ambiguous_and_missing_go_to_llm),
+        ("Сопоставление ответа LLM", test_llm_locators_matched_by_name),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
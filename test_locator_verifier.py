@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки выбора локаторов (locator_verifier).
+Вместо браузера — драйвер с заранее записанными ответами скрипта проверки.
+"""
+
+import json
+import sys
+
+from locator_verifier import VERIFY_SCRIPT, choose_locators, normalize_locator_type, verify_locators
+
+# Ответ скрипта для локатора (по значению): число совпадений, видимость, доступность
+PAGE = {
+    "user-name": {"count": 1, "visible": True, "interactable": True},
+    ".btn": {"count": 3, "visible": True, "interactable": True},
+    "#login-button": {"count": 1, "visible": True, "interactable": True},
+    "#overlayed": {"count": 1, "visible": True, "interactable": False},
+    "//div[@id='hidden']": {"count": 1, "visible": False, "interactable": False},
+    "a[": {"count": 0, "error": "is not a valid selector"},
+}
+
+
+class RecordedDriver:
+    """Драйвер, который отвечает на VERIFY_SCRIPT по словарю PAGE и считает вызовы"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def execute_script(self, script, candidates):
+        assert script == VERIFY_SCRIPT
+        self.calls += 1
+        return json.dumps([PAGE.get(candidate["value"], {"count": 0}) for candidate in candidates])
+
+
+def test_normalize_types():
+    """Все написания типов локаторов в проекте"""
+    print("🔧 Тестирование типов локаторов...")
+    cases = {
+        "By.ID": "id", "ID": "id", "By.cssSelector": "css", "CSS": "css", "css selector": "css",
+        "By.CSS_SELECTOR": "css", "By.name": "name", "XPATH": "xpath", "By.linkText": "link_text",
+        "LINK_TEXT": "link_text", "By.className": "class_name", "text": None,
+    }
+    wrong = {value: normalize_locator_type(value) for value, expected in cases.items()
+             if normalize_locator_type(value) != expected}
+    print(f"📊 Несовпадения: {wrong}")
+    return not wrong
+
+
+def test_single_script_for_all_elements():
+    """Все кандидаты всех элементов проверяются одним вызовом execute_script"""
+    print("\n🔧 Тестирование выбора кандидатов...")
+    driver = RecordedDriver()
+    groups = [
+        [{"type": "By.ID", "value": "user-name"}],
+        [{"type": "By.cssSelector", "value": ".btn"}, {"type": "By.cssSelector", "value": "#login-button"}],
+        [{"type": "By.cssSelector", "value": "a["}, {"type": "By.cssSelector", "value": "#overlayed"}],
+        [{"type": "By.xpath", "value": "//div[@id='hidden']"}, {"type": "By.ID", "value": "missing"}],
+    ]
+    chosen = choose_locators(driver, groups)
+    values = [best["value"] if best else None for best, _ in chosen]
+    print(f"📊 Выбрано: {values}, вызовов скрипта: {driver.calls}")
+    invalid = chosen[2][1][0]
+    return (
+        values == ["user-name", "#login-button", "#overlayed", None] and
+        driver.calls == 1 and
+        invalid["error"] and not invalid["unique"]
+    )
+
+
+def test_unsupported_type_not_sent():
+    """Неизвестный тип локатора помечается ошибкой без запроса в браузер"""
+    print("\n🔧 Тестирование неизвестного типа...")
+    driver = RecordedDriver()
+    results = verify_locators(driver, [{"type": "By.text", "value": "Войти"}])
+    print(f"📊 Результат: {results}, вызовов скрипта: {driver.calls}")
+    return driver.calls == 0 and results[0]["error"] and results[0]["count"] == 0
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование проверки локаторов")
+    print("=" * 50)
+
+    tests = [
+        ("Типы локаторов", test_normalize_types),
+        ("Один скрипт на страницу", test_single_script_for_all_elements),
+        ("Неизвестный тип", test_unsupported_type_not_sent),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
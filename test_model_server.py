@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки сервера модели.
+Вместо GGUF-модели сервер использует фиктивную модель — llama.cpp и файл модели не нужны.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import model_server
+from json_grammar import json_completion_kwargs
+from model_server import ModelServer, RemoteLlama, create_llm
+
+JAVA_TEXT = "public class LoginTest {\n}\n"
+
+
+class FakeLlama:
+    """Фиктивная модель: считает загрузки, выгрузки и вызовы, поток отдаёт по символу"""
+    loads = 0
+    closes = 0
+
+    def __init__(self, model_path, **kwargs):
+        FakeLlama.loads += 1
+        self.calls = 0
+
+    def close(self):
+        FakeLlama.closes += 1
+
+    def __call__(self, prompt, stream=False, grammar=None, **kwargs):
+        self.calls += 1
+        text = '{"url": "https://example.com"}' if grammar is not None else JAVA_TEXT
+        if not stream:
+            return {"choices": [{"text": text}], "params": sorted(kwargs)}
+
+        def chunks():
+            for ch in text:
+                time.sleep(0.01)
+                yield {"choices": [{"text": ch}]}
+        return chunks()
+
+
+def test_single_load_for_all_clients(llm_a, llm_b):
+    """Два клиента одной модели используют одну загрузку"""
+    print("🔧 Тестирование общей модели...")
+    results = []
+    threads = [
+        threading.Thread(target=lambda llm=llm: results.append(llm("prompt", max_tokens=8)["choices"][0]["text"]))
+        for llm in (llm_a, llm_b, llm_a, llm_b)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"📊 Ответов: {len(results)}, загрузок модели: {FakeLlama.loads}")
+    return len(results) == 4 and all(text == JAVA_TEXT for text in results) and FakeLlama.loads == 1
+
+
+def test_json_schema_forwarded(llm):
+    """JSON-схема передаётся серверу, stop отбрасывается при построенной грамматике"""
+    print("\n🔧 Тестирование JSON-схемы...")
+    kwargs = json_completion_kwargs({"type": "object"}, stop=["\n\n"], llm=llm)
+    response = llm("prompt", max_tokens=8, **kwargs)
+    print(f"📊 Параметры запроса: {sorted(kwargs)}, ответ: {response['choices'][0]['text']}")
+    if "json_schema" not in kwargs:
+        return False
+    # Грамматика строится, только если llama_cpp поддерживает LlamaGrammar
+    from json_grammar import json_grammar
+    if json_grammar({"type": "object"}) is None:
+        return "stop" in response["params"]
+    return response["choices"][0]["text"].startswith("{") and "stop" not in response["params"]
+
+
+def test_stream_close_cancels(llm, server):
+    """Закрытие потока на клиенте останавливает генерацию на сервере"""
+    print("\n🔧 Тестирование потоковой генерации...")
+    stream = llm("prompt", stream=True, max_tokens=64)
+    text = ""
+    for chunk in stream:
+        text += chunk["choices"][0]["text"]
+        if len(text) >= 6:
+            break
+    stream.close()
+    time.sleep(0.5)
+    stats = next(iter(server.health()["models"].values()))
+    print(f"📊 Получено: {text!r}, статистика: {stats}")
+    return text == JAVA_TEXT[:6] and stats["cancelled"] == 1
+
+
+def test_create_llm_uses_server(url, model_path):
+    """create_llm возвращает RemoteLlama при заданном MODEL_SERVER_URL"""
+    print("\n🔧 Тестирование create_llm...")
+    os.environ["MODEL_SERVER_URL"] = url
+    try:
+        llm = create_llm(model_path, n_ctx=4096)
+    finally:
+        del os.environ["MODEL_SERVER_URL"]
+    print(f"📊 Клиент: {type(llm).__name__}")
+    return isinstance(llm, RemoteLlama) and llm.base_url == url
+
+
+def test_other_model_unloads_previous(url, server, model_path):
+    """Запрос к другому файлу модели выгружает прежнюю, настройки сервера видны в /health"""
+    print("\n🔧 Тестирование выгрузки прежней модели...")
+    other_path = os.path.join(os.path.dirname(model_path), "other.gguf")
+    open(other_path, "wb").close()
+    response = RemoteLlama(url, other_path)("prompt", max_tokens=8)
+    time.sleep(0.3)
+    health = server.health()
+    print(f"📊 Модели: {list(health['models'])}, выгрузок: {FakeLlama.closes}, speculative: {health['speculative']}")
+    return (
+        response["choices"][0]["text"] == JAVA_TEXT and
+        list(health["models"]) == [os.path.abspath(other_path)] and
+        FakeLlama.closes == 1 and health["speculative"] == "off" and health["parallel"] == 1
+    )
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование сервера модели")
+    print("=" * 50)
+
+    model_server.Llama = FakeLlama
+    model_path = os.path.join(tempfile.mkdtemp(), "model.gguf")
+    open(model_path, "wb").close()
+
+    server = ModelServer(host="127.0.0.1", port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    while server._server is None:
+        time.sleep(0.05)
+    url = f"http://127.0.0.1:{server.port}"
+    llm_a = RemoteLlama(url, model_path)
+    llm_b = RemoteLlama(url, model_path)
+
+    tests = [
+        ("Общая модель", lambda: test_single_load_for_all_clients(llm_a, llm_b)),
+        ("JSON-схема", lambda: test_json_schema_forwarded(llm_a)),
+        ("Отмена потока", lambda: test_stream_close_cancels(llm_b, server)),
+        ("create_llm", lambda: test_create_llm_uses_server(url, model_path)),
+        ("Выгрузка прежней модели", lambda: test_other_model_unloads_previous(url, server, model_path)),
+    ]
+
+    passed = 0
+    total = len(tests)
+    try:
+        for test_name, test_func in tests:
+            try:
+                if test_func():
+                    print(f"✅ {test_name} - ПРОЙДЕН")
+                    passed += 1
+                else:
+                    print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+            except Exception as e:
+                print(f"❌ {test_name} - ОШИБКА: {e}")
+    finally:
+        server.shutdown()
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки кэша снимков страниц (PageSnapshotCache).
+Вместо браузера — драйвер, который возвращает заданную структуру DOM.
+"""
+
+import sys
+import tempfile
+import time
+
+from page_cache import FINGERPRINT_SCRIPT, PageSnapshotCache
+
+
+class FakeDriver:
+    """Драйвер с текущим URL и структурой интерактивных элементов"""
+
+    def __init__(self, url, structure):
+        self.current_url = url
+        self.structure = structure
+
+    def execute_script(self, script):
+        assert script == FINGERPRINT_SCRIPT
+        return self.structure
+
+
+class Collector:
+    """Полный снимок страницы: считает, сколько раз страницу снимали"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, driver):
+        self.calls += 1
+        return [{"tag": "input", "attributes": {"id": "user-name"}, "structure": driver.structure}]
+
+
+LOGIN = "input|user-name|user-name|text||username\ninput|password|password|password||password"
+
+
+def test_repeated_page_hits_cache(cache_dir):
+    """Вторая страница с тем же отпечатком берётся из кэша"""
+    print("🔧 Тестирование повторной страницы...")
+    cache = PageSnapshotCache(cache_dir=cache_dir)
+    collect = Collector()
+    first = cache.snapshot(FakeDriver("https://www.saucedemo.com/", LOGIN), collect, variant="agent")
+    second = cache.snapshot(FakeDriver("https://www.saucedemo.com/#top", LOGIN), collect, variant="agent")
+    second[0]["tag"] = "changed"
+    third = cache.snapshot(FakeDriver("https://www.saucedemo.com/", LOGIN), collect, variant="agent")
+    print(f"📊 Снимков: {collect.calls}, статистика: {cache.stats()}")
+    return collect.calls == 1 and first == third and cache.stats()["hits"] == 2
+
+
+def test_fingerprint_change_invalidates(cache_dir):
+    """Изменение структуры DOM заставляет снять страницу заново"""
+    print("\n🔧 Тестирование изменения отпечатка...")
+    cache = PageSnapshotCache(cache_dir=cache_dir)
+    collect = Collector()
+    cache.snapshot(FakeDriver("https://hr.example.com/login", LOGIN), collect)
+    changed = LOGIN + "\nbutton|login-button||submit||"
+    snapshot = cache.snapshot(FakeDriver("https://hr.example.com/login", changed), collect)
+    print(f"📊 Снимков: {collect.calls}, статистика: {cache.stats()}")
+    return collect.calls == 2 and snapshot[0]["structure"] == changed and cache.stats()["invalidations"] == 1
+
+
+def test_ttl_and_variants(cache_dir):
+    """Устаревшая запись и другой сборщик не берутся из кэша"""
+    print("\n🔧 Тестирование TTL и видов сборщика...")
+    cache = PageSnapshotCache(cache_dir=cache_dir, ttl_seconds=0.2)
+    collect = Collector()
+    driver = FakeDriver("https://example.com/catalog", LOGIN)
+    cache.snapshot(driver, collect, variant="agent")
+    cache.snapshot(driver, collect, variant="loc_define2")
+    time.sleep(0.3)
+    cache.snapshot(driver, collect, variant="agent")
+    print(f"📊 Снимков: {collect.calls}, статистика: {cache.stats()}")
+    return collect.calls == 3
+
+
+def test_shared_between_processes(cache_dir):
+    """Новый экземпляр кэша (другой процесс) читает записи с диска"""
+    print("\n🔧 Тестирование общего каталога кэша...")
+    driver = FakeDriver("https://www.saucedemo.com/inventory.html", LOGIN)
+    PageSnapshotCache(cache_dir=cache_dir).snapshot(driver, Collector(), variant="ai_test_generator")
+    collect = Collector()
+    other = PageSnapshotCache(cache_dir=cache_dir)
+    other.snapshot(driver, collect, variant="ai_test_generator")
+    print(f"📊 Снимков во втором экземпляре: {collect.calls}")
+    return collect.calls == 0
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование кэша снимков страниц")
+    print("=" * 50)
+
+    tests = [
+        ("Повторная страница", test_repeated_page_hits_cache),
+        ("Изменение отпечатка", test_fingerprint_change_invalidates),
+        ("TTL и виды сборщика", test_ttl_and_variants),
+        ("Общий каталог", test_shared_between_processes),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                if test_func(cache_dir):
+                    print(f"✅ {test_name} - ПРОЙДЕН")
+                    passed += 1
+                else:
+                    print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки снимка страницы (page_snapshot).
+Вместо браузера — драйвер, который запоминает вызовы execute_script
+и возвращает подготовленную JSON-строку, как её отдаёт SNAPSHOT_SCRIPT.
+"""
+
+import json
+import re
+import sys
+
+from page_snapshot import DEFAULT_TAGS, SNAPSHOT_ATTRIBUTES, SNAPSHOT_SCRIPT, take_page_snapshot, to_element_info
+
+RECORD_FIELDS = {"selector", "tag", "text", "visible", "attributes", "rect", "css", "xpath"}
+
+LOGIN_PAGE = [
+    {
+        "selector": "input", "tag": "input", "text": "", "visible": True,
+        "attributes": {"id": "user-name", "name": "user-name", "type": "text", "placeholder": "Username",
+                       "data-test": "username", "class": "input_error form_input"},
+        "rect": {"x": 660, "y": 220, "width": 300, "height": 40},
+        "css": "#user-name", "xpath": "//*[@id='user-name']",
+    },
+    {
+        "selector": "input", "tag": "input", "text": "", "visible": True,
+        "attributes": {"id": "login-button", "name": "login-button", "type": "submit", "value": "Login",
+                       "data-test": "login-button"},
+        "rect": {"x": 660, "y": 380, "width": 300, "height": 49},
+        "css": "#login-button", "xpath": "//*[@id='login-button']",
+    },
+    {
+        "selector": "div", "tag": "div", "text": "Swag Labs", "visible": True,
+        "attributes": {"class": "login_logo"},
+        "rect": {"x": 0, "y": 20, "width": 1620, "height": 60},
+        "css": "div.login_logo", "xpath": "/html/body/div/div/div[1]",
+    },
+]
+
+
+class SnapshotDriver:
+    """Драйвер, который отдаёт готовый снимок и запоминает аргументы каждого вызова"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.calls = []
+
+    def execute_script(self, script, *args):
+        self.calls.append((script, args))
+        return self.raw
+
+    def find_elements(self, by, value):
+        raise AssertionError("снимок не должен искать элементы по одному")
+
+
+def test_single_script_call():
+    """Снимок собирается одним execute_script со скриптом, тегами, опциями и списком атрибутов"""
+    print("🔧 Тестирование одного вызова скрипта...")
+    driver = SnapshotDriver(json.dumps(LOGIN_PAGE))
+    snapshot = take_page_snapshot(driver)
+    script, (selectors, options, attributes) = driver.calls[0]
+    print(f"📊 Вызовов: {len(driver.calls)}, селекторы: {selectors}, опции: {options}, элементов: {len(snapshot)}")
+    return (
+        len(driver.calls) == 1 and script == SNAPSHOT_SCRIPT and selectors == DEFAULT_TAGS and
+        options == {"visible_only": True, "limit_per_selector": 0, "text_limit": 0} and
+        attributes == SNAPSHOT_ATTRIBUTES and snapshot == LOGIN_PAGE and
+        all(set(record) == RECORD_FIELDS for record in snapshot)
+    )
+
+
+def test_options_passed_to_script():
+    """Селекторы и ограничения передаются скрипту как есть, пустой ответ — пустой снимок"""
+    print("\n🔧 Тестирование параметров снимка...")
+    driver = SnapshotDriver("[]")
+    snapshot = take_page_snapshot(driver, ("input", "[data-test]"), visible_only=False,
+                                  limit_per_selector=20, text_limit=100)
+    _, (selectors, options, _) = driver.calls[0]
+    missing = take_page_snapshot(SnapshotDriver(None), ["button"])
+    print(f"📊 Селекторы: {selectors}, опции: {options}, пустые снимки: {snapshot}, {missing}")
+    return (
+        selectors == ["input", "[data-test]"] and
+        options == {"visible_only": False, "limit_per_selector": 20, "text_limit": 100} and
+        snapshot == [] and missing == []
+    )
+
+
+def test_script_record_fields():
+    """Скрипт возвращает записи с полями из описания take_page_snapshot и читает все атрибуты"""
+    print("\n🔧 Тестирование полей записи в скрипте...")
+    push = SNAPSHOT_SCRIPT[SNAPSHOT_SCRIPT.index("result.push({"):]
+    push = push[:push.index("});")]
+    rect_fields = set(re.findall(r"(\w+): Math\.round", push))
+    fields = set(re.findall(r"^\s*(\w+):", re.sub(r"\{[^{}]*\}", "", push), re.MULTILINE))
+    print(f"📊 Поля записи: {sorted(fields)}, поля rect: {sorted(rect_fields)}")
+    return (
+        fields == RECORD_FIELDS and rect_fields == {"x", "y", "width", "height"} and
+        "readAttr(el, attrNames[a])" in SNAPSHOT_SCRIPT and "return JSON.stringify(result);" in SNAPSHOT_SCRIPT
+    )
+
+
+def test_to_element_info():
+    """Поля записи берутся из неё самой, атрибуты с дефисом — через подчёркивание, отсутствующие — None"""
+    print("\n🔧 Тестирование плоского словаря элемента...")
+    info = to_element_info(LOGIN_PAGE[0], ("tag", "text", "id", "name", "data_test", "aria_label", "css", "xpath", "visible"))
+    button = to_element_info(LOGIN_PAGE[1], ("value", "type", "rect"))
+    ax = to_element_info(dict(LOGIN_PAGE[1], ax_role="button", accessible_name="Login"), ("ax_role", "accessible_name", "id"))
+    print(f"📊 Элементы: {info}, {button}, {ax}")
+    return (
+        info == {"tag": "input", "text": "", "id": "user-name", "name": "user-name", "data_test": "username",
+                 "aria_label": None, "css": "#user-name", "xpath": "//*[@id='user-name']", "visible": True} and
+        button == {"value": "Login", "type": "submit", "rect": {"x": 660, "y": 380, "width": 300, "height": 49}} and
+        ax == {"ax_role": "button", "accessible_name": "Login", "id": "login-button"} and
+        to_element_info({"tag": "span"}, ("tag", "id")) == {"tag": "span", "id": None}
+    )
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование снимка страницы")
+    print("=" * 50)
+
+    tests = [
+        ("Один вызов скрипта", test_single_script_call),
+        ("Параметры снимка", test_options_passed_to_script),
+        ("Поля записи в скрипте", test_script_record_fields),
+        ("Плоский словарь элемента", test_to_element_info),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки ожидания стабильной страницы (page_transition).
+Вместо браузера — драйвер, который по очереди возвращает состояния страницы.
+"""
+
+import sys
+import time
+
+from element_probe import ElementProbe
+from page_transition import TRANSITION_SCRIPT, wait_for_stable_page
+
+
+def state(url, stable, pending=0):
+    return {"url": url, "ready_state": "complete", "pending": pending, "quiet_ms": 0, "stable": stable}
+
+
+class ScriptedDriver:
+    """Драйвер, который на TRANSITION_SCRIPT отдаёт состояния по очереди (последнее повторяется)"""
+
+    def __init__(self, states):
+        self.states = list(states)
+        self.calls = 0
+
+    def execute_script(self, script, quiet_ms, mark):
+        assert script == TRANSITION_SCRIPT
+        self.calls += 1
+        current = self.states[0] if len(self.states) == 1 else self.states.pop(0)
+        if isinstance(current, Exception):
+            raise current
+        return current
+
+
+def test_returns_when_stable():
+    """Ожидание заканчивается на первом стабильном состоянии, а не по таймауту"""
+    print("🔧 Тестирование стабилизации после перехода...")
+    driver = ScriptedDriver([
+        state("https://www.saucedemo.com/", False),
+        Exception("javascript error: document unloaded while waiting for result"),
+        state("https://www.saucedemo.com/inventory.html", False, pending=2),
+        state("https://www.saucedemo.com/inventory.html", True),
+    ])
+    started = time.perf_counter()
+    result = wait_for_stable_page(driver, timeout=5, start_url="https://www.saucedemo.com/", poll_interval=0.01)
+    elapsed = time.perf_counter() - started
+    print(f"📊 Результат: {result}, опросов: {driver.calls}, время: {elapsed:.2f} с")
+    return result["stable"] and result["url_changed"] and driver.calls == 4 and elapsed < 1
+
+
+def test_timeout_when_never_stable():
+    """Страница с постоянными запросами ждётся не дольше таймаута"""
+    print("\n🔧 Тестирование таймаута...")
+    driver = ScriptedDriver([state("https://example.com/live", False, pending=1)])
+    started = time.perf_counter()
+    result = wait_for_stable_page(driver, timeout=0.3, poll_interval=0.02)
+    elapsed = time.perf_counter() - started
+    print(f"📊 Результат: {result}, время: {elapsed:.2f} с")
+    return not result["stable"] and result["pending"] == 1 and 0.3 <= elapsed < 1
+
+
+def test_probe_accounts_wait():
+    """ElementProbe учитывает ожидание стабильности в своей статистике"""
+    print("\n🔧 Тестирование учёта в ElementProbe...")
+    probe = ElementProbe(ScriptedDriver([state("https://example.com/", True)]))
+    result = probe.wait_for_stable_page(timeout=1)
+    stats = probe.stats()
+    print(f"📊 Статистика: {stats}")
+    return result["stable"] and stats["calls"].get("page_stable") == 1 and stats["timeouts"] == 0
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование ожидания стабильной страницы")
+    print("=" * 50)
+
+    tests = [
+        ("Стабилизация после перехода", test_returns_when_stable),
+        ("Таймаут", test_timeout_when_never_stable),
+        ("Учёт в ElementProbe", test_probe_accounts_wait),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
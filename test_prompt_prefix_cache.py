@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки кэша состояний префиксов промптов (PrefixStateCache).
+Вместо llama.cpp — модель, у которой токен равен символу, а состояние —
+копия контекста.
+"""
+
+import os
+import sys
+import tempfile
+
+from prompt_prefix_cache import PrefixStateCache
+
+JAVA_PREFIX = "[INST] <<SYS>>\nТы - эксперт по автоматизации тестирования на Java + Selenium.\n<</SYS>>\n\n"
+LOCATORS_PREFIX = "[INST] Верни только JSON с локаторами элементов.\n"
+
+
+class FakeLlama:
+    """Контекст модели — список токенов; считает вычисленные токены и загрузки состояния"""
+
+    def __init__(self, n_ctx=4096):
+        self._n_ctx = n_ctx
+        self.input_ids = []
+        self.evaluated = 0
+        self.loads = 0
+
+    @property
+    def n_tokens(self):
+        return len(self.input_ids)
+
+    def n_ctx(self):
+        return self._n_ctx
+
+    def tokenize(self, text, add_bos=True):
+        return ([1] if add_bos else []) + [ord(ch) for ch in text.decode("utf-8")]
+
+    def reset(self):
+        self.input_ids = []
+
+    def eval(self, tokens):
+        self.evaluated += len(tokens)
+        self.input_ids = self.input_ids + list(tokens)
+
+    def save_state(self):
+        return {"input_ids": list(self.input_ids)}
+
+    def load_state(self, state):
+        self.loads += 1
+        self.input_ids = list(state["input_ids"])
+
+
+def make_cache(workdir, llm):
+    model_path = os.path.join(workdir, "model.gguf")
+    if not os.path.exists(model_path):
+        with open(model_path, "wb") as f:
+            f.write(b"GGUF")
+    return PrefixStateCache(llm, model_path)
+
+
+def test_computed_then_reused():
+    """Первый вызов вычисляет префикс, повторный при том же контексте ничего не делает"""
+    print("🔧 Тестирование вычисления префикса...")
+    with tempfile.TemporaryDirectory() as workdir:
+        llm = FakeLlama()
+        cache = make_cache(workdir, llm)
+        cache.prepare("java", JAVA_PREFIX)
+        evaluated = llm.evaluated
+        cache.prepare("java", JAVA_PREFIX)
+        files = os.listdir(cache.cache_dir)
+        print(f"📊 Статистика: {cache.stats}, вычислено токенов: {llm.evaluated}, файлы: {files}")
+        return (
+            evaluated == len(JAVA_PREFIX) + 1 and llm.evaluated == evaluated and
+            cache.stats == {"reused": 1, "memory": 0, "disk": 0, "computed": 1} and
+            cache.cache_dir == os.path.join(workdir, "model.prefix_cache") and len(files) == 1
+        )
+
+
+def test_memory_restore():
+    """После другого шаблона префикс восстанавливается из памяти без вычисления"""
+    print("\n🔧 Тестирование восстановления из памяти...")
+    with tempfile.TemporaryDirectory() as workdir:
+        llm = FakeLlama()
+        cache = make_cache(workdir, llm)
+        cache.prepare("java", JAVA_PREFIX)
+        cache.prepare("locators", LOCATORS_PREFIX)
+        evaluated = llm.evaluated
+        cache.prepare("java", JAVA_PREFIX)
+        print(f"📊 Статистика: {cache.stats}, загрузок состояния: {llm.loads}")
+        return (
+            llm.evaluated == evaluated and llm.loads == 1 and
+            llm.input_ids == llm.tokenize(JAVA_PREFIX.encode("utf-8")) and
+            cache.stats == {"reused": 0, "memory": 1, "disk": 0, "computed": 2}
+        )
+
+
+def test_disk_restore():
+    """Новый процесс с той же моделью берёт состояние с диска; другой n_ctx — вычисляет заново"""
+    print("\n🔧 Тестирование восстановления с диска...")
+    with tempfile.TemporaryDirectory() as workdir:
+        make_cache(workdir, FakeLlama()).prepare("java", JAVA_PREFIX)
+        restarted = FakeLlama()
+        cache = make_cache(workdir, restarted)
+        cache.prepare("java", JAVA_PREFIX)
+        other_ctx = FakeLlama(n_ctx=8192)
+        other = make_cache(workdir, other_ctx)
+        other.prepare("java", JAVA_PREFIX)
+        print(f"📊 Статистика: {cache.stats}, другой n_ctx: {other.stats}")
+        return (
+            restarted.evaluated == 0 and restarted.loads == 1 and
+            cache.stats == {"reused": 0, "memory": 0, "disk": 1, "computed": 0} and
+            other.stats["computed"] == 1 and other_ctx.evaluated > 0
+        )
+
+
+def test_broken_disk_state():
+    """Испорченный файл состояния не ломает вызов: префикс вычисляется заново"""
+    print("\n🔧 Тестирование испорченного файла...")
+    with tempfile.TemporaryDirectory() as workdir:
+        first = make_cache(workdir, FakeLlama())
+        first.prepare("java", JAVA_PREFIX)
+        for name in os.listdir(first.cache_dir):
+            with open(os.path.join(first.cache_dir, name), "wb") as f:
+                f.write(b"not a pickle")
+        llm = FakeLlama()
+        cache = make_cache(workdir, llm)
+        cache.prepare("java", JAVA_PREFIX)
+        print(f"📊 Статистика: {cache.stats}")
+        return cache.stats["computed"] == 1 and llm.evaluated == len(JAVA_PREFIX) + 1
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование кэша префиксов промптов")
+    print("=" * 50)
+
+    tests = [
+        ("Вычисление префикса", test_computed_then_reused),
+        ("Восстановление из памяти", test_memory_restore),
+        ("Восстановление с диска", test_disk_restore),
+        ("Испорченный файл", test_broken_disk_state),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки конвейера обработки сценариев (scenario_pipeline).
+Вместо модели, браузера и GitHub — фиктивные стадии, которые записывают
+порядок вызовов; браузеры пула — фиктивные драйверы.
+"""
+
+import sys
+import threading
+import time
+
+import browser_pool
+from scenario_pipeline import ScenarioPipeline
+
+URL = "https://www.saucedemo.com/"
+LOCATORS = '[{"element": "Кнопка Login", "locator": {"type": "id", "value": "login-button"}}]'
+JAVA_CODE = "public class LoginTest {}"
+
+FULL_PATH = ["download", "analyze", "collect", "locate", "verify", "generate", "publish"]
+
+
+class FakeDriver:
+    """Драйвер для пула: отвечает на проверку здоровья и очистку сессии"""
+
+    window_handles = ["main"]
+
+    class switch_to:
+        @staticmethod
+        def window(handle):
+            pass
+
+    def execute_script(self, script, *args):
+        return 1
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return {}
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        pass
+
+
+class FakeModelClient:
+    """Стадии модели и браузера; fail — стадия, которая бросает исключение для файла"""
+
+    def __init__(self, agent, browser_delay=0.0):
+        self.agent = agent
+        self.browser_delay = browser_delay
+
+    def resolve_scenario_target(self, content):
+        self.agent.record(content, "analyze")
+        # Адрес и требуемые элементы несут имя файла для следующих стадий
+        return URL + content, [{"name": "Кнопка Login", "description": "вход в систему", "file": content}]
+
+    def indexed_locators(self, url, required_elements):
+        return None
+
+    def static_locators(self, url, required_elements):
+        return None
+
+    def snapshot_page(self, driver, probe, url):
+        self.agent.collect_started()
+        time.sleep(self.browser_delay)
+        self.agent.record(url[len(URL):], "collect")
+        return [{"tag": "button", "id": "login-button"}], []
+
+    def generate_locators(self, required_elements, page_elements, page_snapshot=None):
+        self.agent.record(required_elements[0]["file"], "locate")
+        return LOCATORS
+
+    def reload_and_verify_locators(self, driver, probe, url, locators, page_snapshot=None):
+        self.agent.record(url[len(URL):], "verify")
+        return locators
+
+
+class FakeAgent:
+    """
+    Агент с фиктивными стадиями. Содержимое сценария — его имя, так стадии
+    знают, к какому файлу относится вызов.
+    """
+
+    def __init__(self, fail=None, browser_delay=0.0):
+        self.fail = fail or {}
+        self.events = {}
+        self.model_client = FakeModelClient(self, browser_delay)
+        self.analyzed = 0
+        self.collecting = 0
+        self.max_waiting = 0
+        self._lock = threading.Lock()
+
+    def record(self, filename, stage):
+        with self._lock:
+            self.events.setdefault(filename, []).append(stage)
+            if stage == "analyze":
+                self.analyzed += 1
+                self._update_waiting()
+        if self.fail.get(filename) == stage:
+            raise RuntimeError(f"{stage} failed")
+
+    def collect_started(self):
+        with self._lock:
+            self.collecting += 1
+
+    def _update_waiting(self):
+        # Сценарии, которые модель уже разобрала, а браузер ещё не взял
+        self.max_waiting = max(self.max_waiting, self.analyzed - self.collecting)
+
+    def download_scenario_file(self, filename):
+        self.record(filename, "download")
+        return None, filename
+
+    def lookup_generated_test(self, content, filename):
+        return None
+
+    def generate_java_from_locators(self, content, filename, locators, analysis=None):
+        self.record(filename, "generate")
+        return JAVA_CODE, filename.replace(".txt", ".java")
+
+    def stage_aft_test(self, java_code, java_filename):
+        self.record(java_filename.replace(".java", ".txt"), "publish")
+        return True
+
+
+def run_pipeline(agent, count, **kwargs):
+    files = [(f"scenario_{i}.txt", f"sha{i}") for i in range(count)]
+    pipeline = ScenarioPipeline(agent, **kwargs)
+    return pipeline, pipeline.run_batch(files)
+
+
+def test_stage_order():
+    """Каждый сценарий проходит все стадии по порядку, результаты — по всем файлам"""
+    print("🔧 Тестирование порядка стадий...")
+    agent = FakeAgent()
+    pipeline, results = run_pipeline(agent, 6, browser_workers=2)
+    paths = agent.events
+    print(f"📊 Результаты: {results}, путь первого: {paths.get('scenario_0.txt')}")
+    metrics = pipeline.metrics_summary(1.0)
+    return (
+        len(results) == 6 and all(results.values()) and
+        all(events == FULL_PATH for events in paths.values()) and
+        all(metrics[stage]["items"] == 6 for stage in FULL_PATH)
+    )
+
+
+def test_backpressure():
+    """Модель не разбирает сценарии впрок: очередь к медленному браузеру ограничена"""
+    print("\n🔧 Тестирование ограничения очереди к браузерам...")
+    agent = FakeAgent(browser_delay=0.1)
+    pipeline, results = run_pipeline(agent, 8, browser_workers=1, queue_size=1)
+    print(f"📊 Максимум ожидающих браузер: {agent.max_waiting}, результаты: {list(results.values())}")
+    # В очереди один сценарий, ещё один может ждать места в очереди у LLM-воркера
+    return all(results.values()) and len(results) == 8 and agent.max_waiting <= pipeline.queue_size + pipeline.llm_workers
+
+
+def test_stage_failure():
+    """Исключение любой стадии проваливает только свой сценарий; ошибка проверки локаторов не фатальна"""
+    print("\n🔧 Тестирование ошибок стадий...")
+    fail = {
+        "scenario_0.txt": "analyze",
+        "scenario_1.txt": "collect",
+        "scenario_2.txt": "locate",
+        "scenario_3.txt": "generate",
+        "scenario_4.txt": "verify",
+        "scenario_5.txt": "download",
+        "scenario_6.txt": "publish",
+    }
+    agent = FakeAgent(fail=fail)
+    pipeline, results = run_pipeline(agent, 8, browser_workers=2)
+    metrics = pipeline.metrics_summary(1.0)
+    print(f"📊 Результаты: {results}")
+    return (
+        [results[f"scenario_{i}.txt"] for i in range(8)] == [False, False, False, False, True, False, False, True] and
+        agent.events["scenario_0.txt"] == ["download", "analyze"] and
+        agent.events["scenario_4.txt"] == FULL_PATH and
+        agent.events["scenario_5.txt"] == ["download"] and
+        agent.events["scenario_6.txt"] == FULL_PATH and
+        all(metrics[stage]["errors"] == 1 for stage in FULL_PATH)
+    )
+
+
+def test_flush_failure_marks_all_failed():
+    """Пакетный коммит не создан — все файлы пачки провалены, статус не сохраняется"""
+    print("\n🔧 Тестирование ошибки публикации пачки...")
+    from agent_v024_interface import TestAutomationAgent
+
+    class FakePublisher:
+        def __init__(self):
+            self.calls = []
+
+        def refresh(self):
+            self.calls.append("refresh")
+
+        def flush(self):
+            self.calls.append("flush")
+            return False
+
+        def discard(self):
+            self.calls.append("discard")
+
+    class Stats:
+        def log_stats(self):
+            pass
+
+    agent = FakeAgent()
+    agent.aft_publisher = FakePublisher()
+    agent.processed_files = set()
+    agent.file_tracking = {}
+    agent.generation_cache = Stats()
+    agent.model_client.page_cache = Stats()
+    agent.model_client.locator_index = Stats()
+    agent._save_file_tracking_status = lambda: None
+
+    files = [(f"scenario_{i}.txt", f"sha{i}") for i in range(3)]
+    ok = TestAutomationAgent._process_changed_files(agent, ScenarioPipeline(agent, browser_workers=2), files)
+    print(f"📊 Результат: {ok}, вызовы: {agent.aft_publisher.calls}, статус: {agent.file_tracking}")
+    return (
+        not ok and agent.aft_publisher.calls == ["refresh", "flush", "discard"] and
+        not agent.processed_files and not agent.file_tracking and
+        all(events[-1] == "publish" for events in agent.events.values())
+    )
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование конвейера сценариев")
+    print("=" * 50)
+
+    browser_pool.get_shared_pool(driver_factory=FakeDriver)
+
+    tests = [
+        ("Порядок стадий", test_stage_order),
+        ("Ограничение очереди", test_backpressure),
+        ("Ошибки стадий", test_stage_failure),
+        ("Ошибка публикации пачки", test_flush_failure_marks_all_failed),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    browser_pool.close_shared_pools()
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки сканирования репозитория сценариев
+(TestAutomationAgent.scan_scenario_repository).
+Вместо GitHub — фиктивный репозиторий с тем же интерфейсом, что у PyGithub,
+и фиктивный requests для запроса ref ветки. Агент создаётся без __init__:
+модель, Jenkins и подключение к GitHub тесту не нужны.
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+from github import GithubException
+
+import agent_v024_interface
+from agent_v024_interface import TestAutomationAgent
+
+SCENARIO_REPO = "qa-team/scenarios"
+SCAN_STATE = {"head_sha": "head1", "ref_etag": 'W/"head1"', "branch": "main"}
+
+FILES = {
+    "README.md": "readme1",
+    "login.txt": "login1",
+    "cart/add_item.txt": "cart1",
+    "cart/checkout/payment.txt": "payment1",
+    "docs/notes.md": "notes1",
+}
+
+
+class Obj:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class FakeRepo:
+    """Ветка main с файлами {путь: blob sha}; считает вызовы API"""
+
+    default_branch = "main"
+
+    def __init__(self, files, truncated=False):
+        self.files = dict(files)
+        self.truncated = truncated
+        self.changes = []
+        self.compare_error = None
+        self.calls = []
+
+    def compare(self, base, head):
+        self.calls.append(("compare", base, head))
+        if self.compare_error:
+            raise self.compare_error
+        return Obj(files=[Obj(filename=path, sha=sha, status=status) for path, sha, status in self.changes])
+
+    def get_git_tree(self, ref, recursive=False):
+        self.calls.append(("get_git_tree", ref, recursive))
+        dirs = {os.path.dirname(path) for path in self.files} - {""}
+        tree = [Obj(path=path, sha=sha, type="blob") for path, sha in self.files.items()]
+        tree += [Obj(path=path, sha=f"tree-{path}", type="tree") for path in sorted(dirs)]
+        return Obj(raw_data={"truncated": self.truncated}, tree=tree)
+
+    def get_contents(self, path):
+        self.calls.append(("get_contents", path))
+        entries = {}
+        prefix = f"{path}/" if path else ""
+        for file_path, sha in self.files.items():
+            if not file_path.startswith(prefix):
+                continue
+            name, _, rest = file_path[len(prefix):].partition("/")
+            if rest:
+                entries[name] = Obj(type="dir", name=name, path=prefix + name, sha=f"tree-{prefix + name}")
+            else:
+                entries[name] = Obj(type="file", name=name, path=file_path, sha=sha)
+        return list(entries.values())
+
+
+class FakeGithub:
+    def __init__(self, repo):
+        self.repo = repo
+        self.get_repo_calls = 0
+
+    def get_repo(self, name):
+        self.get_repo_calls += 1
+        if name != SCENARIO_REPO:
+            raise GithubException(404, {"message": "Not Found"}, None)
+        return self.repo
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = headers or {}
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeRequests:
+    """Ref ветки: head — текущий коммит, ETag меняется вместе с ним"""
+
+    def __init__(self, head="head1", fail=False):
+        self.head = head
+        self.fail = fail
+        self.calls = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls.append((url, dict(headers or {})))
+        if self.fail:
+            raise RuntimeError("connection reset")
+        etag = f'W/"{self.head}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, {"object": {"sha": self.head}}, {"ETag": etag})
+
+
+def make_agent(repo, file_tracking=None, scan_state=None):
+    agent = TestAutomationAgent.__new__(TestAutomationAgent)
+    agent.scenario_repo_name = SCENARIO_REPO
+    agent.github_token = "token"
+    agent.github_client = FakeGithub(repo)
+    agent.file_tracking = dict(file_tracking or {})
+    agent.scan_state = dict(scan_state or {})
+    agent._pending_scan_state = None
+    return agent
+
+
+def with_requests(fake, check):
+    """Выполняет check с подменённым requests в рабочей директории-песочнице"""
+    saved_requests, saved_cwd = agent_v024_interface.requests, os.getcwd()
+    agent_v024_interface.requests = fake
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            return check()
+        finally:
+            os.chdir(saved_cwd)
+            agent_v024_interface.requests = saved_requests
+
+
+def test_full_scan_with_one_tree_request():
+    """Первый скан: одно обращение к git trees API, только .txt, отслеживаемые без изменений пропускаются"""
+    print("🔧 Тестирование полного скана деревом...")
+    repo = FakeRepo(FILES)
+    agent = make_agent(repo, file_tracking={"login.txt": "login1", "cart/add_item.txt": "cart0", "old.txt": "old1"})
+
+    def check():
+        changed = agent.scan_scenario_repository()
+        print(f"📊 Изменённые: {changed}, вызовы API: {repo.calls}")
+        return (
+            changed == [("cart/add_item.txt", "cart1"), ("cart/checkout/payment.txt", "payment1")] and
+            repo.calls == [("get_git_tree", "head1", True)]
+        )
+
+    return with_requests(FakeRequests(), check)
+
+
+def test_truncated_tree_fallback():
+    """Усечённый ответ git trees API — обход директорий через get_contents с теми же sha"""
+    print("\n🔧 Тестирование усечённого дерева...")
+    repo = FakeRepo(FILES, truncated=True)
+    agent = make_agent(repo)
+
+    def check():
+        changed = agent.scan_scenario_repository()
+        walked = sorted(call[1] for call in repo.calls if call[0] == "get_contents")
+        print(f"📊 Изменённые: {changed}, обход: {walked}")
+        return (
+            changed == [("cart/add_item.txt", "cart1"), ("cart/checkout/payment.txt", "payment1"), ("login.txt", "login1")] and
+            walked == ["", "cart", "cart/checkout", "docs"] and repo.calls[0] == ("get_git_tree", "head1", True)
+        )
+
+    return with_requests(FakeRequests(), check)
+
+
+def test_repository_errors():
+    """Ошибка GitHub при скане не выходит наружу — скан возвращает пустой список"""
+    print("\n🔧 Тестирование ошибок GitHub...")
+    agent = make_agent(FakeRepo(FILES))
+    agent.scenario_repo_name = "qa-team/missing"
+    changed = with_requests(FakeRequests(fail=True), agent.scan_scenario_repository)
+    print(f"📊 Изменённые: {changed}, обращений к get_repo: {agent.github_client.get_repo_calls}")
+    return changed == [] and agent.github_client.get_repo_calls == 2
+
+
+def test_idle_scan_not_modified():
+    """Повторный скан без изменений: условный запрос получает 304, к GitHub API обращений нет"""
+    print("\n🔧 Тестирование скана без изменений...")
+    repo = FakeRepo(FILES)
+    agent = make_agent(repo)
+    fake = FakeRequests()
+
+    def check():
+        first = agent.scan_scenario_repository()
+        agent._commit_scan_state(True)
+        calls, get_repo_calls = list(repo.calls), agent.github_client.get_repo_calls
+        second = agent.scan_scenario_repository()
+        print(f"📊 Первый скан: {len(first)} файлов, второй: {second}, заголовки: {[h for _, h in fake.calls]}")
+        return (
+            len(first) == 3 and second == [] and agent.scan_state == SCAN_STATE and
+            "If-None-Match" not in fake.calls[0][1] and fake.calls[1][1]["If-None-Match"] == 'W/"head1"' and
+            fake.calls[1][0].endswith("/repos/qa-team/scenarios/git/ref/heads/main") and
+            repo.calls == calls and agent.github_client.get_repo_calls == get_repo_calls == 1
+        )
+
+    return with_requests(fake, check)
+
+
+def test_compare_after_push():
+    """После нового коммита берутся только изменённые .txt из compare, удалённые пропускаются"""
+    print("\n🔧 Тестирование сравнения коммитов...")
+    repo = FakeRepo(FILES)
+    repo.changes = [("login.txt", "login2", "modified"), ("old.txt", "old1", "removed"),
+                    ("README.md", "readme2", "modified"), ("search.txt", "search1", "added")]
+    agent = make_agent(repo, file_tracking={"login.txt": "login1", "old.txt": "old1"}, scan_state=SCAN_STATE)
+
+    def check():
+        changed = agent.scan_scenario_repository()
+        print(f"📊 Изменённые: {changed}, вызовы API: {repo.calls}")
+        return (
+            changed == [("login.txt", "login2"), ("search.txt", "search1")] and
+            repo.calls == [("compare", "head1", "head2")] and
+            agent._pending_scan_state == {"head_sha": "head2", "ref_etag": 'W/"head2"', "branch": "main"}
+        )
+
+    return with_requests(FakeRequests(head="head2"), check)
+
+
+def test_compare_fallback_to_tree():
+    """Ошибка compare или 300 файлов в сравнении — полный скан деревом нового коммита"""
+    print("\n🔧 Тестирование полного скана вместо сравнения...")
+    results = []
+    for error, changes in (
+        (GithubException(404, {"message": "No common ancestor"}, None), []),
+        (None, [(f"bulk/{i}.txt", f"bulk{i}", "added") for i in range(300)]),
+    ):
+        repo = FakeRepo(FILES)
+        repo.compare_error = error
+        repo.changes = changes
+        agent = make_agent(repo, scan_state=SCAN_STATE)
+        changed = with_requests(FakeRequests(head="head2"), agent.scan_scenario_repository)
+        results.append((len(changed), [call[0] for call in repo.calls], repo.calls[-1]))
+    print(f"📊 Результаты: {results}")
+    return all(result == (3, ["compare", "get_git_tree"], ("get_git_tree", "head2", True)) for result in results)
+
+
+def test_scan_state_roundtrip():
+    """Состояние скана переживает перезапуск; после ошибок head не сдвигается и ETag сбрасывается"""
+    print("\n🔧 Тестирование файла состояния скана...")
+    repo = FakeRepo(FILES)
+    fake = FakeRequests()
+
+    def check():
+        agent = make_agent(repo)
+        agent.scan_scenario_repository()
+        agent._commit_scan_state(True)
+        with open(agent_v024_interface.SCENARIO_SCAN_STATE_FILE, encoding="utf-8") as f:
+            saved = json.load(f)
+        restarted = make_agent(repo)
+        restarted._load_scan_state()
+        loaded = dict(restarted.scan_state)
+
+        fake.head = "head2"
+        repo.changes = [("login.txt", "login2", "modified")]
+        pushed = restarted.scan_scenario_repository()
+        restarted._commit_scan_state(False)
+        failed_state = dict(restarted.scan_state)
+        retried = restarted.scan_scenario_repository()
+        retry_headers = fake.calls[-1][1]
+
+        with open(agent_v024_interface.SCENARIO_SCAN_STATE_FILE, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        broken = make_agent(repo)
+        broken._load_scan_state()
+        print(f"📊 Сохранено: {saved}, после ошибки: {failed_state}, повтор: {retried}, битый файл: {broken.scan_state}")
+        return (
+            saved == SCAN_STATE and loaded == SCAN_STATE and
+            pushed == [("login.txt", "login2")] and retried == pushed and
+            failed_state == dict(SCAN_STATE, ref_etag=None) and "If-None-Match" not in retry_headers and
+            repo.calls[-2:] == [("compare", "head1", "head2")] * 2 and broken.scan_state == {}
+        )
+
+    return with_requests(fake, check)
+
+
+def test_conditional_request_failure():
+    """Ошибка условного запроса — полный скан, состояние скана не меняется"""
+    print("\n🔧 Тестирование ошибки условного запроса...")
+    repo = FakeRepo(FILES)
+    agent = make_agent(repo, scan_state=SCAN_STATE)
+
+    def check():
+        changed = agent.scan_scenario_repository()
+        agent._commit_scan_state(True)
+        print(f"📊 Изменённые: {len(changed)}, вызовы API: {repo.calls}, состояние: {agent.scan_state}")
+        return (
+            len(changed) == 3 and repo.calls == [("get_git_tree", "main", True)] and
+            agent.scan_state == SCAN_STATE and not os.path.exists(agent_v024_interface.SCENARIO_SCAN_STATE_FILE)
+        )
+
+    return with_requests(FakeRequests(fail=True), check)
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование сканирования репозитория сценариев")
+    print("=" * 50)
+
+    tests = [
+        ("Полный скан деревом", test_full_scan_with_one_tree_request),
+        ("Усечённое дерево", test_truncated_tree_fallback),
+        ("Ошибки GitHub", test_repository_errors),
+        ("Скан без изменений", test_idle_scan_not_modified),
+        ("Сравнение коммитов", test_compare_after_push),
+        ("Полный скан вместо сравнения", test_compare_fallback_to_tree),
+        ("Файл состояния скана", test_scan_state_roundtrip),
+        ("Ошибка условного запроса", test_conditional_request_failure),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
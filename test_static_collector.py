@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки сбора элементов без браузера (StaticPageCollector).
+Страницы отдаёт локальный статический HTTP-сервер.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from static_collector import StaticPageCollector
+
+PAGES = {
+    "login.html": """<!doctype html>
+<html><head><title>HR Portal</title><script src="/analytics.js"></script></head>
+<body>
+<form id="login-form" action="/login" method="post">
+  <label for="username">Имя пользователя</label>
+  <input id="username" name="username" type="text" placeholder="Логин">
+  <label for="password">Пароль</label>
+  <input id="password" name="password" type="password">
+  <input type="hidden" name="csrf" value="token">
+  <div style="display:none"><button>Служебная кнопка</button></div>
+  <button type="submit" class="btn">Войти</button>
+  <button type="reset" class="btn">Очистить</button>
+</form>
+<table><tr><td><a href="/forgot">Забыли пароль?</a></td></tr></table>
+</body></html>""",
+    "spa.html": """<!doctype html>
+<html><head><title>App</title></head>
+<body><div id="root"></div><script src="/bundle.js"></script></body></html>""",
+}
+
+LOGIN_ELEMENTS = [
+    {"name": "Поле ввода логина", "description": "имя пользователя"},
+    {"name": "Поле ввода пароля", "description": "пароль"},
+    {"name": "Кнопка Войти", "description": "отправка формы входа"},
+]
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(directory):
+    """Статический сервер на свободном порту в фоновом потоке"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_static_snapshot(base_url):
+    """Видимые элементы формы с уникальными CSS и XPath, скрытые пропущены"""
+    print("🔧 Тестирование статического снимка...")
+    records = StaticPageCollector(selectors=["input", "button", "a", "label"]).collect(f"{base_url}/login.html")
+    by_text = {record["text"] or record["attributes"].get("name"): record for record in records}
+    print(f"📊 Элементы: {[(r['tag'], r['text'], r['css']) for r in records]}")
+    return (
+        "csrf" not in by_text and "Служебная кнопка" not in by_text and
+        by_text["username"]["css"] == "#username" and
+        by_text["Войти"]["css"] == "#login-form > button:nth-of-type(1)" and
+        by_text["Очистить"]["xpath"] == "/html/body/form/button[2]" and
+        by_text["Забыли пароль?"]["attributes"]["href"] == f"{base_url}/forgot" and
+        by_text["Забыли пароль?"]["xpath"] == "/html/body/table/tbody/tr/td/a"
+    )
+
+
+def test_locate_without_browser(base_url):
+    """Все требуемые элементы найдены в HTML — локаторы без браузера"""
+    print("\n🔧 Тестирование поиска локаторов в статическом HTML...")
+    found = StaticPageCollector().locate(f"{base_url}/login.html", LOGIN_ELEMENTS)
+    locators = [entry["locator"]["value"] for entry in found[1]] if found else None
+    print(f"📊 Локаторы: {locators}")
+    return (
+        locators == ["username", "password", "#login-form > button:nth-of-type(1)"] and
+        all(entry["verification"]["source"] == "static" for entry in found[1])
+    )
+
+
+def test_fallback_to_browser(base_url):
+    """Страница на JS и недостающий элемент требуют браузера"""
+    print("\n🔧 Тестирование перехода к браузеру...")
+    collector = StaticPageCollector()
+    spa = collector.locate(f"{base_url}/spa.html", LOGIN_ELEMENTS)
+    missing = collector.locate(f"{base_url}/login.html", LOGIN_ELEMENTS + [{"name": "Ссылка на корзину", "description": ""}])
+    absent = collector.locate(f"{base_url}/missing.html", LOGIN_ELEMENTS)
+    print(f"📊 SPA: {spa}, без корзины: {missing}, 404: {absent}, переходов к браузеру: {collector.fallbacks}")
+    return spa is None and missing is None and absent is None and collector.fallbacks == 3
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование сбора элементов без браузера")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, html in PAGES.items():
+            with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+                f.write(html)
+        server, base_url = start_server(directory)
+
+        tests = [
+            ("Статический снимок", test_static_snapshot),
+            ("Локаторы без браузера", test_locate_without_browser),
+            ("Переход к браузеру", test_fallback_to_browser),
+        ]
+
+        passed = 0
+        total = len(tests)
+        try:
+            for test_name, test_func in tests:
+                try:
+                    if test_func(base_url):
+                        print(f"✅ {test_name} - ПРОЙДЕН")
+                        passed += 1
+                    else:
+                        print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+                except Exception as e:
+                    print(f"❌ {test_name} - ОШИБКА: {e}")
+        finally:
+            server.shutdown()
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки контроля потоковой генерации (stream_guard).
+Поток токенов модели имитируется нарезкой текста на короткие фрагменты.
+"""
+
+import sys
+
+from stream_guard import JavaStreamGuard
+
+JAVA_CLASS = '''import org.junit.jupiter.api.Test;
+
+public class LoginTest {
+    // Закрывающая скобка в комментарии: }
+    /* и в блочном комментарии: } } */
+    private static final String BRACES = "}}{";
+    private static final char OPEN = '{';
+
+    @Test
+    public void login() {
+        driver.findElement(By.id("login-button")).click();
+    }
+}'''
+
+
+def feed_tokens(guard, text, size=3):
+    """Подаёт текст фрагментами по size символов, пока guard не вынесет решение"""
+    for i in range(0, len(text), size):
+        if guard.feed(text[i:i + size]):
+            break
+    return guard.verdict
+
+
+def test_class_complete():
+    """Скобки в строках, символах и комментариях не считаются; болтовня после класса отбрасывается"""
+    print("🔧 Тестирование завершения класса...")
+    guard = JavaStreamGuard()
+    verdict = feed_tokens(guard, JAVA_CLASS + "\n\nЭтот тест проверяет вход в систему и ещё много чего.")
+    print(f"📊 Решение: {verdict}, токенов: {guard.tokens}, причина: {guard.reason}")
+    return verdict == "complete" and guard.result() == JAVA_CLASS
+
+
+def test_no_early_stop():
+    """Без текста после класса решение не выносится, незакрытый класс не завершён"""
+    print("\n🔧 Тестирование незавершённого класса...")
+    whole = JavaStreamGuard()
+    unfinished = JavaStreamGuard()
+    feed_tokens(whole, JAVA_CLASS)
+    feed_tokens(unfinished, JAVA_CLASS[:-1])
+    print(f"📊 Решения: {whole.verdict}, {unfinished.verdict}")
+    return whole.verdict is None and whole.result() == JAVA_CLASS and unfinished.verdict is None
+
+
+def test_next_declaration_continues():
+    """После первого класса идёт новое объявление Java — генерация продолжается"""
+    print("\n🔧 Тестирование нескольких классов...")
+    guard = JavaStreamGuard()
+    text = JAVA_CLASS + "\n\nclass Helper {\n    int x = 1;\n}\n```\nГотово!"
+    verdict = feed_tokens(guard, text)
+    print(f"📊 Решение: {verdict}, длина результата: {len(guard.result())}")
+    return verdict == "complete" and guard.result().endswith("class Helper {\n    int x = 1;\n}")
+
+
+def test_split_tokens():
+    """Комментарий и слово class, разрезанные между токенами, распознаются"""
+    print("\n🔧 Тестирование разрезанных токенов...")
+    guard = JavaStreamGuard()
+    for token in ["public cla", "ss A {", " /", "/ }", "\n", "}", "\nthe end of the answer text"]:
+        guard.feed(token)
+    print(f"📊 Решение: {guard.verdict}, результат: {guard.result()!r}")
+    return guard.verdict == "complete" and guard.result() == "public class A { // }\n}"
+
+
+def test_repeated_lines():
+    """Одна строка четыре раза подряд — вывод зациклился; три раза и строки из скобок — нет"""
+    print("\n🔧 Тестирование повторяющихся строк...")
+    line = "        driver.findElement(By.id(\"login\")).click();\n"
+    header = "public class LoopTest {\n    public void run() {\n"
+    looping = JavaStreamGuard()
+    normal = JavaStreamGuard()
+    feed_tokens(looping, header + line * 4, size=5)
+    feed_tokens(normal, header + line * 3 + "    }\n" + "}\n" * 5, size=5)
+    print(f"📊 Решения: {looping.verdict} ({looping.reason}), {normal.verdict}")
+    return looping.verdict == "derailed" and "repeated 4 times" in looping.reason and normal.verdict is None
+
+
+def test_no_class():
+    """Нет class за первые 600 токенов — генерация прерывается"""
+    print("\n🔧 Тестирование вывода без класса...")
+    chatter = JavaStreamGuard()
+    late = JavaStreamGuard()
+    for i in range(700):
+        if chatter.feed(f"word{i} "):
+            break
+    for i in range(700):
+        late.feed("public class Late {" if i == 599 else f"word{i} ")
+    print(f"📊 Решения: {chatter.verdict} после {chatter.tokens} токенов, {late.verdict}")
+    return chatter.verdict == "derailed" and chatter.tokens == 600 and late.verdict is None
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование контроля потоковой генерации")
+    print("=" * 50)
+
+    tests = [
+        ("Завершение класса", test_class_complete),
+        ("Незавершённый класс", test_no_early_stop),
+        ("Несколько классов", test_next_declaration_continues),
+        ("Разрезанные токены", test_split_tokens),
+        ("Повторяющиеся строки", test_repeated_lines),
+        ("Вывод без класса", test_no_class),
+    ]
+
+    passed = 0
+    total = len(tests)
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"✅ {test_name} - ПРОЙДЕН")
+                passed += 1
+            else:
+                print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+        except Exception as e:
+            print(f"❌ {test_name} - ОШИБКА: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Тестовый скрипт для проверки приёма GitHub push-вебхуков.
+Отправляет записанный payload на локальный WebhookTrigger — без GitHub и агента.
+"""
+
+import hashlib
+import hmac
+import json
+import sys
+import urllib.error
+import urllib.request
+
+from webhook_trigger import WebhookTrigger
+
+SECRET = "test-secret"
+
+# Сокращённый payload push-события GitHub
+PUSH_PAYLOAD = {
+    "ref": "refs/heads/main",
+    "before": "1111111111111111111111111111111111111111",
+    "after": "2222222222222222222222222222222222222222",
+    "repository": {"full_name": "johny19844/scenario", "default_branch": "main"},
+    "commits": [
+        {"id": "aaa", "added": ["login.txt", "README.md"], "modified": [], "removed": []},
+        {"id": "bbb", "added": [], "modified": ["cart/checkout.txt"], "removed": ["old.txt"]},
+    ],
+}
+
+
+def post(port, payload, event="push", secret=SECRET):
+    """Отправляет payload и возвращает (статус, ответ)"""
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json", "X-GitHub-Event": event}
+    if secret:
+        digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        headers["X-Hub-Signature-256"] = f"sha256={digest}"
+    req = urllib.request.Request(f"http://127.0.0.1:{port}/github-webhook", data=body, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_push_enqueues_txt_paths(trigger):
+    """Подписанный push ставит в очередь только .txt пути"""
+    print("🔧 Тестирование push-события...")
+    status, body = post(trigger.port, PUSH_PAYLOAD)
+    paths = trigger.wait_for_paths(timeout=2)
+    print(f"📊 Ответ: {status} {body}, очередь: {paths}")
+    return status == 202 and paths == {"login.txt", "cart/checkout.txt"}
+
+
+def test_invalid_signature_rejected(trigger):
+    """Push с неверной подписью отклоняется и ничего не ставит в очередь"""
+    print("\n🔧 Тестирование неверной подписи...")
+    status, _ = post(trigger.port, PUSH_PAYLOAD, secret="wrong-secret")
+    paths = trigger.wait_for_paths(timeout=0.5)
+    print(f"📊 Ответ: {status}, очередь: {paths}")
+    return status == 401 and paths is None
+
+
+def test_other_branch_ignored(trigger):
+    """Push в другую ветку или репозиторий игнорируется"""
+    print("\n🔧 Тестирование push в другую ветку...")
+    payload = dict(PUSH_PAYLOAD, ref="refs/heads/feature")
+    status, body = post(trigger.port, payload)
+    paths = trigger.wait_for_paths(timeout=0.5)
+    print(f"📊 Ответ: {status} {body}, очередь: {paths}")
+    return status == 202 and body.get("status") == "ignored" and paths is None
+
+
+def test_ping(trigger):
+    """Ping-событие при создании вебхука"""
+    print("\n🔧 Тестирование ping...")
+    status, body = post(trigger.port, {"zen": "Keep it logically awesome."}, event="ping")
+    print(f"📊 Ответ: {status} {body}")
+    return status == 200
+
+
+def test_unsigned_local_only(trigger):
+    """Без секрета эндпоинт слушает только 127.0.0.1, но неподписанный push принимает"""
+    print("\n🔧 Тестирование запуска без секрета...")
+    unsigned = WebhookTrigger(secret="", repo_full_name="johny19844/scenario", host="0.0.0.0", port=0)
+    unsigned.start()
+    try:
+        status, _ = post(unsigned.port, PUSH_PAYLOAD, secret=None)
+        paths = unsigned.wait_for_paths(timeout=2)
+    finally:
+        unsigned.stop()
+    print(f"📊 Адрес: {unsigned.host}, ответ: {status}, очередь: {paths}")
+    return unsigned.host == "127.0.0.1" and status == 202 and paths == {"login.txt", "cart/checkout.txt"}
+
+
+def main():
+    """Основная функция тестирования"""
+    print("🚀 Тестирование webhook-триггера")
+    print("=" * 50)
+
+    trigger = WebhookTrigger(secret=SECRET, repo_full_name="johny19844/scenario", host="127.0.0.1", port=0)
+    trigger.start()
+
+    tests = [
+        ("Push-событие", test_push_enqueues_txt_paths),
+        ("Неверная подпись", test_invalid_signature_rejected),
+        ("Другая ветка", test_other_branch_ignored),
+        ("Ping", test_ping),
+        ("Запуск без секрета", test_unsigned_local_only),
+    ]
+
+    passed = 0
+    total = len(tests)
+    try:
+        for test_name, test_func in tests:
+            try:
+                if test_func(trigger):
+                    print(f"✅ {test_name} - ПРОЙДЕН")
+                    passed += 1
+                else:
+                    print(f"❌ {test_name} - НЕ ПРОЙДЕН")
+            except Exception as e:
+                print(f"❌ {test_name} - ОШИБКА: {e}")
+    finally:
+        trigger.stop()
+
+    print("\n" + "=" * 50)
+    print(f"📊 Результаты: {passed}/{total} тестов пройдено")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,161 @@
+"""
+Событийный запуск агента по GitHub push-вебхуку.
+
+Небольшой HTTP-сервер (только стандартная библиотека) принимает payload
+push-события, проверяет подпись X-Hub-Signature-256 и ставит в очередь
+ровно те .txt файлы, которые были добавлены или изменены в коммитах.
+Агент ждёт событий не дольше scan_interval, после чего делает обычный
+скан — опрос остаётся запасным вариантом на случай потерянных доставок.
+
+Без секрета (GITHUB_WEBHOOK_SECRET) подпись проверить нельзя, поэтому
+эндпоинт слушает только 127.0.0.1 — поддельный payload с другой машины
+не запустит скан и генерацию тестов.
+
+Локальная проверка: отправить записанный payload через curl или test_webhook_trigger.py.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+def verify_signature(secret, body, signature_header):
+    """
+    Проверяет подпись GitHub (заголовок X-Hub-Signature-256: sha256=<hex>).
+    Без секрета проверка отключена (WebhookTrigger тогда слушает только 127.0.0.1).
+    """
+    if not secret:
+        return True
+    if not signature_header or not signature_header.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header.split("=", 1)[1])
+
+
+def extract_txt_paths(payload):
+    """
+    Возвращает множество добавленных/изменённых .txt путей из push payload.
+    Удалённые файлы не обрабатываются.
+    """
+    paths = set()
+    for commit in payload.get("commits", []):
+        for path in commit.get("added", []) + commit.get("modified", []):
+            if path.endswith(".txt"):
+                paths.add(path)
+        for path in commit.get("removed", []):
+            paths.discard(path)
+    return paths
+
+
+LOCAL_HOST = "127.0.0.1"
+
+
+class WebhookTrigger:
+    """
+    HTTP-эндпоинт для push-вебхуков и очередь изменённых путей для агента.
+    """
+    def __init__(self, secret=None, repo_full_name=None, host="0.0.0.0", port=8090, path="/github-webhook"):
+        self.secret = secret
+        self.repo_full_name = repo_full_name
+        if not secret and host != LOCAL_HOST:
+            logger.warning(
+                f"⚠️ Webhook secret is not set: push signatures are NOT verified, "
+                f"listening on {LOCAL_HOST} instead of {host}"
+            )
+            host = LOCAL_HOST
+        self.host = host
+        self.port = port
+        self.path = path
+        self.events = queue.Queue()
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """
+        Запускает HTTP-сервер в фоновом потоке.
+        """
+        trigger = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                trigger._handle(self)
+
+            def log_message(self, format, *args):
+                logger.debug("webhook: " + format % args)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="webhook", daemon=True)
+        self._thread.start()
+        logger.info(f"🪝 Webhook endpoint listening on http://{self.host}:{self.port}{self.path}")
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def wait_for_paths(self, timeout):
+        """
+        Ждёт событие не дольше timeout секунд.
+        Возвращает множество путей (все накопившиеся события объединяются) или None по таймауту.
+        """
+        try:
+            paths = set(self.events.get(timeout=timeout))
+        except queue.Empty:
+            return None
+        while True:
+            try:
+                paths.update(self.events.get_nowait())
+            except queue.Empty:
+                return paths
+
+    # ------------------------------------------------------------------
+    def _respond(self, handler, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _handle(self, handler):
+        if handler.path.split("?", 1)[0] != self.path:
+            return self._respond(handler, 404, {"error": "not found"})
+
+        length = int(handler.headers.get("Content-Length", 0))
+        body = handler.rfile.read(length)
+        if not verify_signature(self.secret, body, handler.headers.get("X-Hub-Signature-256")):
+            logger.warning("⚠️ Webhook rejected: invalid signature")
+            return self._respond(handler, 401, {"error": "invalid signature"})
+
+        event = handler.headers.get("X-GitHub-Event", "")
+        if event == "ping":
+            return self._respond(handler, 200, {"status": "pong"})
+        if event != "push":
+            return self._respond(handler, 202, {"status": "ignored", "event": event})
+
+        try:
+            payload = json.loads(body.decode("utf-8"))
+        except ValueError:
+            return self._respond(handler, 400, {"error": "invalid JSON"})
+
+        repository = payload.get("repository", {})
+        full_name = repository.get("full_name", "")
+        if self.repo_full_name and full_name.lower() != self.repo_full_name.lower():
+            return self._respond(handler, 202, {"status": "ignored", "repository": full_name})
+        default_branch = repository.get("default_branch")
+        if default_branch and payload.get("ref") != f"refs/heads/{default_branch}":
+            return self._respond(handler, 202, {"status": "ignored", "ref": payload.get("ref")})
+
+        paths = extract_txt_paths(payload)
+        if paths:
+            self.events.put(paths)
+            logger.info(f"🪝 Push {payload.get('after', '')[:7]}: queued {sorted(paths)}")
+        return self._respond(handler, 202, {"status": "queued", "paths": sorted(paths)})